@@ -1,17 +1,22 @@
 import base64
+import datetime
 import json
 import logging
+import pickle
 import secrets
 from typing import Optional
 
 import click
 from flask import current_app
+from sqlalchemy import update
 from werkzeug.exceptions import NotFound
 
 from configs import dify_config
 from constants.languages import languages
+from core.rag.datasource.keyword.jieba.jieba_inverted_index import JiebaInvertedIndex
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.datasource.vdb.vector_type import VectorType
+from core.rag.embedding.embedding_codec import EmbeddingFormat, encode_embedding, is_encoded_embedding
 from core.rag.models.document import Document
 from events.app_event import app_was_created
 from extensions.ext_database import db
@@ -20,11 +25,12 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models import Tenant
-from models.dataset import Dataset, DatasetCollectionBinding, DocumentSegment
+from models.dataset import Dataset, DatasetCollectionBinding, DatasetKeywordTable, DocumentSegment, Embedding
 from models.dataset import Document as DatasetDocument
 from models.model import Account, App, AppAnnotationSetting, AppMode, Conversation, MessageAnnotation
 from models.provider import Provider, ProviderModel
 from services.account_service import RegisterService, TenantService
+from services.retention_purge_service import RetentionPurgeService
 
 
 @click.command("reset-password", help="Reset the account password.")
@@ -649,3 +655,153 @@ where sites.id is null limit 1000"""
                 break
 
     click.echo(click.style("Fix for missing app-related sites completed successfully!", fg="green"))
+
+
+@click.command("migrate-embedding-cache", help="Rewrite cached embeddings into the compact binary format.")
+@click.option(
+    "--format",
+    "embedding_format",
+    type=click.Choice([embedding_format.value for embedding_format in EmbeddingFormat]),
+    default=None,
+    help="Storage format, default is EMBEDDING_CACHE_STORAGE_FORMAT.",
+)
+@click.option("--batch-size", default=1000, show_default=True, help="Number of embeddings rewritten per batch.")
+def migrate_embedding_cache(embedding_format: Optional[str], batch_size: int):
+    """
+    Rewrite pickled embeddings of the embeddings table into the compact binary format.
+    """
+    if not dify_config.EMBEDDING_CACHE_COMPACT_FORMAT_ENABLED:
+        click.echo(
+            click.style(
+                "EMBEDDING_CACHE_COMPACT_FORMAT_ENABLED is not enabled, enable it once every process is upgraded.",
+                fg="red",
+            )
+        )
+        return
+
+    target_format = EmbeddingFormat(embedding_format or dify_config.EMBEDDING_CACHE_STORAGE_FORMAT)
+    click.echo(click.style(f"Starting embedding cache migration to {target_format}.", fg="green"))
+
+    last_id = None
+    migrated_count = 0
+    failed_count = 0
+    old_size = 0
+    new_size = 0
+    while True:
+        query = db.session.query(Embedding.id, Embedding.embedding).order_by(Embedding.id)
+        if last_id:
+            query = query.filter(Embedding.id > last_id)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = []
+        for row in rows:
+            if is_encoded_embedding(row.embedding):
+                continue
+
+            try:
+                embedding = encode_embedding(pickle.loads(row.embedding), target_format)
+            except Exception:
+                failed_count += 1
+                logging.exception(f"Failed to migrate embedding {row.id}")
+                continue
+
+            updates.append({"id": row.id, "embedding": embedding})
+            old_size += len(row.embedding)
+            new_size += len(embedding)
+
+        if updates:
+            db.session.execute(update(Embedding), updates)
+        db.session.commit()
+
+        migrated_count += len(updates)
+        click.echo(f"{migrated_count} embeddings migrated, {failed_count} failed.")
+
+    saved_ratio = (1 - new_size / old_size) * 100 if old_size else 0
+    click.echo(
+        click.style(
+            f"Embedding cache migration completed, {migrated_count} embeddings migrated, {failed_count} failed, "
+            f"size {old_size} bytes -> {new_size} bytes, saved {old_size - new_size} bytes ({saved_ratio:.1f}%).",
+            fg="green",
+        )
+    )
+
+
+@click.command("migrate-keyword-index", help="Migrate keyword tables into the inverted keyword index.")
+@click.option("--batch-size", default=100, show_default=True, help="Number of keyword tables migrated per batch.")
+def migrate_keyword_index(batch_size: int):
+    """
+    Import the JSON keyword tables of the `jieba` keyword store into the postings of the `jieba_inverted_index`
+    keyword store, the keyword tables are kept. Postings already imported are skipped, so it can be run again
+    to catch up with keyword tables changed before switching KEYWORD_STORE.
+    """
+    click.echo(click.style("Starting keyword index migration.", fg="green"))
+
+    last_id = None
+    migrated_count = 0
+    failed_count = 0
+    posting_count = 0
+    while True:
+        query = db.session.query(DatasetKeywordTable).order_by(DatasetKeywordTable.id)
+        if last_id:
+            query = query.filter(DatasetKeywordTable.id > last_id)
+        dataset_keyword_tables = query.limit(batch_size).all()
+        if not dataset_keyword_tables:
+            break
+        last_id = dataset_keyword_tables[-1].id
+
+        for dataset_keyword_table in dataset_keyword_tables:
+            try:
+                dataset = db.session.query(Dataset).filter(Dataset.id == dataset_keyword_table.dataset_id).first()
+                keyword_table_dict = dataset_keyword_table.keyword_table_dict
+                if not dataset or not keyword_table_dict:
+                    continue
+
+                posting_count += JiebaInvertedIndex(dataset).import_keyword_table(
+                    keyword_table_dict["__data__"]["table"]
+                )
+                migrated_count += 1
+            except Exception:
+                db.session.rollback()
+                failed_count += 1
+                logging.exception(f"Failed to migrate keyword table of dataset {dataset_keyword_table.dataset_id}")
+
+        click.echo(f"{migrated_count} keyword tables migrated, {failed_count} failed.")
+
+    click.echo(
+        click.style(
+            f"Keyword index migration completed, {migrated_count} keyword tables migrated, {failed_count} failed, "
+            f"{posting_count} postings.",
+            fg="green",
+        )
+    )
+
+
+@click.command("purge-expired-messages", help="Delete expired messages and cached embeddings.")
+@click.option("--dry-run", is_flag=True, default=False, help="Count the rows that would be deleted, without deleting.")
+@click.option("--batch-size", default=None, type=int, help="Number of rows deleted per batch.")
+def purge_expired_messages(dry_run: bool, batch_size: Optional[int]):
+    """
+    Delete the messages of the tenants on the sandbox plan created more than PLAN_SANDBOX_CLEAN_MESSAGE_DAY_SETTING
+    days ago and the cached embeddings created more than PLAN_SANDBOX_CLEAN_DAY_SETTING days ago,
+    like the clean_messages and clean_embedding_cache_task schedules.
+    """
+    click.echo(click.style(f"Starting expired messages purge{' (dry run)' if dry_run else ''}.", fg="green"))
+    batch_size = batch_size or dify_config.RETENTION_PURGE_BATCH_SIZE
+    now = datetime.datetime.now()
+
+    stats = RetentionPurgeService.purge_messages(
+        before=now - datetime.timedelta(days=dify_config.PLAN_SANDBOX_CLEAN_MESSAGE_DAY_SETTING),
+        batch_size=batch_size,
+        dry_run=dry_run,
+    )
+    click.echo(click.style(f"Messages: {stats.to_report()}", fg="green"))
+
+    stats = RetentionPurgeService.purge_embeddings(
+        before=now - datetime.timedelta(days=dify_config.PLAN_SANDBOX_CLEAN_DAY_SETTING),
+        batch_size=batch_size,
+        dry_run=dry_run,
+    )
+    click.echo(click.style(f"Embeddings: {stats.to_report()}", fg="green"))
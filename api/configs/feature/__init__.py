@@ -5,6 +5,7 @@ from pydantic import (
     Field,
     HttpUrl,
     NegativeInt,
+    NonNegativeFloat,
     NonNegativeInt,
     PositiveFloat,
     PositiveInt,
@@ -61,6 +62,20 @@ class AppExecutionConfig(BaseSettings):
         description="Maximum number of concurrent active requests per app (0 for unlimited)",
         default=0,
     )
+    APP_MAX_WAITING_REQUESTS: NonNegativeInt = Field(
+        description="Maximum number of requests per app waiting for an active request to finish"
+        " when the app is at its maximum active requests, in first in first out order (0 to reject immediately)",
+        default=0,
+    )
+    APP_MAX_WAIT_TIME: PositiveFloat = Field(
+        description="Maximum time in seconds a request waits for an active request to finish before it is rejected",
+        default=5.0,
+    )
+    APP_STREAM_COALESCE_WINDOW: NonNegativeFloat = Field(
+        description="Time window in seconds in which text chunks of a stream response are sent in a single frame"
+        " (0 to send every text chunk in its own frame)",
+        default=0.0,
+    )
 
 
 class CodeExecutionSandboxConfig(BaseSettings):
@@ -93,6 +108,50 @@ class CodeExecutionSandboxConfig(BaseSettings):
         default=10.0,
     )
 
+    CODE_EXECUTION_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections to the code execution service",
+        default=100,
+    )
+
+    CODE_EXECUTION_POOL_MAX_KEEPALIVE_CONNECTIONS: NonNegativeInt = Field(
+        description="Maximum number of idle keep-alive connections to the code execution service,"
+        " 0 disables keep-alive",
+        default=20,
+    )
+
+    CODE_EXECUTION_POOL_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Time in seconds an idle keep-alive connection to the code execution service is kept open",
+        default=5.0,
+    )
+
+    CODE_EXECUTION_BATCH_SIZE: NonNegativeInt = Field(
+        description="Maximum number of input sets executed in one code execution request by batch executions,"
+        " such as a sequential iteration with a single code node, 0 disables batch executions."
+        " The sandbox time limit applies to the whole request, an execution it interrupts is run again on its own",
+        default=0,
+    )
+
+    JINJA2_RENDER_MODE: Literal["remote", "local"] = Field(
+        description="Where jinja2 templates of template transform nodes and prompts are rendered,"
+        " 'remote' in the code execution sandbox or 'local' in process in a sandboxed jinja2 environment",
+        default="remote",
+    )
+
+    JINJA2_TEMPLATE_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of compiled jinja2 templates cached in process when rendering locally",
+        default=256,
+    )
+
+    JINJA2_RENDER_MAX_OUTPUT_LENGTH: PositiveInt = Field(
+        description="Maximum length in characters of a jinja2 template rendered locally",
+        default=1000000,
+    )
+
+    JINJA2_RENDER_TIMEOUT: PositiveFloat = Field(
+        description="Maximum time in seconds to render a jinja2 template locally",
+        default=5.0,
+    )
+
     CODE_MAX_NUMBER: PositiveInt = Field(
         description="Maximum allowed numeric value in code execution",
         default=9223372036854775807,
@@ -314,6 +373,28 @@ class HttpConfig(BaseSettings):
         default=5,
     )
 
+    SSRF_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections of the pooled HTTP client of each proxy"
+        " configuration (SSRF)",
+        default=100,
+    )
+
+    SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS: NonNegativeInt = Field(
+        description="Maximum number of idle keep-alive connections kept by the pooled HTTP client of each proxy"
+        " configuration (SSRF), 0 disables keep-alive",
+        default=20,
+    )
+
+    SSRF_POOL_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Time in seconds an idle keep-alive connection is kept open (SSRF)",
+        default=5.0,
+    )
+
+    SSRF_STREAM_CHUNK_SIZE: PositiveInt = Field(
+        description="Size in bytes of the chunks read by streaming downloads (SSRF)",
+        default=64 * 1024,
+    )
+
     RESPECT_XFORWARD_HEADERS_ENABLED: bool = Field(
         description="Enable handling of X-Forwarded-For, X-Forwarded-Proto, and X-Forwarded-Port headers"
         " when the app is behind a single trusted reverse proxy.",
@@ -388,6 +469,31 @@ class ModelLoadBalanceConfig(BaseSettings):
         default=False,
     )
 
+    MODEL_LB_STRATEGY: Literal["round_robin", "least_outstanding_requests", "ewma_latency"] = Field(
+        description="Strategy to pick the load balancing config of a model invocation: 'round_robin',"
+        " 'least_outstanding_requests' for the config with the fewest requests in flight,"
+        " or 'ewma_latency' for the config with the lowest moving average latency weighted by requests in flight",
+        default="round_robin",
+    )
+
+    MODEL_LB_EWMA_DECAY: float = Field(
+        description="Weight of the latest latency in the moving average latency of a load balancing config, 0 to 1",
+        default=0.3,
+        gt=0,
+        le=1,
+    )
+
+    MODEL_LB_STATS_SYNC_INTERVAL: PositiveFloat = Field(
+        description="Interval in seconds the request stats of load balancing configs are shared between processes",
+        default=5.0,
+    )
+
+    MODEL_LB_COOLDOWN_CHECK_INTERVAL: PositiveFloat = Field(
+        description="Time in seconds a load balancing config not in cooldown is trusted to stay out of cooldown"
+        " before it is checked again",
+        default=1.0,
+    )
+
 
 class BillingConfig(BaseSettings):
     """
@@ -441,6 +547,11 @@ class WorkflowConfig(BaseSettings):
         default=200 * 1024,
     )
 
+    WORKFLOW_EXECUTION_PLAN_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of compiled workflow execution plans cached per process",
+        default=128,
+    )
+
 
 class WorkflowNodeExecutionConfig(BaseSettings):
     """
@@ -448,10 +559,65 @@ class WorkflowNodeExecutionConfig(BaseSettings):
     """
 
     MAX_SUBMIT_COUNT: PositiveInt = Field(
-        description="Maximum number of submitted thread count in a ThreadPool for parallel node execution",
+        description="Maximum number of queued tasks per workflow run in the shared scheduler for parallel node"
+        " execution, further submissions wait until the queue drains",
         default=100,
     )
 
+    WORKFLOW_SCHEDULER_MAX_WORKERS: PositiveInt = Field(
+        description="Maximum number of worker threads per process shared by all parallel node executions",
+        default=100,
+    )
+
+    WORKFLOW_SCHEDULER_MAX_COMPENSATION_WORKERS: NonNegativeInt = Field(
+        description="Maximum number of extra worker threads started while workers wait for nested parallel branches,"
+        " past it one more worker is only started when every worker is waiting",
+        default=100,
+    )
+
+    WORKFLOW_SCHEDULER_WORKER_IDLE_TIMEOUT: PositiveFloat = Field(
+        description="Idle time in seconds after which a scheduler worker thread exits",
+        default=60.0,
+    )
+
+    DOCUMENT_EXTRACTOR_MAX_WORKERS: PositiveInt = Field(
+        description="Maximum number of files of a file array extracted at the same time by a document extractor node",
+        default=4,
+    )
+
+    DOCUMENT_EXTRACTOR_CACHE_ENABLED: bool = Field(
+        description="Cache texts extracted by document extractor nodes by file content hash",
+        default=True,
+    )
+
+    DOCUMENT_EXTRACTOR_CACHE_SIZE: NonNegativeInt = Field(
+        description="Maximum number of extracted texts cached in process in front of the storage cache,"
+        " 0 disables the in-process cache",
+        default=128,
+    )
+
+    DOCUMENT_EXTRACTOR_CACHE_STORAGE_ENABLED: bool = Field(
+        description="Also keep texts extracted by document extractor nodes in storage under document_extractor_cache/,"
+        " shared by all processes, the cached texts are not deleted and must be cleaned up out of band",
+        default=False,
+    )
+
+    WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED: bool = Field(
+        description="Buffer the node executions of workflow runs and save them in batches in the background,"
+        " instead of committing every node event on the stream response path",
+        default=False,
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL: PositiveFloat = Field(
+        description="Interval in seconds between saves of buffered node executions",
+        default=1.0,
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE: PositiveInt = Field(
+        description="Number of buffered node executions that triggers a save before the flush interval",
+        default=200,
+    )
+
 
 class AuthConfig(BaseSettings):
     """
@@ -619,6 +785,24 @@ class RagEtlConfig(BaseSettings):
         default="false",
     )
 
+    PDF_EXTRACT_PROCESSES: NonNegativeInt = Field(
+        description="Number of processes parsing page ranges of large PDF files in parallel for knowledge indexing,"
+        " 0 or 1 parses the pages one after another in the calling thread",
+        default=0,
+    )
+
+    PDF_EXTRACT_PAGE_RANGE_SIZE: PositiveInt = Field(
+        description="Number of pages of a PDF file parsed by a process at a time,"
+        " PDF files with more pages are parsed in parallel",
+        default=50,
+    )
+
+    PDF_EXTRACT_MAX_PENDING_PAGE_RANGES: PositiveInt = Field(
+        description="Maximum number of PDF page ranges parsed ahead of the pages consumed,"
+        " which bounds the memory of parsed pages waiting to be consumed",
+        default=8,
+    )
+
 
 class DataSetConfig(BaseSettings):
     """
@@ -655,6 +839,11 @@ class DataSetConfig(BaseSettings):
         default=30,
     )
 
+    RETENTION_PURGE_BATCH_SIZE: PositiveInt = Field(
+        description="Number of expired messages or embeddings deleted per batch by the retention cleanup tasks",
+        default=1000,
+    )
+
 
 class WorkspaceConfig(BaseSettings):
     """
@@ -682,6 +871,54 @@ class IndexingConfig(BaseSettings):
         default=50,
     )
 
+    EMBEDDING_CACHE_QUERY_BATCH_SIZE: PositiveInt = Field(
+        description="Number of text hashes looked up per query in the document embedding cache",
+        default=1000,
+    )
+
+    EMBEDDING_MAX_CONCURRENT_BATCHES: PositiveInt = Field(
+        description="Maximum number of document embedding batches sent to the model concurrently",
+        default=1,
+    )
+
+    EMBEDDING_CACHE_STORAGE_FORMAT: Literal["float32", "float16", "int8"] = Field(
+        description="Storage format of cached embeddings, float16 and int8 trade precision for space",
+        default="float32",
+    )
+
+    EMBEDDING_CACHE_COMPACT_FORMAT_ENABLED: bool = Field(
+        description="Write cached embeddings in the compact EMBEDDING_CACHE_STORAGE_FORMAT format instead of"
+        " the legacy pickled and base64 formats, enable it only once every api and worker process reads it",
+        default=False,
+    )
+
+    QUERY_EMBEDDING_CACHE_SIZE: NonNegativeInt = Field(
+        description="Maximum number of query embeddings cached in process in front of Redis, 0 to disable",
+        default=1024,
+    )
+
+    QUERY_EMBEDDING_CACHE_TTL: PositiveInt = Field(
+        description="Time in seconds query embeddings are cached in process",
+        default=60,
+    )
+
+
+class MemoryConfig(BaseSettings):
+    """
+    Configuration for conversation memory
+    """
+
+    MEMORY_INCREMENTAL_TOKEN_COUNT: bool = Field(
+        description="Prune conversation history over the token limit using token counts cached per message,"
+        " instead of recounting the remaining history after each pruned message",
+        default=True,
+    )
+
+    MEMORY_MESSAGE_TOKEN_COUNT_CACHE_TTL: PositiveInt = Field(
+        description="Time in seconds token counts of conversation messages are cached",
+        default=86400,
+    )
+
 
 class MultiModalTransferConfig(BaseSettings):
     MULTIMODAL_SEND_FORMAT: Literal["base64", "url"] = Field(
@@ -802,6 +1039,7 @@ class FeatureConfig(
     IndexingConfig,
     LoggingConfig,
     MailConfig,
+    MemoryConfig,
     ModelLoadBalanceConfig,
     ModerationConfig,
     MultiModalTransferConfig,
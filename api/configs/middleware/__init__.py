@@ -83,7 +83,9 @@ class VectorStoreConfig(BaseSettings):
 class KeywordStoreConfig(BaseSettings):
     KEYWORD_STORE: str = Field(
         description="Method for keyword extraction and storage."
-        " Default is 'jieba', a Chinese text segmentation library.",
+        " Default is 'jieba', a Chinese text segmentation library."
+        " 'jieba_inverted_index' stores jieba keywords as an inverted index table,"
+        " run 'flask migrate-keyword-index' to migrate existing keyword tables.",
         default="jieba",
     )
 
@@ -26,6 +26,7 @@ from libs.login import login_required
 from models import Account, App
 from services.app_dsl_service import AppDslService, ImportMode
 from services.app_service import AppService
+from services.eager_loading_service import EagerLoadingService
 
 ALLOW_CREATE_APP_MODES = ["chat", "agent-chat", "advanced-chat", "workflow", "completion"]
 
@@ -67,6 +68,7 @@ class AppListApi(Resource):
         if not app_pagination:
             return {"data": [], "total": 0, "page": 1, "limit": 20, "has_more": False}
 
+        EagerLoadingService.load_apps(app_pagination.items)
         return marshal(app_pagination, app_pagination_fields)
 
     @setup_required
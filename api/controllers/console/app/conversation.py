@@ -23,6 +23,7 @@ from libs.helper import DatetimeString
 from libs.login import login_required
 from models import Conversation, EndUser, Message, MessageAnnotation
 from models.model import AppMode
+from services.eager_loading_service import EagerLoadingService
 
 
 class CompletionConversationApi(Resource):
@@ -92,6 +93,7 @@ class CompletionConversationApi(Resource):
         query = query.order_by(Conversation.created_at.desc())
 
         conversations = db.paginate(query, page=args["page"], per_page=args["limit"], error_out=False)
+        EagerLoadingService.load_conversations(conversations.items)
 
         return conversations
 
@@ -257,6 +259,7 @@ class ChatConversationApi(Resource):
                 query = query.order_by(Conversation.created_at.desc())
 
         conversations = db.paginate(query, page=args["page"], per_page=args["limit"], error_out=False)
+        EagerLoadingService.load_conversations(conversations.items)
 
         return conversations
 
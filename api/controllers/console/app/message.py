@@ -29,6 +29,7 @@ from libs.infinite_scroll_pagination import InfiniteScrollPagination
 from libs.login import login_required
 from models.model import AppMode, Conversation, Message, MessageAnnotation, MessageFeedback
 from services.annotation_service import AppAnnotationService
+from services.eager_loading_service import EagerLoadingService
 from services.errors.conversation import ConversationNotExistsError
 from services.errors.message import MessageNotExistsError, SuggestedQuestionsAfterAnswerDisabledError
 from services.message_service import MessageService
@@ -109,6 +110,7 @@ class ChatMessageListApi(Resource):
                 has_more = True
 
         history_messages = list(reversed(history_messages))
+        EagerLoadingService.load_messages(history_messages)
 
         return InfiniteScrollPagination(data=history_messages, limit=args["limit"], has_more=has_more)
 
@@ -27,6 +27,7 @@ from libs import helper
 from libs.helper import uuid_value
 from models.model import AppMode
 from services.app_generate_service import AppGenerateService
+from services.eager_loading_service import EagerLoadingService
 from services.errors.app import MoreLikeThisDisabledError
 from services.errors.conversation import ConversationNotExistsError
 from services.errors.message import MessageNotExistsError, SuggestedQuestionsAfterAnswerDisabledError
@@ -49,7 +50,7 @@ class MessageListApi(InstalledAppResource):
         args = parser.parse_args()
 
         try:
-            return MessageService.pagination_by_first_id(
+            pagination = MessageService.pagination_by_first_id(
                 app_model, current_user, args["conversation_id"], args["first_id"], args["limit"]
             )
         except services.errors.conversation.ConversationNotExistsError:
@@ -57,6 +58,9 @@ class MessageListApi(InstalledAppResource):
         except services.errors.message.FirstMessageNotExistsError:
             raise NotFound("First Message Not Exists.")
 
+        EagerLoadingService.load_messages(pagination.data)
+        return pagination
+
 
 class MessageFeedbackApi(InstalledAppResource):
     def post(self, installed_app, message_id):
@@ -13,6 +13,7 @@ from fields.conversation_fields import message_file_fields
 from fields.raws import FilesContainedField
 from libs.helper import TimestampField, uuid_value
 from models.model import App, AppMode, EndUser
+from services.eager_loading_service import EagerLoadingService
 from services.errors.message import SuggestedQuestionsAfterAnswerDisabledError
 from services.message_service import MessageService
 
@@ -88,7 +89,7 @@ class MessageListApi(Resource):
         args = parser.parse_args()
 
         try:
-            return MessageService.pagination_by_first_id(
+            pagination = MessageService.pagination_by_first_id(
                 app_model, end_user, args["conversation_id"], args["first_id"], args["limit"]
             )
         except services.errors.conversation.ConversationNotExistsError:
@@ -96,6 +97,9 @@ class MessageListApi(Resource):
         except services.errors.message.FirstMessageNotExistsError:
             raise NotFound("First Message Not Exists.")
 
+        EagerLoadingService.load_messages(pagination.data)
+        return pagination
+
 
 class MessageFeedbackApi(Resource):
     @validate_app_token(fetch_user_arg=FetchUserArg(fetch_from=WhereisUserArg.JSON, required=True))
@@ -27,6 +27,7 @@ from libs import helper
 from libs.helper import TimestampField, uuid_value
 from models.model import AppMode
 from services.app_generate_service import AppGenerateService
+from services.eager_loading_service import EagerLoadingService
 from services.errors.app import MoreLikeThisDisabledError
 from services.errors.conversation import ConversationNotExistsError
 from services.errors.message import MessageNotExistsError, SuggestedQuestionsAfterAnswerDisabledError
@@ -90,7 +91,7 @@ class MessageListApi(WebApiResource):
         args = parser.parse_args()
 
         try:
-            return MessageService.pagination_by_first_id(
+            pagination = MessageService.pagination_by_first_id(
                 app_model, end_user, args["conversation_id"], args["first_id"], args["limit"]
             )
         except services.errors.conversation.ConversationNotExistsError:
@@ -98,6 +99,9 @@ class MessageListApi(WebApiResource):
         except services.errors.message.FirstMessageNotExistsError:
             raise NotFound("First Message Not Exists.")
 
+        EagerLoadingService.load_messages(pagination.data)
+        return pagination
+
 
 class MessageFeedbackApi(WebApiResource):
     def post(self, app_model, end_user, message_id):
@@ -1,5 +1,7 @@
+import json
 from collections.abc import Mapping
-from typing import Any
+from functools import lru_cache
+from typing import Any, Optional, cast
 
 from core.file import FileUploadConfig
 
@@ -29,6 +31,20 @@ class FileUploadConfigManager:
 
                 return FileUploadConfig.model_validate(data)
 
+    @classmethod
+    def convert_workflow_features(
+        cls, workflow_id: str, features: Optional[str], is_vision: bool = True
+    ) -> Optional[FileUploadConfig]:
+        """
+        Convert workflow features to file upload config, memoized per workflow id and features,
+        the returned config is shared and must not be modified
+
+        :param workflow_id: workflow id
+        :param features: workflow features json
+        :param is_vision: if True, the feature is vision feature
+        """
+        return _convert_workflow_features(workflow_id, features or "", is_vision)
+
     @classmethod
     def validate_and_set_defaults(cls, config: dict) -> tuple[dict, list[str]]:
         """
@@ -42,3 +58,12 @@ class FileUploadConfigManager:
             FileUploadConfig.model_validate(config["file_upload"])
 
         return config, ["file_upload"]
+
+
+@lru_cache(maxsize=1024)
+def _convert_workflow_features(workflow_id: str, features: str, is_vision: bool) -> Optional[FileUploadConfig]:
+    # features are part of the key, as the features of the draft workflow change under the same workflow id
+    return cast(
+        Optional[FileUploadConfig],
+        FileUploadConfigManager.convert(json.loads(features) if features else {}, is_vision=is_vision),
+    )
@@ -1,6 +1,6 @@
 import logging
 from collections.abc import Mapping
-from typing import Any, cast
+from typing import Any, Optional, cast
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
@@ -19,6 +19,7 @@ from core.moderation.base import ModerationError
 from core.workflow.callbacks import WorkflowCallback, WorkflowLoggingCallback
 from core.workflow.entities.variable_pool import VariablePool
 from core.workflow.enums import SystemVariableKey
+from core.workflow.graph_engine.execution_plan import ExecutionPlan
 from core.workflow.workflow_entry import WorkflowEntry
 from extensions.ext_database import db
 from models.enums import UserFrom
@@ -72,6 +73,7 @@ class AdvancedChatAppRunner(WorkflowBasedAppRunner):
         if dify_config.DEBUG:
             workflow_callbacks.append(WorkflowLoggingCallback())
 
+        execution_plan: Optional[ExecutionPlan] = None
         if self.application_generate_entity.single_iteration_run:
             # if only single iteration run is requested
             graph, variable_pool = self._get_graph_and_variable_pool_of_single_iteration(
@@ -144,8 +146,9 @@ class AdvancedChatAppRunner(WorkflowBasedAppRunner):
                 conversation_variables=conversation_variables,
             )
 
-            # init graph
-            graph = self._init_graph(graph_config=workflow.graph_dict)
+            # init graph from the compiled execution plan
+            execution_plan = self._init_execution_plan(workflow)
+            graph = execution_plan.graph
 
         db.session.close()
 
@@ -166,6 +169,7 @@ class AdvancedChatAppRunner(WorkflowBasedAppRunner):
             invoke_from=self.application_generate_entity.invoke_from,
             call_depth=self.application_generate_entity.call_depth,
             variable_pool=variable_pool,
+            execution_plan=execution_plan,
         )
 
         generator = workflow_entry.run(
@@ -1,8 +1,10 @@
 import logging
 from abc import ABC, abstractmethod
-from collections.abc import Generator, Mapping
+from collections.abc import Callable, Generator, Mapping
 from typing import Any, Union
 
+from configs import dify_config
+from core.app.apps.stream_frame_encoder import StreamFrameEncoder
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.task_entities import AppBlockingResponse, AppStreamResponse
 from core.errors.error import ModelCurrentlyNotSupportError, ProviderTokenNotInitError, QuotaExceededError
@@ -22,28 +24,28 @@ class AppGenerateResponseConverter(ABC):
             if isinstance(response, AppBlockingResponse):
                 return cls.convert_blocking_full_response(response)
             else:
-
-                def _generate_full_response() -> Generator[str, Any, None]:
-                    for chunk in cls.convert_stream_full_response(response):
-                        if chunk == "ping":
-                            yield f"event: {chunk}\n\n"
-                        else:
-                            yield f"data: {chunk}\n\n"
-
-                return _generate_full_response()
+                return cls._encode_stream_response(response, cls.convert_stream_full_response)
         else:
             if isinstance(response, AppBlockingResponse):
                 return cls.convert_blocking_simple_response(response)
             else:
+                return cls._encode_stream_response(response, cls.convert_stream_simple_response)
+
+    @classmethod
+    def _encode_stream_response(
+        cls,
+        response: Generator[AppStreamResponse, Any, None],
+        convert_stream_response: Callable[[Generator[AppStreamResponse, None, None]], Generator[str, None, None]],
+    ) -> Generator[str, None, None]:
+        """
+        Encode stream response into SSE frames, converting chunks one at a time
+        """
 
-                def _generate_simple_response() -> Generator[str, Any, None]:
-                    for chunk in cls.convert_stream_simple_response(response):
-                        if chunk == "ping":
-                            yield f"event: {chunk}\n\n"
-                        else:
-                            yield f"data: {chunk}\n\n"
+        def convert_chunk(chunk: AppStreamResponse) -> str:
+            return next(convert_stream_response(c for c in (chunk,)))
 
-                return _generate_simple_response()
+        encoder = StreamFrameEncoder(convert_chunk, coalesce_window=dify_config.APP_STREAM_COALESCE_WINDOW)
+        return encoder.encode(response)
 
     @classmethod
     @abstractmethod
@@ -1,12 +1,19 @@
 import queue
 import time
 from abc import abstractmethod
+from collections.abc import Mapping, Sequence
+from datetime import date, datetime
+from decimal import Decimal
 from enum import Enum
-from typing import Any
+from types import NoneType, UnionType
+from typing import Annotated, Any, Literal, Union, get_args, get_origin
+from uuid import UUID
 
+from pydantic import BaseModel
 from sqlalchemy.orm import DeclarativeMeta
 
 from configs import dify_config
+from core.app.apps.task_stop_signal import TaskStopSignal
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import (
     AppQueueEvent,
@@ -16,6 +23,7 @@ from core.app.entities.queue_entities import (
     QueueStopEvent,
     WorkflowQueueMessage,
 )
+from core.helper.event_channel import EventChannel
 from extensions.ext_redis import redis_client
 
 
@@ -25,6 +33,9 @@ class PublishFrom(Enum):
 
 
 class AppQueueManager:
+    # event class -> whether its field types can never hold SQLAlchemy models
+    _sqlalchemy_safe_event_classes: dict[type[AppQueueEvent], bool] = {}
+
     def __init__(self, task_id: str, user_id: str, invoke_from: InvokeFrom) -> None:
         if not user_id:
             raise ValueError("user is required")
@@ -38,9 +49,11 @@ class AppQueueManager:
             AppQueueManager._generate_task_belong_cache_key(self._task_id), 1800, f"{user_prefix}-{self._user_id}"
         )
 
-        q: queue.Queue[WorkflowQueueMessage | MessageQueueMessage | None] = queue.Queue()
+        q: EventChannel[WorkflowQueueMessage | MessageQueueMessage] = EventChannel()
 
         self._q = q
+        # stops are pushed by the task stop signal, which wakes up the listener
+        self._local_task = task_stop_signal.register(self._task_id, on_stop=q.wakeup)
 
     def listen(self):
         """
@@ -53,7 +66,11 @@ class AppQueueManager:
         last_ping_time: int | float = 0
         while True:
             try:
-                message = self._q.get(timeout=1)
+                # wake up on messages and stops, and at the latest for the next ping or listen timeout
+                elapsed_time = time.time() - start_time
+                message = self._q.get(
+                    timeout=max(min((last_ping_time + 1) * 10 - elapsed_time, listen_timeout - elapsed_time), 0)
+                )
                 if message is None:
                     break
 
@@ -75,10 +92,10 @@ class AppQueueManager:
 
     def stop_listen(self) -> None:
         """
-        Stop listen to queue
+        Stop listen to queue, messages published afterwards are dropped
         :return:
         """
-        self._q.put(None)
+        self._q.close()
 
     def publish_error(self, e, pub_from: PublishFrom) -> None:
         """
@@ -96,7 +113,9 @@ class AppQueueManager:
         :param pub_from:
         :return:
         """
-        self._check_for_sqlalchemy_models(event.model_dump())
+        # events made of known-safe field types only, e.g. chunk events, skip the dump and the check
+        if not self._is_sqlalchemy_safe_event_class(type(event)):
+            self._check_for_sqlalchemy_models(event.model_dump())
         self._publish(event, pub_from)
 
     @abstractmethod
@@ -125,18 +144,14 @@ class AppQueueManager:
 
         stopped_cache_key = cls._generate_stopped_cache_key(task_id)
         redis_client.setex(stopped_cache_key, 600, 1)
+        TaskStopSignal.publish(task_id)
 
     def _is_stopped(self) -> bool:
         """
         Check if task is stopped
         :return:
         """
-        stopped_cache_key = AppQueueManager._generate_stopped_cache_key(self._task_id)
-        result = redis_client.get(stopped_cache_key)
-        if result is not None:
-            return True
-
-        return False
+        return task_stop_signal.is_stopped(self._local_task)
 
     @classmethod
     def _generate_task_belong_cache_key(cls, task_id: str) -> str:
@@ -156,6 +171,20 @@ class AppQueueManager:
         """
         return f"generate_task_stopped:{task_id}"
 
+    @classmethod
+    def _is_sqlalchemy_safe_event_class(cls, event_cls: type[AppQueueEvent]) -> bool:
+        """
+        Check once per event class if its field types can hold SQLAlchemy models
+        :param event_cls: event class
+        :return: True if instances never need to be checked
+        """
+        is_safe = cls._sqlalchemy_safe_event_classes.get(event_cls)
+        if is_safe is None:
+            is_safe = _is_sqlalchemy_safe_type(event_cls, set())
+            cls._sqlalchemy_safe_event_classes[event_cls] = is_safe
+
+        return is_safe
+
     def _check_for_sqlalchemy_models(self, data: Any):
         # from entity to dict or list
         if isinstance(data, dict):
@@ -173,3 +202,44 @@ class AppQueueManager:
 
 class GenerateTaskStoppedError(Exception):
     pass
+
+
+task_stop_signal = TaskStopSignal(stopped_cache_key=AppQueueManager._generate_stopped_cache_key)
+
+_SQLALCHEMY_SAFE_SCALAR_TYPES = (str, int, float, bool, bytes, Decimal, datetime, date, UUID, Enum, NoneType)
+_SQLALCHEMY_SAFE_CONTAINER_TYPES = (list, tuple, set, frozenset, dict, Mapping, Sequence, Union, UnionType)
+
+
+def _is_sqlalchemy_safe_type(tp: Any, seen: set[type[BaseModel]]) -> bool:
+    """
+    Check if values of the type can never be or contain SQLAlchemy models,
+    types that can hold arbitrary values (Any, bare containers, arbitrary classes) are not safe
+    """
+    origin = get_origin(tp)
+    if origin is Annotated:
+        return _is_sqlalchemy_safe_type(get_args(tp)[0], seen)
+    if origin is Literal:
+        return True
+    if origin is not None:
+        return origin in _SQLALCHEMY_SAFE_CONTAINER_TYPES and all(
+            arg is Ellipsis or _is_sqlalchemy_safe_type(arg, seen) for arg in get_args(tp)
+        )
+
+    if not isinstance(tp, type):
+        return False
+    if issubclass(tp, _SQLALCHEMY_SAFE_SCALAR_TYPES):
+        return True
+    if not issubclass(tp, BaseModel):
+        return False
+
+    if tp in seen:
+        return True
+    seen.add(tp)
+
+    if tp.model_config.get("extra") == "allow":
+        return False
+
+    # instances of subclasses are accepted as field values too
+    return all(_is_sqlalchemy_safe_type(field.annotation, seen) for field in tp.model_fields.values()) and all(
+        _is_sqlalchemy_safe_type(subclass, seen) for subclass in tp.__subclasses__()
+    )
@@ -0,0 +1,222 @@
+import contextvars
+import json
+import queue
+import threading
+import time
+from collections.abc import Callable, Generator, Hashable, Iterable
+from contextlib import nullcontext
+from json.encoder import encode_basestring_ascii  # type: ignore
+from typing import Optional
+
+from flask import Flask, current_app, has_app_context
+
+from core.app.entities.task_entities import (
+    AgentMessageStreamResponse,
+    AppStreamResponse,
+    MessageStreamResponse,
+    TextChunkStreamResponse,
+)
+
+# text of the template chunks, whose frames are split where the encoded placeholder is
+_TEXT_PLACEHOLDER = "\x00text\x00"
+_ENCODED_TEXT_PLACEHOLDER = json.dumps(_TEXT_PLACEHOLDER)
+# end of the chunks read from the stream response
+_END = object()
+# chunks read ahead of the frames sent, the stream response is not read further until they are sent
+_MAX_READ_AHEAD_CHUNKS = 64
+# seconds the reader waits for room in the read ahead chunks before checking if the response is closed
+_STOP_CHECK_INTERVAL = 0.1
+
+
+class StreamFrameEncoder:
+    """
+    Encode the stream responses of a task into SSE frames.
+
+    Text chunks of the same message differ only by their text, so the first one of each kind is converted
+    with a placeholder text and its frame is split into a constant prefix and suffix,
+    the frames of the next ones are the prefix, the escaped text and the suffix.
+    Text chunks of the same kind received within the coalesce window are sent in a single frame,
+    the stream response is then read in a thread, so held text chunks are sent when the window closes
+    even if the next chunk is not received yet. The thread reads in its own app context, with its own
+    database session, and at most a few chunks ahead of the frames sent.
+    """
+
+    def __init__(self, convert_chunk: Callable[[AppStreamResponse], str], coalesce_window: float = 0.0) -> None:
+        """
+        :param convert_chunk: convert a chunk to the JSON data of its frame, or "ping"
+        :param coalesce_window: seconds text chunks are held to be sent with the next text chunks, 0 to disable
+        """
+        self._convert_chunk = convert_chunk
+        self._coalesce_window = coalesce_window
+        # text chunk key -> frame prefix and suffix, None if the text is not found in the frame
+        self._templates: dict[Hashable, Optional[tuple[str, str]]] = {}
+
+    def encode(self, stream_response: Iterable[AppStreamResponse]) -> Generator[str, None, None]:
+        if self._coalesce_window > 0:
+            yield from self._encode_coalesced(stream_response)
+            return
+
+        for chunk in stream_response:
+            text = self._get_text(chunk)
+            if text is None:
+                yield self._to_frame(self._convert_chunk(chunk))
+            else:
+                yield self._encode_texts(chunk, self._get_key(chunk), [text])
+
+    def _encode_coalesced(self, stream_response: Iterable[AppStreamResponse]) -> Generator[str, None, None]:
+        chunks: queue.Queue = queue.Queue(maxsize=_MAX_READ_AHEAD_CHUNKS)
+        stopped = threading.Event()
+        flask_app: Optional[Flask] = current_app._get_current_object() if has_app_context() else None  # type: ignore
+        reader_thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._read, flask_app, stream_response, chunks, stopped),
+            daemon=True,
+        )
+        reader_thread.start()
+
+        pending_chunk: Optional[AppStreamResponse] = None
+        pending_key: Hashable = None
+        pending_texts: list[str] = []
+        pending_since = 0.0
+        try:
+            while True:
+                if pending_chunk is None:
+                    item = chunks.get()
+                else:
+                    try:
+                        remaining_window = pending_since + self._coalesce_window - time.monotonic()
+                        item = chunks.get(timeout=max(remaining_window, 0.0))
+                    except queue.Empty:
+                        # the window closed before the next chunk
+                        yield self._encode_texts(pending_chunk, pending_key, pending_texts)
+                        pending_chunk = None
+                        continue
+
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    if pending_chunk is not None:
+                        yield self._encode_texts(pending_chunk, pending_key, pending_texts)
+                    raise item
+
+                chunk = item
+                text = self._get_text(chunk)
+                if text is None:
+                    if pending_chunk is not None:
+                        yield self._encode_texts(pending_chunk, pending_key, pending_texts)
+                        pending_chunk = None
+                    yield self._to_frame(self._convert_chunk(chunk))
+                    continue
+
+                key = self._get_key(chunk)
+                if pending_chunk is not None:
+                    if key == pending_key and time.monotonic() - pending_since < self._coalesce_window:
+                        pending_texts.append(text)
+                        continue
+                    yield self._encode_texts(pending_chunk, pending_key, pending_texts)
+
+                pending_chunk, pending_key, pending_texts, pending_since = chunk, key, [text], time.monotonic()
+
+            if pending_chunk is not None:
+                yield self._encode_texts(pending_chunk, pending_key, pending_texts)
+        finally:
+            # if the response is closed early, the reader closes the stream response
+            # as soon as the chunk it is reading, if any, is received
+            stopped.set()
+
+    @staticmethod
+    def _read(
+        flask_app: Optional[Flask],
+        stream_response: Iterable[AppStreamResponse],
+        chunks: queue.Queue,
+        stopped: threading.Event,
+    ) -> None:
+        """
+        Put the chunks of the stream response, then an error raised reading it if any, then _END
+        """
+        # the session of the request may be removed while the stream response is read
+        with flask_app.app_context() if flask_app is not None else nullcontext():
+            iterator = iter(stream_response)
+            try:
+                for chunk in iterator:
+                    if not StreamFrameEncoder._put(chunks, chunk, stopped):
+                        break
+            except Exception as e:
+                StreamFrameEncoder._put(chunks, e, stopped)
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                StreamFrameEncoder._put(chunks, _END, stopped)
+
+    @staticmethod
+    def _put(chunks: queue.Queue, item: object, stopped: threading.Event) -> bool:
+        """
+        Put an item once there is room for it, False if the response is closed before
+        """
+        while not stopped.is_set():
+            try:
+                chunks.put(item, timeout=_STOP_CHECK_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _encode_texts(self, chunk: AppStreamResponse, key: Hashable, texts: list[str]) -> str:
+        if key not in self._templates:
+            frame = self._to_frame(self._convert_chunk(self._with_text(chunk, _TEXT_PLACEHOLDER)))
+            prefix, placeholder, suffix = frame.partition(_ENCODED_TEXT_PLACEHOLDER)
+            self._templates[key] = (prefix, suffix) if placeholder else None
+
+        text = texts[0] if len(texts) == 1 else "".join(texts)
+        template = self._templates[key]
+        if template is None:
+            return self._to_frame(self._convert_chunk(self._with_text(chunk, text)))
+        # the C string encoder of json.dumps, frames are the same as the ones of the converters
+        return template[0] + encode_basestring_ascii(text) + template[1]
+
+    @staticmethod
+    def _to_frame(data: str) -> str:
+        if data == "ping":
+            return f"event: {data}\n\n"
+        return f"data: {data}\n\n"
+
+    @staticmethod
+    def _get_text(chunk: AppStreamResponse) -> Optional[str]:
+        stream_response = chunk.stream_response
+        if isinstance(stream_response, MessageStreamResponse | AgentMessageStreamResponse):
+            return stream_response.answer
+        if isinstance(stream_response, TextChunkStreamResponse):
+            return stream_response.data.text
+        return None
+
+    @staticmethod
+    def _get_key(chunk: AppStreamResponse) -> Hashable:
+        """
+        Key of the fields of a text chunk but the text
+        """
+        stream_response = chunk.stream_response
+        if isinstance(stream_response, TextChunkStreamResponse):
+            variable_selector = stream_response.data.from_variable_selector
+        else:
+            variable_selector = getattr(stream_response, "from_variable_selector", None)
+        return (
+            type(chunk),
+            *(value for name, value in chunk if name != "stream_response"),
+            type(stream_response),
+            stream_response.event,
+            stream_response.task_id,
+            getattr(stream_response, "id", None),
+            tuple(variable_selector) if variable_selector is not None else None,
+        )
+
+    @staticmethod
+    def _with_text(chunk: AppStreamResponse, text: str) -> AppStreamResponse:
+        stream_response = chunk.stream_response
+        if isinstance(stream_response, TextChunkStreamResponse):
+            stream_response = stream_response.model_copy(
+                update={"data": stream_response.data.model_copy(update={"text": text})}
+            )
+        else:
+            stream_response = stream_response.model_copy(update={"answer": text})
+        return chunk.model_copy(update={"stream_response": stream_response})
@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from typing import Optional
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTask:
+    """
+    Stop state of a task running in the current process
+    """
+
+    def __init__(self, task_id: str, on_stop: Optional[Callable[[], None]] = None) -> None:
+        self.task_id = task_id
+        self.stopped = False
+        self._on_stop = on_stop
+
+    def set_stopped(self) -> None:
+        self.stopped = True
+        if self._on_stop:
+            self._on_stop()
+
+
+class TaskStopSignal:
+    """
+    Push-based task stop signal.
+
+    Stopping a task publishes its id on a Redis channel, a subscriber thread per process marks the
+    matching local task as stopped, so checking the stop flag is an in-memory read instead of a Redis GET.
+    While the subscriber is not subscribed (startup, reconnecting) checks fall back to the stop flag key,
+    and after (re)subscribing the stop flag keys of all local tasks are read once to catch missed stops.
+    The subscription is pinged every HEARTBEAT_INTERVAL seconds, if nothing is received from it for
+    HEARTBEAT_TIMEOUT seconds, e.g. the connection dropped silently, checks fall back to the stop flag key
+    and the subscriber reconnects.
+    """
+
+    CHANNEL = "generate_task_stopped"
+    HEARTBEAT_INTERVAL = 5.0
+    HEARTBEAT_TIMEOUT = 15.0
+    RECONNECT_INTERVAL = 1.0
+    MAX_RECONNECT_INTERVAL = 30.0
+
+    def __init__(self, stopped_cache_key: Callable[[str], str]) -> None:
+        """
+        :param stopped_cache_key: stop flag key of a task id, set before the stop is published
+        """
+        self._stopped_cache_key = stopped_cache_key
+        self._lock = threading.Lock()
+        self._local_tasks: weakref.WeakValueDictionary[str, LocalTask] = weakref.WeakValueDictionary()
+        self._subscriber: Optional[threading.Thread] = None
+        self._subscribed = False
+        self._subscription_count = 0
+        # monotonic time the subscription last received anything, pongs included
+        self._last_heartbeat = 0.0
+
+    def register(self, task_id: str, on_stop: Optional[Callable[[], None]] = None) -> LocalTask:
+        """
+        Register a task running in the current process, the task is unregistered
+        once the returned local task is garbage collected
+
+        :param task_id: task id
+        :param on_stop: called from the subscriber thread when the task is stopped
+        :return: local task, must be kept referenced while the task is running
+        """
+        local_task = LocalTask(task_id=task_id, on_stop=on_stop)
+        with self._lock:
+            self._local_tasks[task_id] = local_task
+            if self._subscriber is None:
+                self._subscriber = threading.Thread(target=self._subscribe, name="TaskStopSignal", daemon=True)
+                self._subscriber.start()
+
+        return local_task
+
+    def is_stopped(self, local_task: LocalTask) -> bool:
+        """
+        Check if a local task is stopped
+        """
+        if local_task.stopped:
+            return True
+        if self._is_subscribed():
+            return False
+
+        if redis_client.get(self._stopped_cache_key(local_task.task_id)) is not None:
+            local_task.set_stopped()
+
+        return local_task.stopped
+
+    @classmethod
+    def publish(cls, task_id: str) -> None:
+        """
+        Publish the stop of a task to all processes
+        """
+        redis_client.publish(cls.CHANNEL, task_id)
+
+    def _is_subscribed(self) -> bool:
+        return self._subscribed and time.monotonic() - self._last_heartbeat < self.HEARTBEAT_TIMEOUT
+
+    def _subscribe(self) -> None:
+        failures = 0
+        while True:
+            subscription_count = self._subscription_count
+            try:
+                self._listen()
+            except Exception:
+                if self._subscription_count != subscription_count:
+                    failures = 0
+                if not failures:
+                    logger.exception("Task stop signal subscriber disconnected, falling back to stop flag polling")
+                else:
+                    logger.debug("Task stop signal subscriber failed to reconnect", exc_info=True)
+                failures += 1
+
+            # back off while redis stays unreachable
+            time.sleep(min(self.RECONNECT_INTERVAL * 2 ** min(failures - 1, 10), self.MAX_RECONNECT_INTERVAL))
+
+    def _listen(self) -> None:
+        pubsub = redis_client.pubsub()
+        try:
+            pubsub.subscribe(self.CHANNEL)
+            self._last_heartbeat = last_ping = time.monotonic()
+            while True:
+                message = pubsub.get_message(timeout=self.HEARTBEAT_INTERVAL)
+                now = time.monotonic()
+                if message is not None:
+                    self._last_heartbeat = now
+                    if message["type"] == "subscribe":
+                        self._on_subscribed()
+                    elif message["type"] == "message":
+                        self._on_message(message["data"])
+                elif now - self._last_heartbeat >= self.HEARTBEAT_TIMEOUT:
+                    raise ConnectionError(f"No heartbeat from the subscription for {self.HEARTBEAT_TIMEOUT} seconds")
+
+                if now - last_ping >= self.HEARTBEAT_INTERVAL:
+                    pubsub.ping()
+                    last_ping = now
+        finally:
+            self._subscribed = False
+            pubsub.close()
+
+    def _on_subscribed(self) -> None:
+        # stops published before subscribing are only visible by their stop flag key
+        with self._lock:
+            local_tasks = list(self._local_tasks.values())
+
+        if local_tasks:
+            pipeline = redis_client.pipeline(transaction=False)
+            for local_task in local_tasks:
+                pipeline.get(self._stopped_cache_key(local_task.task_id))
+
+            for local_task, result in zip(local_tasks, pipeline.execute()):
+                if result is not None:
+                    local_task.set_stopped()
+
+        self._subscribed = True
+        self._subscription_count += 1
+
+    def _on_message(self, data: bytes | str) -> None:
+        task_id = data.decode("utf-8") if isinstance(data, bytes) else data
+        with self._lock:
+            local_task = self._local_tasks.get(task_id)
+
+        if local_task:
+            local_task.set_stopped()
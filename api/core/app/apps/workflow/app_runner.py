@@ -12,6 +12,7 @@ from core.app.entities.app_invoke_entities import (
 from core.workflow.callbacks import WorkflowCallback, WorkflowLoggingCallback
 from core.workflow.entities.variable_pool import VariablePool
 from core.workflow.enums import SystemVariableKey
+from core.workflow.graph_engine.execution_plan import ExecutionPlan
 from core.workflow.workflow_entry import WorkflowEntry
 from extensions.ext_database import db
 from models.enums import UserFrom
@@ -73,6 +74,7 @@ class WorkflowAppRunner(WorkflowBasedAppRunner):
         if dify_config.DEBUG:
             workflow_callbacks.append(WorkflowLoggingCallback())
 
+        execution_plan: Optional[ExecutionPlan] = None
         # if only single iteration run is requested
         if self.application_generate_entity.single_iteration_run:
             # if only single iteration run is requested
@@ -101,8 +103,9 @@ class WorkflowAppRunner(WorkflowBasedAppRunner):
                 conversation_variables=[],
             )
 
-            # init graph
-            graph = self._init_graph(graph_config=workflow.graph_dict)
+            # init graph from the compiled execution plan
+            execution_plan = self._init_execution_plan(workflow)
+            graph = execution_plan.graph
 
         # RUN WORKFLOW
         workflow_entry = WorkflowEntry(
@@ -122,6 +125,7 @@ class WorkflowAppRunner(WorkflowBasedAppRunner):
             call_depth=self.application_generate_entity.call_depth,
             variable_pool=variable_pool,
             thread_pool_id=self.workflow_thread_pool_id,
+            execution_plan=execution_plan,
         )
 
         generator = workflow_entry.run(callbacks=workflow_callbacks)
@@ -192,14 +192,18 @@ class WorkflowAppGenerateTaskPipeline:
         ):
             tts_publisher = AppGeneratorTTSPublisher(tenant_id, features_dict["text_to_speech"].get("voice"))
 
-        for response in self._process_stream_response(tts_publisher=tts_publisher, trace_manager=trace_manager):
-            while True:
-                audio_response = self._listen_audio_msg(publisher=tts_publisher, task_id=task_id)
-                if audio_response:
-                    yield audio_response
-                else:
-                    break
-            yield response
+        try:
+            for response in self._process_stream_response(tts_publisher=tts_publisher, trace_manager=trace_manager):
+                while True:
+                    audio_response = self._listen_audio_msg(publisher=tts_publisher, task_id=task_id)
+                    if audio_response:
+                        yield audio_response
+                    else:
+                        break
+                yield response
+        finally:
+            # save the node executions written behind by runs ended by an error or a closed stream
+            self._workflow_cycle_manager._flush_workflow_node_executions()
 
         start_listener_time = time.time()
         while (time.time() - start_listener_time) < TTS_AUTO_PLAY_TIMEOUT:
@@ -360,6 +364,8 @@ class WorkflowAppGenerateTaskPipeline:
                 if not self._workflow_run_id:
                     raise ValueError("workflow run not initialized.")
 
+                self._workflow_cycle_manager._flush_workflow_node_executions(wait=False)
+
                 with Session(db.engine, expire_on_commit=False) as session:
                     workflow_run = self._workflow_cycle_manager._get_workflow_run(
                         session=session, workflow_run_id=self._workflow_run_id
@@ -49,6 +49,7 @@ from core.workflow.graph_engine.entities.event import (
     ParallelBranchRunSucceededEvent,
 )
 from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.execution_plan import ExecutionPlan, ExecutionPlanCache
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.node_mapping import NODE_TYPE_CLASSES_MAPPING
 from core.workflow.workflow_entry import WorkflowEntry
@@ -81,6 +82,22 @@ class WorkflowBasedAppRunner(AppRunner):
 
         return graph
 
+    def _init_execution_plan(self, workflow: Workflow) -> ExecutionPlan:
+        """
+        Init execution plan, compiled once per workflow graph and cached per process
+        """
+        graph_config = workflow.graph_dict
+        if "nodes" not in graph_config or "edges" not in graph_config:
+            raise ValueError("nodes or edges not found in workflow graph")
+
+        if not isinstance(graph_config.get("nodes"), list):
+            raise ValueError("nodes in workflow graph must be a list")
+
+        if not isinstance(graph_config.get("edges"), list):
+            raise ValueError("edges in workflow graph must be a list")
+
+        return ExecutionPlanCache.get_or_compile(cache_key=workflow.unique_hash, graph_config=graph_config)
+
     def _get_graph_and_variable_pool_of_single_iteration(
         self,
         workflow: Workflow,
@@ -1,23 +1,145 @@
 import logging
+import threading
 import time
 import uuid
 from collections.abc import Generator, Mapping
 from datetime import timedelta
 from typing import Any, Optional, Union
 
+from redis.commands.core import Script
+
+from configs import dify_config
 from core.errors.error import AppInvokeQuotaExceededError
 from extensions.ext_redis import redis_client
 
 logger = logging.getLogger(__name__)
 
 
+# Admit a request if the app has a free active request slot, or queue it.
+# Active requests older than the max alive time are expired before rejecting,
+# waiters take free slots in first in first out order before new requests,
+# they are queued by the time of the Redis server so that the order does not depend on the clocks of the hosts.
+# Returns 1 if admitted, 0 if waiting and -1 if rejected.
+_ADMIT_SCRIPT = """
+local active_requests_key = KEYS[1]
+local waiting_requests_key = KEYS[2]
+local admitted_request_key = KEYS[3]
+local request_id = ARGV[1]
+local now = tonumber(ARGV[2])
+local max_alive_time = tonumber(ARGV[3])
+local max_active_requests = tonumber(ARGV[4])
+local max_waiting_requests = tonumber(ARGV[5])
+local stale_waiting_time = tonumber(ARGV[6])
+
+-- admitted by the exit of an active request while not blocked on the admitted request key
+if redis.call('HEXISTS', active_requests_key, request_id) == 1 then
+    redis.call('DEL', admitted_request_key)
+    return 1
+end
+
+local active_requests_count = redis.call('HLEN', active_requests_key)
+if active_requests_count >= max_active_requests then
+    local request_details = redis.call('HGETALL', active_requests_key)
+    for i = 1, #request_details, 2 do
+        local started_at = tonumber(request_details[i + 1])
+        if not started_at or now - started_at > max_alive_time then
+            redis.call('HDEL', active_requests_key, request_details[i])
+        end
+    end
+    active_requests_count = redis.call('HLEN', active_requests_key)
+end
+
+local server_time = redis.call('TIME')
+local server_now = tonumber(server_time[1]) + tonumber(server_time[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', waiting_requests_key, '-inf', server_now - stale_waiting_time)
+local free_count = max_active_requests - active_requests_count
+local rank = redis.call('ZRANK', waiting_requests_key, request_id)
+local admitted
+if rank then
+    admitted = rank < free_count
+else
+    local waiting_requests_count = redis.call('ZCARD', waiting_requests_key)
+    admitted = waiting_requests_count < free_count
+    if not admitted then
+        if waiting_requests_count >= max_waiting_requests then
+            return -1
+        end
+        redis.call('ZADD', waiting_requests_key, server_now, request_id)
+        redis.call('EXPIRE', waiting_requests_key, 86400)
+    end
+end
+
+if not admitted then
+    return 0
+end
+redis.call('ZREM', waiting_requests_key, request_id)
+redis.call('HSET', active_requests_key, request_id, ARGV[2])
+redis.call('EXPIRE', active_requests_key, 86400)
+return 1
+"""
+
+# Leave the queue after waiting for the max wait time, unless an exit admitted the request meanwhile.
+# Returns 1 if admitted and -1 if rejected.
+_LEAVE_SCRIPT = """
+local active_requests_key = KEYS[1]
+local waiting_requests_key = KEYS[2]
+local admitted_request_key = KEYS[3]
+local request_id = ARGV[1]
+
+if redis.call('ZREM', waiting_requests_key, request_id) == 1 then
+    return -1
+end
+redis.call('DEL', admitted_request_key)
+if redis.call('HEXISTS', active_requests_key, request_id) == 1 then
+    return 1
+end
+return -1
+"""
+
+# Release an active request slot and hand the free slots over to the first waiters.
+# Returns the ids of the admitted waiters, which are then woken by a push to their admitted request keys.
+_EXIT_SCRIPT = """
+local active_requests_key = KEYS[1]
+local waiting_requests_key = KEYS[2]
+local request_id = ARGV[1]
+local max_active_requests = tonumber(ARGV[3])
+local stale_waiting_time = tonumber(ARGV[4])
+
+redis.call('HDEL', active_requests_key, request_id)
+local admitted_request_ids = {}
+if redis.call('EXISTS', waiting_requests_key) == 0 then
+    return admitted_request_ids
+end
+
+local server_time = redis.call('TIME')
+local server_now = tonumber(server_time[1]) + tonumber(server_time[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', waiting_requests_key, '-inf', server_now - stale_waiting_time)
+local free_count = max_active_requests - redis.call('HLEN', active_requests_key)
+while #admitted_request_ids < free_count do
+    local waiter = redis.call('ZPOPMIN', waiting_requests_key)
+    if #waiter == 0 then
+        break
+    end
+    redis.call('HSET', active_requests_key, waiter[1], ARGV[2])
+    table.insert(admitted_request_ids, waiter[1])
+end
+return admitted_request_ids
+"""
+
+
 class RateLimit:
+    # keys of an app share a hash tag, so that the admission script can use them on Redis Cluster
     _MAX_ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:max_active_requests"
-    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:active_requests"
+    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{{{}}}:active_requests"
+    _WAITING_REQUESTS_KEY = "dify:rate_limit:{{{}}}:waiting_requests"
+    _ADMITTED_REQUEST_KEY = "dify:rate_limit:{{{}}}:admitted_request:{}"
     _UNLIMITED_REQUEST_ID = "unlimited_request_id"
     _REQUEST_MAX_ALIVE_TIME = 10 * 60  # 10 minutes
     _ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL = 5 * 60  # recalculate request_count from request_detail every 5 minutes
+    # waiters are woken by exits, they only recheck for slots freed by expired active requests
+    _WAIT_RECHECK_INTERVAL = 1.0
     _instance_dict: dict[str, "RateLimit"] = {}
+    _scripts: dict[str, Script] = {}
 
     def __new__(cls: type["RateLimit"], client_id: str, max_active_requests: int):
         if client_id not in cls._instance_dict:
@@ -32,8 +154,10 @@ class RateLimit:
         self.initialized = True
         self.client_id = client_id
         self.active_requests_key = self._ACTIVE_REQUESTS_KEY.format(client_id)
+        self.waiting_requests_key = self._WAITING_REQUESTS_KEY.format(client_id)
         self.max_active_requests_key = self._MAX_ACTIVE_REQUESTS_KEY.format(client_id)
         self.last_recalculate_time = float("-inf")
+        self.metrics = RateLimitMetrics()
         self.flush_cache(use_local_value=True)
 
     def flush_cache(self, use_local_value=False):
@@ -63,6 +187,14 @@ class RateLimit:
             redis_client.hdel(self.active_requests_key, *timeout_requests)
 
     def enter(self, request_id: Optional[str] = None) -> str:
+        """
+        Admit a request, waiting up to APP_MAX_WAIT_TIME in a queue of at most APP_MAX_WAITING_REQUESTS
+        requests if the app is at its maximum active requests
+
+        :param request_id: request id
+        :return: request id to exit with
+        :raises AppInvokeQuotaExceededError: if the request is not admitted
+        """
         if time.time() - self.last_recalculate_time > RateLimit._ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL:
             self.flush_cache()
         if self.max_active_requests <= 0:
@@ -70,19 +202,101 @@ class RateLimit:
         if not request_id:
             request_id = RateLimit.gen_request_key()
 
-        active_requests_count = redis_client.hlen(self.active_requests_key)
-        if active_requests_count >= self.max_active_requests:
-            raise AppInvokeQuotaExceededError(
-                "Too many requests. Please try again later. The current maximum "
-                "concurrent requests allowed is {}.".format(self.max_active_requests)
+        start_at = time.perf_counter()
+        result = self._admit(request_id)
+        queued = result == 0
+        while result == 0:
+            remaining_wait_time = dify_config.APP_MAX_WAIT_TIME - (time.perf_counter() - start_at)
+            if remaining_wait_time <= 0:
+                result = self._leave(request_id)
+                break
+            # blocks until an exit hands its slot over to this request, instead of polling the admission
+            if redis_client.blpop(
+                [self._admitted_request_key(request_id)],
+                timeout=min(remaining_wait_time, RateLimit._WAIT_RECHECK_INTERVAL),
+            ):
+                result = 1
+                break
+            result = self._admit(request_id)
+
+        if result == 1:
+            self.metrics.on_admitted(time.perf_counter() - start_at, queued)
+            return request_id
+
+        self.metrics.on_rejected(queued)
+        raise AppInvokeQuotaExceededError(
+            "Too many requests. Please try again later. The current maximum concurrent requests allowed is {}.".format(
+                self.max_active_requests
+            )
+        )
+
+    def _admit(self, request_id: str) -> int:
+        return int(
+            self._run_script(
+                _ADMIT_SCRIPT,
+                keys=[self.active_requests_key, self.waiting_requests_key, self._admitted_request_key(request_id)],
+                args=[
+                    request_id,
+                    str(time.time()),
+                    RateLimit._REQUEST_MAX_ALIVE_TIME,
+                    self.max_active_requests,
+                    dify_config.APP_MAX_WAITING_REQUESTS,
+                    self._stale_waiting_time(),
+                ],
             )
-        redis_client.hset(self.active_requests_key, request_id, str(time.time()))
-        return request_id
+        )
+
+    def _leave(self, request_id: str) -> int:
+        return int(
+            self._run_script(
+                _LEAVE_SCRIPT,
+                keys=[self.active_requests_key, self.waiting_requests_key, self._admitted_request_key(request_id)],
+                args=[request_id],
+            )
+        )
 
     def exit(self, request_id: str):
         if request_id == RateLimit._UNLIMITED_REQUEST_ID:
             return
-        redis_client.hdel(self.active_requests_key, request_id)
+        admitted_request_ids = self._run_script(
+            _EXIT_SCRIPT,
+            keys=[self.active_requests_key, self.waiting_requests_key],
+            args=[request_id, str(time.time()), self.max_active_requests, self._stale_waiting_time()],
+        )
+        if not admitted_request_ids:
+            return
+
+        # wake the admitted waiters, a waiter that is not woken finds its admission when it rechecks
+        with redis_client.pipeline(transaction=False) as pipe:
+            for admitted_request_id in admitted_request_ids:
+                if isinstance(admitted_request_id, bytes):
+                    admitted_request_id = admitted_request_id.decode("utf-8")
+                admitted_request_key = self._admitted_request_key(admitted_request_id)
+                pipe.rpush(admitted_request_key, 1)
+                pipe.expire(admitted_request_key, 60)
+            pipe.execute()
+
+    def _admitted_request_key(self, request_id: str) -> str:
+        return self._ADMITTED_REQUEST_KEY.format(self.client_id, request_id)
+
+    @staticmethod
+    def _stale_waiting_time() -> float:
+        # waiters that did not leave the queue, e.g. killed processes
+        return dify_config.APP_MAX_WAIT_TIME + 60
+
+    @staticmethod
+    def _run_script(source: str, keys: list[str], args: list[Any]) -> Any:
+        script = RateLimit._scripts.get(source)
+        if script is None:
+            script = RateLimit._scripts[source] = redis_client.register_script(source)
+        return script(keys=keys, args=args)
+
+    @classmethod
+    def get_metrics(cls) -> dict[str, dict[str, Any]]:
+        """
+        Get admission metrics of the apps rate limited in the current process
+        """
+        return {client_id: rate_limit.metrics.to_dict() for client_id, rate_limit in cls._instance_dict.items()}
 
     @staticmethod
     def gen_request_key() -> str:
@@ -95,6 +309,49 @@ class RateLimit:
             return RateLimitGenerator(rate_limit=self, generator=generator, request_id=request_id)
 
 
+class RateLimitMetrics:
+    """
+    Admission metrics of a rate limit in the current process
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.admitted_count = 0
+        self.queued_admitted_count = 0
+        self.rejected_count = 0
+        self.queued_rejected_count = 0
+        self.total_admission_latency = 0.0
+        self.max_admission_latency = 0.0
+
+    def on_admitted(self, latency: float, queued: bool) -> None:
+        with self._lock:
+            self.admitted_count += 1
+            if queued:
+                self.queued_admitted_count += 1
+            self.total_admission_latency += latency
+            self.max_admission_latency = max(self.max_admission_latency, latency)
+
+    def on_rejected(self, queued: bool) -> None:
+        with self._lock:
+            self.rejected_count += 1
+            if queued:
+                self.queued_rejected_count += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "admitted_count": self.admitted_count,
+                "queued_admitted_count": self.queued_admitted_count,
+                "rejected_count": self.rejected_count,
+                # rejected after waiting for the max wait time
+                "queued_rejected_count": self.queued_rejected_count,
+                "avg_admission_latency": self.total_admission_latency / self.admitted_count
+                if self.admitted_count
+                else 0,
+                "max_admission_latency": self.max_admission_latency,
+            }
+
+
 class RateLimitGenerator:
     def __init__(self, rate_limit: RateLimit, generator: Generator[str, None, None], request_id: str):
         self.rate_limit = rate_limit
@@ -8,6 +8,7 @@ from uuid import uuid4
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from configs import dify_config
 from core.app.entities.app_invoke_entities import AdvancedChatAppGenerateEntity, InvokeFrom, WorkflowAppGenerateEntity
 from core.app.entities.queue_entities import (
     QueueIterationCompletedEvent,
@@ -45,6 +46,7 @@ from core.workflow.enums import SystemVariableKey
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.tool.entities import ToolNodeData
 from core.workflow.workflow_entry import WorkflowEntry
+from extensions.ext_database import db
 from models.account import Account
 from models.enums import CreatedByRole, WorkflowRunTriggeredFrom
 from models.model import EndUser
@@ -58,6 +60,7 @@ from models.workflow import (
 )
 
 from .exc import WorkflowRunNotFoundError
+from .workflow_node_execution_writer import WorkflowNodeExecutionWriter
 
 
 class WorkflowCycleManage:
@@ -69,6 +72,7 @@ class WorkflowCycleManage:
     ) -> None:
         self._workflow_run: WorkflowRun | None = None
         self._workflow_node_executions: dict[str, WorkflowNodeExecution] = {}
+        self._workflow_node_execution_writer: Optional[WorkflowNodeExecutionWriter] = None
         self._application_generate_entity = application_generate_entity
         self._workflow_system_variables = workflow_system_variables
 
@@ -153,6 +157,7 @@ class WorkflowCycleManage:
         :param conversation_id: conversation id
         :return:
         """
+        self._flush_workflow_node_executions()
         workflow_run = self._get_workflow_run(session=session, workflow_run_id=workflow_run_id)
 
         outputs = WorkflowEntry.handle_special_values(outputs)
@@ -189,6 +194,7 @@ class WorkflowCycleManage:
         conversation_id: Optional[str] = None,
         trace_manager: Optional[TraceQueueManager] = None,
     ) -> WorkflowRun:
+        self._flush_workflow_node_executions()
         workflow_run = self._get_workflow_run(session=session, workflow_run_id=workflow_run_id)
         outputs = WorkflowEntry.handle_special_values(dict(outputs) if outputs else None)
 
@@ -246,19 +252,27 @@ class WorkflowCycleManage:
         workflow_run.finished_at = datetime.now(UTC).replace(tzinfo=None)
         workflow_run.exceptions_count = exceptions_count
 
-        stmt = select(WorkflowNodeExecution.node_execution_id).where(
-            WorkflowNodeExecution.tenant_id == workflow_run.tenant_id,
-            WorkflowNodeExecution.app_id == workflow_run.app_id,
-            WorkflowNodeExecution.workflow_id == workflow_run.workflow_id,
-            WorkflowNodeExecution.triggered_from == WorkflowNodeExecutionTriggeredFrom.WORKFLOW_RUN.value,
-            WorkflowNodeExecution.workflow_run_id == workflow_run.id,
-            WorkflowNodeExecution.status == WorkflowNodeExecutionStatus.RUNNING.value,
-        )
-        ids = session.scalars(stmt).all()
-        # Use self._get_workflow_node_execution here to make sure the cache is updated
-        running_workflow_node_executions = [
-            self._get_workflow_node_execution(session=session, node_execution_id=id) for id in ids if id
-        ]
+        if dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED:
+            # the node executions of the run are all cached, some of them may not be saved yet
+            running_workflow_node_executions = [
+                workflow_node_execution
+                for workflow_node_execution in self._workflow_node_executions.values()
+                if workflow_node_execution.status == WorkflowNodeExecutionStatus.RUNNING.value
+            ]
+        else:
+            stmt = select(WorkflowNodeExecution.node_execution_id).where(
+                WorkflowNodeExecution.tenant_id == workflow_run.tenant_id,
+                WorkflowNodeExecution.app_id == workflow_run.app_id,
+                WorkflowNodeExecution.workflow_id == workflow_run.workflow_id,
+                WorkflowNodeExecution.triggered_from == WorkflowNodeExecutionTriggeredFrom.WORKFLOW_RUN.value,
+                WorkflowNodeExecution.workflow_run_id == workflow_run.id,
+                WorkflowNodeExecution.status == WorkflowNodeExecutionStatus.RUNNING.value,
+            )
+            ids = session.scalars(stmt).all()
+            # Use self._get_workflow_node_execution here to make sure the cache is updated
+            running_workflow_node_executions = [
+                self._get_workflow_node_execution(session=session, node_execution_id=id) for id in ids if id
+            ]
 
         for workflow_node_execution in running_workflow_node_executions:
             now = datetime.now(UTC).replace(tzinfo=None)
@@ -266,6 +280,10 @@ class WorkflowCycleManage:
             workflow_node_execution.error = error
             workflow_node_execution.finished_at = now
             workflow_node_execution.elapsed_time = (now - workflow_node_execution.created_at).total_seconds()
+            if dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED:
+                self._get_workflow_node_execution_writer().add(workflow_node_execution)
+
+        self._flush_workflow_node_executions()
 
         if trace_manager:
             trace_manager.add_trace_task(
@@ -306,7 +324,10 @@ class WorkflowCycleManage:
         )
         workflow_node_execution.created_at = datetime.now(UTC).replace(tzinfo=None)
 
-        session.add(workflow_node_execution)
+        if dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED:
+            self._get_workflow_node_execution_writer().add(workflow_node_execution)
+        else:
+            session.add(workflow_node_execution)
 
         self._workflow_node_executions[event.node_execution_id] = workflow_node_execution
         return workflow_node_execution
@@ -336,7 +357,10 @@ class WorkflowCycleManage:
         workflow_node_execution.finished_at = finished_at
         workflow_node_execution.elapsed_time = elapsed_time
 
-        workflow_node_execution = session.merge(workflow_node_execution)
+        if dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED:
+            self._get_workflow_node_execution_writer().add(workflow_node_execution)
+        else:
+            workflow_node_execution = session.merge(workflow_node_execution)
         return workflow_node_execution
 
     def _handle_workflow_node_execution_failed(
@@ -376,7 +400,10 @@ class WorkflowCycleManage:
         workflow_node_execution.elapsed_time = elapsed_time
         workflow_node_execution.execution_metadata = execution_metadata
 
-        workflow_node_execution = session.merge(workflow_node_execution)
+        if dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED:
+            self._get_workflow_node_execution_writer().add(workflow_node_execution)
+        else:
+            workflow_node_execution = session.merge(workflow_node_execution)
         return workflow_node_execution
 
     def _handle_workflow_node_execution_retried(
@@ -427,7 +454,10 @@ class WorkflowCycleManage:
         workflow_node_execution.execution_metadata = execution_metadata
         workflow_node_execution.index = event.node_run_index
 
-        session.add(workflow_node_execution)
+        if dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED:
+            self._get_workflow_node_execution_writer().add(workflow_node_execution)
+        else:
+            session.add(workflow_node_execution)
 
         self._workflow_node_executions[event.node_execution_id] = workflow_node_execution
         return workflow_node_execution
@@ -828,7 +858,10 @@ class WorkflowCycleManage:
     def _get_workflow_run(self, *, session: Session, workflow_run_id: str) -> WorkflowRun:
         if self._workflow_run and self._workflow_run.id == workflow_run_id:
             cached_workflow_run = self._workflow_run
-            cached_workflow_run = session.merge(cached_workflow_run)
+            # the cached workflow run is not loaded again while node executions are written behind
+            cached_workflow_run = session.merge(
+                cached_workflow_run, load=not dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED
+            )
             return cached_workflow_run
         stmt = select(WorkflowRun).where(WorkflowRun.id == workflow_run_id)
         workflow_run = session.scalar(stmt)
@@ -842,4 +875,28 @@ class WorkflowCycleManage:
         if node_execution_id not in self._workflow_node_executions:
             raise ValueError(f"Workflow node execution not found: {node_execution_id}")
         cached_workflow_node_execution = self._workflow_node_executions[node_execution_id]
+        if dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BEHIND_ENABLED:
+            # node executions written behind are not attached to sessions
+            return cached_workflow_node_execution
         return session.merge(cached_workflow_node_execution)
+
+    def _get_workflow_node_execution_writer(self) -> WorkflowNodeExecutionWriter:
+        if self._workflow_node_execution_writer is None:
+            self._workflow_node_execution_writer = WorkflowNodeExecutionWriter(
+                engine=db.engine,
+                flush_interval=dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL,
+                batch_size=dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE,
+            )
+        return self._workflow_node_execution_writer
+
+    def _flush_workflow_node_executions(self, *, wait: bool = True) -> None:
+        """
+        Save the node executions written behind
+        :param wait: save them before returning, for the end of the run, otherwise in the background
+        """
+        if self._workflow_node_execution_writer is None:
+            return
+        if wait:
+            self._workflow_node_execution_writer.close()
+        else:
+            self._workflow_node_execution_writer.request_flush()
@@ -0,0 +1,117 @@
+import logging
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import Engine, insert, inspect, update
+from sqlalchemy.orm import Session
+
+from models.workflow import WorkflowNodeExecution
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowNodeExecutionWriter:
+    """
+    Write-behind buffer of the node executions of a workflow run.
+
+    The latest state of every added node execution is kept until a background thread saves the buffered rows
+    in one transaction, every flush interval, when the buffer reaches the batch size, or when a flush is requested.
+    `close` stops the thread and saves the remaining rows synchronously,
+    it must be called when the run ends, successfully or not.
+    """
+
+    _column_keys = tuple(attr.key for attr in inspect(WorkflowNodeExecution).column_attrs)
+    # columns left to their server defaults while not set
+    _not_null_column_keys = frozenset(
+        attr.key for attr in inspect(WorkflowNodeExecution).column_attrs if not attr.columns[0].nullable
+    )
+
+    def __init__(self, engine: Engine, flush_interval: float, batch_size: int) -> None:
+        self._engine = engine
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        # serializes the saves of the thread and of the caller
+        self._flush_lock = threading.Lock()
+        # node execution id -> latest row
+        self._pending_rows: dict[str, dict[str, Any]] = {}
+        self._saved_ids: set[str] = set()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, workflow_node_execution: WorkflowNodeExecution) -> None:
+        """
+        Buffer the current state of a node execution
+        """
+        row = {}
+        for key in self._column_keys:
+            value = getattr(workflow_node_execution, key)
+            if value is not None or key not in self._not_null_column_keys:
+                row[key] = value
+        with self._lock:
+            self._pending_rows[row["id"]] = row
+            # rows added after close are saved by the next close
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if len(self._pending_rows) >= self._batch_size:
+                self._wakeup.set()
+
+    def request_flush(self) -> None:
+        """
+        Save the buffered rows in the background without waiting for the flush interval
+        """
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """
+        Stop the background thread and save the buffered rows
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread:
+            self._wakeup.set()
+            thread.join()
+
+        self._flush()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            if self._closed:
+                # the remaining rows are saved by close
+                return
+            try:
+                self._flush()
+            except Exception:
+                logger.exception("Failed to save workflow node executions, retrying at the next flush")
+
+    def _flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                rows = self._pending_rows
+                self._pending_rows = {}
+                saved_ids = set(self._saved_ids)
+            if not rows:
+                return
+
+            insert_rows = [row for id, row in rows.items() if id not in saved_ids]
+            update_rows = [row for id, row in rows.items() if id in saved_ids]
+            try:
+                with Session(self._engine) as session:
+                    if insert_rows:
+                        session.execute(insert(WorkflowNodeExecution), insert_rows)
+                    if update_rows:
+                        session.execute(update(WorkflowNodeExecution), update_rows)
+                    session.commit()
+            except Exception:
+                with self._lock:
+                    # keep the rows updated while saving
+                    self._pending_rows = {**rows, **self._pending_rows}
+                raise
+
+            with self._lock:
+                self._saved_ids.update(rows)
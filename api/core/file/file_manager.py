@@ -73,9 +73,7 @@ def download(f: File, /):
     if f.transfer_method in (FileTransferMethod.TOOL_FILE, FileTransferMethod.LOCAL_FILE):
         return _download_file_content(f._storage_key)
     elif f.transfer_method == FileTransferMethod.REMOTE_URL:
-        response = ssrf_proxy.get(f.remote_url, follow_redirects=True)
-        response.raise_for_status()
-        return response.content
+        return ssrf_proxy.download(f.remote_url, follow_redirects=True)
     raise ValueError(f"unsupported transfer method: {f.transfer_method}")
 
 
@@ -103,9 +101,7 @@ def _download_file_content(path: str, /):
 def _get_encoded_string(f: File, /):
     match f.transfer_method:
         case FileTransferMethod.REMOTE_URL:
-            response = ssrf_proxy.get(f.remote_url, follow_redirects=True)
-            response.raise_for_status()
-            data = response.content
+            data = ssrf_proxy.download(f.remote_url, follow_redirects=True)
         case FileTransferMethod.LOCAL_FILE:
             data = _download_file_content(f._storage_key)
         case FileTransferMethod.TOOL_FILE:
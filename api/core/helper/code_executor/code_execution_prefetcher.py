@@ -0,0 +1,94 @@
+import logging
+from collections.abc import Mapping, Sequence
+from threading import Event, Lock
+from typing import Any, Optional
+
+from configs import dify_config
+from core.helper.code_executor.code_executor import CodeExecutor, CodeLanguage
+
+logger = logging.getLogger(__name__)
+
+
+class CodeExecutionPrefetcher:
+    """
+    Executions of the same code for a sequence of inputs known in advance, such as a code node run for each item
+    of an iteration, executed in batches of CODE_EXECUTION_BATCH_SIZE inputs.
+
+    A batch is executed when the first of its executions is taken, so executions are done at most a batch ahead,
+    and the result of each execution is handed over once to the run of its own index.
+    """
+
+    def __init__(
+        self,
+        *,
+        language: CodeLanguage,
+        code: str,
+        inputs_list: Sequence[Mapping[str, Any]],
+        index_selector: Sequence[str],
+        stop_on_error: bool = False,
+    ) -> None:
+        """
+        :param language: code language
+        :param code: code
+        :param inputs_list: inputs of each execution
+        :param index_selector: selector of the variable holding the index of the current execution
+        :param stop_on_error: do not execute the inputs after the first failed execution of a batch
+        """
+        self.language = language
+        self.code = code
+        self.inputs_list = inputs_list
+        self.index_selector = index_selector
+        self.stop_on_error = stop_on_error
+        self._batch_size = dify_config.CODE_EXECUTION_BATCH_SIZE
+        self._lock = Lock()
+        # start index of the executed or executing batches -> set once its results are available
+        self._batches: dict[int, Event] = {}
+        # index -> result of the execution not taken yet
+        self._results: dict[int, Mapping[str, Any] | Exception] = {}
+
+    @classmethod
+    def is_supported(cls, language: CodeLanguage) -> bool:
+        template_transformer = CodeExecutor.code_template_transformers.get(language)
+        return (
+            bool(dify_config.CODE_EXECUTION_BATCH_SIZE)
+            and template_transformer is not None
+            and template_transformer.get_batch_runner_script() is not None
+        )
+
+    def take(self, index: int, inputs: Mapping[str, Any]) -> Optional[Mapping[str, Any] | Exception]:
+        """
+        Take the result of the execution at index, executing its batch if it is not executed yet
+
+        :param index: index of the execution
+        :param inputs: inputs of the execution
+        :return: result or error of the execution, None if the execution is not prefetched,
+            e.g. its inputs changed, its result was taken or its batch stopped before it, it must be executed as usual
+        """
+        if not 0 <= index < len(self.inputs_list) or inputs != self.inputs_list[index]:
+            return None
+
+        start = index - index % self._batch_size
+        with self._lock:
+            batch_done = self._batches.get(start)
+            is_batch_owner = batch_done is None
+            if batch_done is None:
+                batch_done = self._batches[start] = Event()
+
+        if is_batch_owner:
+            try:
+                results = CodeExecutor.execute_workflow_code_template_batch(
+                    self.language, self.code, self.inputs_list[start : start + self._batch_size], self.stop_on_error
+                )
+                with self._lock:
+                    for offset, result in enumerate(results):
+                        self._results[start + offset] = result
+            except Exception:
+                # nothing is executed, e.g. inputs not serializable to json
+                logger.warning("Failed to prefetch code executions, executing them one by one", exc_info=True)
+            finally:
+                batch_done.set()
+        else:
+            batch_done.wait()
+
+        with self._lock:
+            return self._results.pop(index, None)
@@ -1,15 +1,16 @@
 import logging
-from collections.abc import Mapping
+from collections.abc import Mapping, Sequence
 from enum import StrEnum
 from threading import Lock
 from typing import Any, Optional
 
-from httpx import Timeout, post
+from httpx import Client, Limits, Timeout
 from pydantic import BaseModel
 from yarl import URL
 
 from configs import dify_config
 from core.helper.code_executor.javascript.javascript_transformer import NodeJsTemplateTransformer
+from core.helper.code_executor.jinja2.jinja2_renderer import Jinja2RenderError, jinja2_renderer
 from core.helper.code_executor.jinja2.jinja2_transformer import Jinja2TemplateTransformer
 from core.helper.code_executor.python3.python3_transformer import Python3TemplateTransformer
 from core.helper.code_executor.template_transformer import TemplateTransformer
@@ -41,6 +42,10 @@ class CodeExecutor:
     dependencies_cache: dict[str, str] = {}
     dependencies_cache_lock = Lock()
 
+    # pooled client to the sandbox, connections are kept alive between executions
+    http_client: Optional[Client] = None
+    http_client_lock = Lock()
+
     code_template_transformers: dict[CodeLanguage, type[TemplateTransformer]] = {
         CodeLanguage.PYTHON3: Python3TemplateTransformer,
         CodeLanguage.JINJA2: Jinja2TemplateTransformer,
@@ -63,6 +68,18 @@ class CodeExecutor:
         :param code: code
         :return:
         """
+        response_data = cls._run_code(language, preload, code)
+
+        if response_data.error:
+            raise CodeExecutionError(response_data.error)
+
+        return response_data.stdout or ""
+
+    @classmethod
+    def _run_code(cls, language: CodeLanguage, preload: str, code: str) -> CodeExecutionResponse.Data:
+        """
+        Run code in the sandbox, the output printed before an error of the code is kept with the error
+        """
         url = URL(str(dify_config.CODE_EXECUTION_ENDPOINT)) / "v1" / "sandbox" / "run"
 
         headers = {"X-Api-Key": dify_config.CODE_EXECUTION_API_KEY}
@@ -75,7 +92,7 @@ class CodeExecutor:
         }
 
         try:
-            response = post(
+            response = cls._get_http_client().post(
                 str(url),
                 json=data,
                 headers=headers,
@@ -112,10 +129,7 @@ class CodeExecutor:
 
         response_code = CodeExecutionResponse(**response_data)
 
-        if response_code.data.error:
-            raise CodeExecutionError(response_code.data.error)
-
-        return response_code.data.stdout or ""
+        return response_code.data
 
     @classmethod
     def execute_workflow_code_template(cls, language: CodeLanguage, code: str, inputs: Mapping[str, Any]):
@@ -130,6 +144,12 @@ class CodeExecutor:
         if not template_transformer:
             raise CodeExecutionError(f"Unsupported language {language}")
 
+        if language == CodeLanguage.JINJA2 and dify_config.JINJA2_RENDER_MODE == "local":
+            try:
+                return {"result": jinja2_renderer.render(code, inputs)}
+            except Jinja2RenderError as e:
+                raise CodeExecutionError(str(e))
+
         runner, preload = template_transformer.transform_caller(code, inputs)
 
         try:
@@ -138,3 +158,79 @@ class CodeExecutor:
             raise e
 
         return template_transformer.transform_response(response)
+
+    @classmethod
+    def execute_workflow_code_template_batch(
+        cls, language: CodeLanguage, code: str, inputs_list: Sequence[Mapping[str, Any]], stop_on_error: bool = False
+    ) -> list[Mapping[str, Any] | Exception]:
+        """
+        Execute the same code for each inputs, up to CODE_EXECUTION_BATCH_SIZE inputs in one request to the sandbox.
+        Executions are done in order, so the results are those of the executions done: the execution a sandbox run
+        ended in, e.g. by the time limit of the whole run, and the executions after it, or after the first error
+        with stop_on_error, are not done, and are left to be executed on their own.
+        :param language: code language
+        :param code: code
+        :param inputs_list: inputs of each execution
+        :param stop_on_error: stop at the first failed execution
+        :return: result of each execution done, or the error raised by it
+        """
+        template_transformer = cls.code_template_transformers.get(language)
+        if not template_transformer:
+            raise CodeExecutionError(f"Unsupported language {language}")
+
+        results: list[Mapping[str, Any] | Exception] = []
+        batch_size = dify_config.CODE_EXECUTION_BATCH_SIZE
+        if not batch_size or template_transformer.get_batch_runner_script() is None:
+            for inputs in inputs_list:
+                try:
+                    results.append(cls.execute_workflow_code_template(language, code, inputs))
+                except (CodeExecutionError, ValueError) as e:
+                    results.append(e)
+                    if stop_on_error:
+                        break
+            return results
+
+        for i in range(0, len(inputs_list), batch_size):
+            batch_inputs_list = inputs_list[i : i + batch_size]
+            runner, preload = template_transformer.transform_batch_caller(code, batch_inputs_list, stop_on_error)
+            try:
+                response_data = cls._run_code(language, preload, runner)
+                batch_results = template_transformer.transform_batch_response(response_data.stdout or "")
+            except (CodeExecutionError, ValueError) as e:
+                # any execution of the batch may have been done, none of them is done again
+                results.extend([e] * len(batch_inputs_list))
+                if stop_on_error:
+                    break
+                continue
+
+            for batch_result in batch_results:
+                if batch_result.get("error") is not None:
+                    results.append(CodeExecutionError(batch_result["error"]))
+                    continue
+                try:
+                    results.append(template_transformer.validate_result(batch_result.get("output")))
+                except ValueError as e:
+                    results.append(e)
+
+            if len(batch_results) < len(batch_inputs_list):
+                # stopped at an error, or the sandbox run ended in the execution after the last result,
+                # which could succeed on its own, e.g. if the time limit of the run is shared by the batch
+                break
+            if stop_on_error and isinstance(results[-1], Exception):
+                break
+
+        return results
+
+    @classmethod
+    def _get_http_client(cls) -> Client:
+        if cls.http_client is None:
+            with cls.http_client_lock:
+                if cls.http_client is None:
+                    cls.http_client = Client(
+                        limits=Limits(
+                            max_connections=dify_config.CODE_EXECUTION_POOL_MAX_CONNECTIONS,
+                            max_keepalive_connections=dify_config.CODE_EXECUTION_POOL_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=dify_config.CODE_EXECUTION_POOL_KEEPALIVE_EXPIRY,
+                        )
+                    )
+        return cls.http_client
@@ -24,3 +24,34 @@ class NodeJsTemplateTransformer(TemplateTransformer):
             """
         )
         return runner_script
+
+    @classmethod
+    def get_batch_runner_script(cls) -> str:
+        runner_script = dedent(
+            f"""
+            // decode the code and the batch of input objects
+            var code = Buffer.from('{cls._code_placeholder}', 'base64').toString('utf-8')
+            var batch = JSON.parse(Buffer.from('{cls._inputs_placeholder}', 'base64').toString('utf-8'))
+
+            // execute main function for each input object in a fresh scope,
+            // the result of each input object is printed as soon as it is done
+            for (var i = 0; i < batch.inputs_list.length; i++) {{
+                var failed = false
+                var result_json
+                try {{
+                    var main = new Function('require', 'module', 'exports', code + '\\nreturn main')(
+                        require, module, exports
+                    )
+                    result_json = JSON.stringify({{ output: main(batch.inputs_list[i]) }})
+                }} catch (e) {{
+                    failed = true
+                    result_json = JSON.stringify({{ error: String(e && e.stack ? e.stack : e) }})
+                }}
+                console.log(`<<RESULT>>${{Buffer.from(result_json, 'utf-8').toString('base64')}}<<RESULT>>`)
+                if (failed && batch.stop_on_error) {{
+                    break
+                }}
+            }}
+            """
+        )
+        return runner_script
@@ -0,0 +1,299 @@
+import functools
+import hashlib
+import json
+import re
+import string
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Optional
+
+from jinja2 import Template
+from jinja2.sandbox import SandboxedEnvironment, safe_range
+
+from configs import dify_config
+
+# max bits of the integers computed by templates, about 10 ** 4900
+_MAX_INTEGER_BITS = 16384
+
+# width and precision of printf-style conversion specifiers
+_PRINTF_SPEC_PATTERN = re.compile(r"%(?:\([^)]*\))?[#0\- +]*(\*|\d+)?(?:\.(\*|\d+))?")
+
+# monotonic time the current render must finish by
+_render_deadline: ContextVar[Optional[float]] = ContextVar("jinja2_render_deadline", default=None)
+
+
+class Jinja2RenderError(Exception):
+    pass
+
+
+def _check_render_deadline() -> None:
+    deadline = _render_deadline.get()
+    if deadline is not None and time.monotonic() > deadline:
+        raise Jinja2RenderError("Template rendering timed out")
+
+
+class _TimeLimitedRange(Sequence):
+    """
+    Range checking the render deadline while it is iterated, so that nested loops without output are time limited
+    """
+
+    def __init__(self, range_: range):
+        self._range = range_
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __getitem__(self, index):
+        item = self._range[index]
+        return _TimeLimitedRange(item) if isinstance(item, range) else item
+
+    def __iter__(self) -> Iterator[int]:
+        for i, item in enumerate(self._range):
+            if i % 1000 == 0:
+                _check_render_deadline()
+            yield item
+
+    def __repr__(self) -> str:
+        return repr(self._range)
+
+
+def _printf_length(template: str, values: Any) -> int:
+    """
+    Upper bound of the padding added by `template % values` to the template and values
+    """
+    length = len(template)
+    for match in _PRINTF_SPEC_PATTERN.finditer(template):
+        for number in match.groups():
+            if number == "*":
+                star_values = values if isinstance(values, tuple) else (values,)
+                length += sum(value for value in star_values if isinstance(value, int))
+            elif number:
+                length += int(number)
+    return length
+
+
+def _str_format_length(template: str, *args: Any, **kwargs: Any) -> int:
+    """
+    Upper bound of the padding added by `template.format(*args, **kwargs)` to the template and values
+    """
+    length = len(template)
+    for _, _, format_spec, _ in string.Formatter().parse(template):
+        if not format_spec:
+            continue
+        length += sum(int(number) for number in re.findall(r"\d+", format_spec))
+        if "{" in format_spec:
+            # nested replacement fields, e.g. {:{width}}
+            length += sum(value for value in (*args, *kwargs.values()) if isinstance(value, int))
+    return length
+
+
+def _replace_length(s: Any, old: Any, new: Any, count: Optional[int] = None) -> int:
+    s, old, new = str(s), str(old), str(new)
+    occurrences = s.count(old) if old else len(s) + 1
+    if count is not None and count >= 0:
+        occurrences = min(occurrences, count)
+    return len(s) + occurrences * (len(new) - len(old))
+
+
+def _indent_length(value: Any, width: int | str = 4, *args: Any, **kwargs: Any) -> int:
+    s = str(value)
+    indention = len(width) if isinstance(width, str) else int(width)
+    return len(s) + (s.count("\n") + 1) * indention
+
+
+def _wordwrap_length(
+    value: Any,
+    width: int = 79,
+    break_long_words: bool = True,
+    wrapstring: Optional[str] = None,
+    *args: Any,
+    **kwargs: Any,
+) -> int:
+    s = str(value)
+    lines = len(s.split()) + len(s) // max(int(width), 1) + s.count("\n") + 1
+    return len(s) + lines * len(wrapstring if wrapstring is not None else "\n")
+
+
+# upper bound of the result length of filters, by the filter arguments
+_FILTER_RESULT_LENGTHS: dict[str, Callable[..., int]] = {
+    "center": lambda value, width=80: max(len(str(value)), int(width)),
+    "format": lambda value, *args, **kwargs: _printf_length(str(value), kwargs or args),
+    "indent": _indent_length,
+    "replace": _replace_length,
+    "wordwrap": _wordwrap_length,
+}
+
+# upper bound of the result length of string methods, by the string and the method arguments
+_STR_METHOD_RESULT_LENGTHS: dict[str, Callable[..., int]] = {
+    "center": lambda s, width, *args: max(len(s), int(width)),
+    "ljust": lambda s, width, *args: max(len(s), int(width)),
+    "rjust": lambda s, width, *args: max(len(s), int(width)),
+    "zfill": lambda s, width: max(len(s), int(width)),
+    "expandtabs": lambda s, tabsize=8: len(s) + s.count("\t") * int(tabsize),
+    "replace": _replace_length,
+    "format": _str_format_length,
+    "format_map": lambda s, mapping: _str_format_length(s, **(mapping if isinstance(mapping, Mapping) else {})),
+}
+
+
+class _TimeLimitedSandboxedEnvironment(SandboxedEnvironment):
+    """
+    Sandboxed environment checking the render deadline on every call and attribute or item access.
+    Multiplications, powers, string formatting and padding or replacing filters and string methods
+    are single operations the deadline can not interrupt, so the size of their results is checked
+    before they are computed.
+    """
+
+    intercepted_binops = frozenset({"*", "**", "%"})
+
+    def __init__(self, *args: Any, max_sequence_length: int, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_sequence_length = max_sequence_length
+        self.globals["range"] = lambda *args: _TimeLimitedRange(safe_range(*args))
+        for name, result_length in _FILTER_RESULT_LENGTHS.items():
+            self.filters[name] = self._size_checked_filter(name, self.filters[name], result_length)
+
+    def call_binop(self, context, operator, left, right):
+        _check_render_deadline()
+        if operator == "*":
+            self._check_multiplication(left, right)
+        elif operator == "**":
+            self._check_power(left, right)
+        elif operator == "%" and isinstance(left, str):
+            self._check_result_length("String formatting", _printf_length(left, right))
+        return super().call_binop(context, operator, left, right)
+
+    def _size_checked_filter(self, name: str, filter_: Callable, result_length: Callable[..., int]) -> Callable:
+        # filters passed the environment or a context take it as first argument
+        offset = 1 if hasattr(filter_, "jinja_pass_arg") else 0
+
+        @functools.wraps(filter_)
+        def size_checked_filter(*args: Any, **kwargs: Any) -> Any:
+            self._check_result_length(f"Filter {name}", result_length(*args[offset:], **kwargs))
+            return filter_(*args, **kwargs)
+
+        return size_checked_filter
+
+    def _check_result_length(self, operation: str, length: int) -> None:
+        if length > self.max_sequence_length:
+            raise Jinja2RenderError(f"{operation} result exceeds {self.max_sequence_length} characters")
+
+    def _check_multiplication(self, left: Any, right: Any) -> None:
+        for sequence, count in ((left, right), (right, left)):
+            if isinstance(sequence, str | bytes | list | tuple) and isinstance(count, int):
+                if len(sequence) * count > self.max_sequence_length:
+                    raise Jinja2RenderError(f"Sequence repetition exceeds {self.max_sequence_length} items")
+                return
+
+        if isinstance(left, int) and isinstance(right, int):
+            if abs(left).bit_length() + abs(right).bit_length() > _MAX_INTEGER_BITS:
+                raise Jinja2RenderError(f"Integer multiplication exceeds {_MAX_INTEGER_BITS} bits")
+
+    @staticmethod
+    def _check_power(base: Any, exponent: Any) -> None:
+        if not isinstance(base, int) or not isinstance(exponent, int) or exponent <= 0 or abs(base) <= 1:
+            return
+        if (abs(base).bit_length() - 1) * exponent > _MAX_INTEGER_BITS:
+            raise Jinja2RenderError(f"Integer power exceeds {_MAX_INTEGER_BITS} bits")
+
+    def call(__self, __context, __obj, *args, **kwargs):  # noqa: N805
+        _check_render_deadline()
+        owner = getattr(__obj, "__self__", None)
+        if isinstance(owner, str):
+            result_length = _STR_METHOD_RESULT_LENGTHS.get(getattr(__obj, "__name__", ""))
+            if result_length is not None:
+                __self._check_result_length(f"String method {__obj.__name__}", result_length(owner, *args, **kwargs))
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def getattr(self, obj, attribute):
+        _check_render_deadline()
+        return super().getattr(obj, attribute)
+
+    def wrap_str_format(self, value):
+        # str.format and str.format_map are replaced by a sandboxed formatter on access, not passed to call
+        wrapper = super().wrap_str_format(value)
+        if wrapper is None:
+            return None
+        result_length = _STR_METHOD_RESULT_LENGTHS[value.__name__]
+
+        @functools.wraps(wrapper)
+        def size_checked_wrapper(*args: Any, **kwargs: Any) -> str:
+            self._check_result_length(f"String method {value.__name__}", result_length(value.__self__, *args, **kwargs))
+            return wrapper(*args, **kwargs)
+
+        return size_checked_wrapper
+
+    def getitem(self, obj, argument):
+        _check_render_deadline()
+        return super().getitem(obj, argument)
+
+
+class Jinja2Renderer:
+    """
+    Render jinja2 templates in process in a sandboxed environment, instead of in the code execution sandbox.
+    Compiled templates are cached by the hash of their source.
+    """
+
+    def __init__(self, cache_size: int, max_output_length: int, timeout: float) -> None:
+        self.cache_size = cache_size
+        self.max_output_length = max_output_length
+        self.timeout = timeout
+        self._environment = _TimeLimitedSandboxedEnvironment(max_sequence_length=max_output_length)
+        self._templates: OrderedDict[str, Template] = OrderedDict()
+        self._lock = Lock()
+
+    def render(self, template: str, inputs: Mapping[str, Any]) -> str:
+        """
+        Render template with inputs
+        :raises Jinja2RenderError: if the template is invalid, fails, times out or its output is too long
+        """
+        compiled_template = self._get_template(template)
+        # only json values are passed to templates, as to templates rendered in the code execution sandbox
+        inputs = json.loads(json.dumps(inputs, ensure_ascii=False))
+
+        token = _render_deadline.set(time.monotonic() + self.timeout)
+        try:
+            output: list[str] = []
+            output_length = 0
+            for chunk in compiled_template.generate(**inputs):
+                output_length += len(chunk)
+                if output_length > self.max_output_length:
+                    raise Jinja2RenderError(f"Template output length exceeds {self.max_output_length} characters")
+                _check_render_deadline()
+                output.append(chunk)
+            return "".join(output)
+        except Jinja2RenderError:
+            raise
+        except Exception as e:
+            raise Jinja2RenderError(f"{type(e).__name__}: {e}") from e
+        finally:
+            _render_deadline.reset(token)
+
+    def _get_template(self, template: str) -> Template:
+        key = hashlib.sha256(template.encode()).hexdigest()
+        with self._lock:
+            compiled_template = self._templates.get(key)
+            if compiled_template is not None:
+                self._templates.move_to_end(key)
+                return compiled_template
+
+        try:
+            compiled_template = self._environment.from_string(template)
+        except Exception as e:
+            raise Jinja2RenderError(f"{type(e).__name__}: {e}") from e
+
+        with self._lock:
+            self._templates[key] = compiled_template
+            while len(self._templates) > self.cache_size:
+                self._templates.popitem(last=False)
+        return compiled_template
+
+
+jinja2_renderer = Jinja2Renderer(
+    cache_size=dify_config.JINJA2_TEMPLATE_CACHE_SIZE,
+    max_output_length=dify_config.JINJA2_RENDER_MAX_OUTPUT_LENGTH,
+    timeout=dify_config.JINJA2_RENDER_TIMEOUT,
+)
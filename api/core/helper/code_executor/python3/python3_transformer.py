@@ -25,3 +25,32 @@ class Python3TemplateTransformer(TemplateTransformer):
             print(result)
             """)
         return runner_script
+
+    @classmethod
+    def get_batch_runner_script(cls) -> str:
+        runner_script = dedent(f"""
+            import json
+            import traceback
+            from base64 import b64decode, b64encode
+
+            # decode the code and the batch of input dicts
+            code = compile(b64decode('{cls._code_placeholder}').decode('utf-8'), '<string>', 'exec')
+            batch = json.loads(b64decode('{cls._inputs_placeholder}').decode('utf-8'))
+
+            # execute main function for each input dict in a fresh namespace,
+            # the result of each input dict is printed as soon as it is done
+            for inputs_obj in batch['inputs_list']:
+                failed = False
+                try:
+                    namespace = {{'__name__': '__main__'}}
+                    exec(code, namespace)
+                    result_json = json.dumps({{'output': namespace['main'](**inputs_obj)}})
+                except Exception:
+                    failed = True
+                    result_json = json.dumps({{'error': traceback.format_exc()}})
+                result = b64encode(result_json.encode('utf-8')).decode('utf-8')
+                print(f'''<<RESULT>>{{result}}<<RESULT>>''', flush=True)
+                if failed and batch['stop_on_error']:
+                    break
+            """)
+        return runner_script
@@ -1,9 +1,10 @@
+import binascii
 import json
 import re
 from abc import ABC, abstractmethod
-from base64 import b64encode
-from collections.abc import Mapping
-from typing import Any
+from base64 import b64decode, b64encode
+from collections.abc import Mapping, Sequence
+from typing import Any, Optional
 
 
 class TemplateTransformer(ABC):
@@ -42,6 +43,52 @@ class TemplateTransformer(ABC):
             result = json.loads(cls.extract_result_str_from_response(response))
         except json.JSONDecodeError:
             raise ValueError("failed to parse response")
+        return cls.validate_result(result)
+
+    @classmethod
+    def transform_batch_caller(
+        cls, code: str, inputs_list: Sequence[Mapping[str, Any]], stop_on_error: bool = False
+    ) -> tuple[str, str]:
+        """
+        Transform code to a runner executing the code for each inputs in a fresh namespace
+        :param code: code
+        :param inputs_list: inputs of each execution
+        :param stop_on_error: stop at the first failed execution
+        :return: runner, preload
+        """
+        batch_runner_script = cls.get_batch_runner_script()
+        if batch_runner_script is None:
+            raise NotImplementedError(f"{cls.__name__} does not support batch executions")
+
+        # the code is executed once per inputs, so it is passed as data instead of being declared in the runner
+        runner_script = batch_runner_script.replace(cls._code_placeholder, b64encode(code.encode()).decode("utf-8"))
+        runner_script = runner_script.replace(
+            cls._inputs_placeholder,
+            cls.serialize_inputs({"inputs_list": list(inputs_list), "stop_on_error": stop_on_error}),
+        )
+        return runner_script, cls.get_preload_script()
+
+    @classmethod
+    def transform_batch_response(cls, response: str) -> list[Mapping[str, Any]]:
+        """
+        Transform response of a batch runner to the results of the executions done, in order,
+        a result is either {"output": output} or {"error": error message}
+        :param response: response
+        :return:
+        """
+        results: list[Mapping[str, Any]] = []
+        for result_str in re.findall(rf"{cls._result_tag}([A-Za-z0-9+/=]*){cls._result_tag}", response):
+            try:
+                result = json.loads(b64decode(result_str))
+            except (binascii.Error, ValueError):
+                raise ValueError("failed to parse response")
+            if not isinstance(result, dict):
+                raise ValueError("batch results must be dicts")
+            results.append(result)
+        return results
+
+    @classmethod
+    def validate_result(cls, result: Any) -> Mapping[str, Any]:
         if not isinstance(result, dict):
             raise ValueError("result must be a dict")
         if not all(isinstance(k, str) for k in result):
@@ -56,6 +103,13 @@ class TemplateTransformer(ABC):
         """
         pass
 
+    @classmethod
+    def get_batch_runner_script(cls) -> Optional[str]:
+        """
+        Get runner script executing the code for each inputs, None if batch executions are not supported
+        """
+        return None
+
     @classmethod
     def serialize_inputs(cls, inputs: Mapping[str, Any]) -> str:
         inputs_json_str = json.dumps(inputs, ensure_ascii=False).encode()
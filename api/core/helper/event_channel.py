@@ -0,0 +1,113 @@
+import threading
+from collections import deque
+from collections.abc import Callable, Generator
+from concurrent.futures import Future
+from contextlib import AbstractContextManager, nullcontext
+from queue import Empty
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class EventChannel(Generic[T]):
+    """
+    Multi-producer, single-consumer event channel that knows when its producers are done.
+
+    The channel is closed either explicitly with `close`, or implicitly once every future passed
+    to `watch` is done, so consumers wake up on events and completion only and never poll.
+    Events put before the channel is closed are still delivered, events put afterwards are dropped.
+    """
+
+    def __init__(self, block_context: Optional[Callable[[], AbstractContextManager]] = None) -> None:
+        """
+        :param block_context: context manager factory entered while the consumer waits for events,
+            e.g. to let a worker scheduler know the current worker is blocked
+        """
+        self._events: deque[T] = deque()
+        self._condition = threading.Condition(threading.Lock())
+        self._block_context = block_context or nullcontext
+        self._closed = False
+        self._watched_count = 0
+        self._pending_count = 0
+
+    def put(self, event: T) -> None:
+        """
+        Put an event into the channel
+        """
+        with self._condition:
+            if self._closed:
+                return
+
+            self._events.append(event)
+            self._condition.notify()
+
+    def close(self) -> None:
+        """
+        Close the channel, the consumer stops after the events put before
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def watch(self, future: Future) -> None:
+        """
+        Keep the channel open until the future is done,
+        all producers must be watched before consuming
+        """
+        with self._condition:
+            self._watched_count += 1
+            self._pending_count += 1
+
+        future.add_done_callback(self._on_producer_done)
+
+    def wakeup(self) -> None:
+        """
+        Wake up the waiting consumer without an event, `get` then raises `queue.Empty`
+        """
+        with self._condition:
+            self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[T]:
+        """
+        Get the next event, wait until an event arrives, the channel is closed or the timeout expires
+
+        :param timeout: timeout in seconds, wait forever if None
+        :return: next event, or None if the channel is closed and all events are consumed
+        :raises queue.Empty: timeout expired or woken up without an event
+        """
+        with self._condition:
+            if self._events:
+                return self._events.popleft()
+            if self._is_closed_locked():
+                return None
+
+            with self._block_context():
+                self._condition.wait(timeout)
+
+            if self._events:
+                return self._events.popleft()
+            if self._is_closed_locked():
+                return None
+
+            raise Empty
+
+    def __iter__(self) -> Generator[T, None, None]:
+        while True:
+            try:
+                event = self.get()
+            except Empty:
+                continue
+
+            if event is None:
+                return
+
+            yield event
+
+    def _is_closed_locked(self) -> bool:
+        return self._closed or (self._watched_count > 0 and self._pending_count == 0)
+
+    def _on_producer_done(self, future: Future) -> None:
+        with self._condition:
+            self._pending_count -= 1
+            if not self._pending_count:
+                self._condition.notify_all()
@@ -3,7 +3,12 @@ Proxy requests to avoid SSRF
 """
 
 import logging
+import threading
 import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Optional
 
 import httpx
 
@@ -21,7 +26,62 @@ class MaxRetriesExceededError(ValueError):
     pass
 
 
-def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+class ResponseTooLargeError(ValueError):
+    """Raised when a downloaded response body exceeds the maximum size."""
+
+    pass
+
+
+# proxy configuration -> pooled client, clients are thread safe and shared by all threads of the process
+_clients: dict[tuple[Optional[str], ...], httpx.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client() -> httpx.Client:
+    """
+    Get the pooled client of the current proxy configuration, connections are kept alive between requests
+    """
+    if dify_config.SSRF_PROXY_ALL_URL:
+        proxy_key: tuple[Optional[str], ...] = (dify_config.SSRF_PROXY_ALL_URL,)
+    elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
+        proxy_key = (dify_config.SSRF_PROXY_HTTP_URL, dify_config.SSRF_PROXY_HTTPS_URL)
+    else:
+        proxy_key = ()
+
+    client = _clients.get(proxy_key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(proxy_key)
+        if client is None:
+            client = _create_client(proxy_key)
+            _clients[proxy_key] = client
+    return client
+
+
+def _create_client(proxy_key: tuple[Optional[str], ...]) -> httpx.Client:
+    limits = httpx.Limits(
+        max_connections=dify_config.SSRF_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=dify_config.SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=dify_config.SSRF_POOL_KEEPALIVE_EXPIRY,
+    )
+    # the client is shared by all requests, cookies set by responses must not be sent with other requests
+    cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+    if len(proxy_key) == 1:
+        return httpx.Client(proxy=proxy_key[0], limits=limits, cookies=cookies)
+    elif len(proxy_key) == 2:
+        proxy_mounts = {
+            "http://": httpx.HTTPTransport(proxy=proxy_key[0], limits=limits),
+            "https://": httpx.HTTPTransport(proxy=proxy_key[1], limits=limits),
+        }
+        return httpx.Client(mounts=proxy_mounts, limits=limits, cookies=cookies)
+    else:
+        return httpx.Client(limits=limits, cookies=cookies)
+
+
+def _prepare_kwargs(kwargs: dict) -> dict:
     if "allow_redirects" in kwargs:
         allow_redirects = kwargs.pop("allow_redirects")
         if "follow_redirects" not in kwargs:
@@ -35,23 +95,18 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
             write=dify_config.SSRF_DEFAULT_WRITE_TIME_OUT,
         )
 
+    kwargs.pop("stream", None)
+    return kwargs
+
+
+def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    kwargs = _prepare_kwargs(kwargs)
+    client = _get_client()
+
     retries = 0
-    stream = kwargs.pop("stream", False)
     while retries <= max_retries:
         try:
-            if dify_config.SSRF_PROXY_ALL_URL:
-                with httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
-                proxy_mounts = {
-                    "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL),
-                    "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL),
-                }
-                with httpx.Client(mounts=proxy_mounts) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            else:
-                with httpx.Client() as client:
-                    response = client.request(method=method, url=url, **kwargs)
+            response = client.request(method=method, url=url, **kwargs)
 
             if response.status_code not in STATUS_FORCELIST:
                 return response
@@ -69,6 +124,67 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
 
 
+@contextmanager
+def stream(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs) -> Generator[httpx.Response, None, None]:
+    """
+    Send a request and yield the response before its body is read, the body is read with
+    `response.iter_bytes()` and the connection is released when the context exits.
+    Requests are retried like `make_request` until the response headers are received.
+    """
+    kwargs = _prepare_kwargs(kwargs)
+    # options of sending the request, the others build it
+    follow_redirects = kwargs.pop("follow_redirects", httpx.USE_CLIENT_DEFAULT)
+    auth = kwargs.pop("auth", httpx.USE_CLIENT_DEFAULT)
+    client = _get_client()
+
+    retries = 0
+    while retries <= max_retries:
+        try:
+            request = client.build_request(method=method, url=url, **kwargs)
+            response = client.send(request, auth=auth, follow_redirects=follow_redirects, stream=True)
+        except httpx.RequestError as e:
+            logging.warning(f"Request to URL {url} failed on attempt {retries + 1}: {e}")
+            if max_retries == 0:
+                raise
+        else:
+            if response.status_code not in STATUS_FORCELIST:
+                break
+
+            response.close()
+            logging.warning(f"Received status code {response.status_code} for URL {url} which is in the force list")
+
+        retries += 1
+        if retries <= max_retries:
+            time.sleep(BACKOFF_FACTOR * (2 ** (retries - 1)))
+    else:
+        raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
+
+    try:
+        yield response
+    finally:
+        response.close()
+
+
+def download(url, max_size: Optional[int] = None, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs) -> bytes:
+    """
+    Download the body of a GET request in chunks, without keeping a copy of it in `response.content`
+
+    :param max_size: maximum size in bytes of the body, ResponseTooLargeError is raised as soon as it is exceeded
+    :raises httpx.HTTPStatusError: if the response status is an error
+    """
+    with stream("GET", url, max_retries=max_retries, **kwargs) as response:
+        response.raise_for_status()
+        if max_size is not None and int(response.headers.get("Content-Length") or 0) > max_size:
+            raise ResponseTooLargeError(f"Response of URL {url} exceeds the maximum size of {max_size} bytes")
+
+        content = bytearray()
+        for chunk in response.iter_bytes(chunk_size=dify_config.SSRF_STREAM_CHUNK_SIZE):
+            content += chunk
+            if max_size is not None and len(content) > max_size:
+                raise ResponseTooLargeError(f"Response of URL {url} exceeds the maximum size of {max_size} bytes")
+        return bytes(content)
+
+
 def get(url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     return make_request("GET", url, max_retries=max_retries, **kwargs)
 
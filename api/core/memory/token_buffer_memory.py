@@ -1,8 +1,12 @@
+import logging
 from collections.abc import Sequence
-from typing import Optional
+from typing import Any, Optional
 
+from sqlalchemy.orm import load_only
+
+from configs import dify_config
 from core.app.app_config.features.file_upload.manager import FileUploadConfigManager
-from core.file import file_manager
+from core.file import FileUploadConfig, file_manager
 from core.model_manager import ModelInstance
 from core.model_runtime.entities import (
     AssistantPromptMessage,
@@ -15,9 +19,12 @@ from core.model_runtime.entities import (
 )
 from core.prompt.utils.extract_thread_messages import extract_thread_messages
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from factories import file_factory
 from models.model import AppMode, Conversation, Message, MessageFile
-from models.workflow import WorkflowRun
+from models.workflow import Workflow, WorkflowRun
+
+logger = logging.getLogger(__name__)
 
 
 class TokenBufferMemory:
@@ -69,22 +76,17 @@ class TokenBufferMemory:
         messages = list(reversed(thread_messages))
 
         prompt_messages: list[PromptMessage] = []
+        # id of the message of each prompt message
+        prompt_message_ids: list[str] = []
+        message_files = self._get_message_files(messages)
+        file_extra_configs = self._get_file_extra_configs(
+            [message for message in messages if message.id in message_files]
+        )
         for message in messages:
-            files = db.session.query(MessageFile).filter(MessageFile.message_id == message.id).all()
+            prompt_message_ids.extend((message.id, message.id))
+            files = message_files.get(message.id)
             if files:
-                file_extra_config = None
-                if self.conversation.mode not in {AppMode.ADVANCED_CHAT, AppMode.WORKFLOW}:
-                    file_extra_config = FileUploadConfigManager.convert(self.conversation.model_config)
-                else:
-                    if message.workflow_run_id:
-                        workflow_run = (
-                            db.session.query(WorkflowRun).filter(WorkflowRun.id == message.workflow_run_id).first()
-                        )
-
-                        if workflow_run and workflow_run.workflow:
-                            file_extra_config = FileUploadConfigManager.convert(
-                                workflow_run.workflow.features_dict, is_vision=False
-                            )
+                file_extra_config = file_extra_configs.get(message.id)
 
                 detail = ImagePromptMessageContent.DETAIL.LOW
                 if file_extra_config and app_record:
@@ -122,6 +124,10 @@ class TokenBufferMemory:
         curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
 
         if curr_message_tokens > max_token_limit:
+            if dify_config.MEMORY_INCREMENTAL_TOKEN_COUNT:
+                prompt_messages = self._prune_prompt_messages(prompt_messages, prompt_message_ids, max_token_limit)
+                curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
+
             pruned_memory = []
             while curr_message_tokens > max_token_limit and len(prompt_messages) > 1:
                 pruned_memory.append(prompt_messages.pop(0))
@@ -129,6 +135,136 @@ class TokenBufferMemory:
 
         return prompt_messages
 
+    def _get_message_files(self, messages: Sequence[Any]) -> dict[str, list[MessageFile]]:
+        """
+        Get the files of messages with one query
+        """
+        if not messages:
+            return {}
+
+        message_files: dict[str, list[MessageFile]] = {}
+        files = db.session.query(MessageFile).filter(MessageFile.message_id.in_([m.id for m in messages])).all()
+        for file in files:
+            message_files.setdefault(file.message_id, []).append(file)
+
+        return message_files
+
+    def _get_file_extra_configs(self, messages: Sequence[Any]) -> dict[str, Optional[FileUploadConfig]]:
+        """
+        Get the file upload config of messages, for workflow based apps the features of the workflows
+        of all messages are loaded with one query for the workflow runs and one for the workflows
+        """
+        if not messages:
+            return {}
+
+        if self.conversation.mode not in {AppMode.ADVANCED_CHAT, AppMode.WORKFLOW}:
+            file_extra_config = FileUploadConfigManager.convert(self.conversation.model_config)
+            return {message.id: file_extra_config for message in messages}
+
+        workflow_run_ids = {message.workflow_run_id for message in messages if message.workflow_run_id}
+        if not workflow_run_ids:
+            return {}
+
+        workflow_ids: dict[str, str] = {
+            row[0]: row[1]
+            for row in db.session.query(WorkflowRun.id, WorkflowRun.workflow_id)
+            .filter(WorkflowRun.id.in_(workflow_run_ids))
+            .all()
+        }
+        workflows = (
+            db.session.query(Workflow)
+            .options(load_only(Workflow.id, Workflow._features))
+            .filter(Workflow.id.in_(set(workflow_ids.values())))
+            .all()
+        )
+        workflow_features = {workflow.id: workflow.features for workflow in workflows}
+
+        file_extra_configs = {}
+        for message in messages:
+            workflow_id = workflow_ids.get(message.workflow_run_id)
+            if workflow_id in workflow_features:
+                file_extra_configs[message.id] = FileUploadConfigManager.convert_workflow_features(
+                    workflow_id, workflow_features[workflow_id], is_vision=False
+                )
+
+        return file_extra_configs
+
+    def _prune_prompt_messages(
+        self, prompt_messages: list[PromptMessage], prompt_message_ids: list[str], max_token_limit: int
+    ) -> list[PromptMessage]:
+        """
+        Prune the oldest prompt messages so that the sum of the token counts of the remaining messages
+        is within the max token limit, keeping at least the latest prompt message.
+        Each message is counted as a prompt of its own, so the overhead of a prompt, counted for an empty prompt,
+        is taken out of each count and added once to the sum.
+        The count of the remaining messages as a whole may differ slightly from the sum,
+        the caller checks it once more.
+        """
+        prompt_message_tokens = self._get_prompt_message_tokens(prompt_messages, prompt_message_ids)
+        prompt_tokens = self.model_instance.get_llm_num_tokens([])
+        prompt_message_tokens = [max(tokens - prompt_tokens, 0) for tokens in prompt_message_tokens]
+
+        start = len(prompt_messages) - 1
+        total_tokens = prompt_tokens + prompt_message_tokens[start]
+        while start > 0 and total_tokens + prompt_message_tokens[start - 1] <= max_token_limit:
+            start -= 1
+            total_tokens += prompt_message_tokens[start]
+
+        return prompt_messages[start:]
+
+    def _get_prompt_message_tokens(
+        self, prompt_messages: list[PromptMessage], prompt_message_ids: list[str]
+    ) -> list[int]:
+        """
+        Get the token count of each prompt message, the counts of the query and answer of a message
+        are counted once and cached per message and model.
+        """
+        cache_keys = {
+            message_id: f"memory_message_tokens:{self.model_instance.provider}:{self.model_instance.model}:{message_id}"
+            for message_id in prompt_message_ids
+        }
+        try:
+            cached_tokens = redis_client.mget(list(cache_keys.values()))
+        except Exception:
+            logger.warning("Failed to get cached message token counts", exc_info=True)
+            cached_tokens = [None] * len(cache_keys)
+
+        # message id -> (query tokens, answer tokens)
+        message_tokens: dict[str, tuple[int, int]] = {}
+        for message_id, tokens in zip(cache_keys, cached_tokens):
+            if tokens:
+                query_tokens, answer_tokens = (tokens.decode() if isinstance(tokens, bytes) else tokens).split(",")
+                message_tokens[message_id] = (int(query_tokens), int(answer_tokens))
+
+        counted_message_tokens = {}
+        for i in range(0, len(prompt_messages), 2):
+            message_id = prompt_message_ids[i]
+            if message_id not in message_tokens:
+                counted_message_tokens[message_id] = (
+                    self.model_instance.get_llm_num_tokens([prompt_messages[i]]),
+                    self.model_instance.get_llm_num_tokens([prompt_messages[i + 1]]),
+                )
+
+        if counted_message_tokens:
+            message_tokens.update(counted_message_tokens)
+            try:
+                pipeline = redis_client.pipeline(transaction=False)
+                for message_id, (query_tokens, answer_tokens) in counted_message_tokens.items():
+                    pipeline.setex(
+                        cache_keys[message_id],
+                        dify_config.MEMORY_MESSAGE_TOKEN_COUNT_CACHE_TTL,
+                        f"{query_tokens},{answer_tokens}",
+                    )
+                pipeline.execute()
+            except Exception:
+                logger.warning("Failed to cache message token counts", exc_info=True)
+
+        prompt_message_tokens: list[int] = []
+        for i in range(0, len(prompt_messages), 2):
+            prompt_message_tokens.extend(message_tokens[prompt_message_ids[i]])
+
+        return prompt_message_tokens
+
     def get_history_prompt_text(
         self,
         human_prefix: str = "Human",
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Optional
+
+from configs import dify_config
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class LoadBalancingStrategy(StrEnum):
+    """
+    Strategy to pick the load balancing config of a model invocation
+    """
+
+    ROUND_ROBIN = "round_robin"
+    LEAST_OUTSTANDING_REQUESTS = "least_outstanding_requests"
+    EWMA_LATENCY = "ewma_latency"
+
+
+@dataclass
+class LoadBalancingConfigStats:
+    """
+    Request stats of a load balancing config
+    """
+
+    outstanding_requests: int = 0
+    # exponentially weighted moving average of latencies in seconds, None before the first request
+    ewma_latency: Optional[float] = None
+
+
+class ModelLoadBalancer:
+    """
+    Request stats and cooldown state of the load balancing configs of models.
+
+    Stats are kept in process and shared with the other processes through Redis every sync interval,
+    the stats of a config are the sum of the outstanding requests and the mean of the latencies of all processes.
+    Cooldowns are cached in process until they expire, configs not in cooldown are checked again
+    after the cooldown check interval.
+    Stats of configs not used for STATS_TTL seconds and expired cooldowns are evicted every sync interval.
+    """
+
+    _STATS_CACHE_KEY = "model_lb_stats:{}"
+    STATS_TTL = 600.0
+
+    def __init__(self, ewma_decay: float, sync_interval: float, cooldown_check_interval: float) -> None:
+        self.ewma_decay = ewma_decay
+        self.sync_interval = sync_interval
+        self.cooldown_check_interval = cooldown_check_interval
+        self._instance_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        # model key -> config id -> stats of this process
+        self._local_stats: dict[str, dict[str, LoadBalancingConfigStats]] = {}
+        # model key -> config id -> stats of other processes
+        self._remote_stats: dict[str, dict[str, list[LoadBalancingConfigStats]]] = {}
+        self._synced_at: dict[str, float] = {}
+        # model key -> config id -> last time its stats were used
+        self._used_at: dict[str, dict[str, float]] = {}
+        # cooldown cache key -> (valid until, in cooldown)
+        self._cooldowns: dict[str, tuple[float, bool]] = {}
+        self._evicted_at = time.monotonic()
+
+    def on_request_start(self, model_key: str, config_id: str) -> None:
+        with self._lock:
+            self._get_local_stats(model_key, config_id).outstanding_requests += 1
+
+    def on_request_end(self, model_key: str, config_id: str, latency: Optional[float]) -> None:
+        """
+        :param latency: latency in seconds, None if the request failed or its latency is not known
+        """
+        with self._lock:
+            stats = self._get_local_stats(model_key, config_id)
+            stats.outstanding_requests = max(0, stats.outstanding_requests - 1)
+            if latency is not None:
+                if stats.ewma_latency is None:
+                    stats.ewma_latency = latency
+                else:
+                    stats.ewma_latency = self.ewma_decay * latency + (1 - self.ewma_decay) * stats.ewma_latency
+
+    def get_stats(self, model_key: str, config_ids: Sequence[str]) -> dict[str, LoadBalancingConfigStats]:
+        """
+        Get the stats of configs of all processes
+        """
+        self._evict()
+        if time.monotonic() - self._synced_at.get(model_key, float("-inf")) >= self.sync_interval:
+            self._synced_at[model_key] = time.monotonic()
+            try:
+                self._sync(model_key)
+            except Exception:
+                logger.warning("Failed to sync model load balancing stats", exc_info=True)
+
+        stats = {}
+        now = time.monotonic()
+        with self._lock:
+            local_stats = self._local_stats.get(model_key, {})
+            remote_stats = self._remote_stats.get(model_key, {})
+            used_at = self._used_at.setdefault(model_key, {})
+            for config_id in config_ids:
+                used_at[config_id] = now
+                config_stats = [local_stats.get(config_id) or LoadBalancingConfigStats()]
+                config_stats.extend(remote_stats.get(config_id, []))
+                latencies = [s.ewma_latency for s in config_stats if s.ewma_latency is not None]
+                stats[config_id] = LoadBalancingConfigStats(
+                    outstanding_requests=sum(s.outstanding_requests for s in config_stats),
+                    ewma_latency=sum(latencies) / len(latencies) if latencies else None,
+                )
+
+        return stats
+
+    def select(self, strategy: LoadBalancingStrategy, model_key: str, config_ids: Sequence[str]) -> Optional[str]:
+        """
+        Select the config with the lowest cost by the least outstanding requests or EWMA latency strategy,
+        configs with the same cost are picked at random
+        """
+        if not config_ids:
+            return None
+
+        stats = self.get_stats(model_key, config_ids)
+        if strategy == LoadBalancingStrategy.LEAST_OUTSTANDING_REQUESTS:
+            costs = {config_id: float(stats[config_id].outstanding_requests) for config_id in config_ids}
+        else:
+            # configs without latency yet, e.g. new or just recovered, are taken as fast as the mean of the others,
+            # so that they do not get every request until their first request ends
+            latencies = [s.ewma_latency for s in stats.values() if s.ewma_latency is not None]
+            mean_latency = sum(latencies) / len(latencies) if latencies else 1.0
+            costs = {
+                config_id: (stats[config_id].ewma_latency or mean_latency) * (stats[config_id].outstanding_requests + 1)
+                for config_id in config_ids
+            }
+
+        min_cost = min(costs.values())
+        return random.choice([config_id for config_id, cost in costs.items() if cost == min_cost])
+
+    def in_cooldown(self, cooldown_cache_key: str) -> bool:
+        self._evict()
+        now = time.monotonic()
+        cooldown = self._cooldowns.get(cooldown_cache_key)
+        if cooldown and cooldown[0] > now:
+            return cooldown[1]
+
+        ttl = redis_client.pttl(cooldown_cache_key)
+        if ttl == -2:
+            self._cooldowns[cooldown_cache_key] = (now + self.cooldown_check_interval, False)
+            return False
+
+        # a cooldown without expiry is checked again like a config not in cooldown
+        valid_for = ttl / 1000 if ttl > 0 else self.cooldown_check_interval
+        self._cooldowns[cooldown_cache_key] = (now + valid_for, True)
+        return True
+
+    def cooldown(self, cooldown_cache_key: str, expire: int) -> None:
+        redis_client.setex(cooldown_cache_key, expire, "true")
+        self._cooldowns[cooldown_cache_key] = (time.monotonic() + expire, True)
+
+    def _evict(self) -> None:
+        """
+        Evict the stats of configs not used for STATS_TTL seconds and expired cooldowns, once per sync interval
+        """
+        now = time.monotonic()
+        if now - self._evicted_at < self.sync_interval:
+            return
+
+        with self._lock:
+            self._evicted_at = now
+            for model_key, used_at in list(self._used_at.items()):
+                local_stats = self._local_stats.get(model_key, {})
+                for config_id, config_used_at in list(used_at.items()):
+                    config_stats = local_stats.get(config_id)
+                    if now - config_used_at < self.STATS_TTL or (config_stats and config_stats.outstanding_requests):
+                        continue
+                    del used_at[config_id]
+                    local_stats.pop(config_id, None)
+
+                if not used_at:
+                    del self._used_at[model_key]
+                    self._local_stats.pop(model_key, None)
+                    self._remote_stats.pop(model_key, None)
+                    self._synced_at.pop(model_key, None)
+
+            for cooldown_cache_key, (valid_until, _) in list(self._cooldowns.items()):
+                if valid_until <= now:
+                    del self._cooldowns[cooldown_cache_key]
+
+    def _get_local_stats(self, model_key: str, config_id: str) -> LoadBalancingConfigStats:
+        self._used_at.setdefault(model_key, {})[config_id] = time.monotonic()
+        model_stats = self._local_stats.setdefault(model_key, {})
+        if config_id not in model_stats:
+            model_stats[config_id] = LoadBalancingConfigStats()
+        return model_stats[config_id]
+
+    def _sync(self, model_key: str) -> None:
+        """
+        Publish the stats of this process and load the stats of other processes
+        """
+        now = time.time()
+        with self._lock:
+            local_stats = {
+                f"{config_id}:{self._instance_id}": json.dumps(
+                    {
+                        "outstanding_requests": stats.outstanding_requests,
+                        "ewma_latency": stats.ewma_latency,
+                        "updated_at": now,
+                    }
+                )
+                for config_id, stats in self._local_stats.get(model_key, {}).items()
+            }
+
+        cache_key = self._STATS_CACHE_KEY.format(model_key)
+        pipeline = redis_client.pipeline(transaction=False)
+        if local_stats:
+            pipeline.hset(cache_key, mapping=local_stats)
+            pipeline.expire(cache_key, int(self.sync_interval * 10) + 60)
+        pipeline.hgetall(cache_key)
+        all_stats = pipeline.execute()[-1]
+
+        remote_stats: dict[str, list[LoadBalancingConfigStats]] = {}
+        expired_fields = []
+        for field, value in all_stats.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            config_id, _, instance_id = field.rpartition(":")
+            if instance_id == self._instance_id:
+                continue
+
+            stats = json.loads(value)
+            # stats of processes that stopped syncing
+            if now - stats["updated_at"] > self.sync_interval * 3:
+                expired_fields.append(field)
+                continue
+
+            remote_stats.setdefault(config_id, []).append(
+                LoadBalancingConfigStats(
+                    outstanding_requests=stats["outstanding_requests"], ewma_latency=stats["ewma_latency"]
+                )
+            )
+
+        if expired_fields:
+            redis_client.hdel(cache_key, *expired_fields)
+
+        with self._lock:
+            self._remote_stats[model_key] = remote_stats
+
+
+model_load_balancer = ModelLoadBalancer(
+    ewma_decay=dify_config.MODEL_LB_EWMA_DECAY,
+    sync_interval=dify_config.MODEL_LB_STATS_SYNC_INTERVAL,
+    cooldown_check_interval=dify_config.MODEL_LB_COOLDOWN_CHECK_INTERVAL,
+)
@@ -1,4 +1,5 @@
 import logging
+import time
 from collections.abc import Callable, Generator, Iterable, Sequence
 from typing import IO, Any, Optional, Union, cast
 
@@ -7,6 +8,7 @@ from core.entities.embedding_type import EmbeddingInputType
 from core.entities.provider_configuration import ProviderConfiguration, ProviderModelBundle
 from core.entities.provider_entities import ModelLoadBalancingConfiguration
 from core.errors.error import ProviderTokenNotInitError
+from core.model_load_balancer import LoadBalancingStrategy, model_load_balancer
 from core.model_runtime.callbacks.base_callback import Callback
 from core.model_runtime.entities.llm_entities import LLMResult
 from core.model_runtime.entities.message_entities import PromptMessage, PromptMessageTool
@@ -345,7 +347,9 @@ class ModelInstance:
             try:
                 if "credentials" in kwargs:
                     del kwargs["credentials"]
-                return function(*args, **kwargs, credentials=lb_config.credentials)
+                return self.load_balancing_manager.invoke(
+                    lb_config, function, *args, **kwargs, credentials=lb_config.credentials
+                )
             except InvokeRateLimitError as e:
                 # expire in 60 seconds
                 self.load_balancing_manager.cooldown(lb_config, expire=60)
@@ -450,6 +454,8 @@ class LBModelManager:
         self._model_type = model_type
         self._model = model
         self._load_balancing_configs = load_balancing_configs
+        self._model_key = "{}:{}:{}:{}".format(tenant_id, provider, model_type.value, model)
+        self._strategy = LoadBalancingStrategy(dify_config.MODEL_LB_STRATEGY)
 
         for load_balancing_config in self._load_balancing_configs[:]:  # Iterate over a shallow copy of the list
             if load_balancing_config.name == "__inherit__":
@@ -462,12 +468,32 @@ class LBModelManager:
     def fetch_next(self) -> Optional[ModelLoadBalancingConfiguration]:
         """
         Get next model load balancing config
-        Strategy: Round Robin
+        Strategy: MODEL_LB_STRATEGY, Round Robin by default
         :return:
         """
-        cache_key = "model_lb_index:{}:{}:{}:{}".format(
-            self._tenant_id, self._provider, self._model_type.value, self._model
-        )
+        if self._strategy == LoadBalancingStrategy.ROUND_ROBIN:
+            return self._fetch_next_round_robin()
+
+        available_configs = {
+            config.id: config for config in self._load_balancing_configs if not self.in_cooldown(config)
+        }
+        config_id = model_load_balancer.select(self._strategy, self._model_key, list(available_configs))
+        if not config_id:
+            # all configs are in cooldown
+            return None
+
+        config = available_configs[config_id]
+        if dify_config.DEBUG:
+            logger.info(
+                f"Model LB\nid: {config.id}\nname:{config.name}\n"
+                f"tenant_id: {self._tenant_id}\nprovider: {self._provider}\n"
+                f"model_type: {self._model_type.value}\nmodel: {self._model}\nstrategy: {self._strategy}"
+            )
+
+        return config
+
+    def _fetch_next_round_robin(self) -> Optional[ModelLoadBalancingConfiguration]:
+        cache_key = "model_lb_index:{}".format(self._model_key)
 
         cooldown_load_balancing_configs = []
         max_index = len(self._load_balancing_configs)
@@ -508,6 +534,42 @@ class LBModelManager:
 
         return None
 
+    def invoke(self, config: ModelLoadBalancingConfiguration, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Invoke with a model load balancing config, tracking its outstanding requests and latency,
+        the latency of streamed results is the time to the first chunk
+        :param config: model load balancing config
+        :param function: function to invoke
+        :return:
+        """
+        model_load_balancer.on_request_start(self._model_key, config.id)
+        start_at = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            model_load_balancer.on_request_end(self._model_key, config.id, None)
+            raise
+
+        if isinstance(result, Generator):
+            # the request of a stream is made once it is iterated
+            model_load_balancer.on_request_end(self._model_key, config.id, None)
+            return self._track_stream(config, result)
+
+        model_load_balancer.on_request_end(self._model_key, config.id, time.perf_counter() - start_at)
+        return result
+
+    def _track_stream(self, config: ModelLoadBalancingConfiguration, stream: Generator) -> Generator:
+        model_load_balancer.on_request_start(self._model_key, config.id)
+        start_at = time.perf_counter()
+        latency = None
+        try:
+            for chunk in stream:
+                if latency is None:
+                    latency = time.perf_counter() - start_at
+                yield chunk
+        finally:
+            model_load_balancer.on_request_end(self._model_key, config.id, latency)
+
     def cooldown(self, config: ModelLoadBalancingConfiguration, expire: int = 60) -> None:
         """
         Cooldown model load balancing config
@@ -515,24 +577,19 @@ class LBModelManager:
         :param expire: cooldown time
         :return:
         """
-        cooldown_cache_key = "model_lb_index:cooldown:{}:{}:{}:{}:{}".format(
-            self._tenant_id, self._provider, self._model_type.value, self._model, config.id
-        )
+        cooldown_cache_key = "model_lb_index:cooldown:{}:{}".format(self._model_key, config.id)
 
-        redis_client.setex(cooldown_cache_key, expire, "true")
+        model_load_balancer.cooldown(cooldown_cache_key, expire)
 
     def in_cooldown(self, config: ModelLoadBalancingConfiguration) -> bool:
         """
-        Check if model load balancing config is in cooldown
+        Check if model load balancing config is in cooldown, cached in process
         :param config: model load balancing config
         :return:
         """
-        cooldown_cache_key = "model_lb_index:cooldown:{}:{}:{}:{}:{}".format(
-            self._tenant_id, self._provider, self._model_type.value, self._model, config.id
-        )
+        cooldown_cache_key = "model_lb_index:cooldown:{}:{}".format(self._model_key, config.id)
 
-        res: bool = redis_client.exists(cooldown_cache_key)
-        return res
+        return model_load_balancer.in_cooldown(cooldown_cache_key)
 
     @staticmethod
     def get_config_in_cooldown_and_ttl(
@@ -0,0 +1,191 @@
+from typing import Any
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from core.rag.datasource.keyword.jieba.jieba import KeywordTableConfig
+from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
+from core.rag.datasource.keyword.keyword_base import BaseKeyword
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from models.dataset import Dataset, DatasetKeywordPosting, DocumentSegment
+
+
+class JiebaInvertedIndex(BaseKeyword):
+    """
+    Jieba keywords stored as an inverted index of (keyword, node id) postings,
+    searches look up the postings of the query keywords only and updates insert or delete
+    the postings of the changed segments only, instead of loading and rewriting the whole keyword table.
+    """
+
+    # postings inserted per statement
+    INSERT_BATCH_SIZE = 1000
+
+    def __init__(self, dataset: Dataset):
+        super().__init__(dataset)
+        self._config = KeywordTableConfig()
+
+    def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
+        self.add_texts(texts, **kwargs)
+        return self
+
+    def add_texts(self, texts: list[Document], **kwargs):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords_list = kwargs.get("keywords_list")
+        node_keywords: dict[str, list[str]] = {}
+        for i, text in enumerate(texts):
+            if text.metadata is None:
+                continue
+
+            keywords = keywords_list[i] if keywords_list else None
+            if not keywords:
+                keywords = keyword_table_handler.extract_keywords(
+                    text.page_content, self._config.max_keywords_per_chunk
+                )
+            node_keywords[text.metadata["doc_id"]] = list(keywords)
+
+        self._update_segments_keywords(node_keywords)
+        self._add_postings(node_keywords)
+        db.session.commit()
+
+    def text_exists(self, id: str) -> bool:
+        posting = db.session.execute(
+            select(DatasetKeywordPosting.id)
+            .where(DatasetKeywordPosting.dataset_id == self.dataset.id, DatasetKeywordPosting.node_id == id)
+            .limit(1)
+        ).first()
+        return posting is not None
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        if not ids:
+            return
+
+        db.session.execute(
+            delete(DatasetKeywordPosting).where(
+                DatasetKeywordPosting.dataset_id == self.dataset.id, DatasetKeywordPosting.node_id.in_(ids)
+            )
+        )
+        db.session.commit()
+
+    def search(self, query: str, **kwargs: Any) -> list[Document]:
+        k = kwargs.get("top_k", 4)
+        node_ids = self._retrieve_ids_by_query(query, k)
+        if not node_ids:
+            return []
+
+        segments = (
+            db.session.query(DocumentSegment)
+            .filter(DocumentSegment.dataset_id == self.dataset.id, DocumentSegment.index_node_id.in_(node_ids))
+            .all()
+        )
+        segments_by_node_id = {segment.index_node_id: segment for segment in segments}
+
+        documents = []
+        for node_id in node_ids:
+            segment = segments_by_node_id.get(node_id)
+            if segment:
+                documents.append(
+                    Document(
+                        page_content=segment.content,
+                        metadata={
+                            "doc_id": node_id,
+                            "doc_hash": segment.index_node_hash,
+                            "document_id": segment.document_id,
+                            "dataset_id": segment.dataset_id,
+                        },
+                    )
+                )
+
+        return documents
+
+    def delete(self) -> None:
+        db.session.execute(delete(DatasetKeywordPosting).where(DatasetKeywordPosting.dataset_id == self.dataset.id))
+        db.session.commit()
+
+    def create_segment_keywords(self, node_id: str, keywords: list[str]):
+        self._update_segments_keywords({node_id: keywords})
+        self._add_postings({node_id: keywords})
+        db.session.commit()
+
+    def multi_create_segment_keywords(self, pre_segment_data_list: list):
+        keyword_table_handler = JiebaKeywordTableHandler()
+        node_keywords: dict[str, list[str]] = {}
+        for pre_segment_data in pre_segment_data_list:
+            segment = pre_segment_data["segment"]
+            if pre_segment_data["keywords"]:
+                segment.keywords = pre_segment_data["keywords"]
+            else:
+                keywords = keyword_table_handler.extract_keywords(segment.content, self._config.max_keywords_per_chunk)
+                segment.keywords = list(keywords)
+            node_keywords[segment.index_node_id] = segment.keywords
+
+        self._add_postings(node_keywords)
+        db.session.commit()
+
+    def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
+        self._add_postings({node_id: keywords})
+        db.session.commit()
+
+    def import_keyword_table(self, keyword_table: dict[str, set[str]]) -> int:
+        """
+        Import the keyword -> node ids table of the `jieba` keyword store, postings already present are kept
+
+        :return: number of postings in the keyword table
+        """
+        node_keywords: dict[str, list[str]] = {}
+        for keyword, node_ids in keyword_table.items():
+            for node_id in node_ids:
+                node_keywords.setdefault(node_id, []).append(keyword)
+
+        self._add_postings(node_keywords)
+        db.session.commit()
+        return sum(len(keywords) for keywords in node_keywords.values())
+
+    def _retrieve_ids_by_query(self, query: str, k: int = 4) -> list[str]:
+        keyword_table_handler = JiebaKeywordTableHandler()
+        keywords = keyword_table_handler.extract_keywords(query)
+        if not keywords:
+            return []
+
+        # text chunks in order of most matching keywords
+        matched_keyword_count = func.count(DatasetKeywordPosting.id)
+        rows = db.session.execute(
+            select(DatasetKeywordPosting.node_id)
+            .where(
+                DatasetKeywordPosting.dataset_id == self.dataset.id,
+                DatasetKeywordPosting.keyword.in_(list(keywords)),
+            )
+            .group_by(DatasetKeywordPosting.node_id)
+            .order_by(matched_keyword_count.desc(), DatasetKeywordPosting.node_id)
+            .limit(k)
+        ).all()
+        return [row.node_id for row in rows]
+
+    def _add_postings(self, node_keywords: dict[str, list[str]]) -> None:
+        postings = [
+            {"dataset_id": self.dataset.id, "keyword": keyword, "node_id": node_id}
+            for node_id, keywords in node_keywords.items()
+            for keyword in dict.fromkeys(keywords)
+        ]
+
+        for i in range(0, len(postings), self.INSERT_BATCH_SIZE):
+            db.session.execute(
+                insert(DatasetKeywordPosting)
+                .values(postings[i : i + self.INSERT_BATCH_SIZE])
+                .on_conflict_do_nothing(index_elements=["dataset_id", "keyword", "node_id"])
+            )
+
+    def _update_segments_keywords(self, node_keywords: dict[str, list[str]]) -> None:
+        if not node_keywords:
+            return
+
+        segments = (
+            db.session.query(DocumentSegment)
+            .filter(
+                DocumentSegment.dataset_id == self.dataset.id,
+                DocumentSegment.index_node_id.in_(list(node_keywords)),
+            )
+            .all()
+        )
+        for segment in segments:
+            segment.keywords = node_keywords[segment.index_node_id]
@@ -1,10 +1,13 @@
+import io
 import json
+import struct
 import uuid
 from contextlib import contextmanager
 from typing import Any
 
 import psycopg2.extras  # type: ignore
 import psycopg2.pool  # type: ignore
+from pgvector.utils import to_db_binary  # type: ignore
 from pydantic import BaseModel, model_validator
 
 from configs import dify_config
@@ -63,7 +66,17 @@ USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
 """
 
 
+# header of the binary COPY format: signature, flags and header extension length
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack("!h", -1)
+
+
 class PGVector(BaseVector):
+    # texts of larger batches are added with binary COPY instead of INSERT
+    COPY_THRESHOLD = 500
+    # ids looked up per statement
+    FILTER_IDS_BATCH_SIZE = 1000
+
     def __init__(self, collection_name: str, config: PGVectorConfig):
         super().__init__(collection_name)
         self.pool = self._create_connection_pool(config)
@@ -115,16 +128,53 @@ class PGVector(BaseVector):
                     )
                 )
         with self._get_cursor() as cur:
-            psycopg2.extras.execute_values(
-                cur, f"INSERT INTO {self.table_name} (id, text, meta, embedding) VALUES %s", values
-            )
+            if len(values) >= self.COPY_THRESHOLD:
+                self._copy_values(cur, values)
+            else:
+                psycopg2.extras.execute_values(
+                    cur, f"INSERT INTO {self.table_name} (id, text, meta, embedding) VALUES %s", values
+                )
         return pks
 
+    def _copy_values(self, cur, values: list[tuple[str, str, str, list[float]]]) -> None:
+        """
+        Add rows with COPY in the binary format, embeddings are sent as float4 arrays instead of text
+        """
+        buffer = io.BytesIO()
+        buffer.write(COPY_BINARY_HEADER)
+        for doc_id, text, meta, embedding in values:
+            fields = (
+                uuid.UUID(doc_id).bytes,
+                text.encode("utf-8"),
+                # version of the binary jsonb format
+                b"\x01" + meta.encode("utf-8"),
+                to_db_binary(embedding),
+            )
+            buffer.write(struct.pack("!h", len(fields)))
+            for field in fields:
+                buffer.write(struct.pack("!i", len(field)))
+                buffer.write(field)
+        buffer.write(COPY_BINARY_TRAILER)
+        buffer.seek(0)
+
+        cur.copy_expert(f"COPY {self.table_name} (id, text, meta, embedding) FROM STDIN WITH (FORMAT BINARY)", buffer)
+
     def text_exists(self, id: str) -> bool:
         with self._get_cursor() as cur:
             cur.execute(f"SELECT id FROM {self.table_name} WHERE id = %s", (id,))
             return cur.fetchone() is not None
 
+    def filter_existing_ids(self, ids: list[str]) -> set[str]:
+        existing_ids: set[str] = set()
+        with self._get_cursor() as cur:
+            for i in range(0, len(ids), self.FILTER_IDS_BATCH_SIZE):
+                cur.execute(
+                    f"SELECT id FROM {self.table_name} WHERE id = ANY(%s::uuid[])",
+                    (ids[i : i + self.FILTER_IDS_BATCH_SIZE],),
+                )
+                existing_ids.update(str(record[0]) for record in cur)
+        return existing_ids
+
     def get_by_ids(self, ids: list[str]) -> list[Document]:
         with self._get_cursor() as cur:
             cur.execute(f"SELECT meta, text FROM {self.table_name} WHERE id IN %s", (tuple(ids),))
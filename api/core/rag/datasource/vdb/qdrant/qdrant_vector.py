@@ -68,6 +68,9 @@ class QdrantConfig(BaseModel):
 
 
 class QdrantVector(BaseVector):
+    # ids retrieved per request
+    FILTER_IDS_BATCH_SIZE = 1000
+
     def __init__(self, collection_name: str, group_id: str, config: QdrantConfig, distance_func: str = "Cosine"):
         super().__init__(collection_name)
         self._client_config = config
@@ -320,6 +323,26 @@ class QdrantVector(BaseVector):
 
         return len(response) > 0
 
+    def filter_existing_ids(self, ids: list[str]) -> set[str]:
+        all_collection_name = []
+        collections_response = self._client.get_collections()
+        collection_list = collections_response.collections
+        for collection in collection_list:
+            all_collection_name.append(collection.name)
+        if self._collection_name not in all_collection_name:
+            return set()
+
+        existing_ids: set[str] = set()
+        for i in range(0, len(ids), self.FILTER_IDS_BATCH_SIZE):
+            response = self._client.retrieve(
+                collection_name=self._collection_name,
+                ids=ids[i : i + self.FILTER_IDS_BATCH_SIZE],
+                with_payload=False,
+                with_vectors=False,
+            )
+            existing_ids.update(str(point.id) for point in response)
+        return existing_ids
+
     def search_by_vector(self, query_vector: list[float], **kwargs: Any) -> list[Document]:
         from qdrant_client.http import models
 
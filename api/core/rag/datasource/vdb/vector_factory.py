@@ -166,6 +166,9 @@ class Vector:
     def text_exists(self, id: str) -> bool:
         return self._vector_processor.text_exists(id)
 
+    def filter_existing_ids(self, ids: list[str]) -> set[str]:
+        return self._vector_processor.filter_existing_ids(ids)
+
     def delete_by_ids(self, ids: list[str]) -> None:
         self._vector_processor.delete_by_ids(ids)
 
@@ -198,16 +201,12 @@ class Vector:
         return CacheEmbedding(embedding_model)
 
     def _filter_duplicate_texts(self, texts: list[Document]) -> list[Document]:
-        for text in texts.copy():
-            if text.metadata is None:
-                continue
-            doc_id = text.metadata["doc_id"]
-            if doc_id:
-                exists_duplicate_node = self.text_exists(doc_id)
-                if exists_duplicate_node:
-                    texts.remove(text)
-
-        return texts
+        doc_ids = [text.metadata["doc_id"] for text in texts if text.metadata is not None and text.metadata["doc_id"]]
+        existing_ids = self.filter_existing_ids(doc_ids) if doc_ids else set()
+        if not existing_ids:
+            return texts
+
+        return [text for text in texts if text.metadata is None or text.metadata["doc_id"] not in existing_ids]
 
     def __getattr__(self, name):
         if self._vector_processor is not None:
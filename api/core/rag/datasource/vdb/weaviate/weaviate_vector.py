@@ -31,6 +31,9 @@ class WeaviateConfig(BaseModel):
 
 
 class WeaviateVector(BaseVector):
+    # ids looked up per query
+    FILTER_IDS_BATCH_SIZE = 100
+
     def __init__(self, collection_name: str, config: WeaviateConfig, attributes: list):
         super().__init__(collection_name)
         self._client = self._init_client(config)
@@ -164,6 +167,37 @@ class WeaviateVector(BaseVector):
 
         return True
 
+    def filter_existing_ids(self, ids: list[str]) -> set[str]:
+        collection_name = self._collection_name
+        schema = self._default_schema(self._collection_name)
+
+        # check whether the index already exists
+        if not self._client.schema.contains(schema):
+            return set()
+
+        existing_ids: set[str] = set()
+        for i in range(0, len(ids), self.FILTER_IDS_BATCH_SIZE):
+            batch_ids = ids[i : i + self.FILTER_IDS_BATCH_SIZE]
+            result = (
+                self._client.query.get(collection_name, ["doc_id"])
+                .with_where(
+                    {
+                        "operator": "Or",
+                        "operands": [
+                            {"path": ["doc_id"], "operator": "Equal", "valueText": doc_id} for doc_id in batch_ids
+                        ],
+                    }
+                )
+                .with_limit(len(batch_ids))
+                .do()
+            )
+
+            if "errors" in result:
+                raise ValueError(f"Error during query: {result['errors']}")
+
+            existing_ids.update(entry["doc_id"] for entry in result["data"]["Get"][collection_name])
+        return existing_ids
+
     def delete_by_ids(self, ids: list[str]) -> None:
         # check whether the index already exists
         schema = self._default_schema(self._collection_name)
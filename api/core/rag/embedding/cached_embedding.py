@@ -1,9 +1,11 @@
 import base64
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Optional, cast
 
 import numpy as np
-from sqlalchemy.exc import IntegrityError
+from flask import current_app, has_app_context
+from sqlalchemy.dialects.postgresql import insert
 
 from configs import dify_config
 from core.entities.embedding_type import EmbeddingInputType
@@ -11,6 +13,8 @@ from core.model_manager import ModelInstance
 from core.model_runtime.entities.model_entities import ModelPropertyKey
 from core.model_runtime.model_providers.__base.text_embedding_model import TextEmbeddingModel
 from core.rag.embedding.embedding_base import Embeddings
+from core.rag.embedding.embedding_codec import EmbeddingFormat, decode_embedding, encode_embedding, is_encoded_embedding
+from core.rag.embedding.query_embedding_cache import query_embedding_cache
 from extensions.ext_database import db
 from extensions.ext_redis import redis_client
 from libs import helper
@@ -25,26 +29,26 @@ class CacheEmbedding(Embeddings):
         self._user = user
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Embed search docs in batches of 10."""
+        """Embed search docs in batches of MAX_CHUNKS."""
         # use doc embedding cache or store if not exists
         text_embeddings: list[Any] = [None for _ in range(len(texts))]
-        embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = (
-                db.session.query(Embedding)
-                .filter_by(
-                    model_name=self._model_instance.model, hash=hash, provider_name=self._model_instance.provider
-                )
-                .first()
-            )
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
-            else:
-                embedding_queue_indices.append(i)
-        if embedding_queue_indices:
-            embedding_queue_texts = [texts[i] for i in embedding_queue_indices]
-            embedding_queue_embeddings = []
+        hashes = [helper.generate_text_hash(text) for text in texts]
+        try:
+            cached_embeddings = self._get_cached_embeddings(hashes)
+        except Exception as ex:
+            db.session.rollback()
+            logger.exception("Failed to embed documents: %s")
+            raise ex
+
+        # texts missing in cache, the same text is only embedded once
+        embedding_queue_hashes: dict[str, str] = {}
+        for i, hash in enumerate(hashes):
+            if hash in cached_embeddings:
+                text_embeddings[i] = cached_embeddings[hash]
+            elif hash not in embedding_queue_hashes:
+                embedding_queue_hashes[hash] = texts[i]
+
+        if embedding_queue_hashes:
             try:
                 model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
                 model_schema = model_type_instance.get_model_schema(
@@ -55,44 +59,27 @@ class CacheEmbedding(Embeddings):
                     if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties
                     else 1
                 )
-                for i in range(0, len(embedding_queue_texts), max_chunks):
-                    batch_texts = embedding_queue_texts[i : i + max_chunks]
+                embedding_queue_texts = list(embedding_queue_hashes.values())
+                vectors = self._invoke_text_embedding_batches(
+                    [
+                        embedding_queue_texts[i : i + max_chunks]
+                        for i in range(0, len(embedding_queue_texts), max_chunks)
+                    ]
+                )
 
-                    embedding_result = self._model_instance.invoke_text_embedding(
-                        texts=batch_texts, user=self._user, input_type=EmbeddingInputType.DOCUMENT
-                    )
+                new_embeddings: dict[str, list[float]] = {}
+                for hash, normalized_embedding in zip(embedding_queue_hashes, self._normalize(vectors)):
+                    if normalized_embedding is None:
+                        # for issue #11827  float values are not json compliant
+                        logger.warning(f"Normalized embedding is nan for text hash: {hash}")
+                        continue
+                    new_embeddings[hash] = normalized_embedding
 
-                    for vector in embedding_result.embeddings:
-                        try:
-                            # FIXME: type ignore for numpy here
-                            normalized_embedding = (vector / np.linalg.norm(vector)).tolist()  # type: ignore
-                            # stackoverflow best way: https://stackoverflow.com/questions/20319813/how-to-check-list-containing-nan
-                            if np.isnan(normalized_embedding).any():
-                                # for issue #11827  float values are not json compliant
-                                logger.warning(f"Normalized embedding is nan: {normalized_embedding}")
-                                continue
-                            embedding_queue_embeddings.append(normalized_embedding)
-                        except IntegrityError:
-                            db.session.rollback()
-                        except Exception as e:
-                            logging.exception("Failed transform embedding")
-                cache_embeddings = []
-                try:
-                    for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
-                        text_embeddings[i] = n_embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(
-                                model_name=self._model_instance.model,
-                                hash=hash,
-                                provider_name=self._model_instance.provider,
-                            )
-                            embedding_cache.set_embedding(n_embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
+                for i, hash in enumerate(hashes):
+                    if hash in new_embeddings:
+                        text_embeddings[i] = new_embeddings[hash]
+
+                self._add_cached_embeddings(new_embeddings)
             except Exception as ex:
                 db.session.rollback()
                 logger.exception("Failed to embed documents: %s")
@@ -100,43 +87,181 @@ class CacheEmbedding(Embeddings):
 
         return text_embeddings
 
+    def _get_cached_embeddings(self, hashes: list[str]) -> dict[str, list[float]]:
+        """Look up cached document embeddings by text hash, in batches."""
+        unique_hashes = list(dict.fromkeys(hashes))
+        batch_size = dify_config.EMBEDDING_CACHE_QUERY_BATCH_SIZE
+        cached_embeddings = {}
+        for i in range(0, len(unique_hashes), batch_size):
+            embeddings = (
+                db.session.query(Embedding)
+                .filter(
+                    Embedding.model_name == self._model_instance.model,
+                    Embedding.provider_name == self._model_instance.provider,
+                    Embedding.hash.in_(unique_hashes[i : i + batch_size]),
+                )
+                .all()
+            )
+            for embedding in embeddings:
+                cached_embeddings[embedding.hash] = embedding.get_embedding()
+
+        return cached_embeddings
+
+    def _add_cached_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        """Bulk insert document embeddings into cache, embeddings cached concurrently are kept."""
+        rows = []
+        for hash, embedding in embeddings.items():
+            embedding_cache = Embedding(
+                model_name=self._model_instance.model,
+                hash=hash,
+                provider_name=self._model_instance.provider,
+            )
+            embedding_cache.set_embedding(embedding)
+            rows.append(
+                {
+                    "model_name": embedding_cache.model_name,
+                    "hash": embedding_cache.hash,
+                    "provider_name": embedding_cache.provider_name,
+                    "embedding": embedding_cache.embedding,
+                }
+            )
+
+        batch_size = dify_config.EMBEDDING_CACHE_QUERY_BATCH_SIZE
+        for i in range(0, len(rows), batch_size):
+            db.session.execute(
+                insert(Embedding)
+                .values(rows[i : i + batch_size])
+                .on_conflict_do_nothing(index_elements=["model_name", "hash", "provider_name"])
+            )
+        db.session.commit()
+
+    def _invoke_text_embedding_batches(self, batches: list[list[str]]) -> list[list[float]]:
+        """Embed text batches, up to EMBEDDING_MAX_CONCURRENT_BATCHES batches at the same time."""
+        max_workers = min(dify_config.EMBEDDING_MAX_CONCURRENT_BATCHES, len(batches))
+        if max_workers <= 1:
+            return [vector for batch in batches for vector in self._invoke_text_embedding(batch)]
+
+        flask_app = current_app._get_current_object() if has_app_context() else None  # type: ignore
+
+        def invoke(batch_texts: list[str]) -> list[list[float]]:
+            if not flask_app:
+                return self._invoke_text_embedding(batch_texts)
+            with flask_app.app_context():
+                return self._invoke_text_embedding(batch_texts)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return [vector for batch_vectors in executor.map(invoke, batches) for vector in batch_vectors]
+
+    def _invoke_text_embedding(self, batch_texts: list[str]) -> list[list[float]]:
+        embedding_result = self._model_instance.invoke_text_embedding(
+            texts=batch_texts, user=self._user, input_type=EmbeddingInputType.DOCUMENT
+        )
+        return embedding_result.embeddings
+
+    @staticmethod
+    def _normalize(vectors: list[list[float]]) -> list[Optional[list[float]]]:
+        """Normalize vectors as one matrix, vectors that can not be normalized (nan) are None."""
+        if not vectors:
+            return []
+
+        matrix = np.asarray(vectors, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        is_nan = np.isnan(normalized).any(axis=1)
+        return [None if nan else row for row, nan in zip(normalized.tolist(), is_nan.tolist())]
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
-        # use doc embedding cache or store if not exists
-        hash = helper.generate_text_hash(text)
-        embedding_cache_key = f"{self._model_instance.provider}_{self._model_instance.model}_{hash}"
-        embedding = redis_client.get(embedding_cache_key)
-        if embedding:
-            redis_client.expire(embedding_cache_key, 600)
-            decoded_embedding = np.frombuffer(base64.b64decode(embedding), dtype="float")
-            return [float(x) for x in decoded_embedding]
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed query texts, using the in-process cache, then Redis, then the model for missing texts."""
+        provider = self._model_instance.provider
+        model = self._model_instance.model
+        hashes = [helper.generate_text_hash(text) for text in texts]
+        query_embeddings: list[Optional[list[float]]] = [
+            query_embedding_cache.get((provider, model, hash)) for hash in hashes
+        ]
+
+        # hash -> text of texts missing in process, the same text is looked up once
+        missing_texts = {hashes[i]: text for i, text in enumerate(texts) if query_embeddings[i] is None}
+        if not missing_texts:
+            return cast(list[list[float]], query_embeddings)
+
+        embeddings = self._get_redis_query_embeddings(list(missing_texts))
+        embedding_texts = {hash: text for hash, text in missing_texts.items() if hash not in embeddings}
+        if embedding_texts:
+            embeddings.update(self._embed_and_cache_queries(embedding_texts))
+
+        for hash, embedding in embeddings.items():
+            query_embedding_cache.set((provider, model, hash), embedding)
+
+        return [
+            embedding if embedding is not None else embeddings[hash]
+            for hash, embedding in zip(hashes, query_embeddings)
+        ]
+
+    def _get_embedding_cache_key(self, hash: str) -> str:
+        return f"{self._model_instance.provider}_{self._model_instance.model}_{hash}"
+
+    def _get_redis_query_embeddings(self, hashes: list[str]) -> dict[str, list[float]]:
+        """Get query embeddings cached in Redis and refresh their expiry."""
+        embedding_cache_keys = [self._get_embedding_cache_key(hash) for hash in hashes]
+        cached_embeddings = redis_client.mget(embedding_cache_keys)
+
+        embeddings = {}
+        pipeline = redis_client.pipeline(transaction=False)
+        for hash, embedding_cache_key, embedding in zip(hashes, embedding_cache_keys, cached_embeddings):
+            if not embedding:
+                continue
+
+            pipeline.expire(embedding_cache_key, 600)
+            if is_encoded_embedding(embedding):
+                embeddings[hash] = decode_embedding(embedding)
+            else:
+                # base64 float64 embeddings cached before the compact encoding
+                decoded_embedding = np.frombuffer(base64.b64decode(embedding), dtype="float")
+                embeddings[hash] = [float(x) for x in decoded_embedding]
+
+        if embeddings:
+            pipeline.execute()
+
+        return embeddings
+
+    def _embed_and_cache_queries(self, texts: dict[str, str]) -> dict[str, list[float]]:
+        """Embed query texts by hash with the model and cache them in Redis."""
         try:
             embedding_result = self._model_instance.invoke_text_embedding(
-                texts=[text], user=self._user, input_type=EmbeddingInputType.QUERY
+                texts=list(texts.values()), user=self._user, input_type=EmbeddingInputType.QUERY
             )
 
-            embedding_results = embedding_result.embeddings[0]
-            # FIXME: type ignore for numpy here
-            embedding_results = (embedding_results / np.linalg.norm(embedding_results)).tolist()  # type: ignore
-            if np.isnan(embedding_results).any():
+            embedding_results = self._normalize(embedding_result.embeddings)
+            if len(embedding_results) != len(texts) or any(embedding is None for embedding in embedding_results):
                 raise ValueError("Normalized embedding is nan please try again")
         except Exception as ex:
             if dify_config.DEBUG:
-                logging.exception(f"Failed to embed query text '{text[:10]}...({len(text)} chars)'")
+                for text in texts.values():
+                    logging.exception(f"Failed to embed query text '{text[:10]}...({len(text)} chars)'")
             raise ex
 
+        embeddings = dict(zip(texts, cast(list[list[float]], embedding_results)))
         try:
-            # encode embedding to base64
-            embedding_vector = np.array(embedding_results)
-            vector_bytes = embedding_vector.tobytes()
-            # Transform to Base64
-            encoded_vector = base64.b64encode(vector_bytes)
-            # Transform to string
-            encoded_str = encoded_vector.decode("utf-8")
-            redis_client.setex(embedding_cache_key, 600, encoded_str)
+            embedding_format = EmbeddingFormat(dify_config.EMBEDDING_CACHE_STORAGE_FORMAT)
+            pipeline = redis_client.pipeline(transaction=False)
+            for hash, embedding in embeddings.items():
+                if dify_config.EMBEDDING_CACHE_COMPACT_FORMAT_ENABLED:
+                    encoded_embedding: bytes | str = encode_embedding(embedding, embedding_format)
+                else:
+                    # base64 float64, readable by processes running versions before the compact encoding
+                    encoded_embedding = base64.b64encode(np.array(embedding).tobytes()).decode("utf-8")
+                pipeline.setex(self._get_embedding_cache_key(hash), 600, encoded_embedding)
+            pipeline.execute()
         except Exception as ex:
             if dify_config.DEBUG:
-                logging.exception(f"Failed to add embedding to redis for the text '{text[:10]}...({len(text)} chars)'")
+                for text in texts.values():
+                    logging.exception(
+                        f"Failed to add embedding to redis for the text '{text[:10]}...({len(text)} chars)'"
+                    )
             raise ex
 
-        return embedding_results
+        return embeddings
@@ -14,6 +14,10 @@ class Embeddings(ABC):
         """Embed query text."""
         raise NotImplementedError
 
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed query texts."""
+        return [self.embed_query(text) for text in texts]
+
     async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
         """Asynchronous Embed search docs."""
         raise NotImplementedError
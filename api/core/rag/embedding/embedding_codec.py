@@ -0,0 +1,91 @@
+import struct
+from collections.abc import Sequence
+from enum import StrEnum
+from typing import cast
+
+import numpy as np
+
+
+class EmbeddingFormat(StrEnum):
+    """
+    Storage format of encoded embeddings
+    """
+
+    FLOAT32 = "float32"
+    FLOAT16 = "float16"
+    # scalar quantized, stored with per vector offset and scale
+    INT8 = "int8"
+
+
+# magic, version, format code
+_HEADER = struct.Struct("<4sBB")
+# offset, scale of int8 format
+_INT8_PARAMS = struct.Struct("<ff")
+
+MAGIC = b"DEMB"
+VERSION = 1
+
+_FORMAT_CODES = {
+    EmbeddingFormat.FLOAT32: 1,
+    EmbeddingFormat.FLOAT16: 2,
+    EmbeddingFormat.INT8: 3,
+}
+_CODE_FORMATS = {code: embedding_format for embedding_format, code in _FORMAT_CODES.items()}
+
+
+def is_encoded_embedding(data: bytes) -> bool:
+    """
+    Check if data is encoded by `encode_embedding`, legacy formats (pickle, base64 float64) never start with MAGIC
+    """
+    return data[: len(MAGIC)] == MAGIC
+
+
+def encode_embedding(embedding: Sequence[float] | np.ndarray, embedding_format: EmbeddingFormat) -> bytes:
+    """
+    Encode embedding to compact little-endian binary
+
+    :param embedding: embedding vector
+    :param embedding_format: storage format
+    :return: encoded embedding
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    header = _HEADER.pack(MAGIC, VERSION, _FORMAT_CODES[embedding_format])
+
+    if embedding_format == EmbeddingFormat.FLOAT32:
+        return header + vector.astype("<f4").tobytes()
+    elif embedding_format == EmbeddingFormat.FLOAT16:
+        return header + vector.astype("<f2").tobytes()
+
+    offset = float(vector.min()) if vector.size else 0.0
+    scale = (float(vector.max()) - offset) / 255 if vector.size else 0.0
+    if scale == 0:
+        scale = 1.0
+    quantized = np.clip(np.rint((vector - offset) / scale) - 128, -128, 127).astype(np.int8)
+    return header + _INT8_PARAMS.pack(offset, scale) + bytes(quantized.tobytes())
+
+
+def decode_embedding(data: bytes) -> list[float]:
+    """
+    Decode embedding encoded by `encode_embedding`
+
+    :param data: encoded embedding
+    :return: embedding vector
+    """
+    if not is_encoded_embedding(data) or len(data) < _HEADER.size:
+        raise ValueError("Data is not an encoded embedding.")
+
+    _, version, format_code = _HEADER.unpack_from(data)
+    if version != VERSION or format_code not in _CODE_FORMATS:
+        raise ValueError(f"Unsupported embedding encoding, version: {version}, format: {format_code}.")
+
+    embedding_format = _CODE_FORMATS[format_code]
+    if embedding_format == EmbeddingFormat.FLOAT32:
+        vector = np.frombuffer(data, dtype="<f4", offset=_HEADER.size)
+    elif embedding_format == EmbeddingFormat.FLOAT16:
+        vector = np.frombuffer(data, dtype="<f2", offset=_HEADER.size)
+    else:
+        offset, scale = _INT8_PARAMS.unpack_from(data, _HEADER.size)
+        quantized = np.frombuffer(data, dtype=np.int8, offset=_HEADER.size + _INT8_PARAMS.size)
+        vector = (quantized.astype(np.float32) + 128) * scale + offset
+
+    return cast(list[float], vector.astype(np.float64).tolist())
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from configs import dify_config
+
+
+class QueryEmbeddingCache:
+    """
+    Process-local, size bounded LRU cache with TTL of query embeddings,
+    used in front of the Redis query embedding cache.
+    Keys are (provider, model, text hash).
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expires at, embedding)
+        self._cache: OrderedDict[tuple[str, str, str], tuple[float, tuple[float, ...]]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: tuple[str, str, str]) -> Optional[list[float]]:
+        """
+        Get embedding, None if missing or expired
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self._cache[key]
+                self._misses += 1
+                return None
+
+            self._cache.move_to_end(key)
+            self._hits += 1
+
+        return list(item[1])
+
+    def set(self, key: tuple[str, str, str], embedding: list[float]) -> None:
+        """
+        Set embedding, the least recently used embedding is evicted when full
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, tuple(embedding))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def get_metrics(self) -> dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0,
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_size=dify_config.QUERY_EMBEDDING_CACHE_SIZE, ttl=dify_config.QUERY_EMBEDDING_CACHE_TTL
+)
@@ -1,13 +1,47 @@
 """Abstract interface for document loader implementations."""
 
+import logging
+import multiprocessing
+import threading
+from collections import deque
 from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, cast
 
+from configs import dify_config
 from core.rag.extractor.blob.blob import Blob
 from core.rag.extractor.extractor_base import BaseExtractor
+from core.rag.extractor.pdf_page_range_extractor import extract_page_range_texts
 from core.rag.models.document import Document
 from extensions.ext_storage import storage
 
+logger = logging.getLogger(__name__)
+
+# processes parsing page ranges of large PDF files, shared by all extractors of the process
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawned processes do not inherit the threads and locks of the forking process
+            _process_pool = ProcessPoolExecutor(
+                max_workers=dify_config.PDF_EXTRACT_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+def _reset_process_pool(process_pool: ProcessPoolExecutor) -> None:
+    """Drop a broken process pool, the next parallel parsing starts a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is process_pool:
+            _process_pool = None
+    process_pool.shutdown(wait=False, cancel_futures=True)
+
 
 class PdfExtractor(BaseExtractor):
     """Load pdf files.
@@ -23,22 +57,18 @@ class PdfExtractor(BaseExtractor):
         self._file_cache_key = file_cache_key
 
     def extract(self) -> list[Document]:
-        plaintext_file_exists = False
         if self._file_cache_key:
             try:
                 text = cast(bytes, storage.load(self._file_cache_key)).decode("utf-8")
-                plaintext_file_exists = True
                 return [Document(page_content=text)]
             except FileNotFoundError:
                 pass
+
         documents = list(self.load())
-        text_list = []
-        for document in documents:
-            text_list.append(document.page_content)
-        text = "\n\n".join(text_list)
 
         # save plaintext file for caching
-        if not plaintext_file_exists and self._file_cache_key:
+        if self._file_cache_key:
+            text = "\n\n".join(document.page_content for document in documents)
             storage.save(self._file_cache_key, text.encode("utf-8"))
 
         return documents
@@ -57,12 +87,70 @@ class PdfExtractor(BaseExtractor):
         with blob.as_bytes_io() as file_path:
             pdf_reader = pypdfium2.PdfDocument(file_path, autoclose=True)
             try:
-                for page_number, page in enumerate(pdf_reader):
-                    text_page = page.get_textpage()
-                    content = text_page.get_text_range()
-                    text_page.close()
-                    page.close()
-                    metadata = {"source": blob.source, "page": page_number}
-                    yield Document(page_content=content, metadata=metadata)
+                page_count = len(pdf_reader)
+                if not self._should_parse_in_parallel(blob, page_count):
+                    for page_number, page in enumerate(pdf_reader):
+                        text_page = page.get_textpage()
+                        content = text_page.get_text_range()
+                        text_page.close()
+                        page.close()
+                        metadata = {"source": blob.source, "page": page_number}
+                        yield Document(page_content=content, metadata=metadata)
+                    return
             finally:
                 pdf_reader.close()
+
+        yield from self._parse_in_parallel(blob, page_count)
+
+    @staticmethod
+    def _should_parse_in_parallel(blob: Blob, page_count: int) -> bool:
+        if dify_config.PDF_EXTRACT_PROCESSES <= 1 or page_count <= dify_config.PDF_EXTRACT_PAGE_RANGE_SIZE:
+            return False
+        if blob.path is None:
+            # workers open the document by path
+            return False
+        if multiprocessing.current_process().daemon:
+            # daemonic processes, such as prefork celery workers, are not allowed to have children
+            return False
+        return True
+
+    @staticmethod
+    def _parse_in_parallel(blob: Blob, page_count: int) -> Iterator[Document]:
+        """
+        Parse page ranges in the process pool and yield the pages in order,
+        up to PDF_EXTRACT_MAX_PENDING_PAGE_RANGES page ranges are parsed ahead of the pages yielded.
+        If the pool breaks, e.g. a worker process crashed, the remaining pages are parsed serially.
+        """
+        process_pool = _get_process_pool()
+        range_size = dify_config.PDF_EXTRACT_PAGE_RANGE_SIZE
+        page_ranges = deque((start, min(start + range_size, page_count)) for start in range(0, page_count, range_size))
+        pending_futures: deque[tuple[int, Future]] = deque()
+        next_page_number = 0
+        try:
+            while page_ranges or pending_futures:
+                while page_ranges and len(pending_futures) < dify_config.PDF_EXTRACT_MAX_PENDING_PAGE_RANGES:
+                    start, stop = page_ranges.popleft()
+                    future = process_pool.submit(extract_page_range_texts, str(blob.path), start, stop)
+                    pending_futures.append((start, future))
+
+                start, future = pending_futures.popleft()
+                texts = future.result()
+                for page_number, content in enumerate(texts, start=start):
+                    metadata = {"source": blob.source, "page": page_number}
+                    yield Document(page_content=content, metadata=metadata)
+                next_page_number = start + len(texts)
+            return
+        except BrokenProcessPool:
+            logger.warning(
+                "PDF parsing processes broke, parsing the remaining pages of %s serially", blob.source, exc_info=True
+            )
+            _reset_process_pool(process_pool)
+        finally:
+            for _, future in pending_futures:
+                future.cancel()
+
+        for start in range(next_page_number, page_count, range_size):
+            texts = extract_page_range_texts(str(blob.path), start, min(start + range_size, page_count))
+            for page_number, content in enumerate(texts, start=start):
+                metadata = {"source": blob.source, "page": page_number}
+                yield Document(page_content=content, metadata=metadata)
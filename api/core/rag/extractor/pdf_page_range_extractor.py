@@ -0,0 +1,24 @@
+"""
+Extract the texts of page ranges of PDF files, run in the processes parsing large PDF files in parallel.
+pypdfium2 is not thread safe, so each process opens the document itself.
+"""
+
+
+def extract_page_range_texts(file_path: str, start: int, stop: int) -> list[str]:
+    """
+    Extract the texts of the pages [start, stop) of a PDF file
+    """
+    import pypdfium2  # type: ignore
+
+    pdf_reader = pypdfium2.PdfDocument(file_path, autoclose=True)
+    try:
+        texts = []
+        for page_number in range(start, stop):
+            page = pdf_reader[page_number]
+            text_page = page.get_textpage()
+            texts.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+        return texts
+    finally:
+        pdf_reader.close()
@@ -1,3 +1,4 @@
+import logging
 import math
 import threading
 from collections import Counter
@@ -20,6 +21,7 @@ from core.ops.utils import measure_time
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.entities.context_entities import DocumentContext
 from core.rag.models.document import Document
 from core.rag.rerank.rerank_type import RerankMode
@@ -34,6 +36,8 @@ from models.dataset import Dataset, DatasetQuery, DocumentSegment
 from models.dataset import Document as DatasetDocument
 from services.external_knowledge_service import ExternalDatasetService
 
+logger = logging.getLogger(__name__)
+
 default_retrieval_model: dict[str, Any] = {
     "search_method": RetrievalMethod.SEMANTIC_SEARCH.value,
     "reranking_enable": False,
@@ -385,6 +389,8 @@ class DatasetRetrieval:
                     ].embedding_model_provider
                     weights["vector_setting"]["embedding_model_name"] = available_datasets[0].embedding_model
 
+        self._embed_query_per_embedding_model(tenant_id, available_datasets, query)
+
         for dataset in available_datasets:
             index_type = dataset.indexing_technique
             retrieval_thread = threading.Thread(
@@ -475,6 +481,42 @@ class DatasetRetrieval:
             db.session.add_all(dataset_queries)
         db.session.commit()
 
+    def _embed_query_per_embedding_model(self, tenant_id: str, available_datasets: list, query: str) -> None:
+        """
+        Embed the query once per embedding model shared by several datasets searched by vector,
+        so the retriever threads of datasets sharing an embedding model hit the query embedding cache
+        instead of embedding the same query concurrently.
+        """
+        embedding_models = Counter(
+            (dataset.embedding_model_provider, dataset.embedding_model)
+            for dataset in available_datasets
+            if dataset.provider != "external"
+            and dataset.indexing_technique == "high_quality"
+            and RetrievalMethod.is_support_semantic_search(
+                (dataset.retrieval_model or default_retrieval_model)["search_method"]
+            )
+        )
+
+        model_manager = ModelManager()
+        for (embedding_model_provider, embedding_model), dataset_count in embedding_models.items():
+            # a query embedded for a single dataset is embedded once anyway
+            if dataset_count < 2:
+                continue
+
+            try:
+                model_instance = model_manager.get_model_instance(
+                    tenant_id=tenant_id,
+                    provider=embedding_model_provider,
+                    model_type=ModelType.TEXT_EMBEDDING,
+                    model=embedding_model,
+                )
+                CacheEmbedding(model_instance).embed_queries([query])
+            except Exception:
+                # the retriever threads embed the query themselves
+                logger.warning(
+                    f"Failed to embed query with {embedding_model_provider}/{embedding_model}", exc_info=True
+                )
+
     def _retriever(self, flask_app: Flask, dataset_id: str, query: str, top_k: int, all_documents: list):
         with flask_app.app_context():
             dataset = db.session.query(Dataset).filter(Dataset.id == dataset_id).first()
@@ -95,9 +95,7 @@ class ToolFileManager:
     ) -> ToolFile:
         # try to download image
         try:
-            response = ssrf_proxy.get(file_url)
-            response.raise_for_status()
-            blob = response.content
+            blob = ssrf_proxy.download(file_url)
         except httpx.TimeoutException as e:
             raise ValueError(f"timeout when downloading file from {file_url}")
 
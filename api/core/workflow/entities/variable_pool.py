@@ -1,9 +1,9 @@
 import re
 from collections import defaultdict
 from collections.abc import Mapping, Sequence
-from typing import Any, Union
+from typing import Any, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from core.file import File, FileAttribute, file_manager
 from core.variables import Segment, SegmentGroup, Variable
@@ -44,6 +44,13 @@ class VariablePool(BaseModel):
         default_factory=list,
     )
 
+    # Copy-on-write overlay support: an overlay pool only holds its own writes and falls back to the
+    # read-only parent pool for everything else. Removals in an overlay are recorded as masks so that
+    # they hide the parent's variables without touching the parent.
+    _parent: Optional["VariablePool"] = PrivateAttr(default=None)
+    _masked_node_ids: set[str] = PrivateAttr(default_factory=set)
+    _masked_keys: set[tuple[str, int]] = PrivateAttr(default_factory=set)
+
     def __init__(
         self,
         *,
@@ -105,6 +112,8 @@ class VariablePool(BaseModel):
 
         hash_key = hash(tuple(selector[1:]))
         self.variable_dictionary[selector[0]][hash_key] = variable
+        if self._parent is not None:
+            self._masked_keys.discard((selector[0], hash_key))
 
     def get(self, selector: Sequence[str], /) -> Segment | None:
         """
@@ -123,7 +132,7 @@ class VariablePool(BaseModel):
             return None
 
         hash_key = hash(tuple(selector[1:]))
-        value = self.variable_dictionary[selector[0]].get(hash_key)
+        value = self._get_segment(selector[0], hash_key)
 
         if value is None:
             selector, attr = selector[:-1], selector[-1]
@@ -153,9 +162,76 @@ class VariablePool(BaseModel):
             return
         if len(selector) == 1:
             self.variable_dictionary[selector[0]] = {}
+            if self._parent is not None:
+                self._masked_node_ids.add(selector[0])
             return
-        hash_key = hash(tuple(selector[1:]))
-        self.variable_dictionary[selector[0]].pop(hash_key, None)
+        self._remove_segment(selector[0], hash(tuple(selector[1:])))
+
+    def create_overlay(self) -> "VariablePool":
+        """
+        Create a copy-on-write overlay on top of this pool.
+
+        The overlay shares this pool as a read-only parent instead of copying it: reads fall back to the
+        parent, while adds and removes only affect the overlay. The parent must not be mutated through
+        the overlay, and the overlay can be merged back with `merge_overlay`.
+
+        Returns:
+            VariablePool: The overlay pool.
+        """
+        overlay = VariablePool.model_construct(
+            variable_dictionary=defaultdict(dict),
+            user_inputs=self.user_inputs,
+            system_variables=self.system_variables,
+            environment_variables=self.environment_variables,
+            conversation_variables=self.conversation_variables,
+        )
+        overlay._parent = self
+        return overlay
+
+    def merge_overlay(self, overlay: "VariablePool", /, *, exclude_node_ids: Sequence[str] = ()) -> None:
+        """
+        Merge the writes and removals of an overlay created by `create_overlay` back into this pool.
+
+        Args:
+            overlay (VariablePool): The overlay pool, its parent must be this pool.
+            exclude_node_ids (Sequence[str]): Node ids whose variables are private to the overlay.
+
+        Raises:
+            ValueError: If the overlay was not created from this pool.
+
+        Returns:
+            None
+        """
+        if overlay._parent is not self:
+            raise ValueError("Variable pool overlay does not belong to this pool")
+
+        # removals go through this pool's own remove, so they are masked when it is an overlay too
+        for node_id in overlay._masked_node_ids:
+            if node_id not in exclude_node_ids:
+                self.remove((node_id,))
+        for node_id, hash_key in overlay._masked_keys:
+            if node_id not in exclude_node_ids:
+                self._remove_segment(node_id, hash_key)
+        for node_id, variables in overlay.variable_dictionary.items():
+            if node_id not in exclude_node_ids:
+                self.variable_dictionary[node_id].update(variables)
+
+    def _remove_segment(self, node_id: str, hash_key: int) -> None:
+        self.variable_dictionary[node_id].pop(hash_key, None)
+        if self._parent is not None:
+            self._masked_keys.add((node_id, hash_key))
+
+    def _get_segment(self, node_id: str, hash_key: int) -> Segment | None:
+        if self._parent is None:
+            return self.variable_dictionary[node_id].get(hash_key)
+
+        # never create entries on reads in an overlay, it is shared with the parent's readers
+        variables = self.variable_dictionary.get(node_id)
+        if variables is not None and hash_key in variables:
+            return variables[hash_key]
+        if node_id in self._masked_node_ids or (node_id, hash_key) in self._masked_keys:
+            return None
+        return self._parent._get_segment(node_id, hash_key)
 
     def convert_template(self, template: str, /):
         parts = VARIABLE_PATTERN.split(template)
@@ -1,13 +1,16 @@
 from typing import Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
+from core.helper.code_executor.code_execution_prefetcher import CodeExecutionPrefetcher
 from core.model_runtime.entities.llm_entities import LLMUsage
 from core.workflow.entities.variable_pool import VariablePool
 from core.workflow.graph_engine.entities.runtime_route_state import RuntimeRouteState
 
 
 class GraphRuntimeState(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     variable_pool: VariablePool = Field(..., description="variable pool")
     """variable pool"""
 
@@ -25,3 +28,6 @@ class GraphRuntimeState(BaseModel):
 
     node_run_state: RuntimeRouteState = RuntimeRouteState()
     """node run state"""
+
+    code_execution_prefetchers: dict[str, CodeExecutionPrefetcher] = Field(default_factory=dict, exclude=True)
+    """prefetched executions of the code nodes of an iteration run (code node id: prefetcher)"""
@@ -0,0 +1,149 @@
+import logging
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional, cast
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from configs import dify_config
+from core.helper.lru_cache import LRUCache
+from core.workflow.graph_engine.entities.graph import Graph, GraphEdge
+from core.workflow.nodes import NodeType
+from core.workflow.nodes.base import BaseNode
+from core.workflow.nodes.base.entities import BaseNodeData
+from core.workflow.nodes.node_mapping import NODE_TYPE_CLASSES_MAPPING
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledNode(BaseModel):
+    """
+    Node config resolved to its node class and validated node data
+    """
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    node_id: str = Field(..., description="node id")
+    node_type: NodeType = Field(..., description="node type")
+    node_cls: type[BaseNode] = Field(..., description="node class resolved from NODE_TYPE_CLASSES_MAPPING")
+    node_data: BaseNodeData = Field(..., description="validated node data, never handed out without a copy")
+
+    def create_node_data(self) -> BaseNodeData:
+        """
+        Create a private copy of node data for a node instance,
+        nodes are allowed to mutate their node data while running.
+        """
+        return self.node_data.model_copy(deep=True)
+
+
+class ExecutionPlan(BaseModel):
+    """
+    Compiled, read-only execution plan of a workflow graph
+    """
+
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    graph: Graph = Field(..., description="graph")
+    nodes: Mapping[str, CompiledNode] = Field(
+        default_factory=dict, description="compiled nodes mapping (node id: compiled node)"
+    )
+    condition_edge_mappings: Mapping[str, Mapping[str, list[GraphEdge]]] = Field(
+        default_factory=dict,
+        description="branch table (source node id: (run condition hash: edges)), only for nodes with run conditions",
+    )
+
+    @classmethod
+    def compile(cls, graph_config: Mapping[str, Any], root_node_id: Optional[str] = None) -> "ExecutionPlan":
+        """
+        Compile graph config into an execution plan
+
+        :param graph_config: graph config
+        :param root_node_id: root node id
+        :return: execution plan
+        """
+        graph = Graph.init(graph_config=graph_config, root_node_id=root_node_id)
+        return cls.from_graph(graph)
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> "ExecutionPlan":
+        """
+        Compile an initialized graph into an execution plan
+
+        :param graph: graph
+        :return: execution plan
+        """
+        nodes: dict[str, CompiledNode] = {}
+        for node_id, node_config in graph.node_id_config_mapping.items():
+            compiled_node = cls._compile_node(node_id=node_id, node_config=node_config)
+            if compiled_node:
+                nodes[node_id] = compiled_node
+
+        condition_edge_mappings: dict[str, dict[str, list[GraphEdge]]] = {}
+        for source_node_id, edges in graph.edge_mapping.items():
+            if len(edges) <= 1 or not any(edge.run_condition for edge in edges):
+                continue
+
+            branch_table: dict[str, list[GraphEdge]] = {}
+            for edge in edges:
+                if edge.run_condition:
+                    branch_table.setdefault(edge.run_condition.hash, []).append(edge)
+
+            condition_edge_mappings[source_node_id] = branch_table
+
+        return cls(graph=graph, nodes=nodes, condition_edge_mappings=condition_edge_mappings)
+
+    @classmethod
+    def _compile_node(cls, node_id: str, node_config: Mapping[str, Any]) -> Optional[CompiledNode]:
+        """
+        Compile a single node, invalid nodes are left to fail at run time like before
+        """
+        node_data_config = node_config.get("data", {})
+        try:
+            node_type = NodeType(node_data_config.get("type"))
+            node_version = node_data_config.get("version", "1")
+            node_cls = NODE_TYPE_CLASSES_MAPPING[node_type][node_version]
+            node_data = node_cls._node_data_cls.model_validate(node_data_config)
+        except Exception:
+            logger.debug(f"Node {node_id} can not be compiled, fallback to run time parsing", exc_info=True)
+            return None
+
+        return CompiledNode(node_id=node_id, node_type=node_type, node_cls=node_cls, node_data=node_data)
+
+
+class ExecutionPlanCache:
+    """
+    Process-wide LRU cache of compiled execution plans
+    """
+
+    _cache = LRUCache(capacity=dify_config.WORKFLOW_EXECUTION_PLAN_CACHE_SIZE)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_or_compile(
+        cls, cache_key: str, graph_config: Mapping[str, Any], root_node_id: Optional[str] = None
+    ) -> ExecutionPlan:
+        """
+        Get the execution plan from cache, compile and cache it if missing
+
+        :param cache_key: cache key, e.g. workflow unique hash, must change whenever graph config changes
+        :param graph_config: graph config
+        :param root_node_id: root node id
+        :return: execution plan
+        """
+        key = f"{cache_key}:{root_node_id or ''}"
+        with cls._lock:
+            execution_plan = cast(Optional[ExecutionPlan], cls._cache.get(key))
+
+        if execution_plan is not None:
+            return execution_plan
+
+        execution_plan = ExecutionPlan.compile(graph_config=graph_config, root_node_id=root_node_id)
+        with cls._lock:
+            cls._cache.put(key, execution_plan)
+
+        return execution_plan
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.cache.clear()
@@ -1,18 +1,17 @@
 import logging
-import queue
 import time
 import uuid
 from collections.abc import Generator, Mapping
-from concurrent.futures import ThreadPoolExecutor, wait
-from copy import copy, deepcopy
+from concurrent.futures import wait
+from copy import copy
 from datetime import UTC, datetime
 from typing import Any, Optional, cast
 
 from flask import Flask, current_app
 
-from configs import dify_config
 from core.app.apps.base_app_queue_manager import GenerateTaskStoppedError
 from core.app.entities.app_invoke_entities import InvokeFrom
+from core.helper.event_channel import EventChannel
 from core.workflow.entities.node_entities import NodeRunMetadataKey, NodeRunResult
 from core.workflow.entities.variable_pool import VariablePool, VariableValue
 from core.workflow.graph_engine.condition_handlers.condition_manager import ConditionManager
@@ -38,6 +37,8 @@ from core.workflow.graph_engine.entities.graph import Graph, GraphEdge
 from core.workflow.graph_engine.entities.graph_init_params import GraphInitParams
 from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
 from core.workflow.graph_engine.entities.runtime_route_state import RouteNodeState
+from core.workflow.graph_engine.execution_plan import ExecutionPlan
+from core.workflow.graph_engine.scheduler import graph_engine_scheduler
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.answer.answer_stream_processor import AnswerStreamProcessor
 from core.workflow.nodes.answer.base_stream_processor import StreamProcessor
@@ -54,36 +55,7 @@ from models.workflow import WorkflowNodeExecutionStatus, WorkflowType
 logger = logging.getLogger(__name__)
 
 
-class GraphEngineThreadPool(ThreadPoolExecutor):
-    def __init__(
-        self,
-        max_workers=None,
-        thread_name_prefix="",
-        initializer=None,
-        initargs=(),
-        max_submit_count=dify_config.MAX_SUBMIT_COUNT,
-    ) -> None:
-        super().__init__(max_workers, thread_name_prefix, initializer, initargs)
-        self.max_submit_count = max_submit_count
-        self.submit_count = 0
-
-    def submit(self, fn, /, *args, **kwargs):
-        self.submit_count += 1
-        self.check_is_full()
-
-        return super().submit(fn, *args, **kwargs)
-
-    def task_done_callback(self, future):
-        self.submit_count -= 1
-
-    def check_is_full(self) -> None:
-        if self.submit_count > self.max_submit_count:
-            raise ValueError(f"Max submit count {self.max_submit_count} of workflow thread pool reached.")
-
-
 class GraphEngine:
-    workflow_thread_pool_mapping: dict[str, GraphEngineThreadPool] = {}
-
     def __init__(
         self,
         tenant_id: str,
@@ -100,27 +72,14 @@ class GraphEngine:
         max_execution_steps: int,
         max_execution_time: int,
         thread_pool_id: Optional[str] = None,
+        execution_plan: Optional[ExecutionPlan] = None,
     ) -> None:
-        thread_pool_max_submit_count = dify_config.MAX_SUBMIT_COUNT
-        thread_pool_max_workers = 10
-
-        # init thread pool
-        if thread_pool_id:
-            if thread_pool_id not in GraphEngine.workflow_thread_pool_mapping:
-                raise ValueError(f"Max submit count {thread_pool_max_submit_count} of workflow thread pool reached.")
-
-            self.thread_pool_id = thread_pool_id
-            self.thread_pool = GraphEngine.workflow_thread_pool_mapping[thread_pool_id]
-            self.is_main_thread_pool = False
-        else:
-            self.thread_pool = GraphEngineThreadPool(
-                max_workers=thread_pool_max_workers, max_submit_count=thread_pool_max_submit_count
-            )
-            self.thread_pool_id = str(uuid.uuid4())
-            self.is_main_thread_pool = True
-            GraphEngine.workflow_thread_pool_mapping[self.thread_pool_id] = self.thread_pool
+        # parallel branches of the run, including nested workflow runs sharing the thread pool id,
+        # are scheduled as one run in the shared scheduler
+        self.thread_pool_id = thread_pool_id or str(uuid.uuid4())
 
         self.graph = graph
+        self.execution_plan = execution_plan
         self.init_params = GraphInitParams(
             tenant_id=tenant_id,
             app_id=app_id,
@@ -201,21 +160,14 @@ class GraphEngine:
             else:
                 # trigger graph run success event
                 yield GraphRunSucceededEvent(outputs=self.graph_runtime_state.outputs)
-            self._release_thread()
         except GraphRunFailedError as e:
             yield GraphRunFailedEvent(error=e.error, exceptions_count=len(handle_exceptions))
-            self._release_thread()
             return
         except Exception as e:
             logger.exception("Unknown Error when graph running")
             yield GraphRunFailedEvent(error=str(e), exceptions_count=len(handle_exceptions))
-            self._release_thread()
             raise e
 
-    def _release_thread(self):
-        if self.is_main_thread_pool and self.thread_pool_id in GraphEngine.workflow_thread_pool_mapping:
-            del GraphEngine.workflow_thread_pool_mapping[self.thread_pool_id]
-
     def _run(
         self,
         start_node_id: str,
@@ -250,10 +202,17 @@ class GraphEngine:
             if not node_config:
                 raise GraphRunFailedError(f"Node {node_id} config not found.")
 
-            # convert to specific node
-            node_type = NodeType(node_config.get("data", {}).get("type"))
-            node_version = node_config.get("data", {}).get("version", "1")
-            node_cls = NODE_TYPE_CLASSES_MAPPING[node_type][node_version]
+            # convert to specific node, use the compiled node if the execution plan has one
+            compiled_node = self.execution_plan.nodes.get(node_id) if self.execution_plan else None
+            node_data: Optional[BaseNodeData] = None
+            if compiled_node:
+                node_type = compiled_node.node_type
+                node_cls = compiled_node.node_cls
+                node_data = compiled_node.create_node_data()
+            else:
+                node_type = NodeType(node_config.get("data", {}).get("type"))
+                node_version = node_config.get("data", {}).get("version", "1")
+                node_cls = NODE_TYPE_CLASSES_MAPPING[node_type][node_version]
 
             previous_node_id = previous_route_node_state.node_id if previous_route_node_state else None
 
@@ -266,6 +225,7 @@ class GraphEngine:
                 graph_runtime_state=self.graph_runtime_state,
                 previous_node_id=previous_node_id,
                 thread_pool_id=self.thread_pool_id,
+                node_data=node_data,
             )
             node_instance = cast(BaseNode[BaseNodeData], node_instance)
             try:
@@ -312,10 +272,7 @@ class GraphEngine:
                 raise e
 
             # It may not be necessary, but it is necessary. :)
-            if (
-                self.graph.node_id_config_mapping[next_node_id].get("data", {}).get("type", "").lower()
-                == NodeType.END.value
-            ):
+            if node_type == NodeType.END:
                 break
 
             previous_route_node_state = route_node_state
@@ -352,14 +309,9 @@ class GraphEngine:
 
                 if any(edge.run_condition for edge in edge_mappings):
                     # if nodes has run conditions, get node id which branch to take based on the run condition results
-                    condition_edge_mappings: dict[str, list[GraphEdge]] = {}
-                    for edge in edge_mappings:
-                        if edge.run_condition:
-                            run_condition_hash = edge.run_condition.hash
-                            if run_condition_hash not in condition_edge_mappings:
-                                condition_edge_mappings[run_condition_hash] = []
-
-                            condition_edge_mappings[run_condition_hash].append(edge)
+                    condition_edge_mappings = self._get_condition_edge_mappings(
+                        node_id=next_node_id, edge_mappings=edge_mappings
+                    )
 
                     for _, sub_edge_mappings in condition_edge_mappings.items():
                         if len(sub_edge_mappings) == 0:
@@ -432,6 +384,29 @@ class GraphEngine:
             if in_parallel_id and self.graph.node_parallel_mapping.get(next_node_id, "") != in_parallel_id:
                 break
 
+    def _get_condition_edge_mappings(
+        self, node_id: str, edge_mappings: list[GraphEdge]
+    ) -> Mapping[str, list[GraphEdge]]:
+        """
+        Get edges grouped by run condition hash, from the execution plan branch table if compiled
+        :param node_id: source node id
+        :param edge_mappings: edges of the source node
+        :return: condition edge mappings (run condition hash: edges)
+        """
+        if self.execution_plan and node_id in self.execution_plan.condition_edge_mappings:
+            return self.execution_plan.condition_edge_mappings[node_id]
+
+        condition_edge_mappings: dict[str, list[GraphEdge]] = {}
+        for edge in edge_mappings:
+            if edge.run_condition:
+                run_condition_hash = edge.run_condition.hash
+                if run_condition_hash not in condition_edge_mappings:
+                    condition_edge_mappings[run_condition_hash] = []
+
+                condition_edge_mappings[run_condition_hash].append(edge)
+
+        return condition_edge_mappings
+
     def _run_parallel_branches(
         self,
         edge_mappings: list[GraphEdge],
@@ -458,8 +433,9 @@ class GraphEngine:
         if not parallel:
             raise GraphRunFailedError(f"Parallel {parallel_id} not found.")
 
-        # run parallel nodes, run in new thread and use queue to get results
-        q: queue.Queue = queue.Queue()
+        # run parallel nodes, run in new thread and use channel to get results,
+        # the channel is closed once every branch is done
+        q: EventChannel[GraphEngineEvent] = EventChannel(block_context=graph_engine_scheduler.managed_block)
 
         # Create a list to store the threads
         futures = []
@@ -472,7 +448,9 @@ class GraphEngine:
             ):
                 continue
 
-            future = self.thread_pool.submit(
+            future = graph_engine_scheduler.submit(
+                self.init_params.tenant_id,
+                self.thread_pool_id,
                 self._run_parallel_node,
                 **{
                     "flask_app": current_app._get_current_object(),  # type: ignore[attr-defined]
@@ -485,32 +463,20 @@ class GraphEngine:
                 },
             )
 
-            future.add_done_callback(self.thread_pool.task_done_callback)
-
+            q.watch(future)
             futures.append(future)
 
-        succeeded_count = 0
-        while True:
-            try:
-                event = q.get(timeout=1)
-                if event is None:
-                    break
-
+        try:
+            for event in q:
                 yield event
-                if event.parallel_id == parallel_id:
-                    if isinstance(event, ParallelBranchRunSucceededEvent):
-                        succeeded_count += 1
-                        if succeeded_count == len(futures):
-                            q.put(None)
-
-                        continue
-                    elif isinstance(event, ParallelBranchRunFailedEvent):
-                        raise GraphRunFailedError(event.error)
-            except queue.Empty:
-                continue
+                if isinstance(event, ParallelBranchRunFailedEvent) and event.parallel_id == parallel_id:
+                    raise GraphRunFailedError(event.error)
+        finally:
+            q.close()
 
         # wait all threads
-        wait(futures)
+        with graph_engine_scheduler.managed_block():
+            wait(futures)
 
         # get final node id
         final_node_id = parallel.end_to_node_id
@@ -520,7 +486,7 @@ class GraphEngine:
     def _run_parallel_node(
         self,
         flask_app: Flask,
-        q: queue.Queue,
+        q: EventChannel[GraphEngineEvent],
         parallel_id: str,
         parallel_start_node_id: str,
         parent_parallel_id: Optional[str] = None,
@@ -848,11 +814,11 @@ class GraphEngine:
     def create_copy(self):
         """
         create a graph engine copy
-        :return: with a new variable pool instance of graph engine
+        :return: with a copy-on-write overlay of the variable pool of graph engine
         """
         new_instance = copy(self)
         new_instance.graph_runtime_state = copy(self.graph_runtime_state)
-        new_instance.graph_runtime_state.variable_pool = deepcopy(self.graph_runtime_state.variable_pool)
+        new_instance.graph_runtime_state.variable_pool = self.graph_runtime_state.variable_pool.create_overlay()
         return new_instance
 
     def _handle_continue_on_error(
@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Generator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any
+
+from configs import dify_config
+
+logger = logging.getLogger(__name__)
+
+
+class _ScheduledTask:
+    __slots__ = ("future", "fn", "args", "kwargs", "tenant_id", "run_id", "submitted_at")
+
+    def __init__(self, future: Future, fn: Callable, args: tuple, kwargs: dict, tenant_id: str, run_id: str):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.tenant_id = tenant_id
+        self.run_id = run_id
+        self.submitted_at = time.perf_counter()
+
+
+class GraphEngineScheduler:
+    """
+    Process-wide bounded worker scheduler shared by graph parallel branches and parallel iterations.
+
+    Tasks are queued per tenant and per run, and idle workers take them round-robin across tenants
+    first and then across the runs of a tenant, so a single busy run or tenant can not starve others.
+
+    Submitting to a run that already has `max_queued_per_run` queued tasks blocks the caller until
+    the queue drains (back-pressure) instead of failing the run.
+
+    Workers waiting for their own sub tasks (nested parallel branches, iterations) must do so inside
+    `managed_block`, the scheduler then starts a compensation worker if needed so that nested waits
+    can not exhaust the pool and deadlock. Once compensation workers are exhausted too, a worker is still
+    started past the limit whenever every worker is blocked, so queued tasks always make progress.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queued_per_run: int,
+        max_compensation_workers: int,
+        worker_idle_timeout: float,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queued_per_run = max_queued_per_run
+        self.max_compensation_workers = max_compensation_workers
+        self.worker_idle_timeout = worker_idle_timeout
+
+        self._lock = threading.Lock()
+        self._task_available = threading.Condition(self._lock)
+        self._queue_space_available = threading.Condition(self._lock)
+        # tenant id -> run id -> queued tasks, both levels are rotated for round-robin
+        self._queues: OrderedDict[str, OrderedDict[str, deque[_ScheduledTask]]] = OrderedDict()
+        self._queued_per_run: dict[str, int] = {}
+        self._worker_thread_ids: set[int] = set()
+        self._worker_count = 0
+        self._idle_workers = 0
+        self._blocked_workers = 0
+        self._running_tasks = 0
+        self._worker_seq = 0
+
+        # metrics
+        self._queued_tasks = 0
+        self._submitted_total = 0
+        self._completed_total = 0
+        self._backpressure_waits_total = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def submit(self, tenant_id: str, run_id: str, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        """
+        Submit a task
+
+        :param tenant_id: tenant id, used for fairness between tenants
+        :param run_id: workflow run (thread pool) id, used for fairness and back-pressure between runs
+        :param fn: callable
+        :return: future of the task
+        """
+        future: Future = Future()
+        task = _ScheduledTask(future=future, fn=fn, args=args, kwargs=kwargs, tenant_id=tenant_id, run_id=run_id)
+
+        with self._lock:
+            if self._queued_per_run.get(run_id, 0) >= self.max_queued_per_run:
+                self._backpressure_waits_total += 1
+                with self._managed_block_locked():
+                    while self._queued_per_run.get(run_id, 0) >= self.max_queued_per_run:
+                        self._queue_space_available.wait()
+
+            tenant_queues = self._queues.setdefault(tenant_id, OrderedDict())
+            tenant_queues.setdefault(run_id, deque()).append(task)
+            self._queued_per_run[run_id] = self._queued_per_run.get(run_id, 0) + 1
+            self._queued_tasks += 1
+            self._submitted_total += 1
+
+            self._adjust_workers_locked()
+            self._task_available.notify()
+
+        return future
+
+    @contextmanager
+    def managed_block(self) -> Generator[None, None, None]:
+        """
+        Mark the current worker as blocked while waiting on other scheduled tasks,
+        no-op if the current thread is not a scheduler worker
+        """
+        with self._lock:
+            with self._managed_block_locked():
+                self._lock.release()
+                try:
+                    yield
+                finally:
+                    self._lock.acquire()
+
+    def get_metrics(self) -> dict[str, Any]:
+        """
+        Get scheduler metrics
+        """
+        with self._lock:
+            started_total = self._submitted_total - self._queued_tasks
+            return {
+                "max_workers": self.max_workers,
+                "workers": self._worker_count,
+                "idle_workers": self._idle_workers,
+                "blocked_workers": self._blocked_workers,
+                "running_tasks": self._running_tasks,
+                "queue_depth": self._queued_tasks,
+                "queue_depth_by_tenant": {
+                    tenant_id: sum(len(tasks) for tasks in tenant_queues.values())
+                    for tenant_id, tenant_queues in self._queues.items()
+                },
+                "submitted_total": self._submitted_total,
+                "completed_total": self._completed_total,
+                "backpressure_waits_total": self._backpressure_waits_total,
+                "wait_time_avg_ms": round(self._wait_time_total / started_total * 1000, 3) if started_total else 0,
+                "wait_time_max_ms": round(self._wait_time_max * 1000, 3),
+            }
+
+    @contextmanager
+    def _managed_block_locked(self) -> Generator[None, None, None]:
+        if threading.get_ident() not in self._worker_thread_ids:
+            yield
+            return
+
+        self._blocked_workers += 1
+        self._adjust_workers_locked()
+        try:
+            yield
+        finally:
+            self._blocked_workers -= 1
+
+    def _adjust_workers_locked(self) -> None:
+        active_workers = self._worker_count - self._blocked_workers
+        if self._queued_tasks <= self._idle_workers or active_workers >= self.max_workers:
+            return
+
+        if self._worker_count >= self.max_workers + self.max_compensation_workers:
+            if active_workers > 0:
+                logger.warning(
+                    "Graph engine scheduler reached %s workers, tasks will wait for a free worker", self._worker_count
+                )
+                return
+            # every worker waits for queued tasks, they would never start without one more worker
+            logger.warning(
+                "Graph engine scheduler reached %s workers and all of them are blocked, starting one more",
+                self._worker_count,
+            )
+
+        self._worker_count += 1
+        self._worker_seq += 1
+        thread = threading.Thread(target=self._worker, name=f"GraphEngineScheduler-{self._worker_seq}", daemon=True)
+        thread.start()
+
+    def _next_task_locked(self) -> _ScheduledTask | None:
+        while self._queues:
+            tenant_id, tenant_queues = next(iter(self._queues.items()))
+            run_id, run_queue = next(iter(tenant_queues.items()))
+            task = run_queue.popleft()
+
+            # rotate, the next task is taken from the next run of the next tenant
+            if run_queue:
+                tenant_queues.move_to_end(run_id)
+            else:
+                del tenant_queues[run_id]
+            if tenant_queues:
+                self._queues.move_to_end(tenant_id)
+            else:
+                del self._queues[tenant_id]
+
+            self._queued_tasks -= 1
+            self._queued_per_run[run_id] -= 1
+            if not self._queued_per_run[run_id]:
+                del self._queued_per_run[run_id]
+            self._queue_space_available.notify_all()
+
+            if task.future.set_running_or_notify_cancel():
+                return task
+
+        return None
+
+    def _worker(self) -> None:
+        with self._lock:
+            self._worker_thread_ids.add(threading.get_ident())
+
+        try:
+            while True:
+                with self._lock:
+                    task = self._next_task_locked()
+                    while task is None:
+                        # retire compensation workers as soon as blocked workers are back
+                        if self._worker_count - self._blocked_workers > self.max_workers:
+                            return
+
+                        self._idle_workers += 1
+                        notified = self._task_available.wait(timeout=self.worker_idle_timeout)
+                        self._idle_workers -= 1
+                        task = self._next_task_locked()
+                        if task is None and not notified:
+                            return
+
+                    wait_time = time.perf_counter() - task.submitted_at
+                    self._wait_time_total += wait_time
+                    self._wait_time_max = max(self._wait_time_max, wait_time)
+                    self._running_tasks += 1
+
+                try:
+                    result = task.fn(*task.args, **task.kwargs)
+                except BaseException as e:
+                    task.future.set_exception(e)
+                else:
+                    task.future.set_result(result)
+                finally:
+                    del task
+                    with self._lock:
+                        self._running_tasks -= 1
+                        self._completed_total += 1
+        finally:
+            with self._lock:
+                self._worker_count -= 1
+                self._worker_thread_ids.discard(threading.get_ident())
+
+
+graph_engine_scheduler = GraphEngineScheduler(
+    max_workers=dify_config.WORKFLOW_SCHEDULER_MAX_WORKERS,
+    max_queued_per_run=dify_config.MAX_SUBMIT_COUNT,
+    max_compensation_workers=dify_config.WORKFLOW_SCHEDULER_MAX_COMPENSATION_WORKERS,
+    worker_idle_timeout=dify_config.WORKFLOW_SCHEDULER_WORKER_IDLE_TIMEOUT,
+)
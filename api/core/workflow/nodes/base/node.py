@@ -34,6 +34,7 @@ class BaseNode(Generic[GenericNodeData]):
         graph_runtime_state: "GraphRuntimeState",
         previous_node_id: Optional[str] = None,
         thread_pool_id: Optional[str] = None,
+        node_data: Optional[BaseNodeData] = None,
     ) -> None:
         self.id = id
         self.tenant_id = graph_init_params.tenant_id
@@ -56,7 +57,9 @@ class BaseNode(Generic[GenericNodeData]):
 
         self.node_id = node_id
 
-        node_data = self._node_data_cls.model_validate(config.get("data", {}))
+        # node data may be pre-validated by a compiled execution plan
+        if node_data is None:
+            node_data = self._node_data_cls.model_validate(config.get("data", {}))
         self.node_data = cast(GenericNodeData, node_data)
 
     @abstractmethod
@@ -6,6 +6,7 @@ from core.helper.code_executor.code_executor import CodeExecutionError, CodeExec
 from core.helper.code_executor.code_node_provider import CodeNodeProvider
 from core.helper.code_executor.javascript.javascript_code_provider import JavascriptCodeProvider
 from core.helper.code_executor.python3.python3_code_provider import Python3CodeProvider
+from core.variables.segments import IntegerSegment
 from core.workflow.entities.node_entities import NodeRunResult
 from core.workflow.nodes.base import BaseNode
 from core.workflow.nodes.code.entities import CodeNodeData
@@ -52,11 +53,17 @@ class CodeNode(BaseNode[CodeNodeData]):
             variables[variable_name] = variable.to_object() if variable else None
         # Run code
         try:
-            result = CodeExecutor.execute_workflow_code_template(
-                language=code_language,
-                code=code,
-                inputs=variables,
-            )
+            prefetched_result = self._take_prefetched_result(variables)
+            if isinstance(prefetched_result, Exception):
+                raise prefetched_result
+            if prefetched_result is not None:
+                result = prefetched_result
+            else:
+                result = CodeExecutor.execute_workflow_code_template(
+                    language=code_language,
+                    code=code,
+                    inputs=variables,
+                )
 
             # Transform result
             result = self._transform_result(result=result, output_schema=self.node_data.outputs)
@@ -67,6 +74,19 @@ class CodeNode(BaseNode[CodeNodeData]):
 
         return NodeRunResult(status=WorkflowNodeExecutionStatus.SUCCEEDED, inputs=variables, outputs=result)
 
+    def _take_prefetched_result(self, inputs: Mapping[str, Any]) -> Optional[Mapping[str, Any] | Exception]:
+        """
+        Take the result prefetched for this run by the iteration running this node, if any
+        """
+        prefetcher = self.graph_runtime_state.code_execution_prefetchers.get(self.node_id)
+        if prefetcher is None:
+            return None
+
+        index = self.graph_runtime_state.variable_pool.get(prefetcher.index_selector)
+        if not isinstance(index, IntegerSegment):
+            return None
+        return prefetcher.take(index.value, inputs)
+
     def _check_string(self, value: str | None, variable: str) -> str | None:
         """
         Check string
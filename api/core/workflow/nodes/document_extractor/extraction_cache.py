@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from configs import dify_config
+from extensions.ext_storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentExtractionCache:
+    """
+    Texts extracted from files, content addressed by the hash of the file content, the file type
+    and the extractor version. Texts are kept in a size bounded in-process LRU cache, and in storage
+    if storage_enabled, texts in storage are never deleted. Failures of the cache are logged and handled as misses.
+    """
+
+    _STORAGE_KEY = "document_extractor_cache/{}.txt"
+
+    def __init__(self, max_size: int, storage_enabled: bool = False) -> None:
+        self.max_size = max_size
+        self.storage_enabled = storage_enabled
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def get_key(content_hash: str, file_type: str, extractor_version: str) -> str:
+        return hashlib.sha256(f"{extractor_version}:{file_type}:{content_hash}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                return text
+
+        if not self.storage_enabled:
+            return None
+
+        try:
+            text = storage.load_once(self._STORAGE_KEY.format(key)).decode("utf-8")
+        except Exception:
+            # not cached, storages raise different errors for missing files
+            return None
+
+        self._set_local(key, text)
+        return text
+
+    def set(self, key: str, text: str) -> None:
+        self._set_local(key, text)
+        if not self.storage_enabled:
+            return
+
+        try:
+            storage.save(self._STORAGE_KEY.format(key), text.encode("utf-8"))
+        except Exception:
+            logger.warning("Failed to cache extracted text in storage", exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _set_local(self, key: str, text: str) -> None:
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+
+document_extraction_cache = DocumentExtractionCache(
+    max_size=dify_config.DOCUMENT_EXTRACTOR_CACHE_SIZE,
+    storage_enabled=dify_config.DOCUMENT_EXTRACTOR_CACHE_STORAGE_ENABLED,
+)
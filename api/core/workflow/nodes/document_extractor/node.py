@@ -1,12 +1,15 @@
 import csv
+import hashlib
 import io
 import json
 import logging
 import operator
 import os
 import tempfile
+import threading
 from collections.abc import Mapping, Sequence
-from typing import Any, cast
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, cast
 
 import docx
 import pandas as pd
@@ -14,6 +17,7 @@ import pypdfium2  # type: ignore
 import yaml  # type: ignore
 from docx.table import Table
 from docx.text.paragraph import Paragraph
+from flask import current_app, has_app_context
 
 from configs import dify_config
 from core.file import File, FileTransferMethod, file_manager
@@ -23,13 +27,22 @@ from core.variables.segments import FileSegment
 from core.workflow.entities.node_entities import NodeRunResult
 from core.workflow.nodes.base import BaseNode
 from core.workflow.nodes.enums import NodeType
+from extensions.ext_database import db
+from models.model import UploadFile
 from models.workflow import WorkflowNodeExecutionStatus
 
 from .entities import DocumentExtractorNodeData
 from .exc import DocumentExtractorError, FileDownloadError, TextExtractionError, UnsupportedFileTypeError
+from .extraction_cache import DocumentExtractionCache, document_extraction_cache
 
 logger = logging.getLogger(__name__)
 
+# version of the text extraction, bump it when the text extracted from any file type changes to invalidate cached texts
+EXTRACTOR_VERSION = "1"
+
+# pdfium is not thread safe, PDF files extracted at the same time are parsed one by one
+_pdfium_lock = threading.Lock()
+
 
 class DocumentExtractorNode(BaseNode[DocumentExtractorNodeData]):
     """
@@ -57,7 +70,7 @@ class DocumentExtractorNode(BaseNode[DocumentExtractorNodeData]):
 
         try:
             if isinstance(value, list):
-                extracted_text_list = list(map(_extract_text_from_file, value))
+                extracted_text_list = _extract_text_from_files(value)
                 return NodeRunResult(
                     status=WorkflowNodeExecutionStatus.SUCCEEDED,
                     inputs=inputs,
@@ -192,14 +205,15 @@ def _extract_text_from_yaml(file_content: bytes) -> str:
 
 def _extract_text_from_pdf(file_content: bytes) -> str:
     try:
-        pdf_file = io.BytesIO(file_content)
-        pdf_document = pypdfium2.PdfDocument(pdf_file, autoclose=True)
-        text = ""
-        for page in pdf_document:
-            text_page = page.get_textpage()
-            text += text_page.get_text_range()
-            text_page.close()
-            page.close()
+        with _pdfium_lock:
+            pdf_file = io.BytesIO(file_content)
+            pdf_document = pypdfium2.PdfDocument(pdf_file, autoclose=True)
+            text = ""
+            for page in pdf_document:
+                text_page = page.get_textpage()
+                text += text_page.get_text_range()
+                text_page.close()
+                page.close()
         return text
     except Exception as e:
         raise TextExtractionError(f"Failed to extract text from PDF: {str(e)}") from e
@@ -309,8 +323,49 @@ def _download_file_content(file: File) -> bytes:
         raise FileDownloadError(f"Error downloading file: {str(e)}") from e
 
 
-def _extract_text_from_file(file: File):
-    file_content = _download_file_content(file)
+def _get_upload_file_hash(file: File) -> Optional[str]:
+    """Get the content hash of an uploaded file, computed on upload, None if it is not known."""
+    if file.transfer_method != FileTransferMethod.LOCAL_FILE or not file.related_id:
+        return None
+
+    try:
+        return cast(Optional[str], db.session.query(UploadFile.hash).filter(UploadFile.id == file.related_id).scalar())
+    except Exception:
+        logger.warning("Failed to get the hash of upload file %s", file.related_id, exc_info=True)
+        return None
+
+
+def _extract_text_from_file(file: File) -> str:
+    if file.extension:
+        file_type = f"extension:{file.extension}"
+    elif file.mime_type:
+        file_type = f"mime_type:{file.mime_type}"
+    else:
+        raise UnsupportedFileTypeError("Unable to determine file type: MIME type or file extension is missing")
+
+    if not dify_config.DOCUMENT_EXTRACTOR_CACHE_ENABLED:
+        return _extract_text_from_file_content(file, _download_file_content(file))
+
+    # texts of uploaded files are looked up by the hash computed on upload, without downloading the file
+    file_content = None
+    content_hash = _get_upload_file_hash(file)
+    if content_hash is None:
+        file_content = _download_file_content(file)
+        content_hash = hashlib.sha3_256(file_content).hexdigest()
+
+    cache_key = DocumentExtractionCache.get_key(content_hash, file_type, EXTRACTOR_VERSION)
+    extracted_text = document_extraction_cache.get(cache_key)
+    if extracted_text is not None:
+        return extracted_text
+
+    if file_content is None:
+        file_content = _download_file_content(file)
+    extracted_text = _extract_text_from_file_content(file, file_content)
+    document_extraction_cache.set(cache_key, extracted_text)
+    return extracted_text
+
+
+def _extract_text_from_file_content(file: File, file_content: bytes) -> str:
     if file.extension:
         extracted_text = _extract_text_by_file_extension(file_content=file_content, file_extension=file.extension)
     elif file.mime_type:
@@ -320,6 +375,24 @@ def _extract_text_from_file(file: File):
     return extracted_text
 
 
+def _extract_text_from_files(files: Sequence[File]) -> list[str]:
+    """Extract text from files, up to DOCUMENT_EXTRACTOR_MAX_WORKERS files at the same time."""
+    max_workers = min(dify_config.DOCUMENT_EXTRACTOR_MAX_WORKERS, len(files))
+    if max_workers <= 1:
+        return [_extract_text_from_file(file) for file in files]
+
+    flask_app = current_app._get_current_object() if has_app_context() else None  # type: ignore
+
+    def extract(file: File) -> str:
+        if not flask_app:
+            return _extract_text_from_file(file)
+        with flask_app.app_context():
+            return _extract_text_from_file(file)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(extract, files))
+
+
 def _extract_text_from_csv(file_content: bytes) -> str:
     try:
         csv_file = io.StringIO(file_content.decode("utf-8", "ignore"))
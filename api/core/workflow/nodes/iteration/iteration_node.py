@@ -1,14 +1,18 @@
 import logging
+import threading
 import uuid
+from collections import deque
 from collections.abc import Generator, Mapping, Sequence
 from concurrent.futures import Future, wait
 from datetime import UTC, datetime
-from queue import Empty, Queue
 from typing import TYPE_CHECKING, Any, Optional, cast
 
 from flask import Flask, current_app
+from pydantic import ValidationError
 
 from configs import dify_config
+from core.helper.code_executor.code_execution_prefetcher import CodeExecutionPrefetcher
+from core.helper.event_channel import EventChannel
 from core.variables import ArrayVariable, IntegerVariable, NoneVariable
 from core.workflow.entities.node_entities import (
     NodeRunMetadataKey,
@@ -32,7 +36,9 @@ from core.workflow.graph_engine.entities.event import (
     NodeRunSucceededEvent,
 )
 from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.scheduler import graph_engine_scheduler
 from core.workflow.nodes.base import BaseNode
+from core.workflow.nodes.code.entities import CodeNodeData
 from core.workflow.nodes.enums import NodeType
 from core.workflow.nodes.event import NodeEvent, RunCompletedEvent
 from core.workflow.nodes.iteration.entities import ErrorHandleMode, IterationNodeData
@@ -106,8 +112,11 @@ class IterationNode(BaseNode[IterationNodeData]):
 
         root_node_id = self.node_data.start_node_id
 
-        # init graph
-        iteration_graph = Graph.init(graph_config=graph_config, root_node_id=root_node_id)
+        # init graph, compiled once so that node data is not re-validated for every item
+        from core.workflow.graph_engine.execution_plan import ExecutionPlan
+
+        execution_plan = ExecutionPlan.compile(graph_config=graph_config, root_node_id=root_node_id)
+        iteration_graph = execution_plan.graph
 
         if not iteration_graph:
             raise IterationGraphNotFoundError("iteration graph not found")
@@ -119,7 +128,7 @@ class IterationNode(BaseNode[IterationNodeData]):
         variable_pool.add([self.node_id, "item"], iterator_list_value[0])
 
         # init graph engine
-        from core.workflow.graph_engine.graph_engine import GraphEngine, GraphEngineThreadPool
+        from core.workflow.graph_engine.graph_engine import GraphEngine
 
         graph_engine = GraphEngine(
             tenant_id=self.tenant_id,
@@ -136,6 +145,7 @@ class IterationNode(BaseNode[IterationNodeData]):
             max_execution_steps=dify_config.WORKFLOW_MAX_EXECUTION_STEPS,
             max_execution_time=dify_config.WORKFLOW_MAX_EXECUTION_TIME,
             thread_pool_id=self.thread_pool_id,
+            execution_plan=execution_plan,
         )
 
         start_at = datetime.now(UTC).replace(tzinfo=None)
@@ -162,55 +172,57 @@ class IterationNode(BaseNode[IterationNodeData]):
         )
         iter_run_map: dict[str, float] = {}
         outputs: list[Any] = [None] * len(iterator_list_value)
+        self._prefetch_code_executions(
+            iteration_graph=iteration_graph,
+            iterator_list_value=iterator_list_value,
+            graph_engine=graph_engine,
+        )
         try:
             if self.node_data.is_parallel:
                 futures: list[Future] = []
-                q: Queue = Queue()
-                thread_pool = GraphEngineThreadPool(
-                    max_workers=self.node_data.parallel_nums, max_submit_count=dify_config.MAX_SUBMIT_COUNT
+                # closed once every lane is done, or early when the iteration is stopped
+                q: EventChannel[NodeEvent | InNodeEvent] = EventChannel(
+                    block_context=graph_engine_scheduler.managed_block
                 )
-                for index, item in enumerate(iterator_list_value):
-                    future: Future = thread_pool.submit(
-                        self._run_single_iter_parallel,
+                # items are run by at most parallel_nums lanes in the shared scheduler,
+                # each lane takes the next pending item until none is left or the iteration is stopped
+                pending_items = deque(enumerate(iterator_list_value))
+                stop_event = threading.Event()
+                for _ in range(max(1, min(self.node_data.parallel_nums, len(iterator_list_value)))):
+                    future: Future = graph_engine_scheduler.submit(
+                        self.tenant_id,
+                        graph_engine.thread_pool_id,
+                        self._run_iter_lane_parallel,
                         flask_app=current_app._get_current_object(),  # type: ignore
                         q=q,
+                        pending_items=pending_items,
+                        stop_event=stop_event,
                         iterator_list_value=iterator_list_value,
                         inputs=inputs,
                         outputs=outputs,
                         start_at=start_at,
                         graph_engine=graph_engine,
                         iteration_graph=iteration_graph,
-                        index=index,
-                        item=item,
                         iter_run_map=iter_run_map,
                     )
-                    future.add_done_callback(thread_pool.task_done_callback)
+                    q.watch(future)
                     futures.append(future)
-                succeeded_count = 0
-                while True:
-                    try:
-                        event = q.get(timeout=1)
-                        if event is None:
-                            break
-                        if isinstance(event, IterationRunNextEvent):
-                            succeeded_count += 1
-                            if succeeded_count == len(futures):
-                                q.put(None)
+                for event in q:
+                    yield event
+                    if isinstance(event, RunCompletedEvent):
+                        q.close()
+                        stop_event.set()
+                        for f in futures:
+                            if not f.done():
+                                f.cancel()
+                        yield event
+                    if isinstance(event, IterationRunFailedEvent):
+                        q.close()
                         yield event
-                        if isinstance(event, RunCompletedEvent):
-                            q.put(None)
-                            for f in futures:
-                                if not f.done():
-                                    f.cancel()
-                            yield event
-                        if isinstance(event, IterationRunFailedEvent):
-                            q.put(None)
-                            yield event
-                    except Empty:
-                        continue
 
                 # wait all threads
-                wait(futures)
+                with graph_engine_scheduler.managed_block():
+                    wait(futures)
             else:
                 for _ in range(len(iterator_list_value)):
                     yield from self._run_single_iter(
@@ -342,6 +354,58 @@ class IterationNode(BaseNode[IterationNodeData]):
 
         return variable_mapping
 
+    def _prefetch_code_executions(
+        self, *, iteration_graph: Graph, iterator_list_value: Sequence[Any], graph_engine: "GraphEngine"
+    ) -> None:
+        """
+        Prefetch the executions of the code of the items in batches if the iteration body is a single code node,
+        the code node run of each item takes the result of its own item from the runtime state of this iteration run.
+        Parallel iterations are not prefetched, a batch would run the items of all lanes one after another.
+        """
+        if self.node_data.is_parallel:
+            return
+
+        node_configs = [
+            node_config
+            for node_config in iteration_graph.node_id_config_mapping.values()
+            if node_config.get("data", {}).get("type") != NodeType.ITERATION_START
+        ]
+        if (
+            len(iterator_list_value) < 2
+            or len(node_configs) != 1
+            or node_configs[0].get("data", {}).get("type") != NodeType.CODE
+        ):
+            return
+
+        try:
+            code_node_data = CodeNodeData.model_validate(node_configs[0]["data"])
+        except ValidationError:
+            return
+        if not CodeExecutionPrefetcher.is_supported(code_node_data.code_language):
+            return
+
+        variable_pool = graph_engine.graph_runtime_state.variable_pool
+        inputs_list = []
+        for index, item in enumerate(iterator_list_value):
+            # resolve the code node variables as they are when the item is run
+            item_variable_pool = variable_pool.create_overlay()
+            item_variable_pool.add([self.node_id, "index"], index)
+            item_variable_pool.add([self.node_id, "item"], item)
+            inputs = {}
+            for variable_selector in code_node_data.variables:
+                variable = item_variable_pool.get(variable_selector.value_selector)
+                inputs[variable_selector.variable] = variable.to_object() if variable else None
+            inputs_list.append(inputs)
+
+        graph_engine.graph_runtime_state.code_execution_prefetchers[node_configs[0]["id"]] = CodeExecutionPrefetcher(
+            language=code_node_data.code_language,
+            code=code_node_data.code,
+            inputs_list=inputs_list,
+            index_selector=[self.node_id, "index"],
+            # the items after a failed one are not run when the iteration terminates on errors
+            stop_on_error=self.node_data.error_handle_mode == ErrorHandleMode.TERMINATED,
+        )
+
     def _handle_event_metadata(
         self,
         *,
@@ -564,11 +628,23 @@ class IterationNode(BaseNode[IterationNodeData]):
                 )
             )
 
+    def _run_iter_lane_parallel(self, *, pending_items: deque, stop_event: threading.Event, **kwargs) -> None:
+        """
+        run pending iterations one after another in parallel mode
+        """
+        while not stop_event.is_set():
+            try:
+                index, item = pending_items.popleft()
+            except IndexError:
+                return
+
+            self._run_single_iter_parallel(index=index, item=item, **kwargs)
+
     def _run_single_iter_parallel(
         self,
         *,
         flask_app: Flask,
-        q: Queue,
+        q: EventChannel[NodeEvent | InNodeEvent],
         iterator_list_value: Sequence[str],
         inputs: Mapping[str, list],
         outputs: list,
@@ -601,3 +677,7 @@ class IterationNode(BaseNode[IterationNodeData]):
             ):
                 q.put(event)
             graph_engine.graph_runtime_state.total_tokens += graph_engine_copy.graph_runtime_state.total_tokens
+            # merge writes outside the iteration (e.g. assigned conversation variables) back to the shared pool
+            graph_engine.graph_runtime_state.variable_pool.merge_overlay(
+                variable_pool_copy, exclude_node_ids=[self.node_id, *iteration_graph.node_ids]
+            )
@@ -15,6 +15,7 @@ from core.workflow.graph_engine.entities.event import GraphEngineEvent, GraphRun
 from core.workflow.graph_engine.entities.graph import Graph
 from core.workflow.graph_engine.entities.graph_init_params import GraphInitParams
 from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
+from core.workflow.graph_engine.execution_plan import ExecutionPlan
 from core.workflow.graph_engine.graph_engine import GraphEngine
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.base import BaseNode
@@ -45,6 +46,7 @@ class WorkflowEntry:
         call_depth: int,
         variable_pool: VariablePool,
         thread_pool_id: Optional[str] = None,
+        execution_plan: Optional[ExecutionPlan] = None,
     ) -> None:
         """
         Init workflow entry
@@ -60,6 +62,7 @@ class WorkflowEntry:
         :param call_depth: call depth
         :param variable_pool: variable pool
         :param thread_pool_id: thread pool id
+        :param execution_plan: compiled execution plan of the graph
         """
         # check call depth
         workflow_call_max_depth = dify_config.WORKFLOW_CALL_MAX_DEPTH
@@ -82,6 +85,7 @@ class WorkflowEntry:
             max_execution_steps=dify_config.WORKFLOW_MAX_EXECUTION_STEPS,
             max_execution_time=dify_config.WORKFLOW_MAX_EXECUTION_TIME,
             thread_pool_id=thread_pool_id,
+            execution_plan=execution_plan,
         )
 
     def run(
@@ -65,3 +65,30 @@ def init_app(app: DifyApp):
             "connection_timeout": engine.pool.timeout(),  # type: ignore
             "recycle_time": db.engine.pool._recycle,  # type: ignore
         }
+
+    @app.route("/workflow-scheduler-stat")
+    def workflow_scheduler_stat():
+        from core.workflow.graph_engine.scheduler import graph_engine_scheduler
+
+        return {
+            "pid": os.getpid(),
+            **graph_engine_scheduler.get_metrics(),
+        }
+
+    @app.route("/query-embedding-cache-stat")
+    def query_embedding_cache_stat():
+        from core.rag.embedding.query_embedding_cache import query_embedding_cache
+
+        return {
+            "pid": os.getpid(),
+            **query_embedding_cache.get_metrics(),
+        }
+
+    @app.route("/rate-limit-stat")
+    def rate_limit_stat():
+        from core.app.features.rate_limiting import RateLimit
+
+        return {
+            "pid": os.getpid(),
+            "apps": RateLimit.get_metrics(),
+        }
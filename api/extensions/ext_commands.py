@@ -7,6 +7,9 @@ def init_app(app: DifyApp):
         convert_to_agent_apps,
         create_tenant,
         fix_app_site_missing,
+        migrate_embedding_cache,
+        migrate_keyword_index,
+        purge_expired_messages,
         reset_email,
         reset_encrypt_key_pair,
         reset_password,
@@ -24,6 +27,9 @@ def init_app(app: DifyApp):
         create_tenant,
         upgrade_db,
         fix_app_site_missing,
+        migrate_embedding_cache,
+        migrate_keyword_index,
+        purge_expired_messages,
     ]
     for cmd in cmds_to_register:
         app.cli.add_command(cmd)
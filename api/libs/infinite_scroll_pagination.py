@@ -1,5 +1,42 @@
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import ColumnElement, literal, tuple_
+
+
 class InfiniteScrollPagination:
     def __init__(self, data, limit, has_more):
         self.data = data
         self.limit = limit
         self.has_more = has_more
+
+    @classmethod
+    def from_rows(cls, rows: Sequence, limit: int) -> "InfiniteScrollPagination":
+        """
+        Build a page from rows fetched with a limit of `limit + 1`,
+        the extra row tells whether there are more rows without counting them
+        """
+        return cls(data=list(rows[:limit]), limit=limit, has_more=len(rows) > limit)
+
+
+def keyset_order_by(sort_column: Any, id_column: Any, descending: bool = True) -> tuple:
+    """
+    Order by the sort column, then by id, so rows with the same sort value have a stable order
+    """
+    if descending:
+        return sort_column.desc(), id_column.desc()
+    return sort_column.asc(), id_column.asc()
+
+
+def keyset_condition(
+    sort_column: Any, id_column: Any, sort_value: Any, id_value: Any, descending: bool = True
+) -> ColumnElement[bool]:
+    """
+    Condition of the rows after the row with (sort_value, id_value) in the `keyset_order_by` order,
+    matching a composite index on (..., sort column, id)
+    """
+    key = tuple_(sort_column, id_column)
+    reference = tuple_(literal(sort_value, sort_column.type), literal(id_value, id_column.type))
+    if descending:
+        return key < reference
+    return key > reference
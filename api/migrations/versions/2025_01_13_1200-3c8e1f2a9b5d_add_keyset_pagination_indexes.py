@@ -0,0 +1,42 @@
+"""add keyset pagination indexes
+
+Revision ID: 3c8e1f2a9b5d
+Revises: 6e2f9c3b1a47
+Create Date: 2025-01-13 12:00:00.000000
+
+"""
+from alembic import op
+import models as models
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e1f2a9b5d'
+down_revision = '6e2f9c3b1a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # indexes are built and dropped concurrently, without locking writes to these large tables,
+    # which can not be done in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('conversation_app_from_user_updated_at_idx', 'conversations', ['app_id', 'from_source', 'from_end_user_id', 'updated_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('message_conversation_created_at_idx', 'messages', ['conversation_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('workflow_run_triggered_from_created_at_idx', 'workflow_runs', ['tenant_id', 'app_id', 'triggered_from', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+        # superseded by the indexes above, which start with the same columns
+        op.drop_index('conversation_app_from_user_idx', table_name='conversations', postgresql_concurrently=True)
+        op.drop_index('message_conversation_id_idx', table_name='messages', postgresql_concurrently=True)
+        op.drop_index('workflow_run_triggerd_from_idx', table_name='workflow_runs', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('workflow_run_triggerd_from_idx', 'workflow_runs', ['tenant_id', 'app_id', 'triggered_from'], unique=False, postgresql_concurrently=True)
+        op.create_index('message_conversation_id_idx', 'messages', ['conversation_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('conversation_app_from_user_idx', 'conversations', ['app_id', 'from_source', 'from_end_user_id'], unique=False, postgresql_concurrently=True)
+
+        op.drop_index('workflow_run_triggered_from_created_at_idx', table_name='workflow_runs', postgresql_concurrently=True)
+        op.drop_index('message_conversation_created_at_idx', table_name='messages', postgresql_concurrently=True)
+        op.drop_index('conversation_app_from_user_updated_at_idx', table_name='conversations', postgresql_concurrently=True)
@@ -16,6 +16,7 @@ from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped
 
 from configs import dify_config
+from core.rag.embedding.embedding_codec import EmbeddingFormat, decode_embedding, encode_embedding, is_encoded_embedding
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from extensions.ext_storage import storage
 from services.entities.knowledge_entities.knowledge_entities import ParentMode, Rule
@@ -749,6 +750,25 @@ class DatasetKeywordTable(db.Model):  # type: ignore[name-defined]
                 return None
 
 
+class DatasetKeywordPosting(db.Model):  # type: ignore[name-defined]
+    """
+    Posting of the inverted keyword index, a keyword of a segment index node
+    """
+
+    __tablename__ = "dataset_keyword_postings"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="dataset_keyword_posting_pkey"),
+        db.UniqueConstraint("dataset_id", "keyword", "node_id", name="dataset_keyword_posting_keyword_idx"),
+        db.Index("dataset_keyword_posting_node_idx", "dataset_id", "node_id"),
+    )
+
+    id = db.Column(StringUUID, primary_key=True, server_default=db.text("uuid_generate_v4()"))
+    dataset_id = db.Column(StringUUID, nullable=False)
+    keyword = db.Column(db.Text, nullable=False)
+    node_id = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
 class Embedding(db.Model):  # type: ignore[name-defined]
     __tablename__ = "embeddings"
     __table_args__ = (
@@ -767,9 +787,19 @@ class Embedding(db.Model):  # type: ignore[name-defined]
     provider_name = db.Column(db.String(255), nullable=False, server_default=db.text("''::character varying"))
 
     def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+        if dify_config.EMBEDDING_CACHE_COMPACT_FORMAT_ENABLED:
+            self.embedding = encode_embedding(
+                embedding_data, EmbeddingFormat(dify_config.EMBEDDING_CACHE_STORAGE_FORMAT)
+            )
+        else:
+            # readable by processes running versions before the compact encoding
+            self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
 
     def get_embedding(self) -> list[float]:
+        if is_encoded_embedding(self.embedding):
+            return decode_embedding(self.embedding)
+
+        # rows stored before the compact encoding
         return cast(list[float], pickle.loads(self.embedding))
 
 
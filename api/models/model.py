@@ -1,7 +1,7 @@
 import json
 import re
 import uuid
-from collections.abc import Mapping
+from collections.abc import Mapping, Sequence
 from datetime import datetime
 from enum import Enum, StrEnum
 from typing import TYPE_CHECKING, Any, Literal, Optional, cast
@@ -22,6 +22,7 @@ from models.workflow import WorkflowRunStatus
 
 from .account import Account, Tenant
 from .engine import db
+from .preloading import preloadable_property
 from .types import StringUUID
 
 if TYPE_CHECKING:
@@ -109,14 +110,14 @@ class App(db.Model):  # type: ignore[name-defined]
         site = db.session.query(Site).filter(Site.app_id == self.id).first()
         return site
 
-    @property
+    @preloadable_property
     def app_model_config(self):
         if self.app_model_config_id:
             return db.session.query(AppModelConfig).filter(AppModelConfig.id == self.app_model_config_id).first()
 
         return None
 
-    @property
+    @preloadable_property
     def workflow(self) -> Optional["Workflow"]:
         if self.workflow_id:
             from .workflow import Workflow
@@ -202,7 +203,7 @@ class App(db.Model):  # type: ignore[name-defined]
 
         return deleted_tools
 
-    @property
+    @preloadable_property
     def tags(self):
         tags = (
             db.session.query(Tag)
@@ -285,7 +286,7 @@ class AppModelConfig(db.Model):  # type: ignore[name-defined]
     def retriever_resource_dict(self) -> dict:
         return json.loads(self.retriever_resource) if self.retriever_resource else {"enabled": True}
 
-    @property
+    @preloadable_property
     def annotation_reply_dict(self) -> dict:
         annotation_setting = (
             db.session.query(AppAnnotationSetting).filter(AppAnnotationSetting.app_id == self.app_id).first()
@@ -527,7 +528,14 @@ class Conversation(db.Model):  # type: ignore[name-defined]
     __tablename__ = "conversations"
     __table_args__ = (
         db.PrimaryKeyConstraint("id", name="conversation_pkey"),
-        db.Index("conversation_app_from_user_idx", "app_id", "from_source", "from_end_user_id"),
+        db.Index(
+            "conversation_app_from_user_updated_at_idx",
+            "app_id",
+            "from_source",
+            "from_end_user_id",
+            "updated_at",
+            "id",
+        ),
     )
 
     id: Mapped[str] = mapped_column(StringUUID, server_default=db.text("uuid_generate_v4()"))
@@ -620,9 +628,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
                 else:
                     model_config["configs"] = override_model_configs
             else:
-                app_model_config = (
-                    db.session.query(AppModelConfig).filter(AppModelConfig.id == self.app_model_config_id).first()
-                )
+                app_model_config = self.app_model_config
                 if app_model_config:
                     model_config = app_model_config.to_dict()
 
@@ -631,6 +637,10 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return model_config
 
+    @preloadable_property
+    def app_model_config(self) -> Optional[AppModelConfig]:
+        return db.session.query(AppModelConfig).filter(AppModelConfig.id == self.app_model_config_id).first()
+
     @property
     def summary_or_query(self):
         if self.summary:
@@ -642,19 +652,19 @@ class Conversation(db.Model):  # type: ignore[name-defined]
             else:
                 return ""
 
-    @property
+    @preloadable_property
     def annotated(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).count() > 0
 
-    @property
+    @preloadable_property
     def annotation(self):
         return db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id == self.id).first()
 
-    @property
+    @preloadable_property
     def message_count(self):
         return db.session.query(Message).filter(Message.conversation_id == self.id).count()
 
-    @property
+    @preloadable_property
     def user_feedback_stats(self):
         like = (
             db.session.query(MessageFeedback)
@@ -678,7 +688,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return {"like": like, "dislike": dislike}
 
-    @property
+    @preloadable_property
     def admin_feedback_stats(self):
         like = (
             db.session.query(MessageFeedback)
@@ -702,7 +712,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return {"like": like, "dislike": dislike}
 
-    @property
+    @preloadable_property
     def status_count(self):
         messages = db.session.query(Message).filter(Message.conversation_id == self.id).all()
         status_counts = {
@@ -727,7 +737,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
             else None
         )
 
-    @property
+    @preloadable_property
     def first_message(self):
         return db.session.query(Message).filter(Message.conversation_id == self.id).first()
 
@@ -735,7 +745,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
     def app(self):
         return db.session.query(App).filter(App.id == self.app_id).first()
 
-    @property
+    @preloadable_property
     def from_end_user_session_id(self):
         if self.from_end_user_id:
             end_user = db.session.query(EndUser).filter(EndUser.id == self.from_end_user_id).first()
@@ -744,7 +754,7 @@ class Conversation(db.Model):  # type: ignore[name-defined]
 
         return None
 
-    @property
+    @preloadable_property
     def from_account_name(self):
         if self.from_account_id:
             account = db.session.query(Account).filter(Account.id == self.from_account_id).first()
@@ -763,7 +773,7 @@ class Message(db.Model):  # type: ignore[name-defined]
     __table_args__ = (
         db.PrimaryKeyConstraint("id", name="message_pkey"),
         db.Index("message_app_id_idx", "app_id", "created_at"),
-        db.Index("message_conversation_id_idx", "conversation_id"),
+        db.Index("message_conversation_created_at_idx", "conversation_id", "created_at", "id"),
         db.Index("message_end_user_idx", "app_id", "from_source", "from_end_user_id"),
         db.Index("message_account_idx", "app_id", "from_source", "from_account_id"),
         db.Index("message_workflow_run_id_idx", "conversation_id", "workflow_run_id"),
@@ -911,7 +921,7 @@ class Message(db.Model):  # type: ignore[name-defined]
 
         return re_sign_file_url_answer
 
-    @property
+    @preloadable_property
     def user_feedback(self):
         feedback = (
             db.session.query(MessageFeedback)
@@ -920,7 +930,7 @@ class Message(db.Model):  # type: ignore[name-defined]
         )
         return feedback
 
-    @property
+    @preloadable_property
     def admin_feedback(self):
         feedback = (
             db.session.query(MessageFeedback)
@@ -929,17 +939,17 @@ class Message(db.Model):  # type: ignore[name-defined]
         )
         return feedback
 
-    @property
+    @preloadable_property
     def feedbacks(self):
         feedbacks = db.session.query(MessageFeedback).filter(MessageFeedback.message_id == self.id).all()
         return feedbacks
 
-    @property
+    @preloadable_property
     def annotation(self):
         annotation = db.session.query(MessageAnnotation).filter(MessageAnnotation.message_id == self.id).first()
         return annotation
 
-    @property
+    @preloadable_property
     def annotation_hit_history(self):
         annotation_history = (
             db.session.query(AppAnnotationHitHistory).filter(AppAnnotationHitHistory.message_id == self.id).first()
@@ -971,7 +981,7 @@ class Message(db.Model):  # type: ignore[name-defined]
     def message_metadata_dict(self) -> dict:
         return json.loads(self.message_metadata) if self.message_metadata else {}
 
-    @property
+    @preloadable_property
     def agent_thoughts(self):
         return (
             db.session.query(MessageAgentThought)
@@ -980,7 +990,7 @@ class Message(db.Model):  # type: ignore[name-defined]
             .all()
         )
 
-    @property
+    @preloadable_property
     def retriever_resources(self):
         return (
             db.session.query(DatasetRetrieverResource)
@@ -989,15 +999,22 @@ class Message(db.Model):  # type: ignore[name-defined]
             .all()
         )
 
-    @property
+    @preloadable_property
     def message_files(self):
-        from factories import file_factory
-
         message_files = db.session.query(MessageFile).filter(MessageFile.message_id == self.id).all()
         current_app = db.session.query(App).filter(App.id == self.app_id).first()
         if not current_app:
             raise ValueError(f"App {self.app_id} not found")
 
+        result = self.build_message_files(message_files, current_app.tenant_id)
+
+        db.session.commit()
+        return result
+
+    @staticmethod
+    def build_message_files(message_files: Sequence["MessageFile"], tenant_id: str) -> list[dict]:
+        from factories import file_factory
+
         files = []
         for message_file in message_files:
             if message_file.transfer_method == "local_file":
@@ -1010,7 +1027,7 @@ class Message(db.Model):  # type: ignore[name-defined]
                         "transfer_method": message_file.transfer_method,
                         "type": message_file.type,
                     },
-                    tenant_id=current_app.tenant_id,
+                    tenant_id=tenant_id,
                 )
             elif message_file.transfer_method == "remote_url":
                 if message_file.url is None:
@@ -1022,7 +1039,7 @@ class Message(db.Model):  # type: ignore[name-defined]
                         "transfer_method": message_file.transfer_method,
                         "url": message_file.url,
                     },
-                    tenant_id=current_app.tenant_id,
+                    tenant_id=tenant_id,
                 )
             elif message_file.transfer_method == "tool_file":
                 if message_file.upload_file_id is None:
@@ -1036,7 +1053,7 @@ class Message(db.Model):  # type: ignore[name-defined]
                 }
                 file = file_factory.build_from_mapping(
                     mapping=mapping,
-                    tenant_id=current_app.tenant_id,
+                    tenant_id=tenant_id,
                 )
             else:
                 raise ValueError(
@@ -1044,14 +1061,11 @@ class Message(db.Model):  # type: ignore[name-defined]
                 )
             files.append(file)
 
-        result = [
+        return [
             {"belongs_to": message_file.belongs_to, **file.to_dict()}
             for (file, message_file) in zip(files, message_files)
         ]
 
-        db.session.commit()
-        return result
-
     @property
     def workflow_run(self):
         if self.workflow_run_id:
@@ -1130,7 +1144,7 @@ class MessageFeedback(db.Model):  # type: ignore[name-defined]
     created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
     updated_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
 
-    @property
+    @preloadable_property
     def from_account(self):
         account = db.session.query(Account).filter(Account.id == self.from_account_id).first()
         return account
@@ -1197,12 +1211,12 @@ class MessageAnnotation(db.Model):  # type: ignore[name-defined]
     created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
     updated_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
 
-    @property
+    @preloadable_property
     def account(self):
         account = db.session.query(Account).filter(Account.id == self.account_id).first()
         return account
 
-    @property
+    @preloadable_property
     def annotation_create_account(self):
         account = db.session.query(Account).filter(Account.id == self.account_id).first()
         return account
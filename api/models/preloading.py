@@ -0,0 +1,26 @@
+import functools
+from collections.abc import Callable
+from typing import Any
+
+_PRELOADED_VALUES_ATTR = "_preloaded_values"
+
+
+def preloadable_property(func: Callable[[Any], Any]) -> property:
+    """
+    Property backed by a query, returning the value set with `set_preloaded` if any,
+    so the values of a list of models can be loaded in batch before serializing them
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def getter(self):
+        preloaded_values = self.__dict__.get(_PRELOADED_VALUES_ATTR)
+        if preloaded_values is not None and name in preloaded_values:
+            return preloaded_values[name]
+        return func(self)
+
+    return property(getter)
+
+
+def set_preloaded(instance: Any, name: str, value: Any) -> None:
+    instance.__dict__.setdefault(_PRELOADED_VALUES_ATTR, {})[name] = value
@@ -388,7 +388,9 @@ class WorkflowRun(db.Model):  # type: ignore[name-defined]
     __tablename__ = "workflow_runs"
     __table_args__ = (
         db.PrimaryKeyConstraint("id", name="workflow_run_pkey"),
-        db.Index("workflow_run_triggerd_from_idx", "tenant_id", "app_id", "triggered_from"),
+        db.Index(
+            "workflow_run_triggered_from_created_at_idx", "tenant_id", "app_id", "triggered_from", "created_at", "id"
+        ),
         db.Index("workflow_run_tenant_app_sequence_idx", "tenant_id", "app_id", "sequence_number"),
     )
 
@@ -1,14 +1,14 @@
-from collections.abc import Callable, Sequence
+from collections.abc import Sequence
 from datetime import UTC, datetime
 from typing import Optional, Union
 
-from sqlalchemy import asc, desc, func, or_, select
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
 
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.llm_generator.llm_generator import LLMGenerator
 from extensions.ext_database import db
-from libs.infinite_scroll_pagination import InfiniteScrollPagination
+from libs.infinite_scroll_pagination import InfiniteScrollPagination, keyset_condition, keyset_order_by
 from models.account import Account
 from models.model import App, Conversation, EndUser, Message
 from services.errors.conversation import ConversationNotExistsError, LastConversationNotExistsError
@@ -47,51 +47,36 @@ class ConversationService:
             stmt = stmt.where(~Conversation.id.in_(exclude_ids))
 
         # define sort fields and directions
-        sort_field, sort_direction = cls._get_sort_params(sort_by)
+        sort_field, descending = cls._get_sort_params(sort_by)
+        sort_column = getattr(Conversation, sort_field)
 
         if last_id:
             last_conversation = session.scalar(stmt.where(Conversation.id == last_id))
             if not last_conversation:
                 raise LastConversationNotExistsError()
 
-            # build filters based on sorting
-            filter_condition = cls._build_filter_condition(
-                sort_field=sort_field,
-                sort_direction=sort_direction,
-                reference_conversation=last_conversation,
+            stmt = stmt.where(
+                keyset_condition(
+                    sort_column,
+                    Conversation.id,
+                    getattr(last_conversation, sort_field),
+                    last_conversation.id,
+                    descending,
+                )
             )
-            stmt = stmt.where(filter_condition)
-        query_stmt = stmt.order_by(sort_direction(getattr(Conversation, sort_field))).limit(limit)
+        query_stmt = stmt.order_by(*keyset_order_by(sort_column, Conversation.id, descending)).limit(limit + 1)
         conversations = session.scalars(query_stmt).all()
 
-        has_more = False
-        if len(conversations) == limit:
-            current_page_last_conversation = conversations[-1]
-            rest_filter_condition = cls._build_filter_condition(
-                sort_field=sort_field,
-                sort_direction=sort_direction,
-                reference_conversation=current_page_last_conversation,
-            )
-            count_stmt = select(func.count()).select_from(stmt.where(rest_filter_condition).subquery())
-            rest_count = session.scalar(count_stmt) or 0
-            if rest_count > 0:
-                has_more = True
-
-        return InfiniteScrollPagination(data=conversations, limit=limit, has_more=has_more)
+        return InfiniteScrollPagination.from_rows(conversations, limit)
 
     @classmethod
-    def _get_sort_params(cls, sort_by: str):
+    def _get_sort_params(cls, sort_by: str) -> tuple[str, bool]:
+        """
+        :return: sort field, whether the order is descending
+        """
         if sort_by.startswith("-"):
-            return sort_by[1:], desc
-        return sort_by, asc
-
-    @classmethod
-    def _build_filter_condition(cls, sort_field: str, sort_direction: Callable, reference_conversation: Conversation):
-        field_value = getattr(reference_conversation, sort_field)
-        if sort_direction == desc:
-            return getattr(Conversation, sort_field) < field_value
-        else:
-            return getattr(Conversation, sort_field) > field_value
+            return sort_by[1:], True
+        return sort_by, False
 
     @classmethod
     def rename(
@@ -0,0 +1,252 @@
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from extensions.ext_database import db
+from models.account import Account
+from models.model import (
+    App,
+    AppAnnotationHitHistory,
+    AppModelConfig,
+    Conversation,
+    DatasetRetrieverResource,
+    EndUser,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageFeedback,
+    MessageFile,
+    Tag,
+    TagBinding,
+)
+from models.preloading import set_preloaded
+from models.workflow import Workflow, WorkflowRun, WorkflowRunStatus
+
+
+class EagerLoadingService:
+    """
+    Load the query backed properties serialized by the list endpoints for a whole page in batch,
+    with a constant number of queries instead of a few queries per item
+    """
+
+    @classmethod
+    def load_apps(cls, apps: Sequence[App]) -> None:
+        if not apps:
+            return
+
+        app_model_configs = cls._get_by_ids(AppModelConfig, (app.app_model_config_id for app in apps))
+        workflows = cls._get_by_ids(Workflow, (app.workflow_id for app in apps))
+
+        tags: dict[str, list[Tag]] = defaultdict(list)
+        tag_bindings = (
+            db.session.query(TagBinding.target_id, Tag)
+            .join(Tag, Tag.id == TagBinding.tag_id)
+            .filter(
+                TagBinding.target_id.in_([app.id for app in apps]),
+                TagBinding.tenant_id == Tag.tenant_id,
+                Tag.tenant_id.in_({app.tenant_id for app in apps}),
+                Tag.type == "app",
+            )
+            .all()
+        )
+        for target_id, tag in tag_bindings:
+            tags[target_id].append(tag)
+
+        for app in apps:
+            set_preloaded(app, "app_model_config", app_model_configs.get(app.app_model_config_id))
+            set_preloaded(app, "workflow", workflows.get(app.workflow_id))
+            set_preloaded(app, "tags", [tag for tag in tags[app.id] if tag.tenant_id == app.tenant_id])
+
+    @classmethod
+    def load_conversations(cls, conversations: Sequence[Conversation]) -> None:
+        if not conversations:
+            return
+
+        conversation_ids = [conversation.id for conversation in conversations]
+
+        numbered_messages = (
+            select(
+                Message,
+                func.row_number()
+                .over(partition_by=Message.conversation_id, order_by=(Message.created_at.asc(), Message.id.asc()))
+                .label("row_number"),
+            )
+            .where(Message.conversation_id.in_(conversation_ids))
+            .subquery()
+        )
+        first_message = aliased(Message, numbered_messages)
+        first_messages = {
+            message.conversation_id: message
+            for message in db.session.scalars(select(first_message).where(numbered_messages.c.row_number == 1))
+        }
+
+        # message count and workflow run status count of each conversation
+        status_counts: dict[str, dict[Any, int]] = defaultdict(dict)
+        rows = (
+            db.session.query(Message.conversation_id, WorkflowRun.status, func.count())
+            .outerjoin(WorkflowRun, WorkflowRun.id == Message.workflow_run_id)
+            .filter(Message.conversation_id.in_(conversation_ids))
+            .group_by(Message.conversation_id, WorkflowRun.status)
+            .all()
+        )
+        for conversation_id, status, count in rows:
+            status_counts[conversation_id][status] = count
+
+        feedback_counts: dict[tuple[str, str, str], int] = {}
+        rows = (
+            db.session.query(
+                MessageFeedback.conversation_id, MessageFeedback.from_source, MessageFeedback.rating, func.count()
+            )
+            .filter(MessageFeedback.conversation_id.in_(conversation_ids))
+            .group_by(MessageFeedback.conversation_id, MessageFeedback.from_source, MessageFeedback.rating)
+            .all()
+        )
+        for conversation_id, from_source, rating, count in rows:
+            feedback_counts[(conversation_id, from_source, rating)] = count
+
+        annotations: dict[str, MessageAnnotation] = {}
+        for annotation in (
+            db.session.query(MessageAnnotation).filter(MessageAnnotation.conversation_id.in_(conversation_ids)).all()
+        ):
+            annotations.setdefault(annotation.conversation_id, annotation)
+
+        app_model_configs = cls._get_by_ids(
+            AppModelConfig, (conversation.app_model_config_id for conversation in conversations)
+        )
+        end_users = cls._get_by_ids(EndUser, (conversation.from_end_user_id for conversation in conversations))
+        accounts = cls._get_by_ids(
+            Account,
+            [conversation.from_account_id for conversation in conversations]
+            + [annotation.account_id for annotation in annotations.values()],
+        )
+        cls._set_annotation_accounts(annotations.values(), accounts)
+        # app model configs are shared by the conversations of an app, load their annotation setting once
+        for app_model_config in app_model_configs.values():
+            set_preloaded(app_model_config, "annotation_reply_dict", app_model_config.annotation_reply_dict)
+
+        for conversation in conversations:
+            counts = status_counts.get(conversation.id, {})
+            end_user = end_users.get(conversation.from_end_user_id)
+            account = accounts.get(conversation.from_account_id)
+            set_preloaded(conversation, "first_message", first_messages.get(conversation.id))
+            set_preloaded(conversation, "message_count", sum(counts.values()))
+            set_preloaded(
+                conversation,
+                "status_count",
+                {
+                    "success": counts.get(WorkflowRunStatus.SUCCEEDED, 0),
+                    "failed": counts.get(WorkflowRunStatus.FAILED, 0),
+                    "partial_success": counts.get(WorkflowRunStatus.PARTIAL_SUCCESSED, 0),
+                }
+                if counts
+                else None,
+            )
+            for from_source in ("user", "admin"):
+                set_preloaded(
+                    conversation,
+                    f"{from_source}_feedback_stats",
+                    {
+                        rating: feedback_counts.get((conversation.id, from_source, rating), 0)
+                        for rating in ("like", "dislike")
+                    },
+                )
+            set_preloaded(conversation, "annotation", annotations.get(conversation.id))
+            set_preloaded(conversation, "annotated", conversation.id in annotations)
+            set_preloaded(conversation, "app_model_config", app_model_configs.get(conversation.app_model_config_id))
+            set_preloaded(conversation, "from_end_user_session_id", end_user.session_id if end_user else None)
+            set_preloaded(conversation, "from_account_name", account.name if account else None)
+
+    @classmethod
+    def load_messages(cls, messages: Sequence[Message]) -> None:
+        if not messages:
+            return
+
+        message_ids = [message.id for message in messages]
+
+        feedbacks: dict[str, list[MessageFeedback]] = defaultdict(list)
+        for feedback in db.session.query(MessageFeedback).filter(MessageFeedback.message_id.in_(message_ids)).all():
+            feedbacks[feedback.message_id].append(feedback)
+
+        annotations: dict[str, MessageAnnotation] = {}
+        for annotation in db.session.query(MessageAnnotation).filter(MessageAnnotation.message_id.in_(message_ids)):
+            annotations.setdefault(annotation.message_id, annotation)
+
+        hit_annotation_ids: dict[str, str] = {}
+        for message_id, annotation_id in db.session.query(
+            AppAnnotationHitHistory.message_id, AppAnnotationHitHistory.annotation_id
+        ).filter(AppAnnotationHitHistory.message_id.in_(message_ids)):
+            hit_annotation_ids.setdefault(message_id, annotation_id)
+        hit_annotations = cls._get_by_ids(MessageAnnotation, hit_annotation_ids.values())
+
+        accounts = cls._get_by_ids(
+            Account,
+            [feedback.from_account_id for message_feedbacks in feedbacks.values() for feedback in message_feedbacks]
+            + [annotation.account_id for annotation in [*annotations.values(), *hit_annotations.values()]],
+        )
+        for message_feedbacks in feedbacks.values():
+            for feedback in message_feedbacks:
+                set_preloaded(feedback, "from_account", accounts.get(feedback.from_account_id))
+        cls._set_annotation_accounts([*annotations.values(), *hit_annotations.values()], accounts)
+
+        agent_thoughts: dict[str, list[MessageAgentThought]] = defaultdict(list)
+        for agent_thought in (
+            db.session.query(MessageAgentThought)
+            .filter(MessageAgentThought.message_id.in_(message_ids))
+            .order_by(MessageAgentThought.position.asc())
+        ):
+            agent_thoughts[agent_thought.message_id].append(agent_thought)
+
+        retriever_resources: dict[str, list[DatasetRetrieverResource]] = defaultdict(list)
+        for retriever_resource in (
+            db.session.query(DatasetRetrieverResource)
+            .filter(DatasetRetrieverResource.message_id.in_(message_ids))
+            .order_by(DatasetRetrieverResource.position.asc())
+        ):
+            retriever_resources[retriever_resource.message_id].append(retriever_resource)
+
+        message_files: dict[str, list[MessageFile]] = defaultdict(list)
+        for message_file in db.session.query(MessageFile).filter(MessageFile.message_id.in_(message_ids)):
+            message_files[message_file.message_id].append(message_file)
+        apps = cls._get_by_ids(App, (message.app_id for message in messages))
+
+        for message in messages:
+            message_feedbacks = feedbacks.get(message.id, [])
+            set_preloaded(message, "feedbacks", message_feedbacks)
+            for from_source in ("user", "admin"):
+                set_preloaded(
+                    message,
+                    f"{from_source}_feedback",
+                    next((feedback for feedback in message_feedbacks if feedback.from_source == from_source), None),
+                )
+            set_preloaded(message, "annotation", annotations.get(message.id))
+            set_preloaded(
+                message, "annotation_hit_history", hit_annotations.get(hit_annotation_ids.get(message.id, ""))
+            )
+            set_preloaded(message, "agent_thoughts", agent_thoughts.get(message.id, []))
+            set_preloaded(message, "retriever_resources", retriever_resources.get(message.id, []))
+            # messages of missing apps are left to the property, which raises
+            app = apps.get(message.app_id)
+            if app:
+                set_preloaded(
+                    message,
+                    "message_files",
+                    Message.build_message_files(message_files.get(message.id, []), app.tenant_id),
+                )
+
+    @staticmethod
+    def _get_by_ids(model: Any, ids: Iterable[Any]) -> dict[str, Any]:
+        ids = {id_ for id_ in ids if id_}
+        if not ids:
+            return {}
+
+        return {row.id: row for row in db.session.query(model).filter(model.id.in_(ids)).all()}
+
+    @staticmethod
+    def _set_annotation_accounts(annotations: Iterable[MessageAnnotation], accounts: dict[str, Account]) -> None:
+        for annotation in annotations:
+            account = accounts.get(annotation.account_id)
+            set_preloaded(annotation, "account", account)
+            set_preloaded(annotation, "annotation_create_account", account)
@@ -11,7 +11,7 @@ from core.ops.entities.trace_entity import TraceTaskName
 from core.ops.ops_trace_manager import TraceQueueManager, TraceTask
 from core.ops.utils import measure_time
 from extensions.ext_database import db
-from libs.infinite_scroll_pagination import InfiniteScrollPagination
+from libs.infinite_scroll_pagination import InfiniteScrollPagination, keyset_condition, keyset_order_by
 from models.account import Account
 from models.model import App, AppMode, AppModelConfig, EndUser, Message, MessageFeedback
 from services.conversation_service import ConversationService
@@ -60,42 +60,26 @@ class MessageService:
                 db.session.query(Message)
                 .filter(
                     Message.conversation_id == conversation.id,
-                    Message.created_at < first_message.created_at,
-                    Message.id != first_message.id,
+                    keyset_condition(Message.created_at, Message.id, first_message.created_at, first_message.id),
                 )
-                .order_by(Message.created_at.desc())
-                .limit(limit)
+                .order_by(*keyset_order_by(Message.created_at, Message.id))
+                .limit(limit + 1)
                 .all()
             )
         else:
             history_messages = (
                 db.session.query(Message)
                 .filter(Message.conversation_id == conversation.id)
-                .order_by(Message.created_at.desc())
-                .limit(limit)
+                .order_by(*keyset_order_by(Message.created_at, Message.id))
+                .limit(limit + 1)
                 .all()
             )
 
-        has_more = False
-        if len(history_messages) == limit:
-            current_page_first_message = history_messages[-1]
-            rest_count = (
-                db.session.query(Message)
-                .filter(
-                    Message.conversation_id == conversation.id,
-                    Message.created_at < current_page_first_message.created_at,
-                    Message.id != current_page_first_message.id,
-                )
-                .count()
-            )
-
-            if rest_count > 0:
-                has_more = True
-
+        pagination = InfiniteScrollPagination.from_rows(history_messages, limit)
         if order == "asc":
-            history_messages = list(reversed(history_messages))
+            pagination.data = list(reversed(pagination.data))
 
-        return InfiniteScrollPagination(data=history_messages, limit=limit, has_more=has_more)
+        return pagination
 
     @classmethod
     def pagination_by_last_id(
@@ -128,26 +112,13 @@ class MessageService:
             if not last_message:
                 raise LastMessageNotExistsError()
 
-            history_messages = (
-                base_query.filter(Message.created_at < last_message.created_at, Message.id != last_message.id)
-                .order_by(Message.created_at.desc())
-                .limit(limit)
-                .all()
+            base_query = base_query.filter(
+                keyset_condition(Message.created_at, Message.id, last_message.created_at, last_message.id)
             )
-        else:
-            history_messages = base_query.order_by(Message.created_at.desc()).limit(limit).all()
-
-        has_more = False
-        if len(history_messages) == limit:
-            current_page_first_message = history_messages[-1]
-            rest_count = base_query.filter(
-                Message.created_at < current_page_first_message.created_at, Message.id != current_page_first_message.id
-            ).count()
 
-            if rest_count > 0:
-                has_more = True
+        history_messages = base_query.order_by(*keyset_order_by(Message.created_at, Message.id)).limit(limit + 1).all()
 
-        return InfiniteScrollPagination(data=history_messages, limit=limit, has_more=has_more)
+        return InfiniteScrollPagination.from_rows(history_messages, limit)
 
     @classmethod
     def create_feedback(
@@ -0,0 +1,224 @@
+import datetime
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import delete, exists, func, select
+
+from configs import dify_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from libs.infinite_scroll_pagination import keyset_condition
+from models.dataset import Embedding
+from models.model import (
+    App,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageChain,
+    MessageFeedback,
+    MessageFile,
+)
+from models.web import SavedMessage
+from services.feature_service import FeatureService
+
+logger = logging.getLogger(__name__)
+
+# tables of the rows deleted with their messages
+MESSAGE_RELATED_MODELS = (
+    MessageFeedback,
+    MessageAnnotation,
+    MessageChain,
+    MessageAgentThought,
+    MessageFile,
+    SavedMessage,
+)
+
+
+@dataclass
+class PurgeStats:
+    """
+    Rows deleted by a purge, or rows that would be deleted by a dry run
+    """
+
+    dry_run: bool
+    # table name -> rows
+    rows: dict[str, int] = field(default_factory=dict)
+    batches: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    def add(self, table_name: str, count: int) -> None:
+        self.rows[table_name] = self.rows.get(table_name, 0) + count
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.rows.values())
+
+    @property
+    def elapsed_time(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed_time = self.elapsed_time
+        return self.total_rows / elapsed_time if elapsed_time > 0 else 0.0
+
+    def to_report(self) -> str:
+        action = "would be deleted" if self.dry_run else "deleted"
+        tables = ", ".join(f"{table_name}: {count}" for table_name, count in self.rows.items())
+        return (
+            f"{self.total_rows} rows {action} in {self.batches} batches ({tables}), "
+            f"latency: {self.elapsed_time:.2f}s, {self.rows_per_second:.1f} rows/s"
+        )
+
+
+class RetentionPurgeService:
+    """
+    Delete expired messages with their related rows and expired embeddings in set-based batches.
+
+    Messages are deleted in batches of consecutive (created_at, id), the last deleted key is checkpointed in Redis,
+    so a purge stopped before the end resumes after it instead of scanning the kept messages again.
+    """
+
+    MESSAGES_CHECKPOINT_KEY = "retention_purge:messages:checkpoint"
+    CHECKPOINT_EXPIRE = 7 * 24 * 60 * 60
+
+    @classmethod
+    def purge_messages(cls, before: datetime.datetime, batch_size: int, dry_run: bool = False) -> PurgeStats:
+        """
+        Delete the messages created before a time of the tenants on the sandbox plan
+        :param before: messages created before it are expired
+        :param batch_size: number of messages deleted per batch
+        :param dry_run: count the rows that would be deleted, without deleting them
+        """
+        stats = PurgeStats(dry_run=dry_run)
+        kept_tenant_ids = cls._get_kept_tenant_ids(before)
+
+        stmt = select(Message.id, Message.app_id, Message.created_at).where(Message.created_at < before)
+        if kept_tenant_ids:
+            stmt = stmt.where(Message.app_id.not_in(select(App.id).where(App.tenant_id.in_(kept_tenant_ids))))
+        stmt = stmt.order_by(Message.created_at, Message.id).limit(batch_size)
+
+        checkpoint = None if dry_run else cls._load_checkpoint()
+        while True:
+            batch_stmt = stmt
+            if checkpoint:
+                batch_stmt = stmt.where(keyset_condition(Message.created_at, Message.id, *checkpoint, descending=False))
+            rows = db.session.execute(batch_stmt).all()
+            if not rows:
+                break
+
+            message_ids = [row.id for row in rows]
+            app_ids = list({row.app_id for row in rows})
+            for model in MESSAGE_RELATED_MODELS:
+                conditions = [model.message_id.in_(message_ids)]
+                if model is SavedMessage:
+                    # saved messages are indexed by app id first
+                    conditions.append(SavedMessage.app_id.in_(app_ids))
+                stats.add(model.__tablename__, cls._delete(model, conditions, dry_run))
+            stats.add(Message.__tablename__, cls._delete(Message, [Message.id.in_(message_ids)], dry_run))
+
+            checkpoint = (rows[-1].created_at, rows[-1].id)
+            if not dry_run:
+                db.session.commit()
+                cls._save_checkpoint(checkpoint)
+            stats.batches += 1
+            logger.info(f"Message retention purge batch {stats.batches}: {stats.to_report()}")
+
+        if not dry_run:
+            redis_client.delete(cls.MESSAGES_CHECKPOINT_KEY)
+        stats.finished_at = time.perf_counter()
+        return stats
+
+    @classmethod
+    def purge_embeddings(cls, before: datetime.datetime, batch_size: int, dry_run: bool = False) -> PurgeStats:
+        """
+        Delete the cached embeddings created before a time
+        :param before: embeddings created before it are expired
+        :param batch_size: number of embeddings deleted per batch
+        :param dry_run: count the rows that would be deleted, without deleting them
+        """
+        stats = PurgeStats(dry_run=dry_run)
+        stmt = (
+            select(Embedding.id, Embedding.created_at)
+            .where(Embedding.created_at < before)
+            .order_by(Embedding.created_at, Embedding.id)
+            .limit(batch_size)
+        )
+
+        last_key = None
+        while True:
+            batch_stmt = stmt
+            if last_key:
+                batch_stmt = stmt.where(
+                    keyset_condition(Embedding.created_at, Embedding.id, *last_key, descending=False)
+                )
+            rows = db.session.execute(batch_stmt).all()
+            if not rows:
+                break
+
+            embedding_ids = [row.id for row in rows]
+            stats.add(Embedding.__tablename__, cls._delete(Embedding, [Embedding.id.in_(embedding_ids)], dry_run))
+            last_key = (rows[-1].created_at, rows[-1].id)
+            if not dry_run:
+                db.session.commit()
+            stats.batches += 1
+
+        stats.finished_at = time.perf_counter()
+        return stats
+
+    @staticmethod
+    def _delete(model, conditions: Sequence, dry_run: bool) -> int:
+        if dry_run:
+            return db.session.scalar(select(func.count()).select_from(model).where(*conditions)) or 0
+
+        result = db.session.execute(delete(model).where(*conditions).execution_options(synchronize_session=False))
+        return result.rowcount  # type: ignore[attr-defined]
+
+    @classmethod
+    def _get_kept_tenant_ids(cls, before: datetime.datetime) -> list[str]:
+        """
+        Get the tenants with expired messages that are not on the sandbox plan,
+        the plan of each tenant is looked up once per purge
+        """
+        if not dify_config.BILLING_ENABLED:
+            # every tenant is on the sandbox plan without billing
+            return []
+
+        tenant_ids = db.session.scalars(
+            select(App.tenant_id)
+            .distinct()
+            .where(exists().where(Message.app_id == App.id, Message.created_at < before))
+        ).all()
+
+        kept_tenant_ids = []
+        for tenant_id in tenant_ids:
+            features_cache_key = f"features:{tenant_id}"
+            plan_cache = redis_client.get(features_cache_key)
+            if plan_cache is None:
+                features = FeatureService.get_features(tenant_id)
+                redis_client.setex(features_cache_key, 600, features.billing.subscription.plan)
+                plan = features.billing.subscription.plan
+            else:
+                plan = plan_cache.decode()
+            if plan != "sandbox":
+                kept_tenant_ids.append(tenant_id)
+
+        return kept_tenant_ids
+
+    @classmethod
+    def _load_checkpoint(cls) -> Optional[tuple[datetime.datetime, str]]:
+        checkpoint = redis_client.get(cls.MESSAGES_CHECKPOINT_KEY)
+        if not checkpoint:
+            return None
+
+        created_at, _, message_id = checkpoint.decode().partition(" ")
+        return datetime.datetime.fromisoformat(created_at), message_id
+
+    @classmethod
+    def _save_checkpoint(cls, checkpoint: tuple[datetime.datetime, str]) -> None:
+        created_at, message_id = checkpoint
+        redis_client.setex(cls.MESSAGES_CHECKPOINT_KEY, cls.CHECKPOINT_EXPIRE, f"{created_at.isoformat()} {message_id}")
@@ -1,7 +1,7 @@
 from typing import Optional
 
 from extensions.ext_database import db
-from libs.infinite_scroll_pagination import InfiniteScrollPagination
+from libs.infinite_scroll_pagination import InfiniteScrollPagination, keyset_condition, keyset_order_by
 from models.enums import WorkflowRunTriggeredFrom
 from models.model import App
 from models.workflow import (
@@ -70,29 +70,17 @@ class WorkflowRunService:
             if not last_workflow_run:
                 raise ValueError("Last workflow run not exists")
 
-            workflow_runs = (
-                base_query.filter(
-                    WorkflowRun.created_at < last_workflow_run.created_at, WorkflowRun.id != last_workflow_run.id
+            base_query = base_query.filter(
+                keyset_condition(
+                    WorkflowRun.created_at, WorkflowRun.id, last_workflow_run.created_at, last_workflow_run.id
                 )
-                .order_by(WorkflowRun.created_at.desc())
-                .limit(limit)
-                .all()
             )
-        else:
-            workflow_runs = base_query.order_by(WorkflowRun.created_at.desc()).limit(limit).all()
 
-        has_more = False
-        if len(workflow_runs) == limit:
-            current_page_first_workflow_run = workflow_runs[-1]
-            rest_count = base_query.filter(
-                WorkflowRun.created_at < current_page_first_workflow_run.created_at,
-                WorkflowRun.id != current_page_first_workflow_run.id,
-            ).count()
-
-            if rest_count > 0:
-                has_more = True
+        workflow_runs = (
+            base_query.order_by(*keyset_order_by(WorkflowRun.created_at, WorkflowRun.id)).limit(limit + 1).all()
+        )
 
-        return InfiniteScrollPagination(data=workflow_runs, limit=limit, has_more=has_more)
+        return InfiniteScrollPagination.from_rows(workflow_runs, limit)
 
     def get_workflow_run(self, app_model: App, run_id: str) -> Optional[WorkflowRun]:
         """
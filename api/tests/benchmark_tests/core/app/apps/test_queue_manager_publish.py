@@ -0,0 +1,120 @@
+"""
+Stream a 4k-token answer through the app queue managers, with and without the publish fast path,
+and count the Redis ops of a streamed answer with pushed and polled stop signals.
+
+Run with: pytest api/tests/benchmark_tests/core/app/apps/test_queue_manager_publish.py
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from core.app.apps import base_app_queue_manager
+from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
+from core.app.apps.message_based_app_queue_manager import MessageBasedAppQueueManager
+from core.app.apps.task_stop_signal import TaskStopSignal
+from core.app.apps.workflow.app_queue_manager import WorkflowAppQueueManager
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import (
+    QueueLLMChunkEvent,
+    QueueMessageEndEvent,
+    QueueTextChunkEvent,
+    QueueWorkflowSucceededEvent,
+)
+from core.model_runtime.entities.llm_entities import LLMResultChunk, LLMResultChunkDelta
+from core.model_runtime.entities.message_entities import AssistantPromptMessage, UserPromptMessage
+
+ANSWER_TOKENS = 4096
+
+
+def _create_queue_manager(mode: str) -> AppQueueManager:
+    if mode == "message":
+        return MessageBasedAppQueueManager(
+            task_id="task",
+            user_id="user",
+            invoke_from=InvokeFrom.WEB_APP,
+            conversation_id="conversation",
+            app_mode="chat",
+            message_id="message",
+        )
+
+    return WorkflowAppQueueManager(task_id="task", user_id="user", invoke_from=InvokeFrom.WEB_APP, app_mode="workflow")
+
+
+def _create_events(mode: str) -> list:
+    if mode == "message":
+        prompt_messages = [UserPromptMessage(content="Tell me a long story.")]
+        return [
+            QueueLLMChunkEvent(
+                chunk=LLMResultChunk(
+                    model="gpt-4o",
+                    prompt_messages=prompt_messages,
+                    delta=LLMResultChunkDelta(index=index, message=AssistantPromptMessage(content=f"token{index} ")),
+                )
+            )
+            for index in range(ANSWER_TOKENS)
+        ] + [QueueMessageEndEvent()]
+
+    return [QueueTextChunkEvent(text=f"token{index} ") for index in range(ANSWER_TOKENS)] + [
+        QueueWorkflowSucceededEvent(outputs={})
+    ]
+
+
+def _stream(mode: str, events: list) -> None:
+    queue_manager = _create_queue_manager(mode)
+    for event in events:
+        queue_manager.publish(event, PublishFrom.APPLICATION_MANAGER)
+
+    assert sum(1 for _ in queue_manager.listen()) == len(events)
+
+
+class _RedisClient:
+    # cheaper than a MagicMock, so that redis calls do not dominate the measurement
+    def __init__(self):
+        self.op_count = 0
+
+    def setex(self, name, time, value):
+        self.op_count += 1
+
+    def get(self, name):
+        self.op_count += 1
+
+
+@pytest.fixture
+def redis_client():
+    redis_client = _RedisClient()
+    task_stop_signal = TaskStopSignal(stopped_cache_key=AppQueueManager._generate_stopped_cache_key)
+    with (
+        patch("core.app.apps.base_app_queue_manager.redis_client", new=redis_client),
+        patch("core.app.apps.task_stop_signal.redis_client", new=redis_client),
+        patch("core.app.apps.base_app_queue_manager.task_stop_signal", new=task_stop_signal),
+        # the subscriber is connected or not depending on the test
+        patch.object(TaskStopSignal, "_subscribe"),
+    ):
+        task_stop_signal._subscribed = True
+        yield redis_client
+
+
+@pytest.mark.parametrize("fast_path", [False, True])
+@pytest.mark.parametrize("mode", ["message", "workflow"])
+def test_stream_answer(benchmark, redis_client, mode, fast_path):
+    events = _create_events(mode)
+
+    if fast_path:
+        benchmark.pedantic(_stream, args=(mode, events), rounds=10, iterations=1)
+    else:
+        with patch.object(AppQueueManager, "_is_sqlalchemy_safe_event_class", return_value=False):
+            benchmark.pedantic(_stream, args=(mode, events), rounds=10, iterations=1)
+
+
+@pytest.mark.parametrize("stop_signal", ["polled", "pushed"])
+def test_stream_answer_redis_ops(benchmark, redis_client, stop_signal):
+    events = _create_events("workflow")
+    # without a subscriber, stops are polled from redis like before the stop signal
+    base_app_queue_manager.task_stop_signal._subscribed = stop_signal == "pushed"
+
+    redis_client.op_count = 0
+    _stream("workflow", events)
+    benchmark.extra_info["redis_ops_per_request"] = redis_client.op_count
+
+    benchmark.pedantic(_stream, args=("workflow", events), rounds=10, iterations=1)
@@ -0,0 +1,60 @@
+"""
+Encode the SSE frames of a 4k-token streamed answer, converting every chunk like before the frame encoder,
+with the frame encoder, and with the frame encoder coalescing text chunks.
+
+Run with: pytest api/tests/benchmark_tests/core/app/apps/test_stream_frame_encoder.py
+"""
+
+import pytest
+
+from core.app.apps.advanced_chat.generate_response_converter import AdvancedChatAppGenerateResponseConverter
+from core.app.apps.stream_frame_encoder import StreamFrameEncoder
+from core.app.entities.task_entities import ChatbotAppStreamResponse, MessageStreamResponse
+
+ANSWER_TOKENS = 4096
+
+
+def _create_chunks() -> list[ChatbotAppStreamResponse]:
+    return [
+        ChatbotAppStreamResponse(
+            conversation_id="0b4c7f6e-8d4b-4b7e-9b1a-2f6d1c3e5a7b",
+            message_id="5d2e9c1a-7f3b-4c8d-a6e2-1b9f0d4c7e3a",
+            created_at=1700000000,
+            stream_response=MessageStreamResponse(
+                task_id="9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d",
+                id="5d2e9c1a-7f3b-4c8d-a6e2-1b9f0d4c7e3a",
+                answer=f" token{i}",
+            ),
+        )
+        for i in range(ANSWER_TOKENS)
+    ]
+
+
+def _convert_chunk(chunk: ChatbotAppStreamResponse) -> str:
+    return next(AdvancedChatAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+
+def _convert_each_chunk(chunks: list[ChatbotAppStreamResponse]) -> list[str]:
+    frames = []
+    for data in AdvancedChatAppGenerateResponseConverter.convert_stream_full_response(c for c in chunks):
+        frames.append(f"data: {data}\n\n")
+    return frames
+
+
+@pytest.mark.parametrize(
+    "encode",
+    [
+        _convert_each_chunk,
+        lambda chunks: list(StreamFrameEncoder(_convert_chunk).encode(chunks)),
+        lambda chunks: list(StreamFrameEncoder(_convert_chunk, coalesce_window=0.05).encode(chunks)),
+    ],
+    ids=["converter", "encoder", "encoder_coalesced"],
+)
+def test_encode_stream_response(benchmark, encode):
+    chunks = _create_chunks()
+    results = []
+    benchmark.pedantic(lambda: results.append(encode(chunks)), rounds=3, iterations=1)
+
+    frames = results[-1]
+    benchmark.extra_info["frames"] = len(frames)
+    benchmark.extra_info["bytes"] = sum(len(frame) for frame in frames)
@@ -0,0 +1,46 @@
+import contextlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# time the fake sandbox takes to start running a request
+SANDBOX_OVERHEAD = 0.002
+
+
+class _SandboxHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):  # noqa: N802
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(SANDBOX_OVERHEAD)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            exec(request["code"], {})
+
+        body = json.dumps({"code": 0, "message": "success", "data": {"stdout": stdout.getvalue(), "error": ""}})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def sandbox_endpoint():
+    """
+    Endpoint of a local fake code execution sandbox running python code in process
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SandboxHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,49 @@
+"""
+Execute the code of a Code node for every item of an iteration against a local fake sandbox,
+one request per item without connection reuse (as before the pooled client), one request per item
+over the pooled client, and in batches, and record the time per item.
+
+Run with: pytest api/tests/benchmark_tests/core/helper/test_code_executor_batch.py
+"""
+
+from textwrap import dedent
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from core.helper.code_executor.code_executor import CodeExecutor, CodeLanguage
+
+ITEM_COUNT = 64
+
+CODE = dedent("""
+    def main(item: str, index: int) -> dict:
+        return {"result": f"{index}:{item.upper()}"}
+    """)
+
+
+def _run_unpooled(inputs_list):
+    # a new connection per request, like the module level httpx.post used before
+    with patch.object(CodeExecutor, "_get_http_client", new=lambda: httpx):
+        return [CodeExecutor.execute_workflow_code_template(CodeLanguage.PYTHON3, CODE, i) for i in inputs_list]
+
+
+def _run_pooled(inputs_list):
+    return [CodeExecutor.execute_workflow_code_template(CodeLanguage.PYTHON3, CODE, i) for i in inputs_list]
+
+
+def _run_batched(inputs_list):
+    return CodeExecutor.execute_workflow_code_template_batch(CodeLanguage.PYTHON3, CODE, inputs_list)
+
+
+@pytest.mark.parametrize("mode", ["unpooled", "pooled", "batched"])
+def test_code_executor_batch(benchmark, sandbox_endpoint, mode):
+    run = {"unpooled": _run_unpooled, "pooled": _run_pooled, "batched": _run_batched}[mode]
+    inputs_list = [{"item": f"item-{i}", "index": i} for i in range(ITEM_COUNT)]
+
+    with patch("core.helper.code_executor.code_executor.dify_config.CODE_EXECUTION_ENDPOINT", sandbox_endpoint):
+        results = benchmark.pedantic(run, args=(inputs_list,), rounds=5, iterations=1, warmup_rounds=1)
+
+    assert results == [{"result": f"{i}:ITEM-{i}"} for i in range(ITEM_COUNT)]
+    benchmark.extra_info["item_count"] = ITEM_COUNT
+    benchmark.extra_info["ms_per_item"] = round(benchmark.stats.stats.mean / ITEM_COUNT * 1000, 3)
@@ -0,0 +1,42 @@
+"""
+Render the jinja2 template of a template transform node in the code execution sandbox (a local fake sandbox
+over the pooled client) and in process, and record the time per render.
+
+Run with: pytest api/tests/benchmark_tests/core/helper/test_jinja2_render.py
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from core.helper.code_executor.code_executor import CodeExecutor, CodeLanguage
+
+RENDER_COUNT = 100
+
+TEMPLATE = """
+{%- for document in documents %}
+## {{ loop.index }}. {{ document.title | title }}
+{{ document.content | truncate(80) }}
+{% endfor %}
+"""
+
+INPUTS = {"documents": [{"title": f"document {i}", "content": f"content of document {i} " * 10} for i in range(10)]}
+
+
+@pytest.mark.parametrize("render_mode", ["remote", "local"])
+def test_jinja2_render(benchmark, sandbox_endpoint, render_mode):
+    def render():
+        return [
+            CodeExecutor.execute_workflow_code_template(CodeLanguage.JINJA2, TEMPLATE, INPUTS)
+            for _ in range(RENDER_COUNT)
+        ]
+
+    with (
+        patch("core.helper.code_executor.code_executor.dify_config.CODE_EXECUTION_ENDPOINT", sandbox_endpoint),
+        patch("core.helper.code_executor.code_executor.dify_config.JINJA2_RENDER_MODE", render_mode),
+    ):
+        results = benchmark.pedantic(render, rounds=5, iterations=1, warmup_rounds=1)
+
+    assert "## 1. Document 0" in results[0]["result"]
+    benchmark.extra_info["render_count"] = RENDER_COUNT
+    benchmark.extra_info["ms_per_render"] = round(benchmark.stats.stats.mean / RENDER_COUNT * 1000, 3)
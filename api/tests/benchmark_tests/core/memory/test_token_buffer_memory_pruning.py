@@ -0,0 +1,107 @@
+"""
+Load the history of a 500-message conversation over the token limit,
+pruned by recounting the remaining history after each pruned message or with per-message token counts.
+
+Run with: pytest api/tests/benchmark_tests/core/memory/test_token_buffer_memory_pruning.py
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.memory.token_buffer_memory import TokenBufferMemory
+from models.model import AppMode
+
+MESSAGE_COUNT = 500
+MAX_TOKEN_LIMIT = 2000
+
+
+class _ModelInstance:
+    # counts words, so that counting a list of messages costs time linear to its length like a tokenizer
+    provider = "openai"
+    model = "gpt-4o"
+
+    def __init__(self):
+        self.counted_messages = 0
+
+    def get_llm_num_tokens(self, prompt_messages):
+        self.counted_messages += len(prompt_messages)
+        return sum(len(prompt_message.content.split()) for prompt_message in prompt_messages)
+
+
+class _Pipeline:
+    def __init__(self, cache: dict):
+        self._cache = cache
+
+    def setex(self, name, time, value):
+        self._cache[name] = value.encode()
+
+    def execute(self):
+        pass
+
+
+class _RedisClient:
+    def __init__(self):
+        self.cache: dict[str, bytes] = {}
+
+    def mget(self, keys):
+        return [self.cache.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self.cache)
+
+
+def _create_messages() -> list[SimpleNamespace]:
+    # latest first, as queried
+    return [
+        SimpleNamespace(
+            id=f"message-{index}",
+            query=" ".join(["question"] * 20),
+            answer=" ".join(["answer"] * 80),
+            workflow_run_id=None,
+            parent_message_id=f"message-{index - 1}" if index else None,
+        )
+        for index in reversed(range(MESSAGE_COUNT))
+    ]
+
+
+@pytest.mark.parametrize(
+    ("incremental", "warm_cache"), [(False, False), (True, False), (True, True)], ids=["recount", "cold", "warm"]
+)
+def test_get_history_prompt_messages(benchmark, incremental: bool, warm_cache: bool):
+    messages = _create_messages()
+    mock_db = MagicMock()
+    mock_db.session.query.return_value.filter.return_value.order_by.return_value.limit.return_value.all.return_value = (
+        messages
+    )
+    mock_db.session.query.return_value.filter.return_value.all.return_value = []
+    conversation = MagicMock(mode=AppMode.CHAT)
+    model_instance = _ModelInstance()
+    redis_client = _RedisClient()
+
+    def setup():
+        if not warm_cache:
+            redis_client.cache.clear()
+        model_instance.counted_messages = 0
+
+    with (
+        patch("core.memory.token_buffer_memory.db", new=mock_db),
+        patch("core.memory.token_buffer_memory.redis_client", new=redis_client),
+        patch("core.memory.token_buffer_memory.dify_config.MEMORY_INCREMENTAL_TOKEN_COUNT", incremental),
+    ):
+        memory = TokenBufferMemory(conversation=conversation, model_instance=model_instance)  # type: ignore
+        if warm_cache:
+            memory.get_history_prompt_messages(max_token_limit=MAX_TOKEN_LIMIT)
+
+        prompt_messages = benchmark.pedantic(
+            memory.get_history_prompt_messages,
+            kwargs={"max_token_limit": MAX_TOKEN_LIMIT},
+            setup=setup,
+            rounds=5,
+            iterations=1,
+        )
+
+    assert model_instance.get_llm_num_tokens(prompt_messages) <= MAX_TOKEN_LIMIT
+    benchmark.extra_info["prompt_messages"] = len(prompt_messages)
+    benchmark.extra_info["counted_messages"] = model_instance.counted_messages - len(prompt_messages)
@@ -0,0 +1,76 @@
+"""
+Extract the text of a synthetic 2,000 page PDF file serially and with page ranges parsed in a process pool,
+and record the number of pages extracted.
+
+Run with: pytest api/tests/benchmark_tests/core/rag/extractor/test_pdf_extract.py
+"""
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from core.rag.extractor import pdf_extractor
+from core.rag.extractor.pdf_extractor import PdfExtractor
+
+PAGE_COUNT = 2000
+
+
+def _create_pdf(file_path: str, page_count: int) -> None:
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(f"{4 + i * 2} 0 R".encode() for i in range(page_count))
+        + f"] /Count {page_count} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i in range(page_count):
+        # a page of 40 lines of text
+        lines = " ".join(f"({f'Page {i} line {line} of the manual, ' * 3}) Tj 0 -16 Td" for line in range(40))
+        content = f"BT /F1 10 Tf 36 756 Td {lines} ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + i * 2} 0 R"
+            " /Resources << /Font << /F1 3 0 R >> >> >>".encode()
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    Path(file_path).write_bytes(pdf)
+
+
+@pytest.fixture(scope="module")
+def pdf_file_path(tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp("pdf") / "manual.pdf")
+    _create_pdf(file_path, PAGE_COUNT)
+    return file_path
+
+
+@pytest.mark.parametrize("processes", [0, 2, 4])
+def test_pdf_extract(benchmark, pdf_file_path, processes):
+    with (
+        patch("core.rag.extractor.pdf_extractor.dify_config.PDF_EXTRACT_PROCESSES", processes),
+        patch("core.rag.extractor.pdf_extractor._process_pool", new=None),
+    ):
+        page_counts = []
+
+        def extract():
+            page_counts.append(sum(1 for _ in PdfExtractor(pdf_file_path).load()))
+
+        try:
+            # the first round starts the processes of the pool
+            benchmark.pedantic(extract, rounds=3, iterations=1, warmup_rounds=1)
+        finally:
+            if pdf_extractor._process_pool:
+                pdf_extractor._process_pool.shutdown()
+
+    assert page_counts[-1] == PAGE_COUNT
+    benchmark.extra_info["pages"] = page_counts[-1]
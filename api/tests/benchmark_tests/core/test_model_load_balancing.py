@@ -0,0 +1,113 @@
+"""
+Simulate concurrent invocations of a model load balanced over three configs, one of them five times slower,
+with each load balancing strategy, and record the latency and the share of requests of the slow config.
+
+Run with: pytest api/tests/benchmark_tests/core/test_model_load_balancing.py
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from core.entities.provider_entities import ModelLoadBalancingConfiguration
+from core.model_load_balancer import LoadBalancingStrategy, ModelLoadBalancer
+from core.model_manager import LBModelManager
+from core.model_runtime.entities.model_entities import ModelType
+
+# config id -> latency in seconds
+CONFIG_LATENCIES = {"fast-1": 0.01, "fast-2": 0.01, "slow": 0.05}
+CONCURRENCY = 12
+REQUEST_COUNT = 240
+
+
+class _RedisClient:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = 0
+
+    def incr(self, name):
+        with self._lock:
+            self._index += 1
+            return self._index
+
+    def expire(self, name, time):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def pttl(self, name):
+        return -2
+
+    def pipeline(self, transaction=True):
+        return _Pipeline()
+
+
+class _Pipeline:
+    def hset(self, name, mapping):
+        pass
+
+    def expire(self, name, time):
+        pass
+
+    def hgetall(self, name):
+        pass
+
+    def execute(self):
+        return [{}]
+
+
+def _invoke(credentials):
+    time.sleep(CONFIG_LATENCIES[credentials["config_id"]])
+    return credentials["config_id"]
+
+
+def _simulate(lb_model_manager: LBModelManager) -> tuple[Counter, float]:
+    def request():
+        start_at = time.perf_counter()
+        config = lb_model_manager.fetch_next()
+        assert config is not None
+        lb_model_manager.invoke(config, _invoke, credentials=config.credentials)
+        return config.id, time.perf_counter() - start_at
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        results = list(executor.map(lambda _: request(), range(REQUEST_COUNT)))
+
+    return Counter(config_id for config_id, _ in results), sum(latency for _, latency in results) / len(results)
+
+
+@pytest.mark.parametrize("strategy", list(LoadBalancingStrategy))
+def test_load_balancing_strategy(benchmark, strategy: LoadBalancingStrategy):
+    redis_client = _RedisClient()
+    with (
+        patch("core.model_manager.redis_client", new=redis_client),
+        patch("core.model_load_balancer.redis_client", new=redis_client),
+        patch("core.model_manager.dify_config.MODEL_LB_STRATEGY", strategy.value),
+    ):
+        results = []
+
+        def simulate():
+            load_balancing_configs = [
+                ModelLoadBalancingConfiguration(id=config_id, name=config_id, credentials={"config_id": config_id})
+                for config_id in CONFIG_LATENCIES
+            ]
+            lb_model_manager = LBModelManager(
+                tenant_id="tenant",
+                provider="azure_openai",
+                model_type=ModelType.LLM,
+                model="gpt-4o",
+                load_balancing_configs=load_balancing_configs,
+            )
+            results.append(_simulate(lb_model_manager))
+
+        model_load_balancer = ModelLoadBalancer(ewma_decay=0.3, sync_interval=5.0, cooldown_check_interval=1.0)
+        with patch("core.model_manager.model_load_balancer", new=model_load_balancer):
+            benchmark.pedantic(simulate, rounds=3, iterations=1)
+
+    config_counts, mean_latency = results[-1]
+    benchmark.extra_info["slow_config_share"] = round(config_counts["slow"] / REQUEST_COUNT, 3)
+    benchmark.extra_info["mean_latency_ms"] = round(mean_latency * 1000, 2)
@@ -0,0 +1,103 @@
+"""
+Measure event fan-in of a workflow with 50 short parallel branches joining into the end node.
+
+Run with: pytest api/tests/benchmark_tests/core/workflow/graph_engine/test_parallel_fan_in.py
+"""
+
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import pytest
+
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.enums import SystemVariableKey
+from core.workflow.graph_engine.entities.event import GraphRunSucceededEvent, NodeRunSucceededEvent
+from core.workflow.graph_engine.entities.graph import Graph
+from core.workflow.graph_engine.graph_engine import GraphEngine
+from core.workflow.nodes import NodeType
+from models.enums import UserFrom
+from models.workflow import WorkflowType
+
+BRANCH_COUNT = 50
+
+GRAPH_CONFIG = {
+    "edges": [
+        *[{"id": f"start-{index}", "source": "start", "target": f"branch-{index}"} for index in range(BRANCH_COUNT)],
+        *[{"id": f"{index}-end", "source": f"branch-{index}", "target": "end"} for index in range(BRANCH_COUNT)],
+    ],
+    "nodes": [
+        {"data": {"type": "start", "title": "Start", "variables": []}, "id": "start"},
+        *[
+            {
+                "data": {
+                    "type": "variable-aggregator",
+                    "title": f"Branch {index}",
+                    "output_type": "string",
+                    "variables": [["sys", "query"]],
+                },
+                "id": f"branch-{index}",
+            }
+            for index in range(BRANCH_COUNT)
+        ],
+        {
+            "data": {
+                "type": "end",
+                "title": "End",
+                "outputs": [{"value_selector": ["branch-0", "output"], "variable": "output"}],
+            },
+            "id": "end",
+        },
+    ],
+}
+
+
+def _run_graph() -> list[float]:
+    graph = Graph.init(graph_config=GRAPH_CONFIG)
+    variable_pool = VariablePool(
+        system_variables={SystemVariableKey.QUERY: "hi", SystemVariableKey.FILES: [], SystemVariableKey.USER_ID: "aaa"},
+        user_inputs={},
+    )
+    graph_engine = GraphEngine(
+        tenant_id="111",
+        app_id="222",
+        workflow_type=WorkflowType.WORKFLOW,
+        workflow_id="333",
+        graph_config=GRAPH_CONFIG,
+        user_id="444",
+        user_from=UserFrom.ACCOUNT,
+        invoke_from=InvokeFrom.WEB_APP,
+        call_depth=0,
+        graph=graph,
+        variable_pool=variable_pool,
+        max_execution_steps=500,
+        max_execution_time=1200,
+    )
+
+    # latency between a branch node finishing and its event reaching the consumer
+    latencies = []
+    items = []
+    for item in graph_engine.run():
+        if isinstance(item, NodeRunSucceededEvent) and item.node_type == NodeType.VARIABLE_AGGREGATOR:
+            finished_at = item.route_node_state.finished_at
+            assert finished_at is not None
+            latencies.append((datetime.now(UTC).replace(tzinfo=None) - finished_at).total_seconds())
+        items.append(item)
+
+    assert isinstance(items[-1], GraphRunSucceededEvent)
+    assert len(latencies) == BRANCH_COUNT
+    return latencies
+
+
+@pytest.fixture(autouse=True)
+def _mock_db_session():
+    with patch("extensions.ext_database.db.session.remove"), patch("extensions.ext_database.db.session.close"):
+        yield
+
+
+def test_parallel_branches_fan_in(benchmark):
+    latencies = sorted(_run_graph())
+
+    benchmark.extra_info["fan_in_latency_p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 3)
+    benchmark.extra_info["fan_in_latency_max_ms"] = round(latencies[-1] * 1000, 3)
+    benchmark.pedantic(_run_graph, rounds=10, iterations=1)
@@ -0,0 +1,58 @@
+"""
+Compare the deepcopy based variable pool copy with the copy-on-write overlay used by parallel iterations.
+
+Run with: pytest api/tests/benchmark_tests/core/workflow/test_variable_pool_copy.py
+"""
+
+import tracemalloc
+from copy import deepcopy
+
+import pytest
+
+from core.workflow.entities.variable_pool import VariablePool
+
+ITERATION_ITEMS = 1000
+UPSTREAM_DOCUMENTS = 200
+DOCUMENT_SIZE = 4 * 1024
+
+
+def _create_upstream_pool() -> VariablePool:
+    pool = VariablePool(system_variables={}, user_inputs={})
+    documents = [
+        {"content": f"{index}" * DOCUMENT_SIZE, "metadata": {"document_id": str(index), "score": 0.5}}
+        for index in range(UPSTREAM_DOCUMENTS)
+    ]
+    pool.add(("extractor", "documents"), documents)
+    pool.add(("retrieval", "result"), documents)
+    pool.add(("iteration", "item"), documents[0])
+    pool.add(("iteration", "index"), 0)
+    return pool
+
+
+def _run_branches(pool: VariablePool, mode: str) -> list[VariablePool]:
+    # keep every branch pool alive, as a worst case of branches running concurrently
+    branch_pools = []
+    for index in range(ITERATION_ITEMS):
+        branch_pool = deepcopy(pool) if mode == "deepcopy" else pool.create_overlay()
+        branch_pool.add(("iteration", "index"), index)
+        branch_pool.add(("iteration", "item"), {"content": f"item {index}"})
+        branch_pool.add(("code", "result"), f"result {index}")
+        branch_pools.append(branch_pool)
+    return branch_pools
+
+
+@pytest.mark.parametrize("mode", ["deepcopy", "overlay"])
+def test_iteration_branch_pool_copy(benchmark, mode):
+    pool = _create_upstream_pool()
+
+    tracemalloc.start()
+    branch_pools = _run_branches(pool, mode)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert branch_pools[-1].get(("iteration", "index")).value == ITERATION_ITEMS - 1
+    assert len(branch_pools[-1].get(("extractor", "documents")).value) == UPSTREAM_DOCUMENTS
+    del branch_pools
+
+    benchmark.extra_info["peak_memory_bytes"] = peak_memory
+    benchmark.pedantic(_run_branches, args=(pool, mode), rounds=3, iterations=1)
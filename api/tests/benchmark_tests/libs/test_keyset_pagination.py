@@ -0,0 +1,117 @@
+"""
+Page deep into the conversations of an end user in a seeded 1M-row table, with offset pagination
+and a count query for has_more, and with keyset pagination fetching limit + 1 rows.
+
+Uses an in-memory SQLite database, the composite index matches the one of the conversations listing.
+
+Run with: pytest api/tests/benchmark_tests/libs/test_keyset_pagination.py
+"""
+
+import datetime
+import random
+
+import pytest
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    insert,
+    select,
+)
+from sqlalchemy.pool import StaticPool
+
+from libs.infinite_scroll_pagination import InfiniteScrollPagination, keyset_condition, keyset_order_by
+
+ROW_COUNT = 1_000_000
+END_USER_COUNT = 10
+LIMIT = 20
+# pages read from the first page on
+PAGE_COUNT = 200
+
+metadata = MetaData()
+conversations = Table(
+    "conversations",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    Column("from_end_user_id", Integer, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("conversation_from_user_updated_at_idx", "from_end_user_id", "updated_at", "id"),
+)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    metadata.create_all(engine)
+    rng = random.Random(0)
+    start_at = datetime.datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, ROW_COUNT, 100_000):
+            conn.execute(
+                insert(conversations),
+                [
+                    {
+                        "id": f"{i:036d}",
+                        "from_end_user_id": i % END_USER_COUNT,
+                        # seconds resolution, so many conversations share updated_at
+                        "updated_at": start_at + datetime.timedelta(seconds=rng.randrange(ROW_COUNT // 10)),
+                    }
+                    for i in range(offset, offset + 100_000)
+                ],
+            )
+    yield engine
+    engine.dispose()
+
+
+def _paginate_with_offset(conn) -> int:
+    row_count = 0
+    for page in range(PAGE_COUNT):
+        stmt = select(conversations).where(conversations.c.from_end_user_id == 0)
+        rows = conn.execute(
+            stmt.order_by(*keyset_order_by(conversations.c.updated_at, conversations.c.id))
+            .offset(page * LIMIT)
+            .limit(LIMIT)
+        ).all()
+        rest_count = conn.execute(
+            select(func.count()).select_from(stmt.offset((page + 1) * LIMIT).limit(-1).subquery())
+        ).scalar()
+        row_count += len(rows)
+        if not rest_count:
+            break
+    return row_count
+
+
+def _paginate_with_keyset(conn) -> int:
+    row_count = 0
+    last_row = None
+    for _ in range(PAGE_COUNT):
+        stmt = select(conversations).where(conversations.c.from_end_user_id == 0)
+        if last_row:
+            stmt = stmt.where(
+                keyset_condition(conversations.c.updated_at, conversations.c.id, last_row.updated_at, last_row.id)
+            )
+        rows = conn.execute(
+            stmt.order_by(*keyset_order_by(conversations.c.updated_at, conversations.c.id)).limit(LIMIT + 1)
+        ).all()
+        pagination = InfiniteScrollPagination.from_rows(rows, LIMIT)
+        row_count += len(pagination.data)
+        if not pagination.has_more:
+            break
+        last_row = pagination.data[-1]
+    return row_count
+
+
+@pytest.mark.parametrize("paginate", [_paginate_with_offset, _paginate_with_keyset], ids=["offset", "keyset"])
+def test_pagination(benchmark, engine, paginate):
+    results = []
+    with engine.connect() as conn:
+        benchmark.pedantic(lambda: results.append(paginate(conn)), rounds=3, iterations=1)
+
+    assert results[-1] == PAGE_COUNT * LIMIT
+    benchmark.extra_info["rows"] = results[-1]
@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
+from core.app.apps.task_stop_signal import TaskStopSignal
+from core.app.apps.workflow.app_queue_manager import WorkflowAppQueueManager
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import (
+    QueueErrorEvent,
+    QueueLLMChunkEvent,
+    QueueRetrieverResourcesEvent,
+    QueueTextChunkEvent,
+    QueueWorkflowFailedEvent,
+)
+
+
+class _SQLAlchemyModel:
+    _sa_instance_state = None
+
+
+@pytest.fixture
+def queue_manager():
+    redis_client = MagicMock()
+    redis_client.get.return_value = None
+    task_stop_signal = TaskStopSignal(stopped_cache_key=AppQueueManager._generate_stopped_cache_key)
+    with (
+        patch("core.app.apps.base_app_queue_manager.redis_client", new=redis_client),
+        patch("core.app.apps.task_stop_signal.redis_client", new=redis_client),
+        patch("core.app.apps.base_app_queue_manager.task_stop_signal", new=task_stop_signal),
+        patch.object(TaskStopSignal, "_subscribe"),
+    ):
+        yield WorkflowAppQueueManager(
+            task_id="task", user_id="user", invoke_from=InvokeFrom.WEB_APP, app_mode="workflow"
+        )
+
+
+def test_is_sqlalchemy_safe_event_class():
+    assert AppQueueManager._is_sqlalchemy_safe_event_class(QueueTextChunkEvent)
+    assert AppQueueManager._is_sqlalchemy_safe_event_class(QueueLLMChunkEvent)
+    assert not AppQueueManager._is_sqlalchemy_safe_event_class(QueueErrorEvent)
+    assert not AppQueueManager._is_sqlalchemy_safe_event_class(QueueRetrieverResourcesEvent)
+
+
+def test_publish_chunk_skips_check(queue_manager):
+    with patch.object(AppQueueManager, "_check_for_sqlalchemy_models") as check_for_sqlalchemy_models:
+        queue_manager.publish(QueueTextChunkEvent(text="hello"), PublishFrom.APPLICATION_MANAGER)
+        check_for_sqlalchemy_models.assert_not_called()
+
+        queue_manager.publish(QueueRetrieverResourcesEvent(retriever_resources=[{}]), PublishFrom.TASK_PIPELINE)
+        check_for_sqlalchemy_models.assert_called_once()
+
+    queue_manager.publish(QueueWorkflowFailedEvent(error="failed", exceptions_count=0), PublishFrom.TASK_PIPELINE)
+
+    messages = list(queue_manager.listen())
+    assert [type(message.event) for message in messages] == [
+        QueueTextChunkEvent,
+        QueueRetrieverResourcesEvent,
+        QueueWorkflowFailedEvent,
+    ]
+
+
+def test_publish_sqlalchemy_model(queue_manager):
+    with pytest.raises(TypeError):
+        queue_manager.publish(QueueErrorEvent(error=_SQLAlchemyModel()), PublishFrom.TASK_PIPELINE)
@@ -0,0 +1,199 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from flask.globals import app_ctx
+
+from core.app.apps.advanced_chat.generate_response_converter import AdvancedChatAppGenerateResponseConverter
+from core.app.apps.stream_frame_encoder import StreamFrameEncoder
+from core.app.apps.workflow.generate_response_converter import WorkflowAppGenerateResponseConverter
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.task_entities import (
+    ChatbotAppStreamResponse,
+    MessageEndStreamResponse,
+    MessageStreamResponse,
+    PingStreamResponse,
+    TextChunkStreamResponse,
+    WorkflowAppStreamResponse,
+)
+
+TEXTS = ["Hello", ", wörld", ' "quoted"\n', "", "你好 \U0001f600"]
+
+
+def _chatbot_chunks():
+    def chunk(stream_response):
+        return ChatbotAppStreamResponse(
+            conversation_id="conversation", message_id="message", created_at=1700000000, stream_response=stream_response
+        )
+
+    chunks = [chunk(PingStreamResponse(task_id="task"))]
+    chunks += [chunk(MessageStreamResponse(task_id="task", id="message", answer=text)) for text in TEXTS]
+    chunks.append(
+        chunk(MessageStreamResponse(task_id="task", id="message", answer="!", from_variable_selector=["llm", "text"]))
+    )
+    chunks.append(chunk(MessageEndStreamResponse(task_id="task", id="message", metadata={"usage": {}})))
+    return chunks
+
+
+def _workflow_chunks():
+    return [
+        WorkflowAppStreamResponse(
+            workflow_run_id="workflow_run",
+            stream_response=TextChunkStreamResponse(
+                task_id="task", data=TextChunkStreamResponse.Data(text=text, from_variable_selector=["llm", "text"])
+            ),
+        )
+        for text in TEXTS
+    ]
+
+
+def _convert_each_chunk(converter, convert_stream_response, chunks) -> list[str]:
+    """
+    Frames of the chunks converted one at a time, like before the encoder
+    """
+    frames = []
+    for data in convert_stream_response(c for c in chunks):
+        frames.append(f"event: {data}\n\n" if data == "ping" else f"data: {data}\n\n")
+    return frames
+
+
+@pytest.mark.parametrize(
+    ("converter", "chunks"),
+    [
+        (AdvancedChatAppGenerateResponseConverter, _chatbot_chunks()),
+        (WorkflowAppGenerateResponseConverter, _workflow_chunks()),
+    ],
+)
+@pytest.mark.parametrize("invoke_from", [InvokeFrom.SERVICE_API, InvokeFrom.WEB_APP])
+def test_frames_are_the_same_as_converted_frames(converter, chunks, invoke_from):
+    if invoke_from == InvokeFrom.SERVICE_API:
+        expected = _convert_each_chunk(converter, converter.convert_stream_full_response, chunks)
+    else:
+        expected = _convert_each_chunk(converter, converter.convert_stream_simple_response, chunks)
+
+    assert list(converter.convert((c for c in chunks), invoke_from)) == expected
+
+
+def test_text_chunks_are_converted_once_per_kind():
+    converted_chunks = []
+
+    def convert_chunk(chunk):
+        converted_chunks.append(chunk)
+        return next(AdvancedChatAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+    frames = list(StreamFrameEncoder(convert_chunk).encode(_chatbot_chunks()))
+
+    assert len(frames) == len(_chatbot_chunks())
+    # the ping, a template per kind of text chunk and the message end
+    assert len(converted_chunks) == 4
+
+
+def test_coalesce_text_chunks():
+    def convert_chunk(chunk):
+        return next(AdvancedChatAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+    with patch("core.app.apps.stream_frame_encoder.time.monotonic", return_value=100.0):
+        frames = list(StreamFrameEncoder(convert_chunk, coalesce_window=0.05).encode(_chatbot_chunks()))
+
+    expected_chunks = _chatbot_chunks()
+    expected_chunks[1].stream_response.answer = "".join(TEXTS)
+    del expected_chunks[2 : 1 + len(TEXTS)]
+    assert frames == [StreamFrameEncoder._to_frame(convert_chunk(chunk)) for chunk in expected_chunks]
+
+
+def test_coalesce_window_expired():
+    def convert_chunk(chunk):
+        return next(WorkflowAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+    # every text chunk is received after the window of the previous one
+    with patch("core.app.apps.stream_frame_encoder.time.monotonic", side_effect=[float(i) for i in range(20)]):
+        frames = list(StreamFrameEncoder(convert_chunk, coalesce_window=0.5).encode(_workflow_chunks()))
+
+    assert frames == [StreamFrameEncoder._to_frame(convert_chunk(chunk)) for chunk in _workflow_chunks()]
+
+
+def test_coalesce_window_closed_while_waiting_for_chunks():
+    def convert_chunk(chunk):
+        return next(WorkflowAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+    first_frame_sent = threading.Event()
+    first_chunk, second_chunk = _workflow_chunks()[:2]
+
+    def chunks():
+        yield first_chunk
+        # the next chunk is received long after the window, e.g. a slow LLM
+        assert first_frame_sent.wait(timeout=5)
+        yield second_chunk
+
+    frames = StreamFrameEncoder(convert_chunk, coalesce_window=0.05).encode(chunks())
+
+    # the held text is sent when the window closes, without waiting for the next chunk
+    assert next(frames) == StreamFrameEncoder._to_frame(convert_chunk(first_chunk))
+    first_frame_sent.set()
+    assert list(frames) == [StreamFrameEncoder._to_frame(convert_chunk(second_chunk))]
+
+
+def test_coalesce_stream_response_error():
+    def convert_chunk(chunk):
+        return next(WorkflowAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+    def chunks():
+        yield from _workflow_chunks()[:1]
+        raise ValueError("upstream failed")
+
+    frames = StreamFrameEncoder(convert_chunk, coalesce_window=0.05).encode(chunks())
+
+    # held texts are sent before the error of the stream response is raised
+    assert next(frames) == StreamFrameEncoder._to_frame(convert_chunk(_workflow_chunks()[0]))
+    with pytest.raises(ValueError, match="upstream failed"):
+        next(frames)
+
+
+def test_coalesce_reads_in_own_app_context():
+    def convert_chunk(chunk):
+        return next(WorkflowAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+    flask_app = Flask(__name__)
+    reader_app_contexts = []
+
+    def chunks():
+        reader_app_contexts.append(app_ctx._get_current_object())
+        yield from _workflow_chunks()
+
+    with flask_app.app_context() as request_app_context:
+        frames = list(StreamFrameEncoder(convert_chunk, coalesce_window=0.05).encode(chunks()))
+
+    # the app context of the request, and its database session, may be torn down while the response is read
+    assert len(frames) == 1
+    assert reader_app_contexts[0].app is flask_app
+    assert reader_app_contexts[0] is not request_app_context
+
+
+def test_coalesce_reads_ahead_boundedly_and_closes_stream_response():
+    def convert_chunk(chunk):
+        return next(WorkflowAppGenerateResponseConverter.convert_stream_full_response(c for c in (chunk,)))
+
+    read_count = 0
+    stream_response_closed = threading.Event()
+    chunk = _chatbot_chunks()[0]
+
+    def chunks():
+        nonlocal read_count
+        try:
+            while True:
+                read_count += 1
+                yield chunk
+        finally:
+            stream_response_closed.set()
+
+    with patch("core.app.apps.stream_frame_encoder._MAX_READ_AHEAD_CHUNKS", 4):
+        frames = StreamFrameEncoder(convert_chunk, coalesce_window=0.05).encode(chunks())
+        assert next(frames) == StreamFrameEncoder._to_frame(convert_chunk(chunk))
+        time.sleep(0.1)
+
+    # the reader waits for the frames to be sent instead of reading the whole stream response
+    assert read_count <= 6
+    frames.close()
+    assert stream_response_closed.wait(timeout=1)
@@ -0,0 +1,185 @@
+import queue
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
+from core.app.apps.task_stop_signal import TaskStopSignal
+from core.app.apps.workflow.app_queue_manager import WorkflowAppQueueManager
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.app.entities.queue_entities import QueueStopEvent, QueueTextChunkEvent
+
+
+class _FakePubSub:
+    def __init__(self, redis: "_FakeRedis") -> None:
+        self._redis = redis
+        self._messages: queue.Queue = queue.Queue()
+
+    def subscribe(self, channel: str) -> None:
+        self._redis.subscribers.setdefault(channel, []).append(self._messages)
+        self._messages.put({"type": "subscribe", "channel": channel, "data": 1})
+
+    def get_message(self, timeout: float):
+        try:
+            return self._messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def ping(self) -> None:
+        if self._redis.pong:
+            self._messages.put({"type": "pong", "channel": None, "data": b""})
+
+    def close(self) -> None:
+        pass
+
+
+class _FakePipeline:
+    def __init__(self, redis: "_FakeRedis") -> None:
+        self._redis = redis
+        self._keys: list[str] = []
+
+    def get(self, name: str) -> None:
+        self._keys.append(name)
+
+    def execute(self) -> list:
+        return [self._redis.get(key) for key in self._keys]
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.subscribers: dict[str, list[queue.Queue]] = {}
+        self.get_count = 0
+        self.pong = True
+
+    def setex(self, name: str, time: int, value) -> None:
+        self.data[name] = str(value).encode()
+
+    def get(self, name: str):
+        self.get_count += 1
+        return self.data.get(name)
+
+    def publish(self, channel: str, message: str) -> None:
+        for messages in self.subscribers.get(channel, []):
+            messages.put({"type": "message", "channel": channel, "data": message.encode()})
+
+    def pubsub(self) -> _FakePubSub:
+        return _FakePubSub(self)
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+
+@pytest.fixture
+def redis_client():
+    redis_client = _FakeRedis()
+    with (
+        patch("core.app.apps.base_app_queue_manager.redis_client", new=redis_client),
+        patch("core.app.apps.task_stop_signal.redis_client", new=redis_client),
+    ):
+        yield redis_client
+
+
+@pytest.fixture
+def task_stop_signal(redis_client):
+    task_stop_signal = TaskStopSignal(stopped_cache_key=AppQueueManager._generate_stopped_cache_key)
+    with patch("core.app.apps.base_app_queue_manager.task_stop_signal", new=task_stop_signal):
+        yield task_stop_signal
+
+
+def _wait_until(condition) -> None:
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _create_queue_manager(task_id: str) -> WorkflowAppQueueManager:
+    return WorkflowAppQueueManager(task_id=task_id, user_id="user", invoke_from=InvokeFrom.WEB_APP, app_mode="workflow")
+
+
+def test_stop_is_pushed(redis_client, task_stop_signal):
+    queue_manager = _create_queue_manager("task-1")
+    _wait_until(lambda: task_stop_signal._subscribed)
+
+    redis_client.get_count = 0
+    for _ in range(100):
+        queue_manager.publish(QueueTextChunkEvent(text="hi"), PublishFrom.APPLICATION_MANAGER)
+
+    # checking the stop flag does not hit redis once subscribed
+    assert redis_client.get_count == 0
+
+    AppQueueManager.set_stop_flag("task-1", InvokeFrom.WEB_APP, "user")
+    _wait_until(lambda: queue_manager._is_stopped())
+
+    # the listener is woken up by the stop, without waiting for a message or ping
+    messages = list(queue_manager.listen())
+    assert isinstance(messages[-1].event, QueueStopEvent)
+    assert len(messages) == 101
+
+
+def test_stop_before_subscribed(redis_client, task_stop_signal):
+    with patch.object(TaskStopSignal, "_subscribe"):
+        queue_manager = _create_queue_manager("task-2")
+
+    # falls back to the stop flag key while not subscribed
+    assert not queue_manager._is_stopped()
+    AppQueueManager.set_stop_flag("task-2", InvokeFrom.WEB_APP, "user")
+    assert queue_manager._is_stopped()
+
+
+def test_missed_stop_is_synced_on_subscribe(redis_client, task_stop_signal):
+    with patch.object(TaskStopSignal, "_subscribe"):
+        queue_manager = _create_queue_manager("task-3")
+
+    AppQueueManager.set_stop_flag("task-3", InvokeFrom.WEB_APP, "user")
+    task_stop_signal._on_subscribed()
+
+    redis_client.get_count = 0
+    assert queue_manager._is_stopped()
+    assert redis_client.get_count == 0
+
+
+def test_stop_of_other_task(redis_client, task_stop_signal):
+    queue_manager = _create_queue_manager("task-4")
+    _wait_until(lambda: task_stop_signal._subscribed)
+
+    task_stop_signal._on_message(b"unknown-task")
+    assert not queue_manager._is_stopped()
+
+
+def test_stop_flag_is_polled_without_heartbeat(redis_client, task_stop_signal):
+    redis_client.pong = False
+    with (
+        patch.object(TaskStopSignal, "HEARTBEAT_INTERVAL", 0.05),
+        patch.object(TaskStopSignal, "HEARTBEAT_TIMEOUT", 0.2),
+    ):
+        queue_manager = _create_queue_manager("task-5")
+        _wait_until(lambda: task_stop_signal._subscribed)
+
+        # the subscription went silent, e.g. the connection dropped, stops are not pushed anymore
+        redis_client.subscribers.clear()
+        redis_client.data[AppQueueManager._generate_stopped_cache_key("task-5")] = b"1"
+
+        _wait_until(lambda: queue_manager._is_stopped())
+
+
+def test_reconnect_backs_off_and_logs_once(task_stop_signal):
+    sleeps = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        if len(sleeps) == 8:
+            raise SystemExit
+
+    with (
+        patch("core.app.apps.task_stop_signal.redis_client.pubsub", side_effect=ConnectionError("Redis is down")),
+        patch("core.app.apps.task_stop_signal.time.sleep", new=sleep),
+        patch("core.app.apps.task_stop_signal.logger") as logger,
+        pytest.raises(SystemExit),
+    ):
+        task_stop_signal._subscribe()
+
+    assert logger.exception.call_count == 1
+    assert sleeps == [1, 2, 4, 8, 16, 30, 30, 30]
@@ -0,0 +1,153 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.features.rate_limiting.rate_limit import _ADMIT_SCRIPT, _EXIT_SCRIPT, _LEAVE_SCRIPT, RateLimit
+from core.errors.error import AppInvokeQuotaExceededError
+
+
+@pytest.fixture
+def mock_redis_client():
+    mock_redis_client = MagicMock()
+    mock_redis_client.exists.return_value = False
+    mock_redis_client.blpop.return_value = None
+    scripts = {_ADMIT_SCRIPT: MagicMock(), _LEAVE_SCRIPT: MagicMock(), _EXIT_SCRIPT: MagicMock()}
+    mock_redis_client.register_script.side_effect = scripts.__getitem__
+    mock_redis_client.scripts = scripts
+    with (
+        patch("core.app.features.rate_limiting.rate_limit.redis_client", new=mock_redis_client),
+        patch.object(RateLimit, "_instance_dict", {}),
+        patch.object(RateLimit, "_scripts", {}),
+    ):
+        yield mock_redis_client
+
+
+def test_keys_share_hash_tag(mock_redis_client):
+    rate_limit = RateLimit("app-1", 2)
+
+    assert rate_limit.active_requests_key == "dify:rate_limit:{app-1}:active_requests"
+    assert rate_limit.waiting_requests_key == "dify:rate_limit:{app-1}:waiting_requests"
+    assert rate_limit._admitted_request_key("request-1") == "dify:rate_limit:{app-1}:admitted_request:request-1"
+
+
+def test_enter_is_admitted_atomically(mock_redis_client):
+    admit_script = mock_redis_client.scripts[_ADMIT_SCRIPT]
+    admit_script.return_value = 1
+    rate_limit = RateLimit("app-1", 2)
+
+    assert rate_limit.enter("request-1") == "request-1"
+
+    # admission is a single script call instead of HLEN and HSET
+    admit_script.assert_called_once()
+    assert admit_script.call_args.kwargs["keys"] == [
+        rate_limit.active_requests_key,
+        rate_limit.waiting_requests_key,
+        rate_limit._admitted_request_key("request-1"),
+    ]
+    assert admit_script.call_args.kwargs["args"][0] == "request-1"
+    assert admit_script.call_args.kwargs["args"][3] == 2
+    mock_redis_client.hlen.assert_not_called()
+    mock_redis_client.blpop.assert_not_called()
+    assert RateLimit.get_metrics()["app-1"]["admitted_count"] == 1
+
+
+def test_enter_is_rejected_without_waiting(mock_redis_client):
+    mock_redis_client.scripts[_ADMIT_SCRIPT].return_value = -1
+    rate_limit = RateLimit("app-1", 2)
+
+    with pytest.raises(AppInvokeQuotaExceededError):
+        rate_limit.enter("request-1")
+
+    mock_redis_client.scripts[_ADMIT_SCRIPT].assert_called_once()
+    mock_redis_client.blpop.assert_not_called()
+    assert RateLimit.get_metrics()["app-1"]["rejected_count"] == 1
+
+
+def test_enter_is_woken_by_exit(mock_redis_client):
+    mock_redis_client.scripts[_ADMIT_SCRIPT].return_value = 0
+    mock_redis_client.blpop.return_value = (b"key", b"1")
+    rate_limit = RateLimit("app-1", 2)
+
+    with patch("core.app.features.rate_limiting.rate_limit.dify_config.APP_MAX_WAIT_TIME", 5.0):
+        assert rate_limit.enter("request-1") == "request-1"
+
+    # the waiter blocks on its own key instead of polling the admission
+    mock_redis_client.scripts[_ADMIT_SCRIPT].assert_called_once()
+    mock_redis_client.blpop.assert_called_once()
+    assert mock_redis_client.blpop.call_args.args[0] == [rate_limit._admitted_request_key("request-1")]
+    assert mock_redis_client.blpop.call_args.kwargs["timeout"] == RateLimit._WAIT_RECHECK_INTERVAL
+    metrics = RateLimit.get_metrics()["app-1"]
+    assert metrics["admitted_count"] == 1
+    assert metrics["queued_admitted_count"] == 1
+
+
+def test_enter_rechecks_admission(mock_redis_client):
+    mock_redis_client.scripts[_ADMIT_SCRIPT].side_effect = [0, 0, 1]
+    rate_limit = RateLimit("app-1", 2)
+
+    with patch("core.app.features.rate_limiting.rate_limit.dify_config.APP_MAX_WAIT_TIME", 5.0):
+        assert rate_limit.enter("request-1") == "request-1"
+
+    assert mock_redis_client.scripts[_ADMIT_SCRIPT].call_count == 3
+    assert mock_redis_client.blpop.call_count == 2
+
+
+@pytest.mark.parametrize(("leave_result", "admitted"), [(-1, False), (1, True)])
+def test_enter_leaves_queue_on_timeout(mock_redis_client, leave_result, admitted):
+    mock_redis_client.scripts[_ADMIT_SCRIPT].return_value = 0
+    leave_script = mock_redis_client.scripts[_LEAVE_SCRIPT]
+    leave_script.return_value = leave_result
+    rate_limit = RateLimit("app-1", 2)
+
+    with patch("core.app.features.rate_limiting.rate_limit.dify_config.APP_MAX_WAIT_TIME", 0.01):
+        if admitted:
+            # admitted by an exit right before leaving
+            assert rate_limit.enter("request-1") == "request-1"
+        else:
+            with pytest.raises(AppInvokeQuotaExceededError):
+                rate_limit.enter("request-1")
+
+    leave_script.assert_called_once()
+    assert leave_script.call_args.kwargs["args"] == ["request-1"]
+    metrics = RateLimit.get_metrics()["app-1"]
+    assert metrics["queued_admitted_count" if admitted else "queued_rejected_count"] == 1
+
+
+def test_exit_hands_over_slot(mock_redis_client):
+    exit_script = mock_redis_client.scripts[_EXIT_SCRIPT]
+    exit_script.return_value = [b"request-2", b"request-3"]
+    rate_limit = RateLimit("app-1", 2)
+    mock_redis_client.pipeline.reset_mock()
+
+    rate_limit.exit("request-1")
+
+    # the script only touches the keys it declares, the admitted waiters are woken afterwards
+    exit_script.assert_called_once()
+    assert exit_script.call_args.kwargs["keys"] == [rate_limit.active_requests_key, rate_limit.waiting_requests_key]
+    assert exit_script.call_args.kwargs["args"][0] == "request-1"
+    pipe = mock_redis_client.pipeline.return_value.__enter__.return_value
+    assert [call.args[0] for call in pipe.rpush.call_args_list] == [
+        rate_limit._admitted_request_key("request-2"),
+        rate_limit._admitted_request_key("request-3"),
+    ]
+    pipe.execute.assert_called_once()
+
+
+def test_exit_without_waiters(mock_redis_client):
+    mock_redis_client.scripts[_EXIT_SCRIPT].return_value = []
+    rate_limit = RateLimit("app-1", 2)
+    mock_redis_client.pipeline.reset_mock()
+
+    rate_limit.exit("request-1")
+
+    mock_redis_client.pipeline.assert_not_called()
+
+
+def test_unlimited(mock_redis_client):
+    rate_limit = RateLimit("app-1", 0)
+
+    request_id = rate_limit.enter()
+    rate_limit.exit(request_id)
+
+    mock_redis_client.register_script.assert_not_called()
+    mock_redis_client.hdel.assert_not_called()
@@ -0,0 +1,109 @@
+from datetime import UTC, datetime
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateTable
+
+from core.app.task_pipeline.workflow_node_execution_writer import WorkflowNodeExecutionWriter
+from models.workflow import WorkflowNodeExecution, WorkflowNodeExecutionStatus
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    # sqlite does not support the uuid_generate_v4() server default
+    ddl = str(CreateTable(WorkflowNodeExecution.__table__).compile(engine))
+    with engine.begin() as conn:
+        conn.exec_driver_sql(ddl.replace(" DEFAULT uuid_generate_v4()", ""))
+    return engine
+
+
+def _create_workflow_node_execution(index: int) -> WorkflowNodeExecution:
+    # StringUUID columns are bound as UUID hex values by sqlite
+    workflow_node_execution = WorkflowNodeExecution()
+    workflow_node_execution.id = uuid4()
+    workflow_node_execution.tenant_id = uuid4()
+    workflow_node_execution.app_id = uuid4()
+    workflow_node_execution.workflow_id = uuid4()
+    workflow_node_execution.triggered_from = "workflow-run"
+    workflow_node_execution.workflow_run_id = uuid4()
+    workflow_node_execution.index = index
+    workflow_node_execution.node_execution_id = str(uuid4())
+    workflow_node_execution.node_id = f"node-{index}"
+    workflow_node_execution.node_type = "code"
+    workflow_node_execution.title = f"Node {index}"
+    workflow_node_execution.status = WorkflowNodeExecutionStatus.RUNNING.value
+    workflow_node_execution.created_by_role = "account"
+    workflow_node_execution.created_by = uuid4()
+    workflow_node_execution.created_at = datetime.now(UTC).replace(tzinfo=None)
+    return workflow_node_execution
+
+
+def _load_statuses(engine) -> dict[str, str]:
+    with Session(engine) as session:
+        rows = session.execute(select(WorkflowNodeExecution.id, WorkflowNodeExecution.status)).all()
+    return {row.id: row.status for row in rows}
+
+
+def test_write_behind(engine):
+    writer = WorkflowNodeExecutionWriter(engine=engine, flush_interval=60, batch_size=100)
+    workflow_node_executions = [_create_workflow_node_execution(i) for i in range(3)]
+    for workflow_node_execution in workflow_node_executions:
+        writer.add(workflow_node_execution)
+
+    # nothing is saved before the flush interval
+    assert _load_statuses(engine) == {}
+
+    # started and finished before a save
+    workflow_node_executions[0].status = WorkflowNodeExecutionStatus.SUCCEEDED.value
+    workflow_node_executions[0].outputs = '{"result": 1}'
+    writer.add(workflow_node_executions[0])
+    writer._flush()
+    assert _load_statuses(engine) == {
+        workflow_node_executions[0].id.hex: WorkflowNodeExecutionStatus.SUCCEEDED.value,
+        workflow_node_executions[1].id.hex: WorkflowNodeExecutionStatus.RUNNING.value,
+        workflow_node_executions[2].id.hex: WorkflowNodeExecutionStatus.RUNNING.value,
+    }
+
+    workflow_node_executions[1].status = WorkflowNodeExecutionStatus.FAILED.value
+    workflow_node_executions[1].error = "error"
+    writer.add(workflow_node_executions[1])
+    writer.close()
+
+    assert _load_statuses(engine)[workflow_node_executions[1].id.hex] == WorkflowNodeExecutionStatus.FAILED.value
+    with Session(engine) as session:
+        saved = session.get(WorkflowNodeExecution, workflow_node_executions[1].id)
+        assert saved is not None
+        assert saved.error == "error"
+        assert saved.title == "Node 1"
+
+
+def test_flush_on_batch_size(engine):
+    writer = WorkflowNodeExecutionWriter(engine=engine, flush_interval=60, batch_size=2)
+    workflow_node_executions = [_create_workflow_node_execution(i) for i in range(2)]
+    with patch.object(writer, "_flush", wraps=writer._flush) as flush:
+        for workflow_node_execution in workflow_node_executions:
+            writer.add(workflow_node_execution)
+        writer._thread.join(timeout=0.5)
+
+        flush.assert_called()
+    assert len(_load_statuses(engine)) == 2
+    writer.close()
+
+
+def test_keep_rows_when_save_fails(engine):
+    writer = WorkflowNodeExecutionWriter(engine=engine, flush_interval=60, batch_size=100)
+    workflow_node_execution = _create_workflow_node_execution(0)
+    writer.add(workflow_node_execution)
+
+    with patch("core.app.task_pipeline.workflow_node_execution_writer.Session.execute", side_effect=ConnectionError()):
+        with pytest.raises(ConnectionError):
+            writer._flush()
+
+    assert _load_statuses(engine) == {}
+    writer.close()
+    assert _load_statuses(engine) == {workflow_node_execution.id.hex: WorkflowNodeExecutionStatus.RUNNING.value}
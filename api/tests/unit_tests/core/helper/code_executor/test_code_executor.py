@@ -0,0 +1,162 @@
+import contextlib
+import io
+from textwrap import dedent
+from unittest.mock import patch
+
+import pytest
+
+from core.helper.code_executor.code_execution_prefetcher import CodeExecutionPrefetcher
+from core.helper.code_executor.code_executor import (
+    CodeExecutionError,
+    CodeExecutionResponse,
+    CodeExecutor,
+    CodeLanguage,
+)
+
+CODE = dedent("""
+    def main(a: int, b: int) -> dict:
+        return {"result": a // b}
+    """)
+
+
+class FakeSandbox:
+    """
+    Run python runner scripts in process, the output printed before an error is returned with the error
+    """
+
+    def __init__(self):
+        self.requests = 0
+
+    def run_code(self, language, preload, code):
+        self.requests += 1
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            try:
+                exec(code, {})
+            except BaseException as e:
+                return CodeExecutionResponse.Data(stdout=stdout.getvalue(), error=repr(e))
+        return CodeExecutionResponse.Data(stdout=stdout.getvalue(), error="")
+
+
+@pytest.fixture
+def sandbox():
+    sandbox = FakeSandbox()
+    with (
+        patch.object(CodeExecutor, "_run_code", new=sandbox.run_code),
+        patch("core.helper.code_executor.code_executor.dify_config.CODE_EXECUTION_BATCH_SIZE", 16),
+    ):
+        yield sandbox
+
+
+def test_execute_workflow_code_template_batch(sandbox):
+    inputs_list = [{"a": i, "b": 1 if i != 3 else 0} for i in range(20)]
+
+    with patch("core.helper.code_executor.code_executor.dify_config.CODE_EXECUTION_BATCH_SIZE", 8):
+        results = CodeExecutor.execute_workflow_code_template_batch(CodeLanguage.PYTHON3, CODE, inputs_list)
+
+    assert sandbox.requests == 3
+    assert len(results) == 20
+    assert isinstance(results[3], CodeExecutionError)
+    assert "ZeroDivisionError" in str(results[3])
+    assert [result for i, result in enumerate(results) if i != 3] == [{"result": i} for i in range(20) if i != 3]
+
+
+def test_execute_workflow_code_template_batch_stop_on_error(sandbox):
+    inputs_list = [{"a": i, "b": 1 if i != 3 else 0} for i in range(20)]
+
+    with patch("core.helper.code_executor.code_executor.dify_config.CODE_EXECUTION_BATCH_SIZE", 2):
+        results = CodeExecutor.execute_workflow_code_template_batch(
+            CodeLanguage.PYTHON3, CODE, inputs_list, stop_on_error=True
+        )
+
+    # the inputs after the first error are not executed
+    assert sandbox.requests == 2
+    assert results[:3] == [{"result": 0}, {"result": 1}, {"result": 2}]
+    assert len(results) == 4
+    assert isinstance(results[3], CodeExecutionError)
+
+
+def test_execute_workflow_code_template_batch_in_fresh_namespaces(sandbox):
+    code = dedent("""
+        calls = []
+
+        def main(a: int) -> dict:
+            calls.append(a)
+            return {"calls": len(calls)}
+        """)
+
+    results = CodeExecutor.execute_workflow_code_template_batch(CodeLanguage.PYTHON3, code, [{"a": 1}, {"a": 2}])
+
+    assert sandbox.requests == 1
+    assert results == [{"calls": 1}, {"calls": 1}]
+
+
+def test_execute_workflow_code_template_batch_run_failed(sandbox):
+    code = dedent("""
+        def main(a: int) -> dict:
+            if a == 2:
+                raise SystemExit("killed")
+            return {"result": a}
+        """)
+
+    results = CodeExecutor.execute_workflow_code_template_batch(
+        CodeLanguage.PYTHON3, code, [{"a": 1}, {"a": 2}, {"a": 3}]
+    )
+
+    # the execution the run failed in and the executions after it are left to be executed on their own
+    assert sandbox.requests == 1
+    assert results == [{"result": 1}]
+
+
+def test_execute_workflow_code_template_batch_request_failed(sandbox):
+    with patch.object(CodeExecutor, "_run_code", side_effect=CodeExecutionError("network issue")):
+        results = CodeExecutor.execute_workflow_code_template_batch(CodeLanguage.PYTHON3, CODE, [{"a": 1, "b": 1}] * 3)
+
+    # any execution may have been done, so none is done again
+    assert len(results) == 3
+    assert all(isinstance(result, CodeExecutionError) for result in results)
+
+
+def test_execute_workflow_code_template_batch_without_batch_runner(sandbox):
+    results = CodeExecutor.execute_workflow_code_template_batch(CodeLanguage.JINJA2, "{{ a }}", [{"a": 1}, {"a": 2}])
+
+    assert sandbox.requests == 2
+    assert results == [{"result": "1"}, {"result": "2"}]
+
+
+def test_prefetcher(sandbox):
+    inputs_list = [{"a": i, "b": 1} for i in range(5)]
+    with patch("core.helper.code_executor.code_execution_prefetcher.dify_config.CODE_EXECUTION_BATCH_SIZE", 2):
+        prefetcher = CodeExecutionPrefetcher(
+            language=CodeLanguage.PYTHON3, code=CODE, inputs_list=inputs_list, index_selector=["iteration", "index"]
+        )
+
+    # a batch is executed when its first execution is taken
+    assert sandbox.requests == 0
+    assert prefetcher.take(0, inputs_list[0]) == {"result": 0}
+    assert sandbox.requests == 1
+    assert prefetcher.take(1, inputs_list[1]) == {"result": 1}
+    assert prefetcher.take(3, inputs_list[3]) == {"result": 3}
+    assert sandbox.requests == 2
+
+    # results are taken once, by the execution of their own index and inputs
+    assert prefetcher.take(3, inputs_list[3]) is None
+    assert prefetcher.take(2, {"a": 2, "b": 2}) is None
+    assert prefetcher.take(5, inputs_list[0]) is None
+    assert sandbox.requests == 2
+
+
+def test_prefetcher_stop_on_error(sandbox):
+    inputs_list = [{"a": 1, "b": 0}, {"a": 2, "b": 1}]
+    prefetcher = CodeExecutionPrefetcher(
+        language=CodeLanguage.PYTHON3,
+        code=CODE,
+        inputs_list=inputs_list,
+        index_selector=["iteration", "index"],
+        stop_on_error=True,
+    )
+
+    assert isinstance(prefetcher.take(0, inputs_list[0]), CodeExecutionError)
+    # not executed after the error, it is executed as usual if it is run
+    assert prefetcher.take(1, inputs_list[1]) is None
+    assert sandbox.requests == 1
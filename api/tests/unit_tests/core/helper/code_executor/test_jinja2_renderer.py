@@ -0,0 +1,96 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.helper.code_executor.code_executor import CodeExecutionError, CodeExecutor, CodeLanguage
+from core.helper.code_executor.jinja2.jinja2_renderer import Jinja2Renderer, Jinja2RenderError
+
+
+@pytest.fixture
+def renderer():
+    return Jinja2Renderer(cache_size=2, max_output_length=100, timeout=0.5)
+
+
+def test_render(renderer):
+    template = "{% for item in items %}{{ item.name }}{% if not loop.last %}, {% endif %}{% endfor %}"
+
+    assert renderer.render(template, {"items": [{"name": "a"}, {"name": "b"}]}) == "a, b"
+    assert renderer.render("{{ missing }}", {}) == ""
+
+
+def test_render_template_cache(renderer):
+    for template in ["{{ a }}", "{{ b }}", "{{ a }}", "{{ c }}"]:
+        renderer.render(template, {})
+
+    # least recently used template is evicted
+    assert len(renderer._templates) == 2
+    with patch.object(renderer._environment, "from_string", wraps=renderer._environment.from_string) as from_string:
+        renderer.render("{{ a }}", {})
+        renderer.render("{{ b }}", {})
+    assert from_string.call_count == 1
+
+
+def test_render_errors(renderer):
+    with pytest.raises(Jinja2RenderError, match="TemplateSyntaxError"):
+        renderer.render("{% for %}", {})
+
+    with pytest.raises(Jinja2RenderError, match="SecurityError"):
+        renderer.render("{{ ''.__class__.__mro__ }}", {})
+
+    with pytest.raises(Jinja2RenderError, match="output length exceeds"):
+        renderer.render("{% for i in range(1000) %}{{ i }}{% endfor %}", {})
+
+    with pytest.raises(Jinja2RenderError, match="timed out"):
+        renderer.render("{% for i in range(100000) %}{% for j in range(100000) %}{% endfor %}{% endfor %}", {})
+
+
+@pytest.mark.parametrize(
+    ("template", "message"),
+    [
+        ("{{ 'x' * 10**10 }}", "Sequence repetition exceeds"),
+        ("{{ [1] * 10**10 }}", "Sequence repetition exceeds"),
+        ("{{ 10 ** (10 ** 8) }}", "Integer power exceeds"),
+        ("{{ (10 ** 4000) * (10 ** 4000) }}", "Integer multiplication exceeds"),
+        ("{{ '%0500000000d' % 1 }}", "String formatting result exceeds"),
+        ("{{ '%*d' % (500000000, 1) }}", "String formatting result exceeds"),
+        ("{{ '%0500000000d'|format(1) }}", "Filter format result exceeds"),
+        ("{{ 'x'|center(500000000) }}", "Filter center result exceeds"),
+        ("{{ 'ab'|replace('a', 'a' * 50)|replace('a', 'a' * 50) }}", "Filter replace result exceeds"),
+        ("{{ 'a\nb'|indent(10**9) }}", "Filter indent result exceeds"),
+        ("{{ 'a b c'|wordwrap(1, wrapstring='x' * 50) }}", "Filter wordwrap result exceeds"),
+        ("{{ '{:>999999999}'.format(1) }}", "String method format result exceeds"),
+        ("{{ '{:>{w}}'.format(1, w=999999999) }}", "String method format result exceeds"),
+        ("{{ 'x'.ljust(10**9) }}", "String method ljust result exceeds"),
+        ("{{ 'x'.zfill(10**9) }}", "String method zfill result exceeds"),
+        ("{{ 'ab'.replace('', 'x' * 50) }}", "String method replace result exceeds"),
+    ],
+)
+def test_render_oversized_operations(renderer, template, message):
+    # single operations can not be interrupted by the deadline, they are refused before they are computed
+    with pytest.raises(Jinja2RenderError, match=message):
+        renderer.render(template, {})
+
+
+def test_render_operations(renderer):
+    assert renderer.render("{{ 'ab' * 3 }} {{ 2 ** 10 }} {{ 6 * 7 }} {{ 2.5 * 2 }}", {}) == "ababab 1024 42 5.0"
+    # power is left associative in jinja2, (10 ** 10) ** 8
+    assert renderer.render("{{ 10 ** 10 ** 8 }}", {}) == str(10**80)
+    assert renderer.render("{{ '%05d' % 3 }} {{ '%s-%s' % ('a', 'b') }} {{ 7 % 4 }}", {}) == "00003 a-b 3"
+    assert renderer.render("{{ 'x'|center(5) }}|{{ 'aba'|replace('a', 'c') }}|{{ '%.2f'|format(1) }}", {}) == (
+        "  x  |cbc|1.00"
+    )
+    assert renderer.render("{{ 'a b c'|wordwrap(1) }}|{{ 'a\nb'|indent(2) }}", {}) == "a\nb\nc|a\n  b"
+    assert renderer.render("{{ '{:>3}'.format(1) }}|{{ 'x'.rjust(3, '-') }}|{{ '5'.zfill(3) }}", {}) == "  1|--x|005"
+
+
+def test_execute_workflow_code_template_local():
+    with (
+        patch("core.helper.code_executor.code_executor.dify_config.JINJA2_RENDER_MODE", "local"),
+        patch.object(CodeExecutor, "execute_code") as execute_code,
+    ):
+        result = CodeExecutor.execute_workflow_code_template(CodeLanguage.JINJA2, "Hello {{ name }}", {"name": "Dify"})
+        with pytest.raises(CodeExecutionError):
+            CodeExecutor.execute_workflow_code_template(CodeLanguage.JINJA2, "{{ 1 / 0 }}", {})
+
+    assert result == {"result": "Hello Dify"}
+    execute_code.assert_not_called()
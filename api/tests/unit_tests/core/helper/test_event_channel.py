@@ -0,0 +1,68 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from core.helper.event_channel import EventChannel
+
+
+def test_closed_when_watched_futures_done():
+    channel: EventChannel[int] = EventChannel()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for index in range(4):
+            channel.watch(executor.submit(lambda i: [channel.put(i * 10 + n) for n in range(3)], index))
+
+        events = list(channel)
+
+    assert sorted(events) == sorted(index * 10 + n for index in range(4) for n in range(3))
+
+
+def test_cancelled_future_closes_channel():
+    channel: EventChannel[int] = EventChannel()
+    future: Future = Future()
+    channel.watch(future)
+
+    assert future.cancel()
+    assert list(channel) == []
+
+
+def test_close_drops_later_events():
+    channel: EventChannel[int] = EventChannel()
+    channel.put(1)
+    channel.close()
+    channel.put(2)
+
+    assert list(channel) == [1]
+
+
+def test_get_timeout():
+    channel: EventChannel[int] = EventChannel()
+    channel.watch(Future())
+
+    with pytest.raises(queue.Empty):
+        channel.get(timeout=0.01)
+
+    threading.Timer(0.05, channel.put, args=(1,)).start()
+    assert channel.get(timeout=5) == 1
+
+
+def test_block_context():
+    entered = []
+
+    class _BlockContext:
+        def __enter__(self):
+            entered.append(True)
+
+        def __exit__(self, *args):
+            return False
+
+    channel: EventChannel[int] = EventChannel(block_context=_BlockContext)
+    channel.put(1)
+    assert channel.get() == 1
+    assert entered == []
+
+    threading.Timer(0.05, channel.close).start()
+    assert channel.get() is None
+    assert entered == [True]
@@ -1,9 +1,19 @@
 import random
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
-from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request
+from core.helper.ssrf_proxy import (
+    SSRF_DEFAULT_MAX_RETRIES,
+    STATUS_FORCELIST,
+    ResponseTooLargeError,
+    _create_client,
+    _get_client,
+    download,
+    make_request,
+    stream,
+)
 
 
 @patch("httpx.Client.request")
@@ -50,3 +60,56 @@ def test_retry_logic_success(mock_request):
     assert response.status_code == 200
     assert mock_request.call_count == SSRF_DEFAULT_MAX_RETRIES + 1
     assert mock_request.call_args_list[0][1].get("method") == "GET"
+
+
+def test_pooled_client_reused():
+    assert _get_client() is _get_client()
+
+
+def test_pooled_client_does_not_persist_cookies():
+    client = _create_client(())
+    response = httpx.Response(
+        200,
+        headers={"Set-Cookie": "session=secret; Path=/"},
+        request=httpx.Request("GET", "http://example.com"),
+    )
+    client.cookies.extract_cookies(response)
+
+    assert len(client.cookies) == 0
+
+
+def _mock_client(handler):
+    return patch(
+        "core.helper.ssrf_proxy._get_client", return_value=httpx.Client(transport=httpx.MockTransport(handler))
+    )
+
+
+def test_download():
+    status_codes = iter([503, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(next(status_codes), content=b"x" * 1000)
+
+    with _mock_client(handler), patch("core.helper.ssrf_proxy.time.sleep"):
+        assert download("http://example.com/file") == b"x" * 1000
+
+
+def test_download_exceeds_max_size():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=httpx.ByteStream(b"x" * 1000))
+
+    with _mock_client(handler):
+        with pytest.raises(ResponseTooLargeError):
+            download("http://example.com/file", max_size=999)
+        assert download("http://example.com/file", max_size=1000) == b"x" * 1000
+
+
+def test_stream_raises_http_status_error():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(404)
+
+    with _mock_client(handler):
+        with stream("GET", "http://example.com/file") as response:
+            assert response.status_code == 404
+        with pytest.raises(httpx.HTTPStatusError):
+            download("http://example.com/file")
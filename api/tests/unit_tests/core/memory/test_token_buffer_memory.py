@@ -0,0 +1,103 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from core.memory.token_buffer_memory import TokenBufferMemory
+from core.model_runtime.entities import AssistantPromptMessage, UserPromptMessage
+from models.model import AppMode
+
+
+def _create_memory(prompt_tokens: int = 0) -> TokenBufferMemory:
+    model_instance = MagicMock(provider="openai", model="gpt-4o")
+    model_instance.get_llm_num_tokens.side_effect = lambda prompt_messages: prompt_tokens + sum(
+        len(prompt_message.content.split()) for prompt_message in prompt_messages
+    )
+    return TokenBufferMemory(conversation=MagicMock(), model_instance=model_instance)
+
+
+def _create_prompt_messages() -> tuple[list, list[str]]:
+    prompt_messages = []
+    prompt_message_ids = []
+    for index, (query_tokens, answer_tokens) in enumerate([(1, 5), (2, 3), (1, 2)]):
+        prompt_messages.extend(
+            [UserPromptMessage(content="q " * query_tokens), AssistantPromptMessage(content="a " * answer_tokens)]
+        )
+        prompt_message_ids.extend([f"message-{index}", f"message-{index}"])
+
+    return prompt_messages, prompt_message_ids
+
+
+def test_prune_prompt_messages():
+    mock_redis_client = MagicMock()
+    mock_redis_client.mget.return_value = [None, b"2,3", None]
+    memory = _create_memory()
+    prompt_messages, prompt_message_ids = _create_prompt_messages()
+
+    with patch("core.memory.token_buffer_memory.redis_client", new=mock_redis_client):
+        pruned_prompt_messages = memory._prune_prompt_messages(prompt_messages, prompt_message_ids, 6)
+
+    # latest messages within the limit are kept: 3 + 1 + 2 tokens
+    assert pruned_prompt_messages == prompt_messages[3:]
+    # messages are counted once each, the cached message is not counted, and the empty prompt once
+    assert memory.model_instance.get_llm_num_tokens.call_count == 5
+    assert {call.args[0]: call.args[2] for call in mock_redis_client.pipeline.return_value.setex.call_args_list} == {
+        "memory_message_tokens:openai:gpt-4o:message-0": "1,5",
+        "memory_message_tokens:openai:gpt-4o:message-2": "1,2",
+    }
+
+
+def test_prune_prompt_messages_keeps_latest_message():
+    mock_redis_client = MagicMock()
+    mock_redis_client.mget.side_effect = Exception("Redis is down")
+    memory = _create_memory()
+    prompt_messages, prompt_message_ids = _create_prompt_messages()
+
+    with patch("core.memory.token_buffer_memory.redis_client", new=mock_redis_client):
+        pruned_prompt_messages = memory._prune_prompt_messages(prompt_messages, prompt_message_ids, 1)
+
+    assert pruned_prompt_messages == prompt_messages[-1:]
+
+
+def test_prune_prompt_messages_counts_prompt_overhead_once():
+    mock_redis_client = MagicMock()
+    mock_redis_client.mget.return_value = [None, None, None]
+    memory = _create_memory(prompt_tokens=3)
+    prompt_messages, prompt_message_ids = _create_prompt_messages()
+
+    with patch("core.memory.token_buffer_memory.redis_client", new=mock_redis_client):
+        pruned_prompt_messages = memory._prune_prompt_messages(prompt_messages, prompt_message_ids, 9)
+
+    # 3 + 3 + 1 + 2 tokens, the same as the count of the kept messages as a whole
+    assert pruned_prompt_messages == prompt_messages[3:]
+    assert memory.model_instance.get_llm_num_tokens(pruned_prompt_messages) == 9
+
+
+def test_get_file_extra_configs_of_workflow_runs():
+    memory = _create_memory()
+    memory.conversation.mode = AppMode.ADVANCED_CHAT
+    messages = [
+        SimpleNamespace(id=f"message-{index}", workflow_run_id=f"run-{index}" if index < 3 else None)
+        for index in range(4)
+    ]
+    features = json.dumps(
+        {"file_upload": {"enabled": True, "number_limits": 3, "allowed_file_upload_methods": ["local_file"]}}
+    )
+    mock_db = MagicMock()
+    mock_db.session.query.return_value.filter.return_value.all.return_value = [
+        ("run-0", "workflow-1"),
+        ("run-1", "workflow-1"),
+        ("run-2", "workflow-2"),
+    ]
+    mock_db.session.query.return_value.options.return_value.filter.return_value.all.return_value = [
+        SimpleNamespace(id="workflow-1", features=features)
+    ]
+
+    with patch("core.memory.token_buffer_memory.db", new=mock_db):
+        file_extra_configs = memory._get_file_extra_configs(messages)
+
+    # workflow runs and workflows are loaded once for all messages
+    assert mock_db.session.query.call_count == 2
+    assert set(file_extra_configs) == {"message-0", "message-1"}
+    # the config is converted once per workflow
+    assert file_extra_configs["message-0"] is file_extra_configs["message-1"]
+    assert file_extra_configs["message-0"].image_config.number_limits == 3
@@ -0,0 +1,70 @@
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from core.rag.datasource.keyword.jieba.jieba_inverted_index import JiebaInvertedIndex
+from core.rag.models.document import Document
+from models.dataset import Dataset
+
+
+def _compile(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def _create_keyword() -> JiebaInvertedIndex:
+    return JiebaInvertedIndex(Dataset(id="dataset-1", tenant_id="tenant-1"))
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_inverted_index.db")
+def test_add_texts_inserts_postings_once(mock_db):
+    mock_db.session.query.return_value.filter.return_value.all.return_value = []
+
+    _create_keyword().add_texts(
+        [
+            Document(page_content="a", metadata={"doc_id": "node-1"}),
+            Document(page_content="b", metadata={"doc_id": "node-2"}),
+        ],
+        keywords_list=[["apple", "banana", "apple"], ["banana"]],
+    )
+
+    # postings of all texts are inserted with one statement, the keyword table is not loaded
+    mock_db.session.execute.assert_called_once()
+    statement = mock_db.session.execute.call_args.args[0]
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert "ON CONFLICT (dataset_id, keyword, node_id) DO NOTHING" in str(compiled)
+    assert sorted(value for key, value in compiled.params.items() if key.startswith("keyword")) == [
+        "apple",
+        "banana",
+        "banana",
+    ]
+    mock_db.session.commit.assert_called_once()
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_inverted_index.db")
+def test_import_keyword_table(mock_db):
+    posting_count = _create_keyword().import_keyword_table({"apple": {"node-1", "node-2"}, "banana": {"node-1"}})
+
+    assert posting_count == 3
+    mock_db.session.execute.assert_called_once()
+    mock_db.session.commit.assert_called_once()
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_inverted_index.JiebaKeywordTableHandler")
+@patch("core.rag.datasource.keyword.jieba.jieba_inverted_index.db")
+def test_search_looks_up_query_keywords(mock_db, mock_keyword_table_handler):
+    mock_keyword_table_handler.return_value.extract_keywords.return_value = {"apple", "banana"}
+    mock_db.session.execute.return_value.all.return_value = [MagicMock(node_id="node-2"), MagicMock(node_id="node-1")]
+    mock_db.session.query.return_value.filter.return_value.all.return_value = [
+        MagicMock(index_node_id="node-1", content="apple"),
+        MagicMock(index_node_id="node-2", content="apple banana"),
+    ]
+
+    documents = _create_keyword().search("apple banana", top_k=2)
+
+    sql = _compile(mock_db.session.execute.call_args.args[0])
+    assert "dataset_keyword_postings.keyword IN" in sql
+    assert "GROUP BY dataset_keyword_postings.node_id" in sql
+    assert "ORDER BY count(dataset_keyword_postings.id) DESC" in sql
+    # documents keep the order of most matching keywords
+    assert [document.metadata["doc_id"] for document in documents] == ["node-2", "node-1"]
+    assert documents[0].page_content == "apple banana"
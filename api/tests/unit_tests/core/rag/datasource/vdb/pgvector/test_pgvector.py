@@ -0,0 +1,102 @@
+import json
+import struct
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.vdb.pgvector.pgvector import PGVector, PGVectorConfig
+from core.rag.models.document import Document
+
+
+@pytest.fixture
+def cursor():
+    return MagicMock()
+
+
+@pytest.fixture
+def vector(cursor):
+    pool = MagicMock()
+    pool.getconn.return_value.cursor.return_value = cursor
+    with patch.object(PGVector, "_create_connection_pool", return_value=pool):
+        yield PGVector(
+            collection_name="collection",
+            config=PGVectorConfig(
+                host="localhost",
+                port=5432,
+                user="postgres",
+                password="password",
+                database="dify",
+                min_connection=1,
+                max_connection=5,
+            ),
+        )
+
+
+def _read_copy_rows(data: bytes) -> list[list[bytes]]:
+    assert data.startswith(b"PGCOPY\n\xff\r\n\x00")
+    offset = 19
+    rows = []
+    while True:
+        (field_count,) = struct.unpack_from("!h", data, offset)
+        offset += 2
+        if field_count == -1:
+            break
+        row = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+            row.append(data[offset : offset + length])
+            offset += length
+        rows.append(row)
+    assert offset == len(data)
+    return rows
+
+
+def test_add_texts_with_copy(vector, cursor):
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, buffer: copied.append((sql, buffer.read()))
+    documents = [Document(page_content=f"text {i}", metadata={"doc_id": str(uuid.uuid4()), "i": i}) for i in range(3)]
+    embeddings = [[0.5 * i, 1.0, -2.0] for i in range(3)]
+
+    with patch.object(PGVector, "COPY_THRESHOLD", 3):
+        ids = vector.add_texts(documents, embeddings)
+
+    assert ids == [document.metadata["doc_id"] for document in documents]
+    sql, data = copied[0]
+    assert sql == "COPY embedding_collection (id, text, meta, embedding) FROM STDIN WITH (FORMAT BINARY)"
+    rows = _read_copy_rows(data)
+    assert len(rows) == 3
+    for row, document, embedding in zip(rows, documents, embeddings):
+        assert str(uuid.UUID(bytes=row[0])) == document.metadata["doc_id"]
+        assert row[1].decode() == document.page_content
+        assert row[2][:1] == b"\x01"
+        assert json.loads(row[2][1:]) == document.metadata
+        assert struct.unpack_from("!HH", row[3]) == (3, 0)
+        assert list(struct.unpack_from("!3f", row[3], 4)) == embedding
+
+
+def test_add_texts_with_insert(vector, cursor):
+    documents = [Document(page_content="text", metadata={"doc_id": str(uuid.uuid4())})]
+
+    with patch("core.rag.datasource.vdb.pgvector.pgvector.psycopg2.extras.execute_values") as execute_values:
+        vector.add_texts(documents, [[1.0, 2.0]])
+
+    execute_values.assert_called_once()
+    cursor.copy_expert.assert_not_called()
+
+
+def test_filter_existing_ids(vector, cursor):
+    ids = [str(uuid.uuid4()) for _ in range(5)]
+    cursor.__iter__.side_effect = [iter([(ids[0],), (ids[1],)]), iter([(ids[3],)]), iter([])]
+
+    with patch.object(PGVector, "FILTER_IDS_BATCH_SIZE", 2):
+        existing_ids = vector.filter_existing_ids(ids)
+
+    assert existing_ids == {ids[0], ids[1], ids[3]}
+    assert cursor.execute.call_count == 3
+    assert cursor.execute.call_args_list[0].args[1] == (ids[:2],)
+
+    documents = [Document(page_content="text", metadata={"doc_id": id}) for id in ids]
+    cursor.__iter__.side_effect = [iter([(ids[0],), (ids[1],), (ids[3],)])]
+    assert vector._filter_duplicate_texts(documents) == [documents[2], documents[4]]
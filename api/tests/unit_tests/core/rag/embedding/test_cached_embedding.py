@@ -0,0 +1,106 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from core.model_runtime.entities.model_entities import ModelPropertyKey
+from core.rag.embedding.cached_embedding import CacheEmbedding
+from core.rag.embedding.embedding_codec import EmbeddingFormat, encode_embedding
+from core.rag.embedding.query_embedding_cache import QueryEmbeddingCache
+from libs import helper
+from models.dataset import Embedding
+
+
+def _create_model_instance(max_chunks: int = 2) -> MagicMock:
+    model_instance = MagicMock()
+    model_instance.model = "text-embedding-3-small"
+    model_instance.provider = "openai"
+    model_instance.model_type_instance.get_model_schema.return_value.model_properties = {
+        ModelPropertyKey.MAX_CHUNKS: max_chunks
+    }
+
+    def invoke_text_embedding(texts, user, input_type):
+        # zero vector for empty text can not be normalized
+        return MagicMock(embeddings=[[float(len(text)), 1.0] if text else [0.0, 0.0] for text in texts])
+
+    model_instance.invoke_text_embedding.side_effect = invoke_text_embedding
+    return model_instance
+
+
+def _create_cached_embedding(text: str, embedding: list[float]) -> Embedding:
+    cached_embedding = Embedding(model_name="text-embedding-3-small", hash=helper.generate_text_hash(text))
+    cached_embedding.set_embedding(embedding)
+    return cached_embedding
+
+
+@patch("core.rag.embedding.cached_embedding.db")
+def test_embed_documents(mock_db):
+    mock_db.session.query.return_value.filter.return_value.all.return_value = [
+        _create_cached_embedding("cached", [0.6, 0.8])
+    ]
+    model_instance = _create_model_instance(max_chunks=2)
+
+    embeddings = CacheEmbedding(model_instance).embed_documents(["cached", "a", "bbb", "a", "cccc", ""])
+
+    # cache is looked up with one query and new embeddings are inserted at once
+    mock_db.session.query.assert_called_once()
+    mock_db.session.execute.assert_called_once()
+    mock_db.session.commit.assert_called_once()
+
+    # "a" is embedded once, in batches of MAX_CHUNKS
+    assert [call.kwargs["texts"] for call in model_instance.invoke_text_embedding.call_args_list] == [
+        ["a", "bbb"],
+        ["cccc", ""],
+    ]
+
+    np.testing.assert_allclose(embeddings[0], [0.6, 0.8], rtol=1e-6)
+    assert embeddings[1] == embeddings[3]
+    np.testing.assert_allclose(embeddings[2], np.array([3.0, 1.0]) / np.sqrt(10))
+    np.testing.assert_allclose(np.linalg.norm(embeddings[4]), 1.0)
+    assert embeddings[5] is None
+
+
+@patch("core.rag.embedding.cached_embedding.dify_config")
+@patch("core.rag.embedding.cached_embedding.db")
+def test_embed_documents_concurrently(mock_db, mock_config):
+    mock_config.EMBEDDING_CACHE_QUERY_BATCH_SIZE = 2
+    mock_config.EMBEDDING_MAX_CONCURRENT_BATCHES = 3
+    mock_db.session.query.return_value.filter.return_value.all.return_value = []
+    model_instance = _create_model_instance(max_chunks=1)
+    texts = ["a" * length for length in range(1, 8)]
+
+    embeddings = CacheEmbedding(model_instance).embed_documents(texts)
+
+    assert mock_db.session.query.call_count == 4
+    assert mock_db.session.execute.call_count == 4
+    assert model_instance.invoke_text_embedding.call_count == 7
+    for length, embedding in enumerate(embeddings, start=1):
+        np.testing.assert_allclose(embedding, np.array([length, 1.0]) / np.sqrt(length**2 + 1))
+
+
+@patch("core.rag.embedding.cached_embedding.query_embedding_cache", new=QueryEmbeddingCache(max_size=10, ttl=60))
+def test_embed_queries():
+    mock_redis_client = MagicMock()
+    cached_hash = helper.generate_text_hash("cached")
+    mock_redis_client.mget.side_effect = lambda keys: [
+        encode_embedding([0.6, 0.8], EmbeddingFormat.FLOAT32) if key.endswith(cached_hash) else None for key in keys
+    ]
+    model_instance = _create_model_instance()
+    cache_embedding = CacheEmbedding(model_instance)
+
+    with patch("core.rag.embedding.cached_embedding.redis_client", new=mock_redis_client):
+        embeddings = cache_embedding.embed_queries(["cached", "bbb", "bbb"])
+
+    # missing texts are embedded at once and cached in Redis with one round trip
+    mock_redis_client.mget.assert_called_once()
+    model_instance.invoke_text_embedding.assert_called_once()
+    assert model_instance.invoke_text_embedding.call_args.kwargs["texts"] == ["bbb"]
+    mock_redis_client.pipeline.return_value.setex.assert_called_once()
+    np.testing.assert_allclose(embeddings[0], [0.6, 0.8], rtol=1e-6)
+    np.testing.assert_allclose(embeddings[1], np.array([3.0, 1.0]) / np.sqrt(10))
+    assert embeddings[1] == embeddings[2]
+
+    # embedded again from the in-process cache
+    with patch("core.rag.embedding.cached_embedding.redis_client", new=mock_redis_client):
+        assert cache_embedding.embed_query("bbb") == embeddings[1]
+    mock_redis_client.mget.assert_called_once()
+    model_instance.invoke_text_embedding.assert_called_once()
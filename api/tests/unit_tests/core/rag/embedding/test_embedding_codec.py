@@ -0,0 +1,73 @@
+import pickle
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from core.rag.embedding.embedding_codec import (
+    EmbeddingFormat,
+    decode_embedding,
+    encode_embedding,
+    is_encoded_embedding,
+)
+from models.dataset import Embedding
+
+DIMENSION = 1536
+
+
+@pytest.fixture
+def embedding() -> list[float]:
+    vector = np.random.default_rng(0).standard_normal(DIMENSION)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest.mark.parametrize(
+    ("embedding_format", "max_size", "tolerance"),
+    [
+        (EmbeddingFormat.FLOAT32, DIMENSION * 4 + 6, 1e-7),
+        (EmbeddingFormat.FLOAT16, DIMENSION * 2 + 6, 1e-3),
+        (EmbeddingFormat.INT8, DIMENSION + 14, 1e-2),
+    ],
+)
+def test_encode_decode(embedding, embedding_format, max_size, tolerance):
+    data = encode_embedding(embedding, embedding_format)
+
+    assert is_encoded_embedding(data)
+    assert len(data) == max_size
+    np.testing.assert_allclose(decode_embedding(data), embedding, atol=tolerance)
+
+
+def test_encode_constant_vector():
+    data = encode_embedding([0.5] * 4, EmbeddingFormat.INT8)
+
+    np.testing.assert_allclose(decode_embedding(data), [0.5] * 4)
+
+
+def test_decode_invalid():
+    with pytest.raises(ValueError):
+        decode_embedding(pickle.dumps([0.1, 0.2]))
+
+    with pytest.raises(ValueError):
+        decode_embedding(b"DEMB\x09\x01")
+
+
+def test_embedding_model_reads_legacy_rows(embedding):
+    legacy = Embedding(embedding=pickle.dumps(embedding, protocol=pickle.HIGHEST_PROTOCOL))
+    assert not is_encoded_embedding(legacy.embedding)
+    assert legacy.get_embedding() == embedding
+
+    compact = Embedding()
+    with patch("models.dataset.dify_config.EMBEDDING_CACHE_COMPACT_FORMAT_ENABLED", True):
+        compact.set_embedding(embedding)
+    assert is_encoded_embedding(compact.embedding)
+    assert len(compact.embedding) < len(legacy.embedding) / 2
+    np.testing.assert_allclose(compact.get_embedding(), embedding, atol=1e-7)
+
+
+def test_embedding_model_writes_legacy_rows_by_default(embedding):
+    legacy = Embedding()
+    legacy.set_embedding(embedding)
+
+    # rows stay readable by processes not upgraded yet until the compact format is enabled
+    assert not is_encoded_embedding(legacy.embedding)
+    assert pickle.loads(legacy.embedding) == embedding
@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from core.rag.embedding.query_embedding_cache import QueryEmbeddingCache
+
+
+def test_get_and_set():
+    cache = QueryEmbeddingCache(max_size=2, ttl=60)
+
+    assert cache.get(("openai", "text-embedding-3-small", "a")) is None
+    cache.set(("openai", "text-embedding-3-small", "a"), [0.6, 0.8])
+
+    assert cache.get(("openai", "text-embedding-3-small", "a")) == [0.6, 0.8]
+    assert cache.get(("openai", "text-embedding-3-large", "a")) is None
+    assert cache.get_metrics() == {"size": 1, "max_size": 2, "hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+
+def test_least_recently_used_is_evicted():
+    cache = QueryEmbeddingCache(max_size=2, ttl=60)
+    cache.set(("openai", "m", "a"), [1.0])
+    cache.set(("openai", "m", "b"), [2.0])
+    cache.get(("openai", "m", "a"))
+    cache.set(("openai", "m", "c"), [3.0])
+
+    assert cache.get(("openai", "m", "a")) == [1.0]
+    assert cache.get(("openai", "m", "b")) is None
+    assert cache.get(("openai", "m", "c")) == [3.0]
+
+
+def test_expired_embedding_is_missing():
+    cache = QueryEmbeddingCache(max_size=2, ttl=60)
+    with patch("core.rag.embedding.query_embedding_cache.time.monotonic", return_value=100):
+        cache.set(("openai", "m", "a"), [1.0])
+    with patch("core.rag.embedding.query_embedding_cache.time.monotonic", return_value=161):
+        assert cache.get(("openai", "m", "a")) is None
+
+    assert cache.get_metrics()["size"] == 0
+
+
+def test_disabled():
+    cache = QueryEmbeddingCache(max_size=0, ttl=60)
+    cache.set(("openai", "m", "a"), [1.0])
+
+    assert cache.get(("openai", "m", "a")) is None
+    assert cache.get_metrics()["size"] == 0
@@ -0,0 +1,112 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from core.rag.extractor import pdf_extractor
+from core.rag.extractor.pdf_extractor import PdfExtractor
+from core.rag.extractor.pdf_page_range_extractor import extract_page_range_texts
+
+
+def _create_pdf(file_path: str, page_count: int) -> None:
+    """
+    Write a PDF file of pages with the text "Page <page number>"
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(f"{4 + i * 2} 0 R".encode() for i in range(page_count))
+        + f"] /Count {page_count} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i in range(page_count):
+        content = f"BT /F1 12 Tf 72 720 Td (Page {i}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + i * 2} 0 R"
+            " /Resources << /Font << /F1 3 0 R >> >> >>".encode()
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+
+    Path(file_path).write_bytes(pdf)
+
+
+@pytest.fixture
+def pdf_file_path(tmp_path):
+    file_path = str(tmp_path / "manual.pdf")
+    _create_pdf(file_path, 35)
+    return file_path
+
+
+def test_parse_serial(pdf_file_path):
+    with patch("core.rag.extractor.pdf_extractor.dify_config.PDF_EXTRACT_PROCESSES", 0):
+        documents = list(PdfExtractor(pdf_file_path).load())
+
+    assert [document.page_content.strip() for document in documents] == [f"Page {i}" for i in range(35)]
+    assert [document.metadata["page"] for document in documents] == list(range(35))
+
+
+def test_parse_in_parallel(pdf_file_path):
+    with (
+        patch("core.rag.extractor.pdf_extractor.dify_config.PDF_EXTRACT_PROCESSES", 2),
+        patch("core.rag.extractor.pdf_extractor.dify_config.PDF_EXTRACT_PAGE_RANGE_SIZE", 10),
+        patch("core.rag.extractor.pdf_extractor.dify_config.PDF_EXTRACT_MAX_PENDING_PAGE_RANGES", 2),
+        patch("core.rag.extractor.pdf_extractor._process_pool", new=None),
+    ):
+        try:
+            documents = list(PdfExtractor(pdf_file_path).load())
+            assert pdf_extractor._process_pool is not None
+        finally:
+            if pdf_extractor._process_pool:
+                pdf_extractor._process_pool.shutdown()
+
+    assert [document.page_content.strip() for document in documents] == [f"Page {i}" for i in range(35)]
+    assert [document.metadata["page"] for document in documents] == list(range(35))
+
+
+class _CrashingProcessPool:
+    """
+    Process pool parsing the first page range, its workers crash on the other page ranges
+    """
+
+    def __init__(self):
+        self.is_shut_down = False
+
+    def submit(self, fn, file_path, start, stop):
+        future: Future = Future()
+        if start == 0:
+            future.set_result(extract_page_range_texts(file_path, start, stop))
+        else:
+            future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.is_shut_down = True
+
+
+def test_parse_in_parallel_falls_back_to_serial_when_pool_breaks(pdf_file_path):
+    process_pool = _CrashingProcessPool()
+    with (
+        patch("core.rag.extractor.pdf_extractor.dify_config.PDF_EXTRACT_PROCESSES", 2),
+        patch("core.rag.extractor.pdf_extractor.dify_config.PDF_EXTRACT_PAGE_RANGE_SIZE", 10),
+        patch("core.rag.extractor.pdf_extractor._process_pool", new=process_pool),
+    ):
+        documents = list(PdfExtractor(pdf_file_path).load())
+
+        # the broken pool is dropped, the next parallel parsing starts a new one
+        assert pdf_extractor._process_pool is None
+        assert process_pool.is_shut_down
+
+    assert [document.page_content.strip() for document in documents] == [f"Page {i}" for i in range(35)]
+    assert [document.metadata["page"] for document in documents] == list(range(35))
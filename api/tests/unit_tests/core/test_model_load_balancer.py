@@ -0,0 +1,113 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+from core.model_load_balancer import LoadBalancingStrategy, ModelLoadBalancer
+
+
+def _create_model_load_balancer() -> ModelLoadBalancer:
+    return ModelLoadBalancer(ewma_decay=0.5, sync_interval=5.0, cooldown_check_interval=1.0)
+
+
+def test_select_least_outstanding_requests():
+    model_load_balancer = _create_model_load_balancer()
+    model_load_balancer.on_request_start("model", "id1")
+    model_load_balancer.on_request_start("model", "id1")
+    model_load_balancer.on_request_start("model", "id2")
+    strategy = LoadBalancingStrategy.LEAST_OUTSTANDING_REQUESTS
+
+    with patch("core.model_load_balancer.redis_client", new=MagicMock()):
+        assert model_load_balancer.select(strategy, "model", ["id1", "id2"]) == "id2"
+        assert model_load_balancer.select(strategy, "model", []) is None
+
+
+def test_select_ewma_latency():
+    model_load_balancer = _create_model_load_balancer()
+    for config_id, latencies in {"fast": [0.1, 0.3], "slow": [1.0, 1.0]}.items():
+        for latency in latencies:
+            model_load_balancer.on_request_start("model", config_id)
+            model_load_balancer.on_request_end("model", config_id, latency)
+
+    with patch("core.model_load_balancer.redis_client", new=MagicMock()):
+        stats = model_load_balancer.get_stats("model", ["fast", "slow", "new"])
+        assert stats["fast"].ewma_latency == 0.2
+        assert stats["fast"].outstanding_requests == 0
+
+        assert model_load_balancer.select(LoadBalancingStrategy.EWMA_LATENCY, "model", ["fast", "slow"]) == "fast"
+
+        # configs without latency cost the mean latency of the others: 0.6 per request
+        assert (
+            model_load_balancer.select(LoadBalancingStrategy.EWMA_LATENCY, "model", ["fast", "slow", "new"]) == "fast"
+        )
+        for _ in range(3):
+            model_load_balancer.on_request_start("model", "fast")
+        assert model_load_balancer.select(LoadBalancingStrategy.EWMA_LATENCY, "model", ["fast", "slow", "new"]) == "new"
+
+        # and do not get every request until their first request ends
+        model_load_balancer.on_request_start("model", "new")
+        assert (
+            model_load_balancer.select(LoadBalancingStrategy.EWMA_LATENCY, "model", ["fast", "slow", "new"]) == "fast"
+        )
+
+
+def test_stats_of_other_processes_are_merged():
+    model_load_balancer = _create_model_load_balancer()
+    model_load_balancer.on_request_start("model", "id1")
+    mock_redis_client = MagicMock()
+    mock_redis_client.pipeline.return_value.execute.return_value = [
+        1,
+        True,
+        {
+            b"id1:other": json.dumps({"outstanding_requests": 2, "ewma_latency": 0.4, "updated_at": time.time()}),
+            b"id2:stopped": json.dumps({"outstanding_requests": 9, "ewma_latency": 0.1, "updated_at": 0}),
+        },
+    ]
+
+    with patch("core.model_load_balancer.redis_client", new=mock_redis_client):
+        stats = model_load_balancer.get_stats("model", ["id1", "id2"])
+
+    mock_redis_client.pipeline.return_value.hset.assert_called_once()
+    assert stats["id1"].outstanding_requests == 3
+    assert stats["id1"].ewma_latency == 0.4
+    # stats of processes that stopped syncing are ignored and removed
+    assert stats["id2"].outstanding_requests == 0
+    mock_redis_client.hdel.assert_called_once_with("model_lb_stats:model", "id2:stopped")
+
+
+def test_cooldown_is_cached():
+    model_load_balancer = _create_model_load_balancer()
+    mock_redis_client = MagicMock()
+    mock_redis_client.pttl.side_effect = [30000, -2]
+
+    with patch("core.model_load_balancer.redis_client", new=mock_redis_client):
+        assert model_load_balancer.in_cooldown("cooldown:id1") is True
+        assert model_load_balancer.in_cooldown("cooldown:id1") is True
+        assert model_load_balancer.in_cooldown("cooldown:id2") is False
+        assert model_load_balancer.in_cooldown("cooldown:id2") is False
+        assert mock_redis_client.pttl.call_count == 2
+
+        model_load_balancer.cooldown("cooldown:id2", expire=10)
+        assert model_load_balancer.in_cooldown("cooldown:id2") is True
+        assert mock_redis_client.pttl.call_count == 2
+
+
+def test_unused_stats_and_expired_cooldowns_are_evicted():
+    model_load_balancer = _create_model_load_balancer()
+    mock_redis_client = MagicMock()
+    mock_redis_client.pttl.return_value = 1000
+
+    with patch("core.model_load_balancer.redis_client", new=mock_redis_client):
+        model_load_balancer.on_request_start("model", "busy")
+        model_load_balancer.on_request_start("model", "idle")
+        model_load_balancer.on_request_end("model", "idle", 0.1)
+        model_load_balancer.get_stats("other-model", ["id1"])
+        model_load_balancer.in_cooldown("cooldown:id1")
+
+        with patch("core.model_load_balancer.time.monotonic", return_value=time.monotonic() + 3600):
+            model_load_balancer.in_cooldown("cooldown:id2")
+
+    # configs with requests in flight are kept
+    assert set(model_load_balancer._local_stats) == {"model"}
+    assert set(model_load_balancer._local_stats["model"]) == {"busy"}
+    assert "other-model" not in model_load_balancer._synced_at
+    assert set(model_load_balancer._cooldowns) == {"cooldown:id2"}
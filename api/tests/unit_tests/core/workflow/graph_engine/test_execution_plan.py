@@ -0,0 +1,158 @@
+from unittest.mock import patch
+
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.workflow.entities.variable_pool import VariablePool
+from core.workflow.enums import SystemVariableKey
+from core.workflow.graph_engine.entities.event import GraphRunSucceededEvent, NodeRunStreamChunkEvent
+from core.workflow.graph_engine.execution_plan import ExecutionPlan, ExecutionPlanCache
+from core.workflow.graph_engine.graph_engine import GraphEngine
+from core.workflow.nodes import NodeType
+from core.workflow.nodes.if_else.if_else_node import IfElseNode
+from models.enums import UserFrom
+from models.workflow import WorkflowType
+
+GRAPH_CONFIG = {
+    "edges": [
+        {"id": "1", "source": "start", "target": "if-else"},
+        {"id": "2", "source": "if-else", "sourceHandle": "true", "target": "answer-1"},
+        {"id": "3", "source": "if-else", "sourceHandle": "false", "target": "answer-2"},
+    ],
+    "nodes": [
+        {
+            "data": {
+                "title": "Start",
+                "type": "start",
+                "variables": [
+                    {
+                        "label": "uid",
+                        "max_length": 48,
+                        "options": [],
+                        "required": True,
+                        "type": "text-input",
+                        "variable": "uid",
+                    }
+                ],
+            },
+            "id": "start",
+        },
+        {
+            "data": {
+                "cases": [
+                    {
+                        "case_id": "true",
+                        "conditions": [
+                            {
+                                "comparison_operator": "contains",
+                                "id": "b0f02473-08b6-4a81-af91-15345dcb2ec8",
+                                "value": "hi",
+                                "varType": "string",
+                                "variable_selector": ["sys", "query"],
+                            }
+                        ],
+                        "id": "true",
+                        "logical_operator": "and",
+                    }
+                ],
+                "title": "IF/ELSE",
+                "type": "if-else",
+            },
+            "id": "if-else",
+        },
+        {
+            "data": {"answer": "1 {{#start.uid#}}", "title": "Answer", "type": "answer", "variables": []},
+            "id": "answer-1",
+        },
+        {
+            "data": {"answer": "2", "title": "Answer 2", "type": "answer"},
+            "id": "answer-2",
+        },
+    ],
+}
+
+
+def test_compile():
+    execution_plan = ExecutionPlan.compile(graph_config=GRAPH_CONFIG)
+
+    assert execution_plan.graph.root_node_id == "start"
+    assert set(execution_plan.nodes.keys()) == {"start", "if-else", "answer-1", "answer-2"}
+
+    compiled_node = execution_plan.nodes["if-else"]
+    assert compiled_node.node_type == NodeType.IF_ELSE
+    assert compiled_node.node_cls is IfElseNode
+    assert compiled_node.node_data.title == "IF/ELSE"
+
+    # node data handed to node instances must never be shared between runs
+    assert compiled_node.create_node_data() is not compiled_node.node_data
+    assert compiled_node.create_node_data() == compiled_node.node_data
+
+    branch_table = execution_plan.condition_edge_mappings["if-else"]
+    assert len(branch_table) == 2
+    assert {edges[0].target_node_id for edges in branch_table.values()} == {"answer-1", "answer-2"}
+    assert "start" not in execution_plan.condition_edge_mappings
+
+
+def test_compile_skips_invalid_node():
+    graph_config = {
+        "edges": [{"id": "1", "source": "start", "target": "unknown"}],
+        "nodes": [
+            {"data": {"type": "start", "title": "Start"}, "id": "start"},
+            {"data": {"type": "not-a-node-type"}, "id": "unknown"},
+        ],
+    }
+
+    execution_plan = ExecutionPlan.compile(graph_config=graph_config)
+
+    assert "start" in execution_plan.nodes
+    assert "unknown" not in execution_plan.nodes
+
+
+def test_cache_get_or_compile():
+    ExecutionPlanCache.clear()
+
+    execution_plan = ExecutionPlanCache.get_or_compile(cache_key="hash-1", graph_config=GRAPH_CONFIG)
+
+    assert ExecutionPlanCache.get_or_compile(cache_key="hash-1", graph_config=GRAPH_CONFIG) is execution_plan
+    assert ExecutionPlanCache.get_or_compile(cache_key="hash-2", graph_config=GRAPH_CONFIG) is not execution_plan
+
+    ExecutionPlanCache.clear()
+
+
+@patch("extensions.ext_database.db.session.remove")
+@patch("extensions.ext_database.db.session.close")
+def test_run_with_execution_plan(mock_close, mock_remove):
+    execution_plan = ExecutionPlan.compile(graph_config=GRAPH_CONFIG)
+
+    # the same plan is reused across runs
+    for _ in range(2):
+        variable_pool = VariablePool(
+            system_variables={
+                SystemVariableKey.QUERY: "hi",
+                SystemVariableKey.FILES: [],
+                SystemVariableKey.CONVERSATION_ID: "abababa",
+                SystemVariableKey.USER_ID: "aaa",
+            },
+            user_inputs={"uid": "takato"},
+        )
+
+        graph_engine = GraphEngine(
+            tenant_id="111",
+            app_id="222",
+            workflow_type=WorkflowType.CHAT,
+            workflow_id="333",
+            graph_config=GRAPH_CONFIG,
+            user_id="444",
+            user_from=UserFrom.ACCOUNT,
+            invoke_from=InvokeFrom.WEB_APP,
+            call_depth=0,
+            graph=execution_plan.graph,
+            variable_pool=variable_pool,
+            max_execution_steps=500,
+            max_execution_time=1200,
+            execution_plan=execution_plan,
+        )
+
+        items = list(graph_engine.run())
+
+        assert any(isinstance(item, NodeRunStreamChunkEvent) and item.chunk_content == "takato" for item in items)
+        assert isinstance(items[-1], GraphRunSucceededEvent)
+        assert items[-1].outputs["answer"] == "1 takato"
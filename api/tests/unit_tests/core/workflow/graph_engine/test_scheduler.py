@@ -0,0 +1,142 @@
+import threading
+import time
+
+from core.workflow.graph_engine.scheduler import GraphEngineScheduler
+
+
+def _create_scheduler(**kwargs) -> GraphEngineScheduler:
+    params = {
+        "max_workers": 2,
+        "max_queued_per_run": 100,
+        "max_compensation_workers": 10,
+        "worker_idle_timeout": 1,
+    }
+    params.update(kwargs)
+    return GraphEngineScheduler(**params)
+
+
+def test_submit():
+    scheduler = _create_scheduler()
+
+    future = scheduler.submit("tenant", "run", lambda a, b=0: a + b, 1, b=2)
+    assert future.result(timeout=5) == 3
+
+    def fail():
+        raise ValueError("failed")
+
+    future = scheduler.submit("tenant", "run", fail)
+    assert isinstance(future.exception(timeout=5), ValueError)
+
+    metrics = scheduler.get_metrics()
+    assert metrics["submitted_total"] == 2
+    assert metrics["queue_depth"] == 0
+    assert metrics["workers"] <= 2
+
+
+def test_round_robin_between_tenants_and_runs():
+    scheduler = _create_scheduler(max_workers=1)
+    release = threading.Event()
+    order = []
+
+    # occupy the only worker so that all following tasks are queued
+    blocker = scheduler.submit("tenant-0", "run-0", release.wait)
+    while scheduler.get_metrics()["running_tasks"] != 1:
+        time.sleep(0.01)
+
+    futures = []
+    for index in range(3):
+        futures.append(scheduler.submit("tenant-a", "run-a1", order.append, f"a1-{index}"))
+    for index in range(3):
+        futures.append(scheduler.submit("tenant-a", "run-a2", order.append, f"a2-{index}"))
+    futures.append(scheduler.submit("tenant-b", "run-b1", order.append, "b1-0"))
+
+    assert scheduler.get_metrics()["queue_depth_by_tenant"] == {"tenant-a": 6, "tenant-b": 1}
+
+    release.set()
+    blocker.result(timeout=5)
+    for future in futures:
+        future.result(timeout=5)
+
+    assert order == ["a1-0", "b1-0", "a2-0", "a1-1", "a2-1", "a1-2", "a2-2"]
+
+
+def test_backpressure_instead_of_error():
+    scheduler = _create_scheduler(max_workers=1, max_queued_per_run=2)
+    release = threading.Event()
+
+    blocker = scheduler.submit("tenant", "run", release.wait)
+    while scheduler.get_metrics()["running_tasks"] != 1:
+        time.sleep(0.01)
+
+    scheduler.submit("tenant", "run", time.sleep, 0)
+    scheduler.submit("tenant", "run", time.sleep, 0)
+
+    submitted = threading.Event()
+
+    def submit_over_limit():
+        scheduler.submit("tenant", "run", time.sleep, 0).result(timeout=5)
+        submitted.set()
+
+    threading.Thread(target=submit_over_limit, daemon=True).start()
+
+    # the third queued task waits for queue space instead of failing
+    assert not submitted.wait(timeout=0.2)
+    assert scheduler.get_metrics()["backpressure_waits_total"] == 1
+
+    # other runs are not affected
+    assert scheduler.submit("tenant", "other-run", time.sleep, 0).cancel()
+
+    release.set()
+    blocker.result(timeout=5)
+    assert submitted.wait(timeout=5)
+
+
+def test_nested_submit_does_not_deadlock():
+    scheduler = _create_scheduler(max_workers=2)
+
+    def branch(depth: int) -> int:
+        if depth == 0:
+            return 1
+
+        futures = [scheduler.submit("tenant", "run", branch, depth - 1) for _ in range(2)]
+        with scheduler.managed_block():
+            return sum(future.result() for future in futures)
+
+    # 7 tasks wait for their children at the same time with only 2 workers
+    assert scheduler.submit("tenant", "run", branch, 3).result(timeout=10) == 8
+    assert scheduler.get_metrics()["blocked_workers"] == 0
+
+
+def test_nested_submit_past_compensation_limit_does_not_deadlock():
+    scheduler = _create_scheduler(max_workers=1, max_compensation_workers=1)
+
+    def branch(depth: int) -> int:
+        if depth == 0:
+            return 1
+
+        future = scheduler.submit("tenant", "run", branch, depth - 1)
+        with scheduler.managed_block():
+            return future.result()
+
+    # 4 tasks wait for their child at the same time with at most 2 workers
+    assert scheduler.submit("tenant", "run", branch, 4).result(timeout=10) == 1
+    assert scheduler.get_metrics()["blocked_workers"] == 0
+
+
+def test_cancelled_task_is_skipped():
+    scheduler = _create_scheduler(max_workers=1)
+    release = threading.Event()
+
+    blocker = scheduler.submit("tenant", "run", release.wait)
+    while scheduler.get_metrics()["running_tasks"] != 1:
+        time.sleep(0.01)
+
+    called = []
+    future = scheduler.submit("tenant", "run", called.append, 1)
+    assert future.cancel()
+
+    release.set()
+    blocker.result(timeout=5)
+    scheduler.submit("tenant", "run", time.sleep, 0).result(timeout=5)
+
+    assert called == []
@@ -1,8 +1,11 @@
+import contextlib
+import io
 import time
 import uuid
 from unittest.mock import patch
 
 from core.app.entities.app_invoke_entities import InvokeFrom
+from core.helper.code_executor.code_executor import CodeExecutionResponse, CodeExecutor
 from core.workflow.entities.node_entities import NodeRunResult
 from core.workflow.entities.variable_pool import VariablePool
 from core.workflow.enums import SystemVariableKey
@@ -858,3 +861,163 @@ def test_iteration_run_error_handle():
             assert item.run_result.status == WorkflowNodeExecutionStatus.SUCCEEDED
             assert item.run_result.outputs == {"output": []}
     assert count == 14
+
+
+def _run_single_code_node_iteration(
+    code: str, items: list[str], error_handle_mode: ErrorHandleMode, is_parallel: bool = False
+):
+    graph_config = {
+        "edges": [
+            {
+                "id": "start-source-iteration-1-target",
+                "source": "start",
+                "target": "iteration-1",
+            },
+            {
+                "id": "iteration-start-source-code-target",
+                "source": "iteration-start",
+                "target": "code",
+            },
+        ],
+        "nodes": [
+            {"data": {"title": "Start", "type": "start", "variables": []}, "id": "start"},
+            {
+                "data": {"title": "iteration", "type": "iteration"},
+                "id": "iteration-1",
+            },
+            {
+                "data": {"iteration_id": "iteration-1", "title": "", "type": "iteration-start"},
+                "id": "iteration-start",
+            },
+            {
+                "data": {
+                    "iteration_id": "iteration-1",
+                    "title": "code",
+                    "type": "code",
+                    "code_language": "python3",
+                    "code": code,
+                    "variables": [
+                        {"variable": "item", "value_selector": ["iteration-1", "item"]},
+                        {"variable": "index", "value_selector": ["iteration-1", "index"]},
+                    ],
+                    "outputs": {"result": {"type": "string"}},
+                },
+                "id": "code",
+            },
+        ],
+    }
+
+    graph = Graph.init(graph_config=graph_config)
+
+    init_params = GraphInitParams(
+        tenant_id="1",
+        app_id="1",
+        workflow_type=WorkflowType.WORKFLOW,
+        workflow_id="1",
+        graph_config=graph_config,
+        user_id="1",
+        user_from=UserFrom.ACCOUNT,
+        invoke_from=InvokeFrom.DEBUGGER,
+        call_depth=0,
+    )
+
+    pool = VariablePool(
+        system_variables={SystemVariableKey.FILES: [], SystemVariableKey.USER_ID: "1"},
+        user_inputs={},
+        environment_variables=[],
+    )
+    pool.add(["pe", "list_output"], items)
+
+    iteration_node = IterationNode(
+        id=str(uuid.uuid4()),
+        graph_init_params=init_params,
+        graph=graph,
+        graph_runtime_state=GraphRuntimeState(variable_pool=pool, start_at=time.perf_counter()),
+        config={
+            "data": {
+                "iterator_selector": ["pe", "list_output"],
+                "output_selector": ["code", "result"],
+                "output_type": "array[string]",
+                "start_node_id": "iteration-start",
+                "title": "iteration",
+                "type": "iteration",
+                "error_handle_mode": error_handle_mode,
+                "is_parallel": is_parallel,
+            },
+            "id": "iteration-1",
+        },
+    )
+
+    sandbox_outputs = []
+
+    def run_code(language, preload, code):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            exec(code, {})
+        sandbox_outputs.append(stdout.getvalue())
+        return CodeExecutionResponse.Data(stdout=stdout.getvalue(), error="")
+
+    events = []
+    with (
+        patch.object(CodeExecutor, "_run_code", new=run_code),
+        patch("core.helper.code_executor.code_executor.dify_config.CODE_EXECUTION_BATCH_SIZE", 16),
+    ):
+        # like the graph engine, stop at the completion of the iteration
+        for event in iteration_node._run():
+            events.append(event)
+            if isinstance(event, RunCompletedEvent):
+                break
+
+    return events, sandbox_outputs
+
+
+def test_run_single_code_node_batched():
+    events, sandbox_outputs = _run_single_code_node_iteration(
+        "def main(item: str, index: int) -> dict:\n    return {'result': f'{index}:{item}'}\n",
+        ["a", "b", "c"],
+        ErrorHandleMode.TERMINATED,
+    )
+
+    # the code of all items is executed in one sandbox run
+    assert len(sandbox_outputs) == 1
+    assert isinstance(events[-1], RunCompletedEvent)
+    assert events[-1].run_result.status == WorkflowNodeExecutionStatus.SUCCEEDED
+    assert events[-1].run_result.outputs == {"output": ["0:a", "1:b", "2:c"]}
+
+
+def test_run_single_code_node_batched_terminated_on_error():
+    events, sandbox_outputs = _run_single_code_node_iteration(
+        "def main(item: str, index: int) -> dict:\n    return {'result': item.upper() if item else item[0]}\n",
+        ["a", "", "c"],
+        ErrorHandleMode.TERMINATED,
+    )
+
+    # the item after the failed one is neither executed in the batch nor on its own
+    assert len(sandbox_outputs) == 1
+    assert sandbox_outputs[0].count("<<RESULT>>") == 4
+    assert isinstance(events[-1], RunCompletedEvent)
+    assert events[-1].run_result.status == WorkflowNodeExecutionStatus.FAILED
+
+    events, sandbox_outputs = _run_single_code_node_iteration(
+        "def main(item: str, index: int) -> dict:\n    return {'result': item.upper() if item else item[0]}\n",
+        ["a", "", "c"],
+        ErrorHandleMode.CONTINUE_ON_ERROR,
+    )
+
+    assert len(sandbox_outputs) == 1
+    assert events[-1].run_result.status == WorkflowNodeExecutionStatus.SUCCEEDED
+    assert events[-1].run_result.outputs == {"output": ["A", None, "C"]}
+
+
+def test_run_single_code_node_parallel_not_batched():
+    events, sandbox_outputs = _run_single_code_node_iteration(
+        "def main(item: str, index: int) -> dict:\n    return {'result': f'{index}:{item}'}\n",
+        ["a", "b", "c"],
+        ErrorHandleMode.TERMINATED,
+        is_parallel=True,
+    )
+
+    # the lanes execute their items on their own instead of waiting for a batch
+    assert len(sandbox_outputs) == 3
+    assert events[-1].run_result.status == WorkflowNodeExecutionStatus.SUCCEEDED
+    assert sorted(events[-1].run_result.outputs["output"]) == ["0:a", "1:b", "2:c"]
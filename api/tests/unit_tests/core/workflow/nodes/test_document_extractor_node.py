@@ -1,5 +1,9 @@
+import hashlib
+import io
 from unittest.mock import Mock, patch
 
+import docx
+import pandas as pd
 import pytest
 
 from core.file import File, FileTransferMethod
@@ -7,8 +11,10 @@ from core.variables import ArrayFileSegment
 from core.variables.variables import StringVariable
 from core.workflow.entities.node_entities import NodeRunResult
 from core.workflow.nodes.document_extractor import DocumentExtractorNode, DocumentExtractorNodeData
+from core.workflow.nodes.document_extractor.extraction_cache import DocumentExtractionCache
 from core.workflow.nodes.document_extractor.node import (
     _extract_text_from_docx,
+    _extract_text_from_excel,
     _extract_text_from_pdf,
     _extract_text_from_plain_text,
 )
@@ -176,3 +182,95 @@ def test_extract_text_from_docx(mock_document):
 
 def test_node_type(document_extractor_node):
     assert document_extractor_node._node_type == NodeType.DOCUMENT_EXTRACTOR
+
+
+def _create_docx(text: str) -> bytes:
+    document = docx.Document()
+    document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _create_xlsx(rows: list[dict]) -> bytes:
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _create_local_file(file_id: str, extension: str) -> File:
+    file = Mock(spec=File)
+    file.transfer_method = FileTransferMethod.LOCAL_FILE
+    file.related_id = file_id
+    file.extension = extension
+    file.mime_type = None
+    return file
+
+
+class _FakeStorage:
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+
+    def load_once(self, filename: str) -> bytes:
+        if filename not in self.files:
+            raise FileNotFoundError(filename)
+        return self.files[filename]
+
+    def save(self, filename: str, data: bytes):
+        self.files[filename] = data
+
+
+def test_extract_text_from_files_parallel_and_cached(document_extractor_node, mock_graph_runtime_state):
+    document_extractor_node.graph_runtime_state = mock_graph_runtime_state
+    contents = {
+        "docx": _create_docx("Employee handbook"),
+        "xlsx": _create_xlsx([{"name": "Alice", "age": 30}]),
+        "pdf": b"%PDF-1.5\n%Test PDF content",
+        "csv": b"name,age\nBob,40\n",
+    }
+    files = [_create_local_file(file_id, f".{file_id}") for file_id in contents]
+    mock_array_file_segment = Mock(spec=ArrayFileSegment)
+    mock_array_file_segment.value = files
+    mock_graph_runtime_state.variable_pool.get.return_value = mock_array_file_segment
+
+    storage = _FakeStorage()
+    download = Mock(side_effect=lambda file: contents[file.related_id])
+    extract_pdf = Mock(return_value="PDF content")
+    with (
+        patch("core.workflow.nodes.document_extractor.extraction_cache.storage", new=storage),
+        patch(
+            "core.workflow.nodes.document_extractor.node.document_extraction_cache",
+            new=DocumentExtractionCache(2, storage_enabled=True),
+        ),
+        patch(
+            "core.workflow.nodes.document_extractor.node._get_upload_file_hash",
+            new=lambda file: hashlib.sha3_256(contents[file.related_id]).hexdigest(),
+        ),
+        patch("core.file.file_manager.download", new=download),
+        patch("core.workflow.nodes.document_extractor.node._extract_text_from_pdf", new=extract_pdf),
+    ):
+        results = [document_extractor_node._run() for _ in range(3)]
+
+    texts = results[0].outputs["text"]
+    assert "Employee handbook" in texts[0]
+    assert texts[1] == _extract_text_from_excel(contents["xlsx"])
+    assert texts[2] == "PDF content"
+    assert "Bob" in texts[3]
+    assert all(result.outputs["text"] == texts for result in results)
+    # files are only downloaded and parsed by the first run, later runs find the texts by upload file hash
+    assert download.call_count == len(contents)
+    assert extract_pdf.call_count == 1
+    assert len(storage.files) == len(contents)
+
+
+def test_document_extraction_cache_without_storage():
+    storage = _FakeStorage()
+    cache = DocumentExtractionCache(1)
+    with patch("core.workflow.nodes.document_extractor.extraction_cache.storage", new=storage):
+        cache.set("key-1", "text 1")
+        cache.set("key-2", "text 2")
+
+        # only the latest text is kept in process, nothing is written to storage
+        assert cache.get("key-1") is None
+        assert cache.get("key-2") == "text 2"
+    assert storage.files == {}
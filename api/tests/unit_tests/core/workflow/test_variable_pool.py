@@ -44,3 +44,110 @@ def test_use_long_selector(pool):
     result = pool.get(("node_1", "part_1", "part_2"))
     assert result is not None
     assert result.value == "test_value"
+
+
+def test_overlay_reads_fall_back_to_parent(pool):
+    pool.add(("node_1", "var"), StringSegment(value="parent_value"))
+
+    overlay = pool.create_overlay()
+
+    result = overlay.get(("node_1", "var"))
+    assert result is not None
+    assert result.value == "parent_value"
+
+
+def test_overlay_writes_do_not_touch_parent(pool):
+    pool.add(("node_1", "var"), StringSegment(value="parent_value"))
+    pool.add(("node_2", "var"), StringSegment(value="parent_value"))
+
+    overlay = pool.create_overlay()
+    overlay.add(("node_1", "var"), StringSegment(value="overlay_value"))
+    overlay.add(("node_3", "var"), StringSegment(value="overlay_value"))
+    overlay.remove(("node_2",))
+
+    assert overlay.get(("node_1", "var")).value == "overlay_value"
+    assert overlay.get(("node_2", "var")) is None
+    assert overlay.get(("node_3", "var")).value == "overlay_value"
+
+    assert pool.get(("node_1", "var")).value == "parent_value"
+    assert pool.get(("node_2", "var")).value == "parent_value"
+    assert pool.get(("node_3", "var")) is None
+
+
+def test_overlays_are_isolated(pool):
+    first = pool.create_overlay()
+    second = pool.create_overlay()
+
+    first.add(("iteration", "item"), StringSegment(value="first"))
+    second.add(("iteration", "item"), StringSegment(value="second"))
+
+    assert first.get(("iteration", "item")).value == "first"
+    assert second.get(("iteration", "item")).value == "second"
+    assert pool.get(("iteration", "item")) is None
+
+
+def test_overlay_remove_then_add(pool):
+    pool.add(("node_1", "var"), StringSegment(value="parent_value"))
+
+    overlay = pool.create_overlay()
+    overlay.remove(("node_1", "var"))
+    assert overlay.get(("node_1", "var")) is None
+
+    overlay.add(("node_1", "var"), StringSegment(value="overlay_value"))
+    assert overlay.get(("node_1", "var")).value == "overlay_value"
+
+
+def test_overlay_get_file_attribute(pool, file):
+    pool.add(("node_1", "file_var"), FileSegment(value=file))
+
+    overlay = pool.create_overlay()
+
+    result = overlay.get(("node_1", "file_var", "name"))
+    assert result is not None
+    assert result.value == file.filename
+
+
+def test_merge_overlay(pool):
+    pool.add(("node_1", "var"), StringSegment(value="parent_value"))
+    pool.add(("node_2", "var"), StringSegment(value="parent_value"))
+
+    overlay = pool.create_overlay()
+    overlay.add(("node_1", "var"), StringSegment(value="overlay_value"))
+    overlay.remove(("node_2", "var"))
+    overlay.add(("private", "var"), StringSegment(value="private_value"))
+
+    pool.merge_overlay(overlay, exclude_node_ids=["private"])
+
+    assert pool.get(("node_1", "var")).value == "overlay_value"
+    assert pool.get(("node_2", "var")) is None
+    assert pool.get(("private", "var")) is None
+
+
+def test_merge_nested_overlay(pool):
+    pool.add(("node_1", "var"), StringSegment(value="parent_value"))
+    pool.add(("node_2", "var"), StringSegment(value="parent_value"))
+
+    # an iteration inside an iteration merges its overlay into the overlay of the outer iteration
+    outer = pool.create_overlay()
+    inner = outer.create_overlay()
+    inner.remove(("node_1", "var"))
+    inner.remove(("node_2",))
+
+    outer.merge_overlay(inner)
+
+    assert outer.get(("node_1", "var")) is None
+    assert outer.get(("node_2", "var")) is None
+    assert pool.get(("node_1", "var")).value == "parent_value"
+    assert pool.get(("node_2", "var")).value == "parent_value"
+
+    pool.merge_overlay(outer)
+
+    assert pool.get(("node_1", "var")) is None
+    assert pool.get(("node_2", "var")) is None
+
+
+def test_merge_overlay_of_another_pool(pool):
+    other = VariablePool(system_variables={}, user_inputs={})
+
+    with pytest.raises(ValueError):
+        pool.merge_overlay(other.create_overlay())
@@ -0,0 +1,63 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, insert, select
+
+from libs.infinite_scroll_pagination import InfiniteScrollPagination, keyset_condition, keyset_order_by
+
+metadata = MetaData()
+items = Table(
+    "items",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("position", Integer, nullable=False),
+)
+
+
+def _paginate(conn, limit: int, descending: bool) -> list[InfiniteScrollPagination]:
+    pages = []
+    last_row = None
+    while True:
+        stmt = select(items)
+        if last_row:
+            stmt = stmt.where(
+                keyset_condition(items.c.created_at, items.c.id, last_row.created_at, last_row.id, descending)
+            )
+        rows = conn.execute(
+            stmt.order_by(*keyset_order_by(items.c.created_at, items.c.id, descending)).limit(limit + 1)
+        )
+        page = InfiniteScrollPagination.from_rows(rows.all(), limit)
+        pages.append(page)
+        if not page.has_more:
+            return pages
+        last_row = page.data[-1]
+
+
+def test_keyset_pagination_with_tied_sort_values():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    created_at = datetime.datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        # groups of 3 rows created at the same time
+        conn.execute(
+            insert(items),
+            [
+                {"id": f"id-{i:02d}", "created_at": created_at + datetime.timedelta(seconds=i // 3), "position": i}
+                for i in range(10)
+            ],
+        )
+
+        for descending in (True, False):
+            pages = _paginate(conn, limit=4, descending=descending)
+
+            assert [len(page.data) for page in pages] == [4, 4, 2]
+            assert [page.has_more for page in pages] == [True, True, False]
+            positions = [row.position for page in pages for row in page.data]
+            assert positions == sorted(range(10), reverse=descending)
+
+
+def test_from_rows_with_exact_limit():
+    page = InfiniteScrollPagination.from_rows([1, 2, 3], limit=3)
+
+    assert page.data == [1, 2, 3]
+    assert not page.has_more
@@ -0,0 +1,253 @@
+import re
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from flask_restful import marshal  # type: ignore
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateTable
+
+from extensions.ext_database import db
+from fields.conversation_fields import conversation_with_summary_fields, message_detail_fields
+from fields.message_fields import message_fields
+from models.account import Account
+from models.model import (
+    App,
+    AppAnnotationHitHistory,
+    AppAnnotationSetting,
+    AppModelConfig,
+    Conversation,
+    DatasetRetrieverResource,
+    EndUser,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageFeedback,
+    MessageFile,
+)
+from models.types import StringUUID
+from models.workflow import WorkflowRun
+from services.eager_loading_service import EagerLoadingService
+
+MODELS = [
+    Account,
+    App,
+    AppAnnotationHitHistory,
+    AppAnnotationSetting,
+    AppModelConfig,
+    Conversation,
+    DatasetRetrieverResource,
+    EndUser,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageFeedback,
+    MessageFile,
+    WorkflowRun,
+]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    with engine.begin() as conn:
+        for model in MODELS:
+            ddl = str(CreateTable(model.__table__).compile(engine))
+            # sqlite does not support the uuid_generate_v4() server default and postgres casts
+            ddl = re.sub(r" DEFAULT uuid_generate_v4\(\)|::character varying|::text", "", ddl)
+            conn.exec_driver_sql(ddl)
+
+    # bind ids as strings, like on postgres, so loaded ids can be bound again
+    with patch.object(StringUUID, "process_bind_param", lambda self, value, dialect: value and str(value)):
+        yield engine
+
+
+def _new_id() -> str:
+    return str(uuid4())
+
+
+def _seed(engine, conversation_count: int, message_count: int) -> str:
+    app_id = _new_id()
+    account = Account(id=_new_id(), name="account", email=f"{_new_id()}@example.com")
+    app_model_config = AppModelConfig(id=_new_id(), app_id=app_id, provider="openai", model_id="gpt-4o")
+    rows: list = [
+        account,
+        app_model_config,
+        App(
+            id=app_id,
+            tenant_id=_new_id(),
+            name="app",
+            mode="chat",
+            icon_type="emoji",
+            enable_site=True,
+            enable_api=True,
+            app_model_config_id=app_model_config.id,
+        ),
+    ]
+    created_at = datetime(2025, 1, 1)
+    for i in range(conversation_count):
+        end_user = EndUser(id=_new_id(), tenant_id=_new_id(), app_id=app_id, type="browser", session_id=f"session-{i}")
+        conversation = Conversation(
+            id=_new_id(),
+            app_id=app_id,
+            app_model_config_id=app_model_config.id,
+            mode="chat",
+            name=f"conversation {i}",
+            _inputs={},
+            status="normal",
+            from_source="api",
+            from_end_user_id=end_user.id,
+        )
+        rows += [end_user, conversation]
+        for j in range(message_count):
+            workflow_run = WorkflowRun(
+                id=_new_id(),
+                tenant_id=_new_id(),
+                app_id=app_id,
+                sequence_number=j,
+                workflow_id=_new_id(),
+                type="chat",
+                triggered_from="app-run",
+                version="1",
+                status="succeeded" if j % 2 else "failed",
+                created_by_role="end_user",
+                created_by=end_user.id,
+            )
+            message = Message(
+                id=_new_id(),
+                app_id=app_id,
+                conversation_id=conversation.id,
+                _inputs={},
+                query=f"query {j}",
+                message=[],
+                answer=f"answer {j}",
+                message_unit_price=0,
+                answer_unit_price=0,
+                currency="USD",
+                from_source="api",
+                from_end_user_id=end_user.id,
+                workflow_run_id=workflow_run.id,
+                created_at=created_at + timedelta(seconds=j),
+            )
+            annotation = MessageAnnotation(
+                id=_new_id(),
+                app_id=app_id,
+                conversation_id=conversation.id,
+                message_id=message.id,
+                content="annotation",
+                account_id=account.id,
+            )
+            rows += [
+                workflow_run,
+                message,
+                annotation,
+                MessageFeedback(
+                    id=_new_id(),
+                    app_id=app_id,
+                    conversation_id=conversation.id,
+                    message_id=message.id,
+                    rating="like",
+                    from_source="user",
+                    from_end_user_id=end_user.id,
+                ),
+                MessageFeedback(
+                    id=_new_id(),
+                    app_id=app_id,
+                    conversation_id=conversation.id,
+                    message_id=message.id,
+                    rating="dislike",
+                    from_source="admin",
+                    from_account_id=account.id,
+                ),
+                AppAnnotationHitHistory(
+                    id=_new_id(),
+                    app_id=app_id,
+                    annotation_id=annotation.id,
+                    source="api",
+                    question="question",
+                    account_id=account.id,
+                    message_id=message.id,
+                    annotation_question="question",
+                    annotation_content="annotation",
+                ),
+                MessageAgentThought(
+                    id=_new_id(),
+                    message_id=message.id,
+                    position=1,
+                    thought="thought",
+                    created_by_role="end_user",
+                    created_by=end_user.id,
+                ),
+                DatasetRetrieverResource(
+                    id=_new_id(),
+                    message_id=message.id,
+                    position=1,
+                    dataset_id=_new_id(),
+                    dataset_name="dataset",
+                    document_id=_new_id(),
+                    document_name="document",
+                    data_source_type="upload_file",
+                    segment_id=_new_id(),
+                    content="content",
+                    retriever_from="api",
+                    created_by=account.id,
+                ),
+            ]
+
+    with Session(engine) as session:
+        session.add_all(rows)
+        session.commit()
+    return app_id
+
+
+def _serialize(engine, model, fields, app_id: str, eager_load) -> tuple[list, int]:
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        with Session(engine) as session, patch.object(db, "session", session):
+            rows = session.query(model).filter(model.app_id == app_id).order_by(model.created_at, model.id).all()
+            if eager_load:
+                eager_load(rows)
+            result = marshal(rows, fields)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+    return result, len(statements)
+
+
+@pytest.mark.parametrize("fields", [message_detail_fields, message_fields])
+def test_load_messages(engine, fields):
+    app_id = _seed(engine, conversation_count=1, message_count=3)
+    expected, _ = _serialize(engine, Message, fields, app_id, eager_load=None)
+    result, query_count = _serialize(engine, Message, fields, app_id, eager_load=EagerLoadingService.load_messages)
+    assert result == expected
+    assert result[0]["agent_thoughts"]
+
+    larger_app_id = _seed(engine, conversation_count=1, message_count=12)
+    _, larger_query_count = _serialize(
+        engine, Message, fields, larger_app_id, eager_load=EagerLoadingService.load_messages
+    )
+    assert larger_query_count == query_count
+
+
+def test_load_conversations(engine):
+    app_id = _seed(engine, conversation_count=2, message_count=3)
+    expected, _ = _serialize(engine, Conversation, conversation_with_summary_fields, app_id, eager_load=None)
+    result, query_count = _serialize(
+        engine, Conversation, conversation_with_summary_fields, app_id, EagerLoadingService.load_conversations
+    )
+    assert result == expected
+    assert result[0]["status_count"] == {"success": 1, "failed": 2, "partial_success": 0}
+    assert result[0]["admin_feedback_stats"] == {"like": 0, "dislike": 3}
+
+    larger_app_id = _seed(engine, conversation_count=8, message_count=3)
+    _, larger_query_count = _serialize(
+        engine, Conversation, conversation_with_summary_fields, larger_app_id, EagerLoadingService.load_conversations
+    )
+    assert larger_query_count == query_count
@@ -0,0 +1,98 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from services.retention_purge_service import MESSAGE_RELATED_MODELS, RetentionPurgeService
+
+
+def _message_rows(start: int, count: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=f"message-{i}", app_id="app", created_at=datetime.datetime(2024, 1, 1) + datetime.timedelta(i)
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def _mock_session(batches: list[list[SimpleNamespace]]) -> MagicMock:
+    session = MagicMock()
+    results = []
+    for rows in batches:
+        results.append(MagicMock(all=MagicMock(return_value=rows)))
+        # deletes of the related rows and of the messages
+        results.extend(MagicMock(rowcount=len(rows)) for _ in range(len(MESSAGE_RELATED_MODELS) + 1))
+    results.append(MagicMock(all=MagicMock(return_value=[])))
+    session.execute.side_effect = results
+    session.scalar.return_value = 2
+    return session
+
+
+def test_purge_messages():
+    session = _mock_session([_message_rows(0, 3), _message_rows(3, 2)])
+    redis_client = MagicMock()
+    redis_client.get.return_value = None
+
+    with (
+        patch("services.retention_purge_service.db", new=MagicMock(session=session)),
+        patch("services.retention_purge_service.redis_client", new=redis_client),
+        patch("services.retention_purge_service.dify_config.BILLING_ENABLED", False),
+    ):
+        stats = RetentionPurgeService.purge_messages(before=datetime.datetime(2025, 1, 1), batch_size=3)
+
+    assert stats.batches == 2
+    assert stats.rows["messages"] == 5
+    assert stats.total_rows == 5 * (len(MESSAGE_RELATED_MODELS) + 1)
+    assert session.commit.call_count == 2
+    # the checkpoint is the last message of the batch and is cleared at the end
+    assert redis_client.setex.call_args_list[-1].args[2] == f"{datetime.datetime(2024, 1, 5).isoformat()} message-4"
+    redis_client.delete.assert_called_once_with(RetentionPurgeService.MESSAGES_CHECKPOINT_KEY)
+    assert "rows/s" in stats.to_report()
+
+
+def test_purge_messages_dry_run():
+    session = MagicMock()
+    session.execute.side_effect = [
+        MagicMock(all=MagicMock(return_value=_message_rows(0, 3))),
+        MagicMock(all=MagicMock(return_value=[])),
+    ]
+    session.scalar.return_value = 2
+    redis_client = MagicMock()
+
+    with (
+        patch("services.retention_purge_service.db", new=MagicMock(session=session)),
+        patch("services.retention_purge_service.redis_client", new=redis_client),
+        patch("services.retention_purge_service.dify_config.BILLING_ENABLED", False),
+    ):
+        stats = RetentionPurgeService.purge_messages(before=datetime.datetime(2025, 1, 1), batch_size=3, dry_run=True)
+
+    # rows are counted, not deleted
+    assert session.scalar.call_count == len(MESSAGE_RELATED_MODELS) + 1
+    assert stats.total_rows == 2 * (len(MESSAGE_RELATED_MODELS) + 1)
+    session.commit.assert_not_called()
+    redis_client.setex.assert_not_called()
+    redis_client.get.assert_not_called()
+    assert "would be deleted" in stats.to_report()
+
+
+def test_kept_tenants_are_looked_up_once():
+    session = MagicMock()
+    session.scalars.return_value.all.return_value = ["tenant-sandbox", "tenant-team"]
+    redis_client = MagicMock()
+    redis_client.get.return_value = None
+    plans = {"tenant-sandbox": "sandbox", "tenant-team": "team"}
+
+    with (
+        patch("services.retention_purge_service.db", new=MagicMock(session=session)),
+        patch("services.retention_purge_service.redis_client", new=redis_client),
+        patch("services.retention_purge_service.dify_config.BILLING_ENABLED", True),
+        patch(
+            "services.retention_purge_service.FeatureService.get_features",
+            side_effect=lambda tenant_id: SimpleNamespace(
+                billing=SimpleNamespace(subscription=SimpleNamespace(plan=plans[tenant_id]))
+            ),
+        ) as get_features,
+    ):
+        kept_tenant_ids = RetentionPurgeService._get_kept_tenant_ids(datetime.datetime(2025, 1, 1))
+
+    assert kept_tenant_ids == ["tenant-team"]
+    assert get_features.call_count == 2